@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""Configuration for the *kiara* service."""
+
+from typing import Dict, List, Union
+
+from pydantic import BaseModel, Field
+
+
+class KiaraServiceConfig(BaseModel):
+    """The configuration of a kiara service instance."""
+
+    read_pool_size: int = Field(
+        description="The maximum number of requests that can read from the kiara context in parallel (kiara itself is not thread-safe, so only increase this if the reads are known to be safe).",
+        default=1,
+        ge=1,
+    )
+    value_cache_size: int = Field(
+        description="The maximum number of values to keep in the in-process value cache.",
+        default=1024,
+        ge=0,
+    )
+    value_cache_max_bytes: int = Field(
+        description="The maximum (estimated) size in bytes of the values (including their data) in the in-process value cache.",
+        default=512 * 1024 * 1024,
+        ge=0,
+    )
+    warmup_aliases: List[str] = Field(
+        description="Aliases (or ids) of values to load into the value cache at startup.",
+        default_factory=list,
+    )
+    warmup_recent_values: int = Field(
+        description="The number of most recently accessed values (as tracked by previous runs of the service) to load into the value cache at startup.",
+        default=0,
+        ge=0,
+    )
+    warmup_load_data: bool = Field(
+        description="Whether to also load the data of the values that are pre-loaded at startup, not only their metadata.",
+        default=False,
+    )
+    upload_staging_dir: Union[str, None] = Field(
+        description="The folder to stage uploaded files in, defaults to a context-specific folder in the user cache dir.",
+        default=None,
+    )
+    upload_chunk_size: int = Field(
+        description="The default size of upload chunks (in bytes).",
+        default=8 * 1024 * 1024,
+        ge=1,
+    )
+    job_timeout: Union[float, None] = Field(
+        description="The default wall-clock timeout for jobs (in seconds), 'None' means no timeout.",
+        default=None,
+        gt=0,
+    )
+    operation_timeouts: Dict[str, float] = Field(
+        description="Wall-clock timeouts for specific operations (in seconds), overriding the default job timeout.",
+        default_factory=dict,
+    )
+    job_workers: int = Field(
+        description="The number of worker processes to run jobs in, '0' runs jobs in the service process.",
+        default=0,
+        ge=0,
+    )
+    job_worker_max_jobs: Union[int, None] = Field(
+        description="The number of jobs after which a worker process is replaced, 'None' means never.",
+        default=100,
+        ge=1,
+    )
+    job_worker_max_output_bytes: Union[int, None] = Field(
+        description="The maximum size in bytes of the (pickled) output data a worker process returns for a job, larger outputs fail the job, 'None' means unbounded.",
+        default=256 * 1024 * 1024,
+        ge=1,
+    )
+    tracing: bool = Field(
+        description="Whether to trace (a sample of) requests, traces can be retrieved from '/debug/traces'.",
+        default=False,
+    )
+    trace_sample_rate: float = Field(
+        description="The fraction of requests to trace, requests with a sampled 'traceparent' header are always traced.",
+        default=0.01,
+        ge=0,
+        le=1,
+    )
+    trace_buffer_size: int = Field(
+        description="The number of most recent traces to keep in memory.",
+        default=100,
+        ge=1,
+    )
+    trace_file: Union[str, None] = Field(
+        description="The (optional) file to append traces to, in OTLP/JSON format (one trace per line).",
+        default=None,
+    )
+    admin_token: Union[str, None] = Field(
+        description="The bearer token required for admin-only endpoints (e.g. profiling), these endpoints are disabled if not set.",
+        default=None,
+    )
+    batch_max_requests: int = Field(
+        description="The maximum number of requests in a single '/batch' request.",
+        default=50,
+        ge=1,
+    )
+    response_cache_dir: Union[str, None] = Field(
+        description="The folder for the on-disk cache of immutable responses (shared by all service processes of a context), defaults to a folder in the user cache dir.",
+        default=None,
+    )
+    response_cache_max_bytes: int = Field(
+        description="The maximum size (in bytes) of the on-disk response cache, '0' disables it.",
+        default=1024 * 1024 * 1024,
+        ge=0,
+    )
+    response_cache_max_item_bytes: int = Field(
+        description="The maximum size (in bytes) of a single response in the on-disk response cache, larger responses are not cached.",
+        default=64 * 1024 * 1024,
+        ge=0,
+    )
+    registry_snapshot: bool = Field(
+        description="Whether to serve registry metadata (operations, modules, data types, pipelines) from a snapshot taken by a previous run while the registries are loaded in the background at startup.",
+        default=True,
+    )
+    registry_snapshot_dir: Union[str, None] = Field(
+        description="The folder to keep registry snapshots in, defaults to a folder in the user cache dir.",
+        default=None,
+    )
+    template_bytecode_cache_dir: Union[str, None] = Field(
+        description="The folder to keep the compiled bytecode of templates in, defaults to a folder in the user cache dir.",
+        default=None,
+    )
+    template_fragment_cache_size: int = Field(
+        description="The maximum number of rendered template fragments (that only depend on immutable inputs) to keep in memory.",
+        default=1024,
+        ge=0,
+    )
+    minify_assets: bool = Field(
+        description="Whether to minify the stylesheets served as (fingerprinted) static assets.",
+        default=False,
+    )
+    value_info_prerender: bool = Field(
+        description="Whether to render the HTML info of values in the background once they are stored, so it can be served from the response cache right away.",
+        default=True,
+    )
+    value_info_stream_threshold: int = Field(
+        description="Cached HTML value infos larger than this (in bytes) are streamed from the response cache, instead of being loaded into memory as a whole.",
+        default=1024 * 1024,
+        ge=0,
+    )
+    aggregation_threads: int = Field(
+        description="The number of threads DuckDB uses for a single aggregate query, several queries can run at the same time.",
+        default=4,
+        ge=1,
+    )
+    max_open_contexts: int = Field(
+        description="When serving several contexts: the maximum number of (additional) contexts to keep open.",
+        default=32,
+        ge=1,
+    )
+    context_idle_timeout: Union[float, None] = Field(
+        description="When serving several contexts: the number of seconds after which an unused context is closed, 'None' means never.",
+        default=900,
+        gt=0,
+    )
+    context_memory_budget: Union[int, None] = Field(
+        description="When serving several contexts: the (estimated) memory budget in bytes for all open (additional) contexts, 'None' means unbounded.",
+        default=4 * 1024 * 1024 * 1024,
+        ge=0,
+    )
@@ -7,6 +7,7 @@
 
 """Web-service related subcommands for the cli."""
 import typing
+from typing import Any, Tuple, Union
 
 import rich_click as click
 
@@ -25,25 +26,624 @@ def service(ctx):
     "--host", help="The host to bind to.", required=False, default="localhost"
 )
 @click.option("--port", "-p", help="The port to bind to.", required=False, default=8080)
+@click.option(
+    "--uds",
+    help="The path of a Unix domain socket to listen on, instead of host and port.",
+    required=False,
+)
+@click.option(
+    "--http2",
+    help="Serve HTTP/2 (cleartext, 'h2c') in addition to HTTP/1.1, requires the 'hypercorn' package.",
+    is_flag=True,
+)
+@click.option(
+    "--keep-alive",
+    help="The number of seconds to keep idle connections open.",
+    required=False,
+    default=5,
+    type=int,
+)
+@click.option(
+    "--backlog",
+    help="The maximum number of pending connections.",
+    required=False,
+    default=2048,
+    type=int,
+)
+@click.option(
+    "--read-pool-size",
+    help="The maximum number of requests reading from the kiara context in parallel (kiara is not thread-safe, so use with care).",
+    required=False,
+    default=1,
+    type=int,
+)
+@click.option(
+    "--warmup-alias",
+    "-w",
+    help="The alias (or id) of a value to load into the value cache at startup, can be used multiple times.",
+    required=False,
+    multiple=True,
+)
+@click.option(
+    "--warmup-recent",
+    help="The number of most recently accessed values to load into the value cache at startup.",
+    required=False,
+    default=0,
+    type=int,
+)
+@click.option(
+    "--warmup-data",
+    help="Also load the data of the values that are loaded at startup.",
+    is_flag=True,
+)
+@click.option(
+    "--job-timeout",
+    help="The wall-clock timeout for jobs (in seconds).",
+    required=False,
+    type=float,
+)
+@click.option(
+    "--job-workers",
+    help="The number of worker processes to run jobs in, '0' runs jobs in the service process.",
+    required=False,
+    default=0,
+    type=int,
+)
+@click.option(
+    "--job-worker-max-jobs",
+    help="The number of jobs after which a worker process is replaced.",
+    required=False,
+    default=100,
+    type=int,
+)
+@click.option(
+    "--response-cache-size",
+    help="The maximum size (in bytes) of the on-disk response cache, which is shared by all service processes of a context, '0' disables it.",
+    required=False,
+    default=1024 * 1024 * 1024,
+    type=int,
+)
+@click.option(
+    "--registry-snapshot/--no-registry-snapshot",
+    help="Serve registry metadata (operations, modules, data types, pipelines) from a snapshot of a previous run, while the registries are loaded at startup.",
+    default=True,
+)
+@click.option(
+    "--aggregation-threads",
+    help="The number of threads used for a single aggregate query.",
+    required=False,
+    default=4,
+    type=int,
+)
+@click.option(
+    "--multi-context",
+    help="Also serve all other contexts of the kiara config, under '/contexts/<context_name>/' (or selected via the 'x-kiara-context' header).",
+    is_flag=True,
+)
+@click.option(
+    "--max-contexts",
+    help="The maximum number of additional contexts to keep open, if serving several contexts.",
+    required=False,
+    default=32,
+    type=int,
+)
+@click.option(
+    "--context-idle-timeout",
+    help="The number of seconds after which an unused (additional) context is closed, if serving several contexts.",
+    required=False,
+    default=900,
+    type=float,
+)
+@click.option(
+    "--minify-assets",
+    help="Minify the stylesheets served as static assets.",
+    is_flag=True,
+)
+@click.option(
+    "--tracing",
+    help="Trace (a sample of) requests, traces can be retrieved from '/debug/traces'.",
+    is_flag=True,
+)
+@click.option(
+    "--trace-sample-rate",
+    help="The fraction of requests to trace.",
+    required=False,
+    default=0.01,
+    type=float,
+)
+@click.option(
+    "--trace-file",
+    help="A file to append traces to (in OTLP/JSON format).",
+    required=False,
+)
+@click.option(
+    "--admin-token",
+    help="The bearer token required for admin-only endpoints (profiling), these are disabled if not set.",
+    required=False,
+    envvar="KIARA_SERVICE_ADMIN_TOKEN",
+)
 @click.pass_context
-def start(ctx, host: str, port: int):
+def start(
+    ctx,
+    host: str,
+    port: int,
+    uds: Union[str, None],
+    http2: bool,
+    keep_alive: int,
+    backlog: int,
+    read_pool_size: int,
+    warmup_alias: Tuple[str, ...],
+    warmup_recent: int,
+    warmup_data: bool,
+    job_timeout: Union[float, None],
+    job_workers: int,
+    job_worker_max_jobs: int,
+    response_cache_size: int,
+    registry_snapshot: bool,
+    aggregation_threads: int,
+    multi_context: bool,
+    max_contexts: int,
+    context_idle_timeout: float,
+    minify_assets: bool,
+    tracing: bool,
+    trace_sample_rate: float,
+    trace_file: Union[str, None],
+    admin_token: Union[str, None],
+):
     """Start a kiara (web) service."""
 
+    from kiara_plugin.service.config import KiaraServiceConfig
     from kiara_plugin.service.openapi.service import KiaraOpenAPIService
+    from kiara_plugin.service.utils.server import ListenerConfig, run_server
+
+    kiara_api: KiaraAPI = ctx.obj.kiara_api
 
-    try:
-        import uvloop
+    service_config = KiaraServiceConfig(
+        read_pool_size=read_pool_size,
+        warmup_aliases=list(warmup_alias),
+        warmup_recent_values=warmup_recent,
+        warmup_load_data=warmup_data,
+        job_timeout=job_timeout,
+        job_workers=job_workers,
+        job_worker_max_jobs=job_worker_max_jobs,
+        response_cache_max_bytes=response_cache_size,
+        registry_snapshot=registry_snapshot,
+        aggregation_threads=aggregation_threads,
+        minify_assets=minify_assets,
+        max_open_contexts=max_contexts,
+        context_idle_timeout=context_idle_timeout,
+        tracing=tracing or trace_file is not None,
+        trace_sample_rate=trace_sample_rate,
+        trace_file=trace_file,
+        admin_token=admin_token,
+    )
+    if multi_context:
+        from kiara_plugin.service.openapi.multi_context import (
+            KiaraMultiContextService,
+        )
 
-        uvloop.install()
-    except Exception:
-        pass
+        kiara_service: Any = KiaraMultiContextService(
+            kiara_config=ctx.obj.kiara_config,
+            default_context=kiara_api.get_current_context_name(),
+            config=service_config,
+        )
+    else:
+        kiara_service = KiaraOpenAPIService(kiara_api=kiara_api, config=service_config)
+    listener = ListenerConfig(
+        host=host,
+        port=port,
+        uds=uds,
+        http2=http2,
+        keep_alive_timeout=keep_alive,
+        backlog=backlog,
+    )
+    run_server(kiara_service.app(), listener)
 
-    kiara_api: KiaraAPI = ctx.obj.kiara_api
 
-    kiara_service = KiaraOpenAPIService(kiara_api=kiara_api)
-    import uvicorn
+@service.command()
+@click.option(
+    "--values",
+    help="The number of values of the generated context to benchmark against.",
+    required=False,
+    default=1000,
+    type=int,
+)
+@click.option(
+    "--workflows",
+    help="The number of workflows of the generated context to benchmark against.",
+    required=False,
+    default=10,
+    type=int,
+)
+@click.option(
+    "--current-context",
+    help="Benchmark the current kiara context, instead of a generated one.",
+    is_flag=True,
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    help="The number of concurrent clients.",
+    required=False,
+    default=8,
+    type=int,
+)
+@click.option(
+    "--iterations",
+    "-n",
+    help="The number of requests per endpoint.",
+    required=False,
+    default=100,
+    type=int,
+)
+@click.option(
+    "--samples",
+    help="The maximum number of different values to request, per endpoint.",
+    required=False,
+    default=10,
+    type=int,
+)
+@click.option(
+    "--output",
+    "-o",
+    help="The file to write the (json) report to, otherwise it is printed.",
+    required=False,
+)
+@click.option(
+    "--baseline",
+    "-b",
+    help="A previous (json) report to compare against, exits with an error if an endpoint got slower.",
+    required=False,
+)
+@click.option(
+    "--tolerance",
+    help="The relative increase of p95 latency (compared to the baseline) that is not considered a regression.",
+    required=False,
+    default=0.2,
+    type=float,
+)
+@click.pass_context
+def benchmark(
+    ctx,
+    values: int,
+    workflows: int,
+    current_context: bool,
+    concurrency: int,
+    iterations: int,
+    samples: int,
+    output: Union[str, None],
+    baseline: Union[str, None],
+    tolerance: float,
+):
+    """Benchmark the service API in-process, and report throughput and latency percentiles per endpoint."""
+
+    import functools
+    import os
+    import sys
+    import tempfile
+
+    import anyio
+
+    from kiara.interfaces.python_api import KiaraAPI
+    from kiara_plugin.service.config import KiaraServiceConfig
+    from kiara_plugin.service.openapi.benchmark import benchmark_service
+    from kiara_plugin.service.utils.benchmark import BenchmarkReport, find_regressions
+    from kiara_plugin.service.utils.context_generator import (
+        ContextSpec,
+        generate_context,
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if current_context:
+            kiara_api: KiaraAPI = ctx.obj.kiara_api
+        else:
+            spec = ContextSpec(
+                scalar_values=values, aliases=values, workflows=workflows
+            )
+            # the benchmark runs jobs, which must not change the cached context
+            kiara_api = generate_context(
+                spec, copy_to=os.path.join(temp_dir, "context")
+            )
+
+        service_config = KiaraServiceConfig(
+            upload_staging_dir=os.path.join(temp_dir, "uploads"),
+            response_cache_dir=os.path.join(temp_dir, "responses"),
+        )
+        report = anyio.run(
+            functools.partial(
+                benchmark_service,
+                kiara_api=kiara_api,
+                config=service_config,
+                concurrency=concurrency,
+                iterations=iterations,
+                samples=samples,
+            )
+        )
+
+    report_json = report.model_dump_json(indent=2)
+    if output:
+        with open(output, "wt") as f:
+            f.write(report_json)
+    else:
+        print(report_json)
+
+    if baseline:
+        with open(baseline, "rt") as f:
+            baseline_report = BenchmarkReport.model_validate_json(f.read())
+        regressions = find_regressions(baseline_report, report, tolerance=tolerance)
+        for name, slowdown in sorted(regressions.items()):
+            print(f"Regression: {name} (p95 +{slowdown:.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+@service.command("benchmark-transports")
+@click.option(
+    "--values",
+    help="The number of values of the generated context to serve.",
+    required=False,
+    default=100,
+    type=int,
+)
+@click.option(
+    "--current-context",
+    help="Serve the current kiara context, instead of a generated one.",
+    is_flag=True,
+)
+@click.option(
+    "--transport",
+    "-t",
+    help="The transport to benchmark, can be used multiple times, defaults to all: tcp, uds, h2c, h2c-uds ('h2c' requires the 'hypercorn' and 'h2' packages).",
+    required=False,
+    multiple=True,
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    help="The number of concurrent clients.",
+    required=False,
+    default=8,
+    type=int,
+)
+@click.option(
+    "--iterations",
+    "-n",
+    help="The number of requests per endpoint.",
+    required=False,
+    default=1000,
+    type=int,
+)
+@click.option(
+    "--output",
+    "-o",
+    help="The file to write the (json) reports to, otherwise a summary is printed.",
+    required=False,
+)
+@click.pass_context
+def benchmark_transports(
+    ctx,
+    values: int,
+    current_context: bool,
+    transport: Tuple[str, ...],
+    concurrency: int,
+    iterations: int,
+    output: Union[str, None],
+):
+    """Serve the service locally over different transports (TCP, Unix socket, HTTP/2), and compare their request rates."""
+
+    import functools
+    import os
+    import tempfile
+
+    import anyio
+    import orjson
+
+    from kiara.interfaces.python_api import KiaraAPI
+    from kiara_plugin.service.config import KiaraServiceConfig
+    from kiara_plugin.service.openapi.benchmark import TRANSPORTS
+    from kiara_plugin.service.openapi.benchmark import (
+        benchmark_transports as _benchmark_transports,
+    )
+    from kiara_plugin.service.utils.context_generator import (
+        ContextSpec,
+        generate_context,
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if current_context:
+            kiara_api: KiaraAPI = ctx.obj.kiara_api
+        else:
+            kiara_api = generate_context(
+                ContextSpec(scalar_values=values, aliases=values),
+                copy_to=os.path.join(temp_dir, "context"),
+            )
+
+        service_config = KiaraServiceConfig(
+            upload_staging_dir=os.path.join(temp_dir, "uploads"),
+            response_cache_dir=os.path.join(temp_dir, "responses"),
+        )
+        reports = anyio.run(
+            functools.partial(
+                _benchmark_transports,
+                kiara_api=kiara_api,
+                config=service_config,
+                transports=transport or TRANSPORTS,
+                concurrency=concurrency,
+                iterations=iterations,
+            )
+        )
+
+    if output:
+        with open(output, "wb") as f:
+            f.write(
+                orjson.dumps(
+                    {name: report.model_dump() for name, report in reports.items()},
+                    option=orjson.OPT_INDENT_2,
+                )
+            )
+        return
+
+    for name, report in reports.items():
+        for endpoint, stats in report.endpoints.items():
+            print(
+                f"{name:<8} {endpoint:<20} {stats.throughput:>10.1f} req/s  p50 {stats.p50:.2f}ms  p99 {stats.p99:.2f}ms"
+            )
+
+
+@service.command("benchmark-encodings")
+@click.option(
+    "--values",
+    help="The number of values of the generated context to benchmark against.",
+    required=False,
+    default=1000,
+    type=int,
+)
+@click.option(
+    "--current-context",
+    help="Benchmark the current kiara context, instead of a generated one.",
+    is_flag=True,
+)
+@click.option(
+    "--iterations",
+    "-n",
+    help="The number of encode and decode runs per listing and encoding.",
+    required=False,
+    default=10,
+    type=int,
+)
+@click.pass_context
+def benchmark_encodings(ctx, values: int, current_context: bool, iterations: int):
+    """Compare payload size, and encode and decode time of the available response encodings on the operations and values listings."""
+
+    import orjson
+
+    from kiara.interfaces.python_api import KiaraAPI
+    from kiara_plugin.service.openapi.benchmark import benchmark_listing_encodings
+    from kiara_plugin.service.utils.context_generator import (
+        ContextSpec,
+        generate_context,
+    )
+
+    if current_context:
+        kiara_api: KiaraAPI = ctx.obj.kiara_api
+    else:
+        kiara_api = generate_context(ContextSpec(scalar_values=values, aliases=values))
+
+    result = benchmark_listing_encodings(kiara_api=kiara_api, iterations=iterations)
+    report = {
+        listing: {
+            media_type: stats.model_dump() for media_type, stats in encodings.items()
+        }
+        for listing, encodings in result.items()
+    }
+    print(orjson.dumps(report, option=orjson.OPT_INDENT_2).decode())
+
+
+@service.command("generate-context")
+@click.option(
+    "--values",
+    help="The number of (scalar) values to create.",
+    required=False,
+    default=1000,
+    type=int,
+)
+@click.option(
+    "--aliases",
+    help="The number of value aliases to create, defaults to the number of values.",
+    required=False,
+    type=int,
+)
+@click.option(
+    "--lineage-chains",
+    help="The number of values with lineage to create.",
+    required=False,
+    default=10,
+    type=int,
+)
+@click.option(
+    "--lineage-depth",
+    help="The number of jobs in the lineage of each of those values.",
+    required=False,
+    default=5,
+    type=int,
+)
+@click.option(
+    "--tables",
+    help="The number of tables to create (requires the 'kiara_plugin.tabular' plugin).",
+    required=False,
+    default=0,
+    type=int,
+)
+@click.option(
+    "--table-rows",
+    help="The number of rows of each table.",
+    required=False,
+    default=1000,
+    type=int,
+)
+@click.option(
+    "--workflows",
+    help="The number of workflows to create.",
+    required=False,
+    default=0,
+    type=int,
+)
+@click.option(
+    "--seed",
+    help="The seed for the random number generator.",
+    required=False,
+    default=0,
+    type=int,
+)
+@click.option(
+    "--cache-dir",
+    help="The folder to keep generated contexts in, defaults to a folder in the user cache dir.",
+    required=False,
+)
+@click.option(
+    "--force", "-f", help="Re-generate the context, even if it exists.", is_flag=True
+)
+@click.pass_context
+def generate_context(
+    ctx,
+    values: int,
+    aliases: Union[int, None],
+    lineage_chains: int,
+    lineage_depth: int,
+    tables: int,
+    table_rows: int,
+    workflows: int,
+    seed: int,
+    cache_dir: Union[str, None],
+    force: bool,
+):
+    """Generate a synthetic kiara context for scaling tests and benchmarks (or re-use a cached one), and print its config file path."""
+
+    import os
+
+    from kiara.defaults import KIARA_CONFIG_FILE_NAME
+    from kiara_plugin.service.utils.context_generator import (
+        ContextSpec,
+        get_context_dir,
+    )
+    from kiara_plugin.service.utils.context_generator import (
+        generate_context as _generate_context,
+    )
+
+    spec = ContextSpec(
+        scalar_values=values,
+        aliases=values if aliases is None else aliases,
+        lineage_chains=lineage_chains,
+        lineage_depth=lineage_depth,
+        tables=tables,
+        table_rows=table_rows,
+        workflows=workflows,
+        seed=seed,
+    )
+
+    def on_progress(task: str, done: int, total: int) -> None:
+        click.echo(f"{task}: {done}/{total}", err=True)
 
-    app = kiara_service.app()
-    config = uvicorn.Config(app=app, host=host, port=port, log_level="info")
-    server = uvicorn.Server(config=config)
-    server.run()
+    _generate_context(spec, cache_dir=cache_dir, force=force, on_progress=on_progress)
+    context_dir = get_context_dir(spec, cache_dir=cache_dir)
+    click.echo(os.path.join(context_dir, KIARA_CONFIG_FILE_NAME))
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark the *kiara* service in-process, against all of its routers."""
+
+import os
+import platform
+import tempfile
+from typing import Dict, Iterable, List
+
+import anyio
+import httpx
+
+from kiara.interfaces.python_api import KiaraAPI
+from kiara_plugin.service.config import KiaraServiceConfig
+from kiara_plugin.service.openapi.service import (
+    KiaraModelResponse,
+    KiaraOpenAPIService,
+)
+from kiara_plugin.service.utils.benchmark import (
+    BenchmarkReport,
+    BenchmarkRequest,
+    benchmark_client,
+    run_benchmark,
+)
+from kiara_plugin.service.utils.encoding import EncodingStats, benchmark_encodings
+from kiara_plugin.service.utils.server import (
+    ListenerConfig,
+    create_client,
+    find_free_port,
+    serve,
+    wait_until_listening,
+)
+
+BENCHMARK_OPERATION = "logic.and"
+"""The (cheap) operation to run for job benchmarks."""
+
+BENCHMARK_PIPELINE = "logic.nand"
+"""The pipeline to use for pipeline benchmarks."""
+
+TRANSPORTS = ["tcp", "uds", "h2c", "h2c-uds"]
+"""The transports that can be compared with `benchmark_transports`."""
+
+
+def create_benchmark_requests(
+    kiara_api: KiaraAPI, samples: int = 10
+) -> List[BenchmarkRequest]:
+    """Create benchmark requests for all service routers, using (a sample of) the values of a kiara context.
+
+    Arguments:
+        kiara_api: the kiara api of the context to benchmark
+        samples: the maximum number of different values to request, per endpoint
+    """
+
+    aliases = sorted(kiara_api.list_alias_names())[:samples]
+    pipeline_ids = kiara_api.list_pipeline_ids()
+    pipeline = (
+        BENCHMARK_PIPELINE
+        if BENCHMARK_PIPELINE in pipeline_ids
+        else next(iter(pipeline_ids), None)
+    )
+    workflows = sorted(kiara_api.list_workflow_alias_names())[:samples]
+
+    requests = [
+        BenchmarkRequest(name="data.ids", path="/data/ids"),
+        BenchmarkRequest(
+            name="data.aliases_info", method="POST", path="/data/aliases_info", body={}
+        ),
+        BenchmarkRequest(
+            name="data.alias_names_of_type", path="/data/type/string/alias_names"
+        ),
+        BenchmarkRequest(
+            name="operations.ids", method="POST", path="/operations/ids", body={}
+        ),
+        BenchmarkRequest(
+            name="operations.info", path=f"/operations/{BENCHMARK_OPERATION}"
+        ),
+        BenchmarkRequest(
+            name="jobs.queue_job",
+            method="POST",
+            path="/jobs/queue_job",
+            body={
+                "operation_id": BENCHMARK_OPERATION,
+                "inputs": {"a": True, "b": True},
+            },
+        ),
+        BenchmarkRequest(
+            name="jobs.queue_job.no_reuse",
+            method="POST",
+            path="/jobs/queue_job",
+            body={
+                "operation_id": BENCHMARK_OPERATION,
+                "inputs": {"a": True, "b": False},
+                "reuse_results": False,
+            },
+        ),
+        BenchmarkRequest(
+            name="render.create_render_manifest",
+            path="/render/create_render_manifest/string",
+        ),
+        BenchmarkRequest(name="pipelines.list", path="/pipelines/list"),
+        BenchmarkRequest(
+            name="workflows.ids", method="POST", path="/workflows/ids", body={}
+        ),
+        BenchmarkRequest(
+            name="workflows.aliases", method="POST", path="/workflows/aliases", body={}
+        ),
+        BenchmarkRequest(
+            name="context.installed_plugins", path="/context/installed_plugins"
+        ),
+    ]
+
+    for alias in aliases:
+        requests.extend(
+            [
+                BenchmarkRequest(
+                    name="data.value_info", path=f"/data/value_info/{alias}"
+                ),
+                BenchmarkRequest(name="data.lineage", path=f"/data/lineage/{alias}"),
+                BenchmarkRequest(
+                    name="render.value",
+                    method="POST",
+                    path=f"/render/value/{alias}/html",
+                ),
+                BenchmarkRequest(
+                    name="render.value_info",
+                    method="POST",
+                    path=f"/render/value_info/{alias}/html",
+                ),
+            ]
+        )
+
+    if pipeline is not None:
+        requests.extend(
+            [
+                BenchmarkRequest(
+                    name="pipelines.structure", path=f"/pipelines/structure/{pipeline}"
+                ),
+                BenchmarkRequest(
+                    name="pipelines.compact_structure",
+                    path=f"/pipelines/compact_structure/{pipeline}",
+                ),
+            ]
+        )
+
+    requests.append(
+        BenchmarkRequest(
+            name="batch",
+            method="POST",
+            path="/batch",
+            body={
+                "requests": [
+                    {"path": f"/operations/{BENCHMARK_OPERATION}"},
+                    {"path": "/data-types/string"},
+                    {"path": "/data/type/string/alias_names"},
+                    *({"path": f"/data/value_info/{alias}"} for alias in aliases),
+                ]
+            },
+        )
+    )
+
+    for workflow in workflows:
+        requests.append(
+            BenchmarkRequest(
+                name="workflows.info", path=f"/workflows/workflow_info/{workflow}"
+            )
+        )
+
+    return requests
+
+
+async def benchmark_service(
+    kiara_api: KiaraAPI,
+    config: KiaraServiceConfig,
+    concurrency: int = 8,
+    iterations: int = 100,
+    samples: int = 10,
+) -> BenchmarkReport:
+    """Boot the service app for a kiara context, and benchmark all of its routers in-process.
+
+    The benchmark runs jobs in the context, so generated contexts should be benchmarked using a copy of them (see
+    'generate_context').
+
+    Arguments:
+        kiara_api: the kiara api of the context to benchmark
+        config: the service configuration
+        concurrency: the number of concurrent clients
+        iterations: the number of measured requests per endpoint
+        samples: the maximum number of different values to request, per endpoint
+    """
+
+    service = KiaraOpenAPIService(kiara_api=kiara_api, config=config)
+    requests = create_benchmark_requests(kiara_api=kiara_api, samples=samples)
+
+    metadata = {
+        "context": kiara_api.get_current_context_name(),
+        "values": len(kiara_api.list_value_ids()),
+        "aliases": len(kiara_api.list_alias_names()),
+        "operations": len(kiara_api.list_operation_ids()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "service_config": config.model_dump(),
+    }
+
+    return await run_benchmark(
+        service.app(),
+        requests,
+        concurrency=concurrency,
+        iterations=iterations,
+        metadata=metadata,
+    )
+
+
+def benchmark_listing_encodings(
+    kiara_api: KiaraAPI, iterations: int = 10
+) -> Dict[str, Dict[str, EncodingStats]]:
+    """Compare the available response encodings (payload size, encode and decode time) on the operations and values listings.
+
+    Arguments:
+        kiara_api: the kiara api of the context to benchmark
+        iterations: the number of measured encode and decode runs per listing and encoding
+    """
+
+    listings = {
+        "operations": kiara_api.retrieve_operations_info().item_infos,
+        "values": kiara_api.retrieve_values_info().item_infos,
+        "aliases": kiara_api.retrieve_aliases_info().item_infos,
+    }
+    return {
+        name: benchmark_encodings(
+            content, default=KiaraModelResponse.serializer, iterations=iterations
+        )
+        for name, content in listings.items()
+    }
+
+
+def create_transport_benchmark_requests() -> List[BenchmarkRequest]:
+    """Create (cheap) requests to compare transports with, so that request rates are dominated by transport overhead."""
+
+    return [
+        BenchmarkRequest(name="service.health", path="/service/health/live"),
+        BenchmarkRequest(
+            name="operations.info", path=f"/operations/{BENCHMARK_OPERATION}"
+        ),
+        BenchmarkRequest(
+            name="data.aliases_info", method="POST", path="/data/aliases_info", body={}
+        ),
+    ]
+
+
+async def benchmark_transports(
+    kiara_api: KiaraAPI,
+    config: KiaraServiceConfig,
+    transports: Iterable[str] = TRANSPORTS,
+    concurrency: int = 8,
+    iterations: int = 1000,
+    keep_alive_timeout: int = 5,
+) -> Dict[str, BenchmarkReport]:
+    """Serve the service app over different transports locally, and benchmark each of them over the network.
+
+    Arguments:
+        kiara_api: the kiara api of the context to serve
+        config: the service configuration
+        transports: the transports to compare (see 'TRANSPORTS')
+        concurrency: the number of concurrent clients (sharing one connection pool)
+        iterations: the number of measured requests per endpoint
+        keep_alive_timeout: the number of seconds idle connections are kept open
+    """
+
+    requests = create_transport_benchmark_requests()
+    result = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for transport in transports:
+            if transport not in TRANSPORTS:
+                raise ValueError(
+                    f"Invalid transport '{transport}', must be one of: {', '.join(TRANSPORTS)}"
+                )
+            listener = ListenerConfig(
+                port=find_free_port(),
+                uds=(
+                    os.path.join(temp_dir, f"{transport}.sock")
+                    if transport.endswith("uds")
+                    else None
+                ),
+                http2=transport.startswith("h2c"),
+                keep_alive_timeout=keep_alive_timeout,
+            )
+            service = KiaraOpenAPIService(kiara_api=kiara_api, config=config)
+            shutdown = anyio.Event()
+            metadata = {
+                "transport": transport,
+                "listener": listener.model_dump(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            }
+
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(serve, service.app(), listener, shutdown)
+                try:
+                    await wait_until_listening(listener, path="/service/health/live")
+                    async with create_client(
+                        listener,
+                        limits=httpx.Limits(max_connections=concurrency),
+                    ) as client:
+                        result[transport] = await benchmark_client(
+                            client,
+                            requests,
+                            concurrency=concurrency,
+                            iterations=iterations,
+                            metadata=metadata,
+                        )
+                finally:
+                    shutdown.set()
+
+    return result
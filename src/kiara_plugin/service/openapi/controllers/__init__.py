@@ -3,8 +3,10 @@ from typing import Callable, Tuple, Union
 
 import docstring_parser
 from docstring_parser import DocstringStyle
+from starlite import delete as starlite_delete
 from starlite import get as starlite_get
 from starlite import post as starlite_post
+from starlite import put as starlite_put
 
 
 def extract_doc(func: Callable) -> Tuple[Union[str, None], Union[str, None]]:
@@ -35,3 +37,17 @@ def post(*args, **kwargs) -> Callable:
     if api_func:
         kwargs["summary"], kwargs["description"] = extract_doc(api_func)
     return starlite_post(*args, **kwargs)
+
+
+def put(*args, **kwargs) -> Callable:
+    api_func = kwargs.pop("api_func", None)
+    if api_func:
+        kwargs["summary"], kwargs["description"] = extract_doc(api_func)
+    return starlite_put(*args, **kwargs)
+
+
+def delete(*args, **kwargs) -> Callable:
+    api_func = kwargs.pop("api_func", None)
+    if api_func:
+        kwargs["summary"], kwargs["description"] = extract_doc(api_func)
+    return starlite_delete(*args, **kwargs)
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from pathlib import Path
+
+from starlite import Controller, Response
+from starlite.exceptions import NotFoundException
+
+from kiara_plugin.service.openapi.controllers import get
+from kiara_plugin.service.utils.assets import IMMUTABLE_CACHE_CONTROL, AssetTable
+
+
+class AssetController(Controller):
+    path = "/"
+
+    @get(
+        path="/{asset:path}",
+        summary="Retrieve a static asset by its fingerprinted name.",
+        description="The name of an asset changes with its content, so responses can be cached forever.",
+        include_in_schema=False,
+    )
+    async def get_asset(self, asset_table: AssetTable, asset: Path) -> Response[bytes]:
+
+        _asset = asset_table.get(str(asset).lstrip("/"))
+        if _asset is None:
+            raise NotFoundException(f"No asset '{asset}'.")
+
+        return Response(
+            content=_asset.body,
+            media_type=_asset.media_type,
+            headers={"cache-control": IMMUTABLE_CACHE_CONTROL},
+        )
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from typing import List
+
+from pydantic import BaseModel, Field
+from starlite import Controller, MediaType, Request, Response
+from starlite.exceptions import ValidationException
+
+from kiara_plugin.service.openapi.controllers import post
+from kiara_plugin.service.utils.batch import SubRequest, dispatch_all, encode_responses
+
+BATCH_PATH = "/batch"
+"""The path of the batch endpoint, which can't be used within a batch."""
+
+
+class BatchRequest(BaseModel):
+
+    requests: List[SubRequest] = Field(description="The requests to run.")
+
+
+class BatchControllerJson(Controller):
+    path = "/"
+
+    @post(
+        path="/",
+        summary="Run several requests in one go.",
+        description="The requests run concurrently within the service, and share its caches. The responses are returned in the order of the requests, as a list of objects with 'status', 'content_type' and 'body' keys. Credentials (like the 'Authorization' header) of the batch request are not passed on, they have to be set in the headers of every request that needs them.",
+    )
+    async def run_batch(
+        self, request: Request, max_batch_size: int, data: BatchRequest
+    ) -> Response[bytes]:
+
+        if len(data.requests) > max_batch_size:
+            raise ValidationException(
+                f"Too many requests in batch: {len(data.requests)} (maximum: {max_batch_size})."
+            )
+        for sub_request in data.requests:
+            path = "/" + sub_request.path.partition("?")[0].lstrip("/")
+            if path == BATCH_PATH or path.startswith(f"{BATCH_PATH}/"):
+                raise ValidationException("Batch requests can't be nested.")
+
+        responses = await dispatch_all(request.app, request.scope, data.requests)
+        return Response(content=encode_responses(responses), media_type=MediaType.JSON)
@@ -13,6 +13,8 @@ from kiara.models.runtime_environment.python import (
 )
 from kiara.registries.environment import EnvironmentRegistry
 from kiara_plugin.service.openapi.controllers import get, post
+from kiara_plugin.service.utils.concurrency import ContextAccess
+from kiara_plugin.service.utils.registry_snapshot import RegistrySnapshot
 
 
 class DataTypeMatcher(BaseModel):
@@ -32,30 +34,59 @@ class DataTypeControllerJson(Controller):
 
     @post(path="/", api_func=KiaraAPI.retrieve_data_types_info)
     async def list_data_types(
-        self, kiara_api: KiaraAPI, data: DataTypeMatcher
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+        data: DataTypeMatcher,
     ) -> Dict[str, DataTypeClassInfo]:
 
+        if registry_snapshot is not None and data == DataTypeMatcher():
+            return registry_snapshot.data_types  # type: ignore
+
         filters = data.filters
         python_package = data.python_package
 
-        data_types = kiara_api.retrieve_data_types_info(
-            filter=filters, python_package=python_package
+        data_types = await context_access.read(
+            kiara_api.retrieve_data_types_info,
+            filter=filters,
+            python_package=python_package,
         )
         return data_types.item_infos  # type: ignore
 
     @get(path="/type_names", api_func=KiaraAPI.list_module_type_names)
-    async def list_module_type_names(self, kiara_api: KiaraAPI) -> List[str]:
+    async def list_module_type_names(
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+    ) -> List[str]:
         """List the ids of all available operations."""
 
-        module_names = kiara_api.list_module_type_names()
+        if registry_snapshot is not None:
+            return list(registry_snapshot.module_types.keys())
+
+        module_names = await context_access.read(kiara_api.list_module_type_names)
         return module_names
 
     @get(path="/{data_type_name:str}", api_func=KiaraAPI.retrieve_data_type_info)
     async def get_module_type_info(
-        self, kiara_api: KiaraAPI, data_type_name: str
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+        data_type_name: str,
     ) -> DataTypeClassInfo:
 
-        data_type = kiara_api.retrieve_data_type_info(data_type_name=data_type_name)
+        if (
+            registry_snapshot is not None
+            and data_type_name in registry_snapshot.data_types
+        ):
+            return registry_snapshot.data_types[data_type_name]  # type: ignore
+
+        data_type = await context_access.read(
+            kiara_api.retrieve_data_type_info, data_type_name=data_type_name
+        )
         return data_type
 
 
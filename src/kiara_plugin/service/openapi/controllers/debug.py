@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import hmac
+from typing import Any, Dict, List, Union
+
+import anyio
+from starlite import ASGIConnection, Controller, MediaType, Parameter
+from starlite.exceptions import (
+    HTTPException,
+    NotAuthorizedException,
+    NotFoundException,
+    PermissionDeniedException,
+)
+from starlite.handlers import BaseRouteHandler
+from starlite.status_codes import HTTP_409_CONFLICT
+
+from kiara_plugin.service.openapi.controllers import get
+from kiara_plugin.service.utils.profiling import (
+    MAX_PROFILE_SECONDS,
+    MemorySnapshot,
+    ProfilerBusyError,
+    format_collapsed_stacks,
+    sample_stacks,
+    snapshot_memory,
+)
+from kiara_plugin.service.utils.tracing import Tracer
+
+
+class AdminGuard(object):
+    """Restricts route handlers marked as 'admin' (via their 'opt') to requests with the admin bearer token.
+
+    Requests without a bearer token are rejected as unauthorized (401), requests with another token are forbidden (403).
+    If no admin token is configured, those route handlers are disabled (403).
+    """
+
+    def __init__(self, admin_token: Union[str, None]):
+
+        self._admin_token: Union[str, None] = admin_token
+
+    def __call__(
+        self, connection: ASGIConnection, route_handler: BaseRouteHandler
+    ) -> None:
+
+        if not route_handler.opt.get("admin", False):
+            return
+
+        if not self._admin_token:
+            raise PermissionDeniedException(
+                "Admin endpoints are disabled: no admin token configured for this service."
+            )
+
+        scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise NotAuthorizedException("Missing admin token.")
+        if not hmac.compare_digest(token.encode(), self._admin_token.encode()):
+            raise PermissionDeniedException("Invalid admin token.")
+
+
+class DebugControllerJson(Controller):
+    path = "/"
+
+    @get(
+        path="/traces",
+        summary="Retrieve the most recent request traces.",
+        description="Admin only. Traces are returned newest first, each as an OpenTelemetry (OTLP/JSON) 'TracesData' document. Only available if tracing is enabled.",
+        opt={"admin": True},
+    )
+    async def get_traces(
+        self,
+        tracer: Union[Tracer, None],
+        limit: Union[int, None] = None,
+        trace_id: Union[str, None] = None,
+    ) -> List[Dict[str, Any]]:
+
+        if tracer is None:
+            raise NotFoundException("Tracing is not enabled for this service.")
+        return tracer.get_traces(limit=limit, trace_id=trace_id)
+
+    @get(
+        path="/profile",
+        summary="Profile the service process for a while, and return the sampled stacks of all threads.",
+        description="Admin only. The result is in collapsed stack format ('<frames separated by ;> <samples>' per line), which can be rendered as a flamegraph with 'flamegraph.pl' or speedscope.",
+        media_type=MediaType.TEXT,
+        opt={"admin": True},
+    )
+    async def profile(
+        self,
+        seconds: float = Parameter(default=5.0, gt=0, le=MAX_PROFILE_SECONDS),
+        interval: float = Parameter(default=0.005, ge=0.001, le=1.0),
+    ) -> str:
+
+        try:
+            stacks = await anyio.to_thread.run_sync(sample_stacks, seconds, interval)
+        except ProfilerBusyError as e:
+            raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
+        return format_collapsed_stacks(stacks)
+
+    @get(
+        path="/memory",
+        summary="Take a snapshot of the top memory allocators of the service process.",
+        description="Admin only. If allocations aren't traced already, tracing is started for 'seconds' before the snapshot, and stopped afterwards.",
+        opt={"admin": True},
+    )
+    async def snapshot_memory(
+        self,
+        seconds: float = Parameter(default=5.0, ge=0, le=MAX_PROFILE_SECONDS),
+        limit: int = Parameter(default=20, ge=1, le=1000),
+        frames: int = Parameter(default=1, ge=1, le=100),
+    ) -> MemorySnapshot:
+
+        try:
+            return await anyio.to_thread.run_sync(
+                snapshot_memory, seconds, limit, frames
+            )
+        except ProfilerBusyError as e:
+            raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
@@ -1,12 +1,65 @@
 # -*- coding: utf-8 -*-
-from typing import Any, Mapping
+import asyncio
+import math
+import pickle
+import threading
+import uuid
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-from pydantic import BaseModel, ConfigDict, Field
-from starlite import Controller
+import anyio
+import structlog
+from pydantic import BaseModel, ConfigDict, Field, computed_field
+from starlite import Controller, MediaType, Stream
+from starlite.exceptions import HTTPException, NotFoundException
+from starlite.status_codes import HTTP_409_CONFLICT, HTTP_504_GATEWAY_TIMEOUT
 
 from kiara.api import KiaraAPI
-from kiara.models.module.jobs import ActiveJob
-from kiara_plugin.service.openapi.controllers import get, post
+from kiara.defaults import NONE_VALUE_ID
+from kiara.interfaces.python_api import ValueInfo
+from kiara.models.module.jobs import (
+    ActiveJob,
+    JobConfig,
+    JobLog,
+    JobRecord,
+    JobStatus,
+)
+from kiara.models.module.manifest import Manifest
+from kiara.models.module.pipeline.structure import PipelineStructure
+from kiara.models.values.value import ValueMapWritable, ValuePedigree
+from kiara.utils.operations import create_operation
+from kiara_plugin.service.openapi.controllers import delete, get, post
+from kiara_plugin.service.openapi.controllers.values import ValueCache
+from kiara_plugin.service.utils.cache import LRUCache
+from kiara_plugin.service.utils.concurrency import (
+    CancellationToken,
+    ContextAccess,
+    JobCancelledError,
+    JobTimeoutError,
+)
+from kiara_plugin.service.utils.job_worker import run_kiara_job
+from kiara_plugin.service.utils.process_pool import ProcessPool
+from kiara_plugin.service.utils.templates import FragmentCache
+
+logger = structlog.getLogger()
+
+T = TypeVar("T")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+"""The media type of streamed job events: one JSON document per line."""
 
 
 class RunJobRequest(BaseModel):
@@ -18,6 +71,23 @@ class RunJobRequest(BaseModel):
         description="The configuration of the operation.", default_factory=dict
     )
     inputs: Mapping[str, Any] = Field(description="The job input values.")
+    timeout: Union[float, None] = Field(
+        description="The (optional) wall-clock timeout for the job in seconds, can only be shorter than the timeout configured for the service.",
+        default=None,
+        gt=0,
+    )
+    wait: bool = Field(
+        description="Whether to wait for the job to finish, otherwise return as soon as the job was created.",
+        default=True,
+    )
+    reuse_results: bool = Field(
+        description="Whether to return an earlier job with the same operation and the same inputs (if there is one), instead of running the job again. Kiara might still re-use earlier results when this is disabled, depending on the 'job_cache' runtime setting of the kiara context.",
+        default=True,
+    )
+    run_id: Union[uuid.UUID, None] = Field(
+        description="An (optional) id chosen by the client, which can be used to cancel the job while it is still queued (before kiara assigned it a job id).",
+        default=None,
+    )
 
 
 class JobInfoRequest(BaseModel):
@@ -25,38 +95,949 @@ class JobInfoRequest(BaseModel):
     job_id: str = Field(description="The id of the job to monitor.")
 
 
+class JobResults(BaseModel):
+    """The outputs of a finished job."""
+
+    job: ActiveJob = Field(description="The job details.")
+    outputs: Dict[str, ValueInfo] = Field(
+        description="Information about the job outputs, indexed by output field name.",
+        default_factory=dict,
+    )
+    data: Dict[str, Any] = Field(
+        description="The data of all scalar outputs, if requested.",
+        default_factory=dict,
+    )
+
+
+class PipelineStepResult(BaseModel):
+    """The outputs of a single pipeline step."""
+
+    step_id: str = Field(description="The id of the pipeline step.")
+    job_id: uuid.UUID = Field(description="The id of the job that ran the step.")
+    error: Union[str, None] = Field(
+        description="The error message, if the step failed.", default=None
+    )
+    outputs: Dict[str, ValueInfo] = Field(
+        description="Information about the step outputs, indexed by output field name.",
+        default_factory=dict,
+    )
+
+
+class JobEvent(BaseModel):
+    """An event that is streamed while a job runs."""
+
+    event: Literal[
+        "job_queued", "job_created", "step_finished", "job_finished", "job_failed"
+    ] = Field(description="The type of the event.")
+    run_id: Union[uuid.UUID, None] = Field(
+        description="The id the job can be cancelled with while it's queued ('job_queued' events).",
+        default=None,
+    )
+    job_id: Union[uuid.UUID, None] = Field(
+        description="The id of the job ('job_created' events).", default=None
+    )
+    step: Union[PipelineStepResult, None] = Field(
+        description="The result of a pipeline step ('step_finished' events).",
+        default=None,
+    )
+    results: Union[JobResults, None] = Field(
+        description="The results of the job ('job_finished' events).", default=None
+    )
+    error: Union[str, None] = Field(
+        description="The error message ('job_failed' events).", default=None
+    )
+
+
+class ResultReuseStats(BaseModel):
+    """Statistics about re-using the results of earlier jobs, instead of running a job again."""
+
+    hits: int = Field(
+        description="The number of jobs that re-used the results of an earlier job.",
+        default=0,
+    )
+    misses: int = Field(
+        description="The number of jobs that could have re-used results, but no finished earlier job matched.",
+        default=0,
+    )
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def hit_rate(self) -> float:
+
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return self.hits / total
+
+
+class _JobRun(object):
+    """The service-side state of a job that is waiting for write access, or running."""
+
+    def __init__(
+        self,
+        token: CancellationToken,
+        run_id: Union[uuid.UUID, None] = None,
+        on_created: Union[Callable[[uuid.UUID], None], None] = None,
+        on_step: Union[Callable[[PipelineStepResult], None], None] = None,
+        reuse_results: bool = True,
+    ):
+
+        self.token: CancellationToken = token
+        self.run_id: uuid.UUID = run_id or uuid.uuid4()
+        self.on_created: Union[Callable[[uuid.UUID], None], None] = on_created
+        self.on_step: Union[Callable[[PipelineStepResult], None], None] = on_step
+        self.reuse_results: bool = reuse_results
+        self.job_config: Union[JobConfig, None] = None
+        self.job_id: Union[uuid.UUID, None] = None
+        self.created = anyio.Event()
+        # the structure of the pipeline, if the job runs one
+        self.pipeline_structure: Union[PipelineStructure, None] = None
+        # the ids of pipeline steps that are running, by job id
+        self.step_ids: Dict[uuid.UUID, str] = {}
+        self.started_steps: Set[str] = set()
+        # whether the job (or one of its pipeline steps) was stopped, because it was cancelled or timed out
+        self.aborted: bool = False
+
+
+class JobManager(object):
+    """Runs jobs, either in-process with exclusive write access to the kiara context, or in worker processes.
+
+    For in-process jobs, the manager is registered as job status listener with the job processor of the kiara context. Every job runs in its
+    own worker thread, and kiara processes jobs synchronously, which means all jobs that are started in that thread
+    belong to that job: the first (non-internal) one is the job itself, the others are pipeline steps. Kiara doesn't
+    expose which step a job belongs to, so that's derived from the pipeline structure. This is used to report the
+    outputs of pipeline steps as soon as they have finished, and to cancel jobs cooperatively: once a job is cancelled
+    (or timed out), starting any further job for it fails, which stops a pipeline before its next step.
+
+    In-process jobs hold exclusive write access to the context while they run, since kiara registers output values
+    while the module code runs, and syncs them before it reports the job as finished. Requests that read from the
+    context wait for those jobs, so long running jobs should run in a process pool instead.
+
+    If a process pool is used, jobs run in worker processes that open the same kiara context, but never write to it.
+    All values referenced in the job inputs are stored beforehand, so workers can load them by id. Workers return the
+    output data (up to 'max_worker_output_bytes', pickled), which is registered and stored (together with a job record,
+    so the job can be looked up after it was forgotten, or the service restarted) with exclusive write access. Workers report the same progress events,
+    and cancelling a job terminates its worker process.
+
+    Arguments:
+        kiara_api: the kiara api instance
+        context_access: coordinates access to the kiara context
+        default_timeout: the default wall-clock timeout for jobs (in seconds), 'None' means no timeout
+        operation_timeouts: timeouts for specific operations (in seconds), overriding the default
+        process_pool: the (optional) pool of worker processes to run jobs in
+        max_worker_output_bytes: the maximum size of the (pickled) output data of a job in a worker process, 'None' means unbounded
+    """
+
+    def __init__(
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        default_timeout: Union[float, None] = None,
+        operation_timeouts: Union[Mapping[str, float], None] = None,
+        process_pool: Union[ProcessPool, None] = None,
+        max_worker_output_bytes: Union[int, None] = None,
+    ):
+
+        self._kiara_api: KiaraAPI = kiara_api
+        self._context_access: ContextAccess = context_access
+        self._default_timeout: Union[float, None] = default_timeout
+        self._operation_timeouts: Dict[str, float] = dict(operation_timeouts or {})
+
+        self._job_registry = kiara_api.context.job_registry
+        # the in-process jobs that are running, by the id of their worker thread
+        self._current: Dict[int, _JobRun] = {}
+        self._active: Set[_JobRun] = set()
+        self._runs: Dict[uuid.UUID, _JobRun] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._process_pool: Union[ProcessPool, None] = process_pool
+        self._max_worker_output_bytes: Union[int, None] = max_worker_output_bytes
+        # jobs that ran in worker processes are unknown to the kiara context of the service
+        self._worker_jobs: LRUCache[uuid.UUID, ActiveJob] = LRUCache(
+            name="worker_jobs", max_items=1024
+        )
+        self._reuse_stats: ResultReuseStats = ResultReuseStats()
+
+        # kiara only allows registering job status listeners with the processor
+        kiara_api.context.job_registry._processor.register_job_status_listener(self)
+
+    @property
+    def caches(self) -> List[LRUCache]:
+        return [self._worker_jobs]
+
+    @property
+    def process_pool(self) -> Union[ProcessPool, None]:
+        return self._process_pool
+
+    @property
+    def reuse_stats(self) -> ResultReuseStats:
+        return self._reuse_stats.model_copy()
+
+    @property
+    def busy(self) -> bool:
+        """Whether any job is running, or waiting to run."""
+
+        return bool(self._active or self._tasks)
+
+    def get_job(self, job_id: Union[str, uuid.UUID]) -> ActiveJob:
+
+        if isinstance(job_id, str):
+            try:
+                job_id = uuid.UUID(job_id)
+            except ValueError:
+                pass
+
+        if not isinstance(job_id, uuid.UUID):
+            return self._kiara_api.get_job(job_id=job_id)
+
+        job = self._worker_jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            return self._kiara_api.get_job(job_id=job_id)
+        except Exception:
+            job = self._find_stored_job(job_id)
+            if job is None:
+                raise
+            self._worker_jobs.set(job_id, job)
+            return job
+
+    def _find_stored_job(self, job_id: uuid.UUID) -> Union[ActiveJob, None]:
+        """Look up a job that isn't known to the current kiara session in the job store of the context."""
+
+        for job_record in self._job_registry.retrieve_all_job_records().values():
+            if job_record.job_id != job_id:
+                continue
+
+            details = job_record.runtime_details
+            return ActiveJob(
+                job_id=job_id,
+                job_config=JobConfig(
+                    module_type=job_record.module_type,
+                    module_config=job_record.module_config,
+                    inputs=job_record.inputs,
+                ),
+                status=JobStatus.SUCCESS,
+                job_log=details.job_log if details else JobLog(),
+                submitted=details.submitted if details else datetime.now(),
+                started=details.started if details else None,
+                finished=details.finished if details else None,
+                results=job_record.outputs,
+            )
+        return None
+
+    def collect_results(
+        self,
+        value_cache: ValueCache,
+        job_id: Union[str, uuid.UUID],
+        include_data: bool = False,
+    ) -> JobResults:
+        """Assemble the output value infos (and optionally the data of scalar outputs) of a finished job."""
+
+        job = self.get_job(job_id=job_id)
+        if job.status not in (JobStatus.SUCCESS, JobStatus.FAILED):
+            raise HTTPException(
+                status_code=HTTP_409_CONFLICT,
+                detail=f"Job '{job_id}' has not finished yet.",
+            )
+
+        result = JobResults(job=job)
+        for field_name, value_id in (job.results or {}).items():
+            value = value_cache.get_value(value_id)
+            if include_data and value.data_type.characteristics.is_scalar:
+                value = value_cache.get_value(value_id, load_data=True)
+                result.data[field_name] = value.data
+            result.outputs[field_name] = self._kiara_api.retrieve_value_info(value)
+        return result
+
+    def job_timeout(
+        self, operation_id: str, requested: Union[float, None] = None
+    ) -> Union[float, None]:
+        """Determine the timeout for a job, a requested timeout can only shorten the configured one."""
+
+        timeout = self._operation_timeouts.get(operation_id, self._default_timeout)
+        if requested is not None and (timeout is None or requested < timeout):
+            timeout = requested
+        return timeout
+
+    def job_status_changed(
+        self,
+        job_id: uuid.UUID,
+        old_status: Union[JobStatus, None],
+        new_status: JobStatus,
+    ) -> None:
+
+        job_run = self._current.get(threading.get_ident(), None)
+        if job_run is None:
+            return
+
+        if new_status is not JobStatus.STARTED:
+            self._job_finished(job_run, job_id, new_status)
+            return
+
+        job = self._job_registry.get_job(job_id)
+        module = self._kiara_api.context.module_registry.create_module(
+            manifest=job.job_config
+        )
+        if module.characteristics.is_internal:
+            # e.g. metadata extraction, which can't be skipped
+            return
+
+        try:
+            job_run.token.check()
+        except JobCancelledError as e:
+            # kiara sends this event before it handles processing errors, so the job has to be marked as failed here,
+            # otherwise the job registry keeps it as running, and hands it out for every job with the same inputs
+            job_run.aborted = True
+            self._job_registry._processor.job_status_updated(job_id=job_id, status=e)
+            # aborts the job before any module code runs
+            raise
+
+        if job_run.job_id is None:
+            job_run.job_id = job_id
+            if module.is_pipeline():
+                job_run.pipeline_structure = module.config.structure
+            self._runs[job_id] = job_run
+            anyio.from_thread.run_sync(job_run.created.set)
+            if job_run.on_created is not None:
+                job_run.on_created(job_id)
+        elif job_id != job_run.job_id:
+            step_id = self._find_step_id(job_run, job.job_config)
+            if step_id is not None:
+                job_run.step_ids[job_id] = step_id
+                job_run.started_steps.add(step_id)
+
+    def _find_step_id(
+        self, job_run: _JobRun, job_config: JobConfig
+    ) -> Union[str, None]:
+        """Find the pipeline step a job runs: the first step (in processing order) that wasn't started yet, runs the same module, and uses the same pipeline inputs."""
+
+        structure = job_run.pipeline_structure
+        if structure is None or job_run.job_config is None:
+            return None
+
+        pipeline_inputs = job_run.job_config.inputs
+        for stage in structure.processing_stages:
+            for step_id in stage:
+                if step_id in job_run.started_steps:
+                    continue
+                if structure.get_step(step_id).module_type != job_config.module_type:
+                    continue
+                refs = structure.get_step_input_refs(step_id)
+                if all(
+                    ref.connected_pipeline_input is None
+                    or job_config.inputs.get(field_name)
+                    == pipeline_inputs.get(ref.connected_pipeline_input)
+                    for field_name, ref in refs.items()
+                ):
+                    return step_id
+        return None
+
+    def _job_finished(
+        self, job_run: _JobRun, job_id: uuid.UUID, new_status: JobStatus
+    ) -> None:
+
+        if new_status not in (JobStatus.SUCCESS, JobStatus.FAILED):
+            return
+
+        step_id = job_run.step_ids.pop(job_id, None)
+        if step_id is None or job_run.on_step is None:
+            return
+
+        try:
+            job = self._job_registry.get_job(job_id)
+            outputs = {
+                field_name: self._kiara_api.retrieve_value_info(value_id)
+                for field_name, value_id in (job.results or {}).items()
+            }
+            job_run.on_step(
+                PipelineStepResult(
+                    step_id=step_id, job_id=job_id, error=job.error, outputs=outputs
+                )
+            )
+        except Exception as e:
+            # never interfere with the job processing itself
+            logger.warning("pipeline_step.report_failed", step_id=step_id, error=str(e))
+
+    def _prepare_job(
+        self,
+        job_run: _JobRun,
+        operation: Union[str, Manifest],
+        inputs: Mapping[str, Any],
+    ) -> Tuple[JobConfig, Union[uuid.UUID, None]]:
+        """Register the job inputs, and look up a finished earlier job kiara would re-use the results of."""
+
+        if isinstance(operation, Manifest):
+            manifest = operation
+        else:
+            manifest = create_operation(
+                module_or_operation=operation, kiara=self._kiara_api.context
+            )
+        job_config = self._kiara_api.context.job_registry.prepare_job_config(
+            manifest=manifest, inputs=inputs
+        )
+
+        if not job_run.reuse_results:
+            return job_config, None
+
+        module = self._kiara_api.context.module_registry.create_module(
+            manifest=job_config
+        )
+        if not module.characteristics.is_idempotent:
+            return job_config, None
+
+        # kiara matches jobs of the current session by input value ids, and stored job records by input data hash
+        # (depending on the 'job_cache' runtime setting of the context)
+        job_id = self._job_registry.find_matching_job_record(inputs_manifest=job_config)
+        if job_id is None:
+            self._reuse_stats.misses += 1
+            return job_config, None
+        try:
+            reusable = self._job_registry.get_job_status(job_id) is JobStatus.SUCCESS
+        except Exception:
+            reusable = False
+        if not reusable:
+            self._reuse_stats.misses += 1
+            return job_config, None
+
+        self._reuse_stats.hits += 1
+        logger.debug("job.reuse_results", job_id=str(job_id))
+        job_run.job_id = job_id
+        return job_config, job_id
+
+    def _queue_job(
+        self,
+        job_run: _JobRun,
+        operation: Union[str, Manifest],
+        inputs: Mapping[str, Any],
+    ) -> uuid.UUID:
+
+        job_config, reused_job_id = self._prepare_job(job_run, operation, inputs)
+        if reused_job_id is not None:
+            return reused_job_id
+
+        job_run.job_config = job_config
+        thread_id = threading.get_ident()
+        self._current[thread_id] = job_run
+        try:
+            job_id = self._kiara_api.context.job_registry.execute_job(
+                job_config=job_config, wait=False
+            )
+        finally:
+            self._current.pop(thread_id, None)
+            job_run.step_ids.clear()
+
+        if job_run.aborted:
+            # a pipeline step was stopped, which kiara doesn't treat as failure of the pipeline
+            job_run.token.check()
+        if job_run.job_id is None:
+            # kiara re-used the result of an earlier job with the same input values
+            job_run.job_id = job_id
+        return job_id
+
+    def _prepare_worker_job(
+        self,
+        job_run: _JobRun,
+        operation: Union[str, Manifest],
+        inputs: Mapping[str, Any],
+    ) -> Tuple[JobConfig, Union[uuid.UUID, None], Dict[str, Any]]:
+        """Prepare a job for a worker process: all input values are stored, so the worker can load them by id."""
+
+        job_config, reused_job_id = self._prepare_job(job_run, operation, inputs)
+        if reused_job_id is not None:
+            return job_config, reused_job_id, {}
+
+        worker_inputs: Dict[str, Any] = {}
+        for field_name, value_id in job_config.inputs.items():
+            if value_id == NONE_VALUE_ID:
+                worker_inputs[field_name] = None
+                continue
+
+            value = self._kiara_api.get_value(value_id)
+            if not value.is_stored:
+                store_result = self._kiara_api.store_value(value=value, alias=None)
+                if store_result.error:
+                    raise Exception(
+                        f"Can't store value for input '{field_name}': {store_result.error}"
+                    )
+            worker_inputs[field_name] = str(value_id)
+        return job_config, None, worker_inputs
+
+    def _store_worker_results(self, job_data: Mapping[str, Any]) -> ActiveJob:
+        """Register and store the outputs of a job that ran in a worker process, and store its job record."""
+
+        job = ActiveJob.model_validate(job_data["job"])
+        if job.status is not JobStatus.SUCCESS:
+            return job
+
+        kiara = self._kiara_api.context
+        module = kiara.module_registry.create_module(manifest=job.job_config)
+        # the same pedigree kiara's job processor assigns to job outputs
+        pedigree = ValuePedigree(
+            kiara_id=kiara.id,
+            module_type=job.job_config.module_type,
+            module_config=job.job_config.module_config,
+            inputs=job.job_config.inputs,
+            environments={
+                env_name: env.instance_id
+                for env_name, env in kiara.current_environments.items()
+            },
+        )
+        outputs = ValueMapWritable.create_from_schema(
+            kiara=kiara,
+            schema=module.outputs_schema,
+            pedigree=pedigree,
+            unique_value_ids=module.characteristics.unique_result_values,
+        )
+        for field_name, value_id in job_data["outputs"].items():
+            outputs.set_value(field_name, value_id)
+        # the data was pickled by a worker process of this service
+        output_data = pickle.loads(job_data["output_data"])  # noqa: S301
+        for field_name, data in output_data.items():
+            outputs.set_value(field_name, data)
+        outputs.sync_values()
+
+        store_result = self._kiara_api.store_values(
+            outputs.get_all_value_ids(), alias_map={}
+        )
+        errors = {
+            field_name: r.error
+            for field_name, r in store_result.root.items()
+            if r.error
+        }
+        if errors:
+            raise Exception(f"Can't store outputs of job '{job.job_id}': {errors}")
+
+        job.results = outputs.get_all_value_ids()
+        job_record = JobRecord.from_active_job(kiara=kiara, active_job=job)
+        self._job_registry.get_archive().store_job_record(job_record)
+        return job
+
+    def _report_worker_progress(self, job_run: _JobRun, message: Tuple) -> None:
+        """Handle a progress message of a job running in a worker process (called from a worker thread)."""
+
+        if message[0] == "job_created":
+            job_id = message[1]
+            job_run.job_id = job_id
+            self._runs[job_id] = job_run
+            anyio.from_thread.run_sync(job_run.created.set)
+            if job_run.on_created is not None:
+                job_run.on_created(job_id)
+
+        elif message[0] == "step_finished" and job_run.on_step is not None:
+            _, step_id, job_id, error, outputs = message
+            job_run.on_step(
+                PipelineStepResult(
+                    step_id=step_id,
+                    job_id=job_id,
+                    error=error,
+                    outputs={
+                        field_name: ValueInfo.model_validate(value_info)
+                        for field_name, value_info in outputs.items()
+                    },
+                )
+            )
+
+    async def _run_in_worker(
+        self,
+        job_run: _JobRun,
+        operation: Union[str, Manifest],
+        inputs: Mapping[str, Any],
+    ) -> uuid.UUID:
+
+        assert self._process_pool is not None
+
+        (
+            job_config,
+            reused_job_id,
+            worker_inputs,
+        ) = await self._context_access.write_cancellable(
+            job_run.token, self._prepare_worker_job, job_run, operation, inputs
+        )
+        if reused_job_id is not None:
+            return reused_job_id
+
+        job_data = await self._process_pool.run(
+            run_kiara_job,
+            {
+                "module_type": job_config.module_type,
+                "module_config": job_config.module_config,
+            },
+            worker_inputs,
+            context_name=self._kiara_api.get_current_context_name(),
+            max_output_bytes=self._max_worker_output_bytes,
+            token=job_run.token,
+            on_progress=lambda message: self._report_worker_progress(job_run, message),
+        )
+        job = await self._context_access.write(self._store_worker_results, job_data)
+        self._worker_jobs.set(job.job_id, job)
+        job_run.job_id = job.job_id
+        return job.job_id
+
+    async def _run(
+        self,
+        job_run: _JobRun,
+        operation: Union[str, Manifest],
+        inputs: Mapping[str, Any],
+    ) -> uuid.UUID:
+
+        if job_run.run_id in self._runs:
+            raise HTTPException(
+                status_code=HTTP_409_CONFLICT,
+                detail=f"A job with run id '{job_run.run_id}' is already queued or running.",
+            )
+
+        self._runs[job_run.run_id] = job_run
+        self._active.add(job_run)
+        try:
+            if self._process_pool is not None:
+                return await self._run_in_worker(job_run, operation, inputs)
+            return await self._context_access.write_cancellable(
+                job_run.token, self._queue_job, job_run, operation, inputs
+            )
+        finally:
+            self._active.discard(job_run)
+            self._runs.pop(job_run.run_id, None)
+            if job_run.job_id is not None:
+                self._runs.pop(job_run.job_id, None)
+            job_run.created.set()
+
+            if job_run.token.cancelled:
+                logger.info(
+                    "job.cancelled",
+                    job_id=str(job_run.job_id),
+                    reason=job_run.token.reason,
+                    latency_ms=job_run.token.cancellation_latency_ms,
+                )
+
+    async def run_job(
+        self,
+        operation: Union[str, Manifest],
+        inputs: Mapping[str, Any],
+        timeout: Union[float, None] = None,
+        on_created: Union[Callable[[uuid.UUID], None], None] = None,
+        on_step: Union[Callable[[PipelineStepResult], None], None] = None,
+        reuse_results: bool = True,
+        run_id: Union[uuid.UUID, None] = None,
+    ) -> uuid.UUID:
+        """Run a job, and wait for it to finish.
+
+        Unless 'reuse_results' is disabled, the id of an earlier, successful job kiara finds for the same manifest and
+        inputs is returned right away, as long as the module is idempotent. Kiara (0.5) has no option to skip its own
+        lookup when the job is executed though, so disabling 'reuse_results' doesn't stop kiara from re-using the
+        result of a job with the same input value ids from the current session, or a stored job record with the same
+        input data (that is controlled by the 'job_cache' runtime setting of the kiara context).
+
+        The callbacks are called from the worker thread that runs the job: 'on_created' with the job id as soon as
+        kiara started the job, and 'on_step' with the result of every pipeline step as soon as the step has finished.
+
+        Until kiara started the job, it can only be cancelled by its 'run_id' (a new one is generated if not provided).
+
+        Raises a 'JobCancelledError' if the job was cancelled (or timed out) before it could start, or if a pipeline
+        was stopped before one of its steps. A running module can't be interrupted, so for jobs that run a single
+        module, the timeout only applies until the module starts.
+        """
+
+        job_run = _JobRun(
+            token=CancellationToken(timeout=timeout),
+            run_id=run_id,
+            on_created=on_created,
+            on_step=on_step,
+            reuse_results=reuse_results,
+        )
+        return await self._run(job_run, operation=operation, inputs=inputs)
+
+    def _background_job_done(self, task: asyncio.Task) -> None:
+
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.info("job.background_failed", error=str(task.exception()))
+
+    def run_in_background(self, coro: Coroutine[Any, Any, T]) -> "asyncio.Task[T]":
+        """Run a coroutine that runs (or waits for) jobs as background task, independent of the current request."""
+
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._background_job_done)
+        return task
+
+    async def start_job(
+        self,
+        operation: Union[str, Manifest],
+        inputs: Mapping[str, Any],
+        timeout: Union[float, None] = None,
+        reuse_results: bool = True,
+        run_id: Union[uuid.UUID, None] = None,
+    ) -> uuid.UUID:
+        """Run a job in the background, and return its id as soon as kiara started it."""
+
+        job_run = _JobRun(
+            token=CancellationToken(timeout=timeout),
+            run_id=run_id,
+            reuse_results=reuse_results,
+        )
+        task = self.run_in_background(
+            self._run(job_run, operation=operation, inputs=inputs)
+        )
+
+        await job_run.created.wait()
+        if job_run.job_id is None:
+            # the job failed (or was cancelled) before it was started
+            return await task
+        return job_run.job_id
+
+    def cancel_job(self, job_id: uuid.UUID, reason: str = "cancelled") -> bool:
+        """Request cancellation of a queued or running job, by its (kiara) job id or its run id.
+
+        Returns 'False' if no job with this id is queued or running.
+        """
+
+        job_run = self._runs.get(job_id, None)
+        if job_run is None:
+            return False
+        job_run.token.cancel(reason=reason)
+        return True
+
+    def cancel_all(self, reason: str = "cancelled") -> None:
+
+        for job_run in list(self._active):
+            job_run.token.cancel(reason=reason)
+
+
+async def _resolve_operation(
+    kiara_api: KiaraAPI, context_access: ContextAccess, data: RunJobRequest
+) -> Union[str, Manifest]:
+
+    if not data.operation_config:
+        return data.operation_id
+
+    return await context_access.read(
+        kiara_api.context.create_manifest,
+        module_or_operation=data.operation_id,
+        config=data.operation_config,
+    )
+
+
+def _cancelled_exception(e: JobCancelledError) -> HTTPException:
+
+    if isinstance(e, JobTimeoutError):
+        return HTTPException(status_code=HTTP_504_GATEWAY_TIMEOUT, detail=f"Job {e}.")
+    return HTTPException(status_code=HTTP_409_CONFLICT, detail=f"Job {e}.")
+
+
 class JobControllerJson(Controller):
     path = "/"
 
     @post(path="/queue_job", api_func=KiaraAPI.queue_job)
-    async def queue_job(self, kiara_api: KiaraAPI, data: RunJobRequest) -> ActiveJob:
+    async def queue_job(
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        job_manager: JobManager,
+        data: RunJobRequest,
+    ) -> ActiveJob:
 
         print(f"JOB RUN REQUEST: {data.dict()}")
 
         try:
-            operation_id = data.operation_id
-            if not data.operation_config:
-                job_id = kiara_api.queue_job(operation=operation_id, inputs=data.inputs)
+            operation = await _resolve_operation(kiara_api, context_access, data)
+            timeout = job_manager.job_timeout(data.operation_id, data.timeout)
+            if data.wait:
+                job_id = await job_manager.run_job(
+                    operation=operation,
+                    inputs=data.inputs,
+                    timeout=timeout,
+                    reuse_results=data.reuse_results,
+                    run_id=data.run_id,
+                )
             else:
-                manifest = kiara_api.context.create_manifest(
-                    module_or_operation=operation_id, config=data.operation_config
+                job_id = await job_manager.start_job(
+                    operation=operation,
+                    inputs=data.inputs,
+                    timeout=timeout,
+                    reuse_results=data.reuse_results,
+                    run_id=data.run_id,
                 )
-                job_id = kiara_api.queue_job(operation=manifest, inputs=data.inputs)
 
-            job = kiara_api.get_job(job_id=job_id)
+            job = await context_access.read(job_manager.get_job, job_id=job_id)
             return job
 
+        except JobCancelledError as e:
+            raise _cancelled_exception(e)
         except Exception as e:
             import traceback
 
             traceback.print_exc()
             raise e
 
+    @post(
+        path="/stream_job",
+        summary="Run a job, and stream its progress.",
+        description="The response is a stream of newline-delimited JSON job events. For pipeline operations, the outputs of every step are sent as soon as the step has finished, followed by the results of the job. If the client disconnects, the job keeps running.",
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+    async def stream_job(
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        value_cache: ValueCache,
+        job_manager: JobManager,
+        data: RunJobRequest,
+    ) -> Stream:
+
+        operation = await _resolve_operation(kiara_api, context_access, data)
+        timeout = job_manager.job_timeout(data.operation_id, data.timeout)
+
+        send_stream, receive_stream = anyio.create_memory_object_stream(math.inf)
+        run_id = data.run_id or uuid.uuid4()
+
+        def send(event: JobEvent) -> None:
+            try:
+                send_stream.send_nowait(event)
+            except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+                # the client disconnected, the job keeps running
+                pass
+
+        # the callbacks are called from the worker thread that runs the job
+        def report_created(job_id: uuid.UUID) -> None:
+            anyio.from_thread.run_sync(
+                send, JobEvent(event="job_created", job_id=job_id)
+            )
+
+        def report_step(step_result: PipelineStepResult) -> None:
+            anyio.from_thread.run_sync(
+                send, JobEvent(event="step_finished", step=step_result)
+            )
+
+        async def run_job() -> None:
+
+            with send_stream:
+                send(JobEvent(event="job_queued", run_id=run_id))
+                try:
+                    job_id = await job_manager.run_job(
+                        operation=operation,
+                        inputs=data.inputs,
+                        timeout=timeout,
+                        on_created=report_created,
+                        on_step=report_step,
+                        reuse_results=data.reuse_results,
+                        run_id=run_id,
+                    )
+                    results = await context_access.read(
+                        job_manager.collect_results, value_cache, job_id
+                    )
+                    send(JobEvent(event="job_finished", results=results))
+                except Exception as e:
+                    send(JobEvent(event="job_failed", error=str(e)))
+
+        async def stream_events() -> AsyncIterator[bytes]:
+
+            with receive_stream:
+                async for event in receive_stream:
+                    yield (event.model_dump_json() + "\n").encode("utf-8")
+
+        # the job is fed into the stream by a separate task, so it's not affected by the response being cancelled
+        job_manager.run_in_background(run_job())
+        return Stream(iterator=stream_events())
+
     @get(path="/monitor_job/{job_id:str}", api_func=KiaraAPI.get_job)
-    async def monitor_job(self, kiara_api: KiaraAPI, job_id: str) -> ActiveJob:
+    async def monitor_job(
+        self, context_access: ContextAccess, job_manager: JobManager, job_id: str
+    ) -> ActiveJob:
 
         print(f"MONITOR REQUEST: {job_id}")
 
-        job = kiara_api.get_job(job_id=job_id)
+        job = await context_access.read(job_manager.get_job, job_id=job_id)
 
         return job
+
+    @get(
+        path="/monitor_job/{job_id:str}/html",
+        summary="Render the (htmx) monitor fragment of a job.",
+        description="While the job runs, the fragment polls this endpoint. Once the job has finished, the fragment shows its results, it's only rendered once per job and element.",
+        media_type=MediaType.HTML,
+    )
+    async def monitor_job_html(
+        self,
+        context_access: ContextAccess,
+        job_manager: JobManager,
+        value_cache: ValueCache,
+        fragment_cache: FragmentCache,
+        job_id: str,
+        element_id: str,
+    ) -> str:
+
+        job = await context_access.read(job_manager.get_job, job_id=job_id)
+        if job.status not in (JobStatus.SUCCESS, JobStatus.FAILED):
+            return fragment_cache.render(
+                "kiara_plugin.service/jobs/job_monitor.html",
+                {"job": job, "element_id": element_id},
+            )
+
+        def create_context() -> Dict[str, Any]:
+
+            results = job_manager.collect_results(value_cache, job.job_id)
+            return {
+                "job": job,
+                "element_id": element_id,
+                "results": results.outputs,
+                "error": job.error if job.status == JobStatus.FAILED else None,
+            }
+
+        # finished jobs don't change anymore
+        return await context_access.read(
+            fragment_cache.render,
+            "kiara_plugin.service/jobs/job_finished.html",
+            create_context,
+            key=(str(job.job_id), element_id),
+        )
+
+    @delete(
+        path="/{job_id:str}",
+        summary="Cancel a queued or running job.",
+        description="Jobs can be cancelled by their job id, or by the run id they were queued with (the only id of a job that is still waiting to start). Cancellation is cooperative: a running pipeline stops before its next step, a single running module can't be interrupted.",
+    )
+    async def cancel_job(
+        self,
+        context_access: ContextAccess,
+        job_manager: JobManager,
+        job_id: str,
+    ) -> None:
+
+        try:
+            _job_id = uuid.UUID(job_id)
+        except ValueError:
+            raise NotFoundException(f"No job with id '{job_id}'.")
+
+        if job_manager.cancel_job(_job_id):
+            return
+
+        try:
+            await context_access.read(job_manager.get_job, job_id=_job_id)
+        except Exception:
+            raise NotFoundException(f"No job with id '{job_id}'.")
+        raise HTTPException(
+            status_code=HTTP_409_CONFLICT,
+            detail=f"Job '{job_id}' has already finished.",
+        )
+
+    @get(
+        path="/{job_id:str}/results",
+        summary="Retrieve the outputs of a finished job.",
+        description="If 'include_data' is set, the data of all outputs of scalar data types (strings, numbers, booleans, ...) is included.",
+    )
+    async def get_job_results(
+        self,
+        context_access: ContextAccess,
+        job_manager: JobManager,
+        value_cache: ValueCache,
+        job_id: str,
+        include_data: bool = False,
+    ) -> JobResults:
+
+        return await context_access.read(
+            job_manager.collect_results,
+            value_cache,
+            job_id,
+            include_data=include_data,
+        )
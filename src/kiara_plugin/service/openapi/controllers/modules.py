@@ -9,6 +9,8 @@ from starlite import (
 from kiara.api import KiaraAPI
 from kiara.interfaces.python_api import ModuleTypeInfo
 from kiara_plugin.service.openapi.controllers import get, post
+from kiara_plugin.service.utils.concurrency import ContextAccess
+from kiara_plugin.service.utils.registry_snapshot import RegistrySnapshot
 
 # class OperationRequest(BaseModel):
 #     element_id: str = Field(description="The id of the element to be created.")
@@ -32,28 +34,57 @@ class ModuleControllerJson(Controller):
 
     @post(path="/", api_func=KiaraAPI.retrieve_module_types_info)
     async def list_module_types(
-        self, kiara_api: KiaraAPI, data: ModuleMatcher
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+        data: ModuleMatcher,
     ) -> Dict[str, ModuleTypeInfo]:
 
+        if registry_snapshot is not None and data == ModuleMatcher():
+            return registry_snapshot.module_types  # type: ignore
+
         filters = data.filters
         python_package = data.python_package
 
-        module_types = kiara_api.retrieve_module_types_info(
-            filter=filters, python_package=python_package
+        module_types = await context_access.read(
+            kiara_api.retrieve_module_types_info,
+            filter=filters,
+            python_package=python_package,
         )
         return module_types.item_infos  # type: ignore
 
     @get(path="/type_names", api_func=KiaraAPI.list_module_type_names)
-    async def list_module_type_names(self, kiara_api: KiaraAPI) -> List[str]:
+    async def list_module_type_names(
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+    ) -> List[str]:
         """List the ids of all available operations."""
 
-        module_names = kiara_api.list_module_type_names()
+        if registry_snapshot is not None:
+            return list(registry_snapshot.module_types.keys())
+
+        module_names = await context_access.read(kiara_api.list_module_type_names)
         return module_names
 
     @get(path="/{module_type_name:str}", api_func=KiaraAPI.retrieve_module_type_info)
     async def get_module_type_info(
-        self, kiara_api: KiaraAPI, module_type_name: str
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+        module_type_name: str,
     ) -> ModuleTypeInfo:
 
-        module = kiara_api.retrieve_module_type_info(module_type=module_type_name)
+        if (
+            registry_snapshot is not None
+            and module_type_name in registry_snapshot.module_types
+        ):
+            return registry_snapshot.module_types[module_type_name]  # type: ignore
+
+        module = await context_access.read(
+            kiara_api.retrieve_module_type_info, module_type=module_type_name
+        )
         return module
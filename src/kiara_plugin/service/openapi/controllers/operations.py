@@ -9,6 +9,8 @@ from starlite import (
 from kiara.api import KiaraAPI
 from kiara.interfaces.python_api import OperationInfo
 from kiara_plugin.service.openapi.controllers import get, post
+from kiara_plugin.service.utils.concurrency import ContextAccess
+from kiara_plugin.service.utils.registry_snapshot import RegistrySnapshot
 
 
 class OperationRequest(BaseModel):
@@ -59,9 +61,19 @@ class OperationControllerJson(Controller):
 
     @post(path="/", api_func=KiaraAPI.retrieve_operations_info)
     async def list_operations(
-        self, kiara_api: KiaraAPI, data: OperationMatcher
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+        data: OperationMatcher,
     ) -> Dict[str, OperationInfo]:
 
+        if registry_snapshot is not None and data == OperationMatcher():
+            return {
+                op_id: registry_snapshot.operations[op_id]
+                for op_id in registry_snapshot.operation_ids
+            }  # type: ignore
+
         filters = data.filters
         include_internal = data.include_internal
 
@@ -70,7 +82,8 @@ class OperationControllerJson(Controller):
         else:
             python_packages = None
 
-        operations = kiara_api.retrieve_operations_info(
+        operations = await context_access.read(
+            kiara_api.retrieve_operations_info,
             *filters,
             include_internal=include_internal,
             python_packages=python_packages,
@@ -81,10 +94,17 @@ class OperationControllerJson(Controller):
 
     @post(path="/ids", api_func=KiaraAPI.list_operation_ids)
     async def list_operation_ids(
-        self, kiara_api: KiaraAPI, data: OperationMatcher
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+        data: OperationMatcher,
     ) -> List[str]:
         """List the ids of all available operations."""
 
+        if registry_snapshot is not None and data == OperationMatcher():
+            return registry_snapshot.operation_ids
+
         filters = data.filters
         include_internal = data.include_internal
 
@@ -93,7 +113,8 @@ class OperationControllerJson(Controller):
         else:
             python_packages = None
 
-        operation_ids = kiara_api.list_operation_ids(
+        operation_ids = await context_access.read(
+            kiara_api.list_operation_ids,
             filter=filters,
             include_internal=include_internal,
             python_packages=python_packages,
@@ -104,10 +125,22 @@ class OperationControllerJson(Controller):
 
     @get(path="/{operation_id:str}", api_func=KiaraAPI.retrieve_operation_info)
     async def get_operation_info(
-        self, kiara_api: KiaraAPI, operation_id: str
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+        operation_id: str,
     ) -> OperationInfo:
 
-        op = kiara_api.retrieve_operation_info(operation=operation_id)
+        if (
+            registry_snapshot is not None
+            and operation_id in registry_snapshot.operations
+        ):
+            return registry_snapshot.operations[operation_id]  # type: ignore
+
+        op = await context_access.read(
+            kiara_api.retrieve_operation_info, operation=operation_id
+        )
         return op
 
 
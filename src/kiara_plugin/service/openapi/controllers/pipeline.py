@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
-from typing import List
+import os
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Hashable, List, Tuple, Union
 
 from pydantic import BaseModel, Field
 from starlite import Controller
@@ -8,6 +9,13 @@ from kiara.api import KiaraAPI
 from kiara.interfaces.python_api.models.info import PipelineStructureInfo
 from kiara.utils.pipelines import get_pipeline_config
 from kiara_plugin.service.openapi.controllers import get
+from kiara_plugin.service.utils.cache import LRUCache
+from kiara_plugin.service.utils.concurrency import ContextAccess
+from kiara_plugin.service.utils.registry_snapshot import RegistrySnapshot
+
+if TYPE_CHECKING:
+    from kiara.models.module.pipeline import PipelineConfig
+    from kiara.models.module.pipeline.structure import PipelineStructure
 
 
 class PipelineMatcher(BaseModel):
@@ -18,24 +26,210 @@ class PipelineMatcher(BaseModel):
     )
 
 
+class CompactPipelineStructure(BaseModel):
+    """A compact encoding of a pipeline's step graph, steps are referenced by their index in 'steps'."""
+
+    pipeline_name: str = Field(description="The name of the pipeline.")
+    steps: List[str] = Field(description="The ids of all steps.")
+    module_types: List[str] = Field(
+        description="The module type of each step (same order as 'steps')."
+    )
+    edges: List[Tuple[int, int]] = Field(
+        description="The execution graph, as (source step, target step) index pairs."
+    )
+    stages: List[List[int]] = Field(
+        description="The processing stages, each a list of step indexes."
+    )
+    inputs: Dict[str, List[int]] = Field(
+        description="The pipeline inputs, and the indexes of the steps they are connected to."
+    )
+    outputs: Dict[str, int] = Field(
+        description="The pipeline outputs, and the index of the step they originate from."
+    )
+
+    @classmethod
+    def create_from_structure(
+        cls, structure: "PipelineStructure"
+    ) -> "CompactPipelineStructure":
+
+        steps = [step.step_id for step in structure.steps]
+        index = {step_id: idx for idx, step_id in enumerate(steps)}
+
+        edges = [
+            (index[source], index[target])
+            for source, target in structure.execution_graph.edges
+            if source in index and target in index
+        ]
+        stages = [
+            [index[step_id] for step_id in stage]
+            for stage in structure.processing_stages
+        ]
+
+        inputs: Dict[str, List[int]] = {}
+        for input_name, input_ref in structure.pipeline_input_refs.items():
+            inputs[input_name] = sorted(
+                index[step_input.step_id] for step_input in input_ref.connected_inputs
+            )
+
+        outputs = {
+            output_name: index[output_ref.connected_output.step_id]
+            for output_name, output_ref in structure.pipeline_output_refs.items()
+        }
+
+        return cls(
+            pipeline_name=structure.pipeline_config.pipeline_name,
+            steps=steps,
+            module_types=[step.module_type for step in structure.steps],
+            edges=edges,
+            stages=stages,
+            inputs=inputs,
+            outputs=outputs,
+        )
+
+
+class PipelineCache(object):
+    """Memoizes pipeline configs and structure infos.
+
+    Items are keyed by the pipeline reference and a marker of its source: the modification time and size of the file
+    if the pipeline was loaded from disk, the current state of the workflow for 'workflow:' references, and nothing
+    for pipelines registered as operations (those don't change for the lifetime of a kiara context).
+    """
+
+    def __init__(self, kiara_api: KiaraAPI, max_items: Union[int, None] = 256):
+
+        self._kiara_api: KiaraAPI = kiara_api
+        self._configs: LRUCache[Hashable, "PipelineConfig"] = LRUCache(
+            name="pipeline_configs", max_items=max_items
+        )
+        self._structure_infos: LRUCache[Hashable, PipelineStructureInfo] = LRUCache(
+            name="pipeline_structure_infos", max_items=max_items
+        )
+        self._compact_structures: LRUCache[
+            Hashable, CompactPipelineStructure
+        ] = LRUCache(name="pipeline_compact_structures", max_items=max_items)
+        self._pipeline_ids: Union[List[str], None] = None
+        self._pipeline_id_set: FrozenSet[str] = frozenset()
+        self._pipeline_ids_from_registry: bool = False
+
+    @property
+    def caches(self) -> List[LRUCache]:
+        return [self._configs, self._structure_infos, self._compact_structures]
+
+    def _source_marker(self, pipeline: str) -> Any:
+
+        self.list_pipeline_ids()
+        if pipeline in self._pipeline_id_set:
+            return None
+
+        if os.path.isfile(pipeline):
+            stat = os.stat(pipeline)
+            return (stat.st_mtime_ns, stat.st_size)
+
+        if pipeline.startswith("workflow:"):
+            workflow_registry = self._kiara_api.context.workflow_registry
+            metadata = workflow_registry.get_workflow_metadata(workflow=pipeline[9:])
+            return metadata.current_state
+
+        return None
+
+    def _cache_key(self, pipeline: str) -> Hashable:
+        return (pipeline, self._source_marker(pipeline))
+
+    def list_pipeline_ids(self) -> List[str]:
+        """Return the ids of all registered pipeline operations, without materializing the operations themselves.
+
+        Once the operation registry is initialized, its index of operation ids by type is used. Before that (e.g. on
+        a cold start), the ids are read from the pipeline operation type's index of pipeline files, since the
+        registry's own index would create every operation first.
+        """
+
+        operation_registry = self._kiara_api.context.operation_registry
+        initialized = operation_registry.is_initialized
+        if self._pipeline_ids is None or (
+            initialized and not self._pipeline_ids_from_registry
+        ):
+            if initialized:
+                pipeline_ids = operation_registry.operations_by_type.get("pipeline", [])
+            else:
+                pipeline_type = operation_registry.get_operation_type("pipeline")
+                pipeline_ids = [
+                    pipeline_data["data"].get("pipeline_name", pipeline_name)
+                    for pipeline_name, pipeline_data in pipeline_type.pipeline_data.items()  # type: ignore
+                ]
+            self._pipeline_ids = sorted(pipeline_ids)
+            self._pipeline_id_set = frozenset(self._pipeline_ids)
+            self._pipeline_ids_from_registry = initialized
+        return self._pipeline_ids
+
+    def get_pipeline_config(self, pipeline: str) -> "PipelineConfig":
+
+        return self._configs.get_or_create(
+            self._cache_key(pipeline),
+            lambda: get_pipeline_config(
+                pipeline=pipeline, kiara=self._kiara_api.context
+            ),
+        )
+
+    def get_structure_info(self, pipeline: str) -> PipelineStructureInfo:
+        def create_info() -> PipelineStructureInfo:
+            pipeline_config = self.get_pipeline_config(pipeline)
+            return PipelineStructureInfo.create_from_instance(
+                kiara=self._kiara_api.context, instance=pipeline_config.structure
+            )
+
+        return self._structure_infos.get_or_create(
+            self._cache_key(pipeline), create_info
+        )
+
+    def get_compact_structure(self, pipeline: str) -> CompactPipelineStructure:
+
+        return self._compact_structures.get_or_create(
+            self._cache_key(pipeline),
+            lambda: CompactPipelineStructure.create_from_structure(
+                self.get_pipeline_config(pipeline).structure
+            ),
+        )
+
+
 class PipelineControllerJson(Controller):
     path = "/"
 
     @get(path="/structure/{pipeline:str}", api_func=get_pipeline_config)
     async def get_pipeline_structure(
-        self, kiara_api: KiaraAPI, pipeline: str
+        self,
+        pipeline_cache: PipelineCache,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+        pipeline: str,
     ) -> PipelineStructureInfo:
 
-        pipeline_config = get_pipeline_config(
-            pipeline=pipeline, kiara=kiara_api.context
-        )
-        info = PipelineStructureInfo.create_from_instance(
-            kiara=kiara_api.context, instance=pipeline_config.structure
-        )
-        return info
+        if registry_snapshot is not None and pipeline in registry_snapshot.pipelines:
+            return registry_snapshot.pipelines[pipeline]  # type: ignore
+
+        return await context_access.read(pipeline_cache.get_structure_info, pipeline)
+
+    @get(
+        path="/compact_structure/{pipeline:str}",
+        summary="Retrieve a compact encoding of the step graph of a pipeline.",
+    )
+    async def get_compact_pipeline_structure(
+        self,
+        pipeline_cache: PipelineCache,
+        context_access: ContextAccess,
+        pipeline: str,
+    ) -> CompactPipelineStructure:
+
+        return await context_access.read(pipeline_cache.get_compact_structure, pipeline)
+
+    @get(path="/list", api_func=KiaraAPI.list_pipeline_ids)
+    async def list_pipelines(
+        self,
+        pipeline_cache: PipelineCache,
+        context_access: ContextAccess,
+        registry_snapshot: Union[RegistrySnapshot, None],
+    ) -> List[str]:
 
-    @get(path="/list", api_func=get_pipeline_config)
-    async def list_pipelines(self, kiara_api: KiaraAPI) -> List[str]:
+        if registry_snapshot is not None:
+            return registry_snapshot.pipeline_ids
 
-        pipelines = kiara_api.list_operations(operation_types="pipeline")
-        return list(pipelines.keys())
+        return await context_access.read(pipeline_cache.list_pipeline_ids)
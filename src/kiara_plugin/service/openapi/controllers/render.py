@@ -1,13 +1,29 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import uuid
 from typing import Any, Dict, List, Mapping, Union
 
+import structlog
 from pydantic import BaseModel, Field
-from starlite import Controller
+from starlite import Controller, Response
+from starlite.response import StreamingResponse
 
-from kiara.api import KiaraAPI, ValueSchema
+from kiara.api import KiaraAPI, Value, ValueSchema
+from kiara.models.events import KiaraEvent
+from kiara.models.events.data_registry import ValueStoredEvent
 from kiara.models.module.operation import Operation
 from kiara.models.rendering import RenderValueResult
 from kiara_plugin.service.openapi.controllers import get, post
+from kiara_plugin.service.openapi.controllers.values import ValueCache
+from kiara_plugin.service.utils.concurrency import ContextAccess
+from kiara_plugin.service.utils.encoding import (
+    EncodedContent,
+    encode,
+    response_media_type,
+)
+from kiara_plugin.service.utils.response_cache import EncodedStream, ResponseCache
+
+logger = structlog.getLogger()
 
 
 class InputsValidationData(BaseModel):
@@ -16,6 +32,128 @@ class InputsValidationData(BaseModel):
     inputs_schema: Mapping[str, ValueSchema] = Field(description="The inputs schemas.")
 
 
+class ValueInfoRenderer(object):
+    """Renders (and caches) the HTML info of values, and pre-renders it in the background once a value is stored.
+
+    The rendered HTML is cached in the response cache, keyed by the id and hash of the value (and its aliases and
+    destinies, which are part of the info). Aliases are resolved on every request, so they always point to the cache
+    entry of their current target. Large cached responses are streamed from the cache, instead of being loaded into
+    memory as a whole.
+
+    Arguments:
+        kiara_api: the kiara api instance
+        value_cache: the cache for loaded values
+        response_cache: the cache for the rendered HTML
+        context_access: coordinates access to the kiara context
+        stream_threshold: cached responses larger than this (in bytes) are streamed
+        prerender: whether to render the info of values in the background once they are stored
+        max_pending: the maximum number of values waiting to be pre-rendered, further values are skipped
+    """
+
+    def __init__(
+        self,
+        kiara_api: KiaraAPI,
+        value_cache: ValueCache,
+        response_cache: ResponseCache,
+        context_access: ContextAccess,
+        stream_threshold: int = 1024 * 1024,
+        prerender: bool = True,
+        max_pending: int = 1024,
+    ):
+
+        self._kiara_api: KiaraAPI = kiara_api
+        self._value_cache: ValueCache = value_cache
+        self._response_cache: ResponseCache = response_cache
+        self._context_access: ContextAccess = context_access
+        self._stream_threshold: int = stream_threshold
+
+        self._max_pending: int = max_pending
+        self._loop: Union[asyncio.AbstractEventLoop, None] = None
+        self._pending: Union["asyncio.Queue[uuid.UUID]", None] = None
+        self._task: Union[asyncio.Task, None] = None
+
+        if prerender and response_cache.disk_cache is not None:
+            kiara_api.context.event_registry.add_listener(self, "value_stored")
+
+    def _render_html(self, value: Value) -> str:
+
+        value_info = self._kiara_api.retrieve_value_info(value)
+        return value_info.create_html()
+
+    def _create_key(self, value: Value) -> Union[str, None]:
+        return self._value_cache.create_value_info_cache_key(
+            value, kind="value_info_html"
+        )
+
+    async def get_or_render(
+        self, value: Union[str, uuid.UUID]
+    ) -> Union[EncodedContent, EncodedStream]:
+        """Return the (encoded) HTML info of a value, from the cache if possible.
+
+        Arguments:
+            value: the value id or alias
+        """
+
+        _value = await self._context_access.read(self._value_cache.get_value, value)
+        key = await self._context_access.read(self._create_key, _value)
+        content = await self._response_cache.get_or_create(
+            key,
+            lambda: self._context_access.read(self._render_html, _value),
+            stream_threshold=self._stream_threshold,
+        )
+        if isinstance(content, (EncodedContent, EncodedStream)):
+            return content
+
+        # not cacheable, e.g. because the value isn't stored
+        media_type = response_media_type()
+        return EncodedContent(body=encode(content, media_type), media_type=media_type)
+
+    def handle_events(self, *events: KiaraEvent) -> None:
+        """Schedule stored values for pre-rendering, this is called by kiara, usually from a worker thread."""
+
+        loop = self._loop
+        if loop is None:
+            return
+        for event in events:
+            if isinstance(event, ValueStoredEvent):
+                loop.call_soon_threadsafe(self._schedule, event.value.value_id)
+
+    def _schedule(self, value_id: uuid.UUID) -> None:
+
+        assert self._pending is not None
+        try:
+            self._pending.put_nowait(value_id)
+        except asyncio.QueueFull:
+            logger.debug("value_info.prerender_skipped", value_id=str(value_id))
+
+    async def _prerender(self) -> None:
+
+        assert self._pending is not None
+        while True:
+            value_id = await self._pending.get()
+            try:
+                content = await self.get_or_render(value_id)
+                if isinstance(content, EncodedStream):
+                    await content.chunks.aclose()  # type: ignore
+            except Exception as e:
+                logger.debug(
+                    "value_info.prerender_failed", value_id=str(value_id), error=str(e)
+                )
+
+    def start(self) -> None:
+        """Start pre-rendering the info of stored values (must be called from the event loop of the service)."""
+
+        self._pending = asyncio.Queue(maxsize=self._max_pending)
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._prerender())
+
+    def stop(self) -> None:
+
+        self._loop = None
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+
 class RenderControllerJson(Controller):
     path = "/"
 
@@ -24,13 +162,16 @@ class RenderControllerJson(Controller):
         api_func=KiaraAPI.assemble_render_pipeline,
     )
     async def create_render_manifest(
-        self, kiara_api: KiaraAPI, data_type: str
+        self, kiara_api: KiaraAPI, context_access: ContextAccess, data_type: str
     ) -> Operation:
         """Create a render manifest for the specified data type."""
 
         filters = ["select_columns"]
-        operation = kiara_api.assemble_render_pipeline(
-            data_type=data_type, target_format="html", filters=filters
+        operation = await context_access.read(
+            kiara_api.assemble_render_pipeline,
+            data_type=data_type,
+            target_format="html",
+            filters=filters,
         )
         return operation
 
@@ -38,6 +179,9 @@ class RenderControllerJson(Controller):
     async def render_data(
         self,
         kiara_api: KiaraAPI,
+        value_cache: ValueCache,
+        response_cache: ResponseCache,
+        context_access: ContextAccess,
         value: str,
         target_format: str = "html",
         data: Union[None, Dict[str, Any]] = None,
@@ -53,16 +197,26 @@ class RenderControllerJson(Controller):
             the render result
         """
 
-        try:
-            # filters = ["select_columns", "drop_columns"]
-            filters: List[str] = []
-            v = kiara_api.get_value(value)
-            result = kiara_api.render_value(
+        # filters = ["select_columns", "drop_columns"]
+        filters: List[str] = []
+
+        async def render() -> RenderValueResult:
+            v = await context_access.read(value_cache.get_value, value, load_data=True)
+            # rendering runs a pipeline, which registers its result values
+            return await context_access.write(
+                kiara_api.render_value,
                 value=v,
                 target_format=target_format,
                 filters=filters,
                 render_config=data,
             )
+
+        try:
+            _value = await context_access.read(value_cache.get_value, value)
+            key = value_cache.create_cache_key(
+                "render", _value, target_format, filters, data or {}
+            )
+            result = await response_cache.get_or_create(key, render)
         except Exception as e:
             import traceback
 
@@ -76,14 +230,17 @@ class RenderControllerJson(Controller):
     )
     async def render_operation_info(
         self,
-        kiara_api: KiaraAPI,
+        value_info_renderer: ValueInfoRenderer,
         value: str,
         target_format: str = "html",
         data: Union[Dict[str, Any], None] = None,
-    ) -> str:
-
-        print(f"RENDER VALUE INFO REQUEST: {value}")
-
-        value_info = kiara_api.retrieve_value_info(value)
-        html = value_info.create_html()
-        return html
+    ) -> Response:
+
+        content = await value_info_renderer.get_or_render(value)
+        if isinstance(content, EncodedStream):
+            return StreamingResponse(
+                content=content.chunks,
+                media_type=content.media_type,
+                headers={"content-length": str(content.size)},
+            )
+        return Response(content=content.body, media_type=content.media_type)
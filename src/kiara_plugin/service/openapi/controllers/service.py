@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from typing import Dict, Union
+
+from pydantic import BaseModel, Field
+from starlite import Controller, MediaType, Response
+from starlite.status_codes import HTTP_200_OK, HTTP_503_SERVICE_UNAVAILABLE
+
+from kiara_plugin.service.openapi.controllers import get
+from kiara_plugin.service.openapi.controllers.jobs import ResultReuseStats
+from kiara_plugin.service.utils.cache import CacheStats
+from kiara_plugin.service.utils.concurrency import ContextAccessStats
+from kiara_plugin.service.utils.process_pool import ProcessPoolStats
+
+
+class ServiceMetrics(BaseModel):
+    """Runtime metrics of a kiara service instance."""
+
+    context_access: ContextAccessStats = Field(
+        description="Statistics about (parallel) access to the kiara context."
+    )
+    caches: Dict[str, CacheStats] = Field(
+        description="Statistics about the service caches, indexed by cache name."
+    )
+    result_reuse: ResultReuseStats = Field(
+        description="Statistics about re-using the results of earlier jobs."
+    )
+    job_workers: Union[ProcessPoolStats, None] = Field(
+        description="Statistics about the job worker processes, if jobs run in worker processes.",
+        default=None,
+    )
+
+
+class WarmupStatus(BaseModel):
+    """The progress of pre-loading values into the value cache at startup."""
+
+    running: bool = Field(description="Whether the warm-up is still running.")
+    total: int = Field(description="The number of values to pre-load.")
+    loaded: int = Field(description="The number of values pre-loaded so far.")
+    failed: int = Field(description="The number of values that could not be loaded.")
+
+
+class ServiceStatus(BaseModel):
+    """The status of a kiara service instance."""
+
+    ready: bool = Field(description="Whether the service is ready to serve requests.")
+    warmup: WarmupStatus = Field(description="The status of the cache warm-up.")
+    registries_loaded: bool = Field(
+        description="Whether the kiara registries are loaded, until then registry metadata is served from a snapshot (if available).",
+        default=True,
+    )
+
+
+class ServiceControllerJson(Controller):
+    path = "/"
+
+    @get(path="/metrics", summary="Retrieve runtime metrics of this service.")
+    async def get_metrics(self, service_metrics: ServiceMetrics) -> ServiceMetrics:
+
+        return service_metrics
+
+    @get(path="/health/live", summary="Check whether this service is running.")
+    async def get_liveness(self) -> Dict[str, str]:
+
+        return {"status": "alive"}
+
+    @get(
+        path="/health/ready",
+        summary="Check whether this service has finished warming up, and is ready to serve requests.",
+    )
+    async def get_readiness(
+        self, service_status: ServiceStatus
+    ) -> Response[Dict[str, object]]:
+
+        status_code = (
+            HTTP_200_OK if service_status.ready else HTTP_503_SERVICE_UNAVAILABLE
+        )
+        return Response(
+            content=service_status.dict(),
+            status_code=status_code,
+            media_type=MediaType.JSON,
+        )
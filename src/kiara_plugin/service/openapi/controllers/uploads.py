@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import shutil
+import stat
+import tarfile
+import threading
+import uuid
+import zipfile
+from typing import AsyncIterator, Dict, List, Literal, Union
+
+import anyio
+import orjson
+from pydantic import BaseModel, Field, computed_field
+from starlite import Controller, Request
+from starlite.exceptions import NotFoundException, ValidationException
+
+from kiara.api import KiaraAPI, Value
+from kiara.interfaces.python_api import ValueInfo
+from kiara.models.filesystem import KiaraFile, KiaraFileBundle
+from kiara_plugin.service.openapi.controllers import delete, get, post, put
+from kiara_plugin.service.utils.concurrency import ContextAccess
+
+CHUNK_CHECKSUM_HEADER = "x-chunk-sha256"
+"""The (optional) request header containing the hex-encoded sha256 checksum of an uploaded chunk."""
+
+
+class CreateUploadRequest(BaseModel):
+
+    file_name: str = Field(description="The name of the file to upload.")
+    size: int = Field(description="The total size of the file (in bytes).", ge=0)
+    chunk_size: Union[int, None] = Field(
+        description="The size of each chunk (except the last one), if not specified the service default is used.",
+        default=None,
+        ge=1,
+    )
+
+
+class CompleteUploadRequest(BaseModel):
+
+    data_type: Literal["file", "file_bundle"] = Field(
+        description="The data type of the value to create, 'file_bundle' requires the uploaded file to be an archive (zip, tar, ...).",
+        default="file",
+    )
+    aliases: List[str] = Field(
+        description="The (optional) aliases for the new value.", default_factory=list
+    )
+
+
+class UploadStatus(BaseModel):
+    """The state of a (resumable) chunked upload."""
+
+    upload_id: str = Field(description="The id of the upload.")
+    file_name: str = Field(description="The name of the uploaded file.")
+    size: int = Field(description="The total size of the file (in bytes).")
+    chunk_size: int = Field(description="The size of each chunk (in bytes).")
+    received_chunks: Dict[int, str] = Field(
+        description="The indexes of all received chunks, with their sha256 checksums.",
+        default_factory=dict,
+    )
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def number_of_chunks(self) -> int:
+
+        if not self.size:
+            return 0
+        return (self.size + self.chunk_size - 1) // self.chunk_size
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def missing_chunks(self) -> List[int]:
+
+        return [
+            idx
+            for idx in range(self.number_of_chunks)
+            if idx not in self.received_chunks.keys()
+        ]
+
+    def expected_chunk_size(self, index: int) -> int:
+
+        if index < 0 or index >= self.number_of_chunks:
+            raise ValidationException(
+                f"Invalid chunk index '{index}' for upload '{self.upload_id}': must be between 0 and {self.number_of_chunks - 1}."
+            )
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+
+def _check_member_path(name: str) -> None:
+
+    if os.path.isabs(name) or name.startswith(("/", "\\")):
+        raise ValueError(f"absolute path '{name}'")
+    if ".." in name.replace("\\", "/").split("/"):
+        raise ValueError(f"path '{name}' points outside of the archive")
+
+
+def unpack_archive(archive_file: str, target_dir: str) -> None:
+    """Unpack a zip or tar archive into 'target_dir', rejecting members that would end up outside of it.
+
+    Links (symbolic or hard) and special files (devices, fifos) are rejected as well, since they could be used to read
+    or write files outside of the target folder.
+
+    Raises:
+        ValueError: if the file is not a (supported) archive, or contains unsafe members
+    """
+
+    if zipfile.is_zipfile(archive_file):
+        with zipfile.ZipFile(archive_file) as zf:
+            for info in zf.infolist():
+                _check_member_path(info.filename)
+                if stat.S_ISLNK(info.external_attr >> 16):
+                    raise ValueError(f"link '{info.filename}'")
+            # all member paths are checked above
+            zf.extractall(target_dir)  # noqa: S202
+        return
+
+    if not tarfile.is_tarfile(archive_file):
+        raise ValueError("not a zip or tar archive")
+
+    with tarfile.open(archive_file) as tf:
+        members = tf.getmembers()
+        for member in members:
+            _check_member_path(member.name)
+            if member.issym() or member.islnk():
+                raise ValueError(f"link '{member.name}'")
+            if not (member.isfile() or member.isdir()):
+                raise ValueError(f"special file '{member.name}'")
+        if hasattr(tarfile, "data_filter"):
+            tf.extractall(target_dir, members=members, filter="data")
+        else:
+            tf.extractall(target_dir, members=members)  # noqa: S202
+
+
+class UploadManager(object):
+    """Manages chunked uploads into a staging area on disk.
+
+    Each upload has its own folder, containing the (pre-allocated) data file, and the upload metadata. Metadata is
+    persisted after every chunk, which means uploads can be resumed, even after a restart of the service.
+
+    Arguments:
+        kiara_api: the kiara api instance
+        staging_dir: the folder to stage uploads in
+        default_chunk_size: the chunk size to use if the client doesn't specify one
+    """
+
+    def __init__(self, kiara_api: KiaraAPI, staging_dir: str, default_chunk_size: int):
+
+        self._kiara_api: KiaraAPI = kiara_api
+        self._staging_dir: str = staging_dir
+        self._default_chunk_size: int = default_chunk_size
+        self._lock = threading.Lock()
+
+    def _upload_dir(self, upload_id: str) -> str:
+
+        # make sure we don't accept anything that could be used to escape the staging dir
+        try:
+            _upload_id = uuid.UUID(upload_id).hex
+        except ValueError:
+            raise NotFoundException(f"No upload with id '{upload_id}'.")
+        return os.path.join(self._staging_dir, _upload_id)
+
+    def _data_file(self, upload_id: str) -> str:
+        return os.path.join(self._upload_dir(upload_id), "data")
+
+    def _save_status(self, status: UploadStatus) -> None:
+
+        meta_file = os.path.join(self._upload_dir(status.upload_id), "upload.json")
+        # written to a temporary file first, so a crash never leaves a truncated status behind
+        temp_file = f"{meta_file}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_file, "wb") as f:
+                f.write(
+                    orjson.dumps(
+                        status.model_dump(
+                            exclude={"number_of_chunks", "missing_chunks"}
+                        ),
+                        option=orjson.OPT_NON_STR_KEYS,
+                    )
+                )
+            os.replace(temp_file, meta_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def get_status(self, upload_id: str) -> UploadStatus:
+
+        meta_file = os.path.join(self._upload_dir(upload_id), "upload.json")
+        if not os.path.isfile(meta_file):
+            raise NotFoundException(f"No upload with id '{upload_id}'.")
+
+        with open(meta_file, "rb") as f:
+            return UploadStatus(**orjson.loads(f.read()))
+
+    def create_upload(self, request: CreateUploadRequest) -> UploadStatus:
+
+        # the file name is used as file name in the staging dir, when unpacking archives
+        file_name = request.file_name
+        if file_name in ("", ".", "..") or any(c in file_name for c in "/\\\0"):
+            raise ValidationException(f"Invalid file name '{file_name}'.")
+
+        status = UploadStatus(
+            upload_id=uuid.uuid4().hex,
+            file_name=file_name,
+            size=request.size,
+            chunk_size=request.chunk_size or self._default_chunk_size,
+        )
+
+        os.makedirs(self._upload_dir(status.upload_id))
+        with open(self._data_file(status.upload_id), "wb") as f:
+            f.truncate(status.size)
+        self._save_status(status)
+        return status
+
+    async def write_chunk(
+        self,
+        upload_id: str,
+        index: int,
+        stream: AsyncIterator[bytes],
+        checksum: Union[str, None] = None,
+    ) -> UploadStatus:
+        """Stream a chunk into the data file of an upload, and verify its size and (optionally) its checksum."""
+
+        status = self.get_status(upload_id)
+        expected_size = status.expected_chunk_size(index)
+
+        hasher = hashlib.sha256()
+        written = 0
+        async with await anyio.open_file(self._data_file(upload_id), "r+b") as f:
+            await f.seek(index * status.chunk_size)
+            async for piece in stream:
+                written += len(piece)
+                if written > expected_size:
+                    raise ValidationException(
+                        f"Invalid chunk '{index}' for upload '{upload_id}': more than {expected_size} bytes."
+                    )
+                hasher.update(piece)
+                await f.write(piece)
+
+        if written != expected_size:
+            raise ValidationException(
+                f"Invalid chunk '{index}' for upload '{upload_id}': expected {expected_size} bytes, got {written}."
+            )
+
+        digest = hasher.hexdigest()
+        if checksum and checksum.lower() != digest:
+            raise ValidationException(
+                f"Invalid chunk '{index}' for upload '{upload_id}': checksum mismatch."
+            )
+
+        with self._lock:
+            # re-read the status, other chunks might have been written in the meantime
+            status = self.get_status(upload_id)
+            status.received_chunks[index] = digest
+            self._save_status(status)
+        return status
+
+    def complete_upload(self, upload_id: str, request: CompleteUploadRequest) -> Value:
+        """Register the uploaded file as a kiara value, store it, and remove it from the staging area."""
+
+        status = self.get_status(upload_id)
+        if status.missing_chunks:
+            raise ValidationException(
+                f"Can't complete upload '{upload_id}', missing chunks: {', '.join(str(c) for c in status.missing_chunks)}."
+            )
+
+        upload_dir = self._upload_dir(upload_id)
+        data_file = self._data_file(upload_id)
+
+        if request.data_type == "file_bundle":
+            bundle_dir = os.path.join(upload_dir, "bundle")
+            archive_file = os.path.join(upload_dir, status.file_name)
+            os.rename(data_file, archive_file)
+            try:
+                unpack_archive(archive_file, bundle_dir)
+            except (ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+                raise ValidationException(
+                    f"Can't create file bundle from upload '{upload_id}': {e}"
+                )
+            data: Union[KiaraFile, KiaraFileBundle] = KiaraFileBundle.import_folder(
+                source=bundle_dir, bundle_name=status.file_name
+            )
+        else:
+            data = KiaraFile.load_file(source=data_file, file_name=status.file_name)
+
+        value = self._kiara_api.register_data(data=data, data_type=request.data_type)
+        store_result = self._kiara_api.store_value(
+            value=value, alias=request.aliases or None
+        )
+        if store_result.error:
+            raise ValidationException(
+                f"Can't store value for upload '{upload_id}': {store_result.error}"
+            )
+
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return value
+
+    def delete_upload(self, upload_id: str) -> None:
+
+        upload_dir = self._upload_dir(upload_id)
+        if not os.path.isdir(upload_dir):
+            raise NotFoundException(f"No upload with id '{upload_id}'.")
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+class UploadControllerJson(Controller):
+    path = "/"
+
+    @post(path="/", summary="Start a new (chunked, resumable) upload.")
+    async def create_upload(
+        self, upload_manager: UploadManager, data: CreateUploadRequest
+    ) -> UploadStatus:
+
+        return await anyio.to_thread.run_sync(upload_manager.create_upload, data)
+
+    @get(
+        path="/{upload_id:str}",
+        summary="Retrieve the status of an upload, including the chunks that are still missing.",
+    )
+    async def get_upload_status(
+        self, upload_manager: UploadManager, upload_id: str
+    ) -> UploadStatus:
+
+        return upload_manager.get_status(upload_id)
+
+    @put(
+        path="/{upload_id:str}/chunks/{index:int}",
+        summary="Upload a single chunk, as raw request body.",
+        description=f"The request can contain a '{CHUNK_CHECKSUM_HEADER}' header with the hex-encoded sha256 checksum of the chunk, which will be verified.",
+    )
+    async def upload_chunk(
+        self,
+        upload_manager: UploadManager,
+        request: Request,
+        upload_id: str,
+        index: int,
+    ) -> UploadStatus:
+
+        return await upload_manager.write_chunk(
+            upload_id=upload_id,
+            index=index,
+            stream=request.stream(),
+            checksum=request.headers.get(CHUNK_CHECKSUM_HEADER, None),
+        )
+
+    @post(
+        path="/{upload_id:str}/complete",
+        summary="Finish an upload, and register and store the uploaded file as a kiara value.",
+    )
+    async def complete_upload(
+        self,
+        kiara_api: KiaraAPI,
+        upload_manager: UploadManager,
+        context_access: ContextAccess,
+        upload_id: str,
+        data: CompleteUploadRequest,
+    ) -> ValueInfo:
+
+        value = await context_access.write(
+            upload_manager.complete_upload, upload_id, data
+        )
+        return await context_access.read(kiara_api.retrieve_value_info, value)
+
+    @delete(path="/{upload_id:str}", summary="Abort an upload.")
+    async def delete_upload(
+        self, upload_manager: UploadManager, upload_id: str
+    ) -> None:
+
+        await anyio.to_thread.run_sync(upload_manager.delete_upload, upload_id)
@@ -1,13 +1,20 @@
 # -*- coding: utf-8 -*-
+import os
+import threading
+import time
 import uuid
-from typing import Any, Dict, List, Mapping, Union
+from typing import Any, Dict, List, Mapping, Tuple, Union
 
+import orjson
 from networkx import DiGraph
 from networkx.readwrite import json_graph
 from pydantic import BaseModel, Field
 from starlite import (
     Controller,
+    Parameter,
 )
+from starlite.exceptions import HTTPException
+from starlite.status_codes import HTTP_400_BAD_REQUEST
 
 from kiara.api import Kiara, KiaraAPI, Value, ValueSchema
 from kiara.exceptions import InvalidValuesException
@@ -15,6 +22,19 @@ from kiara.interfaces.python_api import ValueInfo, ValuesInfo
 from kiara.models.values.matchers import ValueMatcher
 from kiara.models.values.value import SerializedData
 from kiara_plugin.service.openapi.controllers import get, post
+from kiara_plugin.service.utils.aggregation import (
+    AggregateQuery,
+    AggregateResult,
+    aggregate_table,
+)
+from kiara_plugin.service.utils.cache import LRUCache
+from kiara_plugin.service.utils.concurrency import ContextAccess
+from kiara_plugin.service.utils.response_cache import ResponseCache, cache_key
+from kiara_plugin.service.utils.sampling import (
+    MAX_SAMPLE_SIZE,
+    DataSample,
+    sample_data,
+)
 
 
 class InputsValidationData(BaseModel):
@@ -23,20 +43,237 @@ class InputsValidationData(BaseModel):
     inputs_schema: Mapping[str, ValueSchema] = Field(description="The inputs schemas.")
 
 
+VALUE_METADATA_SIZE = 4096
+"""The estimated in-memory size of a value instance without its data (in bytes)."""
+
+
+class _CachedValue(object):
+    """A cached value, and whether its data was loaded."""
+
+    def __init__(self, value: Value, data_loaded: bool = False):
+
+        self.value: Value = value
+        self.data_loaded: bool = data_loaded
+
+
+class ValueCache(object):
+    """Caches loaded values (and their data) by value id, and keeps track of which values were accessed most recently.
+
+    Aliases are resolved to value ids on every access, so they always point to the cache entry of their current
+    target. The cache is bounded by the estimated size of the values it holds: the size of their (serialized) data if
+    it was loaded, and a fixed estimate for the metadata otherwise.
+
+    For stored values, the cache holds its own copy of the value instance kiara keeps, and only loads the data into
+    that copy. Kiara also keeps the data of every value it loaded (for the lifetime of the context), so evicting a
+    copy drops that as well, and the data will be re-loaded from the data store if needed again. Values that aren't
+    stored can't be re-loaded, so the cache holds kiara's instance of those, and their data is never released: the
+    size bound only applies to the data of stored values (and only to data that was loaded through the cache).
+
+    The access times can be persisted, in order to warm up the cache with the most recently used values after a
+    restart.
+
+    Arguments:
+        kiara_api: the kiara api instance
+        max_items: the maximum number of values to keep
+        max_bytes: the maximum (estimated) size of all cached values
+        access_log_file: the (optional) path of the file to persist the value access times to
+    """
+
+    def __init__(
+        self,
+        kiara_api: KiaraAPI,
+        max_items: Union[int, None] = 1024,
+        max_bytes: Union[int, None] = None,
+        access_log_file: Union[str, None] = None,
+    ):
+
+        self._kiara_api: KiaraAPI = kiara_api
+        self._values: LRUCache[uuid.UUID, _CachedValue] = LRUCache(
+            name="values",
+            max_items=max_items,
+            max_bytes=max_bytes,
+            size_func=self._estimate_size,
+            on_evict=self._release_data,
+        )
+        self._access_log_file: Union[str, None] = access_log_file
+        self._access_times: Dict[uuid.UUID, float] = {}
+        # values are retrieved from several worker threads
+        self._lock = threading.Lock()
+
+        if access_log_file and os.path.isfile(access_log_file):
+            with open(access_log_file, "rb") as f:
+                access_log: Dict[str, float] = orjson.loads(f.read())
+            self._access_times = {uuid.UUID(k): v for k, v in access_log.items()}
+
+    @property
+    def caches(self) -> List[LRUCache]:
+        return [self._values]
+
+    def _estimate_size(self, cached: _CachedValue) -> int:
+
+        if cached.data_loaded:
+            return VALUE_METADATA_SIZE + cached.value.value_size
+        return VALUE_METADATA_SIZE
+
+    def _release_data(self, value_id: uuid.UUID, cached: _CachedValue) -> None:
+
+        if cached.data_loaded and cached.value.is_stored:
+            # kiara has no api to release the data it loaded
+            data_registry = self._kiara_api.context.data_registry
+            data_registry._cached_data.pop(value_id, None)
+
+    def resolve_value_id(self, value: Union[str, uuid.UUID]) -> uuid.UUID:
+
+        if isinstance(value, uuid.UUID):
+            return value
+
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            pass
+
+        alias_registry = self._kiara_api.context.alias_registry
+        value_id = alias_registry.find_value_id_for_alias(value)
+        if value_id is None:
+            # let kiara deal with other reference formats, or raise the appropriate exception
+            value_id = self._kiara_api.get_value(value).value_id
+        return value_id
+
+    def _create_entry(self, value_id: uuid.UUID) -> _CachedValue:
+
+        value = self._kiara_api.get_value(value_id)
+        if value.is_stored:
+            value = value.model_copy()
+        return _CachedValue(value)
+
+    def _get_value(self, value_id: uuid.UUID, load_data: bool) -> Value:
+
+        cached = self._values.get_or_create(
+            value_id, lambda: self._create_entry(value_id)
+        )
+        if load_data and not cached.data_loaded:
+            # loading the data happens outside the cache lock, replacing the entry accounts for the size of the data
+            # (unless it was evicted, or replaced by another thread in the meantime)
+            cached.value.data
+            self._values.replace(
+                value_id, cached, _CachedValue(cached.value, data_loaded=True)
+            )
+        return cached.value
+
+    def get_value(self, value: Union[str, uuid.UUID], load_data: bool = False) -> Value:
+
+        value_id = self.resolve_value_id(value)
+        with self._lock:
+            self._access_times[value_id] = time.time()
+        return self._get_value(value_id, load_data=load_data)
+
+    def preload(self, value: Union[str, uuid.UUID], load_data: bool = False) -> Value:
+        """Load a value (and optionally its data) into the cache, without recording it as accessed."""
+
+        value_id = self.resolve_value_id(value)
+        return self._get_value(value_id, load_data=load_data)
+
+    def create_cache_key(
+        self, kind: str, value: Value, *parts: Any
+    ) -> Union[str, None]:
+        """Create a response cache key for a response that is derived from a value (and the additional parts).
+
+        Returns 'None' for values that aren't stored (yet), since those might still change.
+        """
+
+        if not value.is_stored:
+            return None
+        return cache_key(kind, value.value_id, value.value_hash, *parts)
+
+    def create_value_info_cache_key(
+        self, value: Value, kind: str = "value_info"
+    ) -> Union[str, None]:
+        """Create a response cache key for the info of a value, which also contains its (mutable) aliases and destinies."""
+
+        if not value.is_stored:
+            return None
+
+        context = self._kiara_api.context
+        aliases = sorted(
+            context.alias_registry.find_aliases_for_value_id(value.value_id)
+        )
+        destinies = context.data_registry.find_destinies_for_value(
+            value_id=value.value_id
+        )
+        return self.create_cache_key(kind, value, aliases, destinies)
+
+    def resolve_inputs(self, inputs: Mapping[str, Any]) -> Dict[str, Any]:
+        """Replace all inputs that reference existing values (by id or alias) with the cached value instances."""
+
+        alias_registry = self._kiara_api.context.alias_registry
+
+        result: Dict[str, Any] = {}
+        for field_name, input_data in inputs.items():
+            value_id: Union[uuid.UUID, None] = None
+            if isinstance(input_data, str):
+                try:
+                    value_id = uuid.UUID(input_data)
+                except ValueError:
+                    value_id = alias_registry.find_value_id_for_alias(input_data)
+
+            if value_id is None:
+                result[field_name] = input_data
+            else:
+                result[field_name] = self.get_value(value_id)
+        return result
+
+    def _sorted_access_times(self, number: int) -> List[Tuple[uuid.UUID, float]]:
+
+        with self._lock:
+            access_times = list(self._access_times.items())
+        access_times.sort(key=lambda item: item[1], reverse=True)
+        return access_times[:number]
+
+    def most_recently_accessed(self, number: int) -> List[uuid.UUID]:
+
+        return [value_id for value_id, _ in self._sorted_access_times(number)]
+
+    def save_access_log(self, max_entries: int = 1000) -> None:
+
+        if not self._access_log_file:
+            return
+
+        access_log = {
+            str(value_id): access_time
+            for value_id, access_time in self._sorted_access_times(max_entries)
+        }
+        os.makedirs(os.path.dirname(self._access_log_file), exist_ok=True)
+        with open(self._access_log_file, "wb") as f:
+            f.write(orjson.dumps(access_log))
+
+
 class ValueControllerJson(Controller):
     path = "/"
 
     @get(path="/ids", api_func=KiaraAPI.list_value_ids)
-    async def list_value_ids(self, kiara_api: KiaraAPI) -> List[uuid.UUID]:
+    async def list_value_ids(
+        self, kiara_api: KiaraAPI, context_access: ContextAccess
+    ) -> List[uuid.UUID]:
 
-        result = kiara_api.list_value_ids()
+        result = await context_access.read(kiara_api.list_value_ids)
         return result
 
     @get(path="/value_info/{value: str}", api_func=KiaraAPI.retrieve_value_info)
-    async def get_value_info(self, kiara_api: KiaraAPI, value: str) -> ValueInfo:
-
-        value_info = kiara_api.retrieve_value_info(value=value)
-        return value_info
+    async def get_value_info(
+        self,
+        kiara_api: KiaraAPI,
+        value_cache: ValueCache,
+        response_cache: ResponseCache,
+        context_access: ContextAccess,
+        value: str,
+    ) -> ValueInfo:
+
+        _value = await context_access.read(value_cache.get_value, value)
+        key = await context_access.read(value_cache.create_value_info_cache_key, _value)
+        return await response_cache.get_or_create(
+            key,
+            lambda: context_access.read(kiara_api.retrieve_value_info, value=_value),
+        )
 
     # @post(path="/values", api_func=KiaraAPI.retrieve_values_info)
     # async def find_values(
@@ -50,22 +287,24 @@ class ValueControllerJson(Controller):
 
     @post(path="/values_info", api_func=KiaraAPI.retrieve_values_info)
     async def get_values_info(
-        self, kiara_api: KiaraAPI, data: ValueMatcher
+        self, kiara_api: KiaraAPI, context_access: ContextAccess, data: ValueMatcher
     ) -> Dict[str, ValueInfo]:
 
         matcher_data = data.dict()
 
-        result = kiara_api.retrieve_values_info(**matcher_data)
+        result = await context_access.read(
+            kiara_api.retrieve_values_info, **matcher_data
+        )
         return result.item_infos  # type: ignore
 
     @get(path="/type/{data_type:str}/values", api_func=KiaraAPI.list_values)
     async def find_values_of_type(
-        self, kiara_api: KiaraAPI, data_type: str
+        self, kiara_api: KiaraAPI, context_access: ContextAccess, data_type: str
     ) -> Dict[str, Value]:
 
         matcher = ValueMatcher(data_types=[data_type])
 
-        result = kiara_api.list_values(**matcher.dict())
+        result = await context_access.read(kiara_api.list_values, **matcher.dict())
         return result  # type: ignore
         # return {str(k): v for k, v in result.items()}
 
@@ -74,36 +313,41 @@ class ValueControllerJson(Controller):
         summary="List values info of specific data type.",
     )
     async def find_values_info_of_type(
-        self, kiara_api: KiaraAPI, data_type: str
+        self, kiara_api: KiaraAPI, context_access: ContextAccess, data_type: str
     ) -> ValuesInfo:
 
         matcher = ValueMatcher(data_types=[data_type])
 
-        result = kiara_api.retrieve_values_info(**matcher.dict())
+        result = await context_access.read(
+            kiara_api.retrieve_values_info, **matcher.dict()
+        )
         return result
 
     @post(path="/alias_names", api_func=KiaraAPI.list_alias_names)
     async def list_alias_names(
-        self, kiara_api: KiaraAPI, data: ValueMatcher
+        self, kiara_api: KiaraAPI, context_access: ContextAccess, data: ValueMatcher
     ) -> List[str]:
 
         matcher_data = data.dict()
-        result = kiara_api.list_alias_names(**matcher_data)
+        result = await context_access.read(kiara_api.list_alias_names, **matcher_data)
         return result
 
     @post(path="/aliases", api_func=KiaraAPI.list_aliases)
     async def list_aliases(
-        self, kiara_api: KiaraAPI, data: ValueMatcher
+        self, kiara_api: KiaraAPI, context_access: ContextAccess, data: ValueMatcher
     ) -> Dict[str, Value]:
 
         matcher_data = data.dict()
 
-        result = kiara_api.list_aliases(**matcher_data)
+        result = await context_access.read(kiara_api.list_aliases, **matcher_data)
         return result  # type: ignore
 
     @post(path="/aliases_info", api_func=KiaraAPI.retrieve_aliases_info)
     async def list_aliases_info(
-        self, kiara_api: KiaraAPI, data: Union[ValueMatcher, None]
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        data: Union[ValueMatcher, None],
     ) -> Dict[str, ValueInfo]:
 
         if data is None:
@@ -111,26 +355,28 @@ class ValueControllerJson(Controller):
         else:
             matcher_data = data.dict()
 
-        result = kiara_api.retrieve_aliases_info(**matcher_data)
+        result = await context_access.read(
+            kiara_api.retrieve_aliases_info, **matcher_data
+        )
         return result.item_infos  # type: ignore
 
     @get(path="/type/{data_type:str}/aliases", api_func=KiaraAPI.list_aliases)
     async def find_value_aliases_of_type(
-        self, kiara_api: KiaraAPI, data_type: str
+        self, kiara_api: KiaraAPI, context_access: ContextAccess, data_type: str
     ) -> Dict[str, Value]:
 
         matcher = ValueMatcher(data_types=[data_type], has_alias=True)
 
-        result = kiara_api.list_aliases(**matcher.dict())
+        result = await context_access.read(kiara_api.list_aliases, **matcher.dict())
         return result  # type: ignore
 
     @get(path="/type/{data_type:str}/alias_names", api_func=KiaraAPI.list_alias_names)
     async def find_value_aliase_names_of_type(
-        self, kiara_api: KiaraAPI, data_type: str
+        self, kiara_api: KiaraAPI, context_access: ContextAccess, data_type: str
     ) -> List[str]:
         matcher = ValueMatcher(data_types=[data_type], has_alias=True)
 
-        result = kiara_api.list_alias_names(**matcher.dict())
+        result = await context_access.read(kiara_api.list_alias_names, **matcher.dict())
         return result
 
     @get(
@@ -138,12 +384,14 @@ class ValueControllerJson(Controller):
         api_func=KiaraAPI.retrieve_aliases_info,
     )
     async def find_value_aliases_info_of_type(
-        self, kiara_api: KiaraAPI, data_type: str
+        self, kiara_api: KiaraAPI, context_access: ContextAccess, data_type: str
     ) -> ValuesInfo:
 
         matcher = ValueMatcher(data_types=[data_type], has_alias=True)
 
-        result = kiara_api.retrieve_aliases_info(**matcher.dict())
+        result = await context_access.read(
+            kiara_api.retrieve_aliases_info, **matcher.dict()
+        )
         return result
 
     @get(
@@ -151,24 +399,133 @@ class ValueControllerJson(Controller):
         summary="Retrieve the serialized form of the values data.",
     )
     async def retrieve_data(
-        self, kiara_api: KiaraAPI, value: Union[str, uuid.UUID]
+        self,
+        value_cache: ValueCache,
+        response_cache: ResponseCache,
+        context_access: ContextAccess,
+        value: Union[str, uuid.UUID],
     ) -> SerializedData:
 
-        _value = kiara_api.get_value(value)
-        return _value.serialized_data
+        _value = await context_access.read(value_cache.get_value, value)
+
+        async def serialize() -> SerializedData:
+            loaded = await context_access.read(
+                value_cache.get_value, _value.value_id, load_data=True
+            )
+            return loaded.serialized_data
+
+        return await response_cache.get_or_create(
+            value_cache.create_cache_key("serialized", _value), serialize
+        )
+
+    @get(
+        path="/sample/{value:str}",
+        summary="Retrieve a random, or stratified sample of the rows (or items) of a value.",
+    )
+    async def sample_value_data(
+        self,
+        value_cache: ValueCache,
+        response_cache: ResponseCache,
+        context_access: ContextAccess,
+        value: str,
+        size: int = Parameter(default=100, ge=1, le=MAX_SAMPLE_SIZE),
+        seed: int = Parameter(default=0, ge=0),
+        stratify_by: Union[str, None] = Parameter(default=None),
+    ) -> DataSample:
+        """Sample tables (rows), arrays (items), and databases or network data (rows of every table).
+
+        Samples of stored values are cached by value hash, size, seed and stratification column, so only the first
+        request for a sample has to scan the data.
+        """
+
+        _value = await context_access.read(value_cache.get_value, value)
+
+        async def create_sample() -> DataSample:
+            loaded = await context_access.read(
+                value_cache.get_value, _value.value_id, load_data=True
+            )
+            samples = await context_access.read(
+                sample_data, loaded.data, size, seed=seed, stratify_by=stratify_by
+            )
+            return DataSample(
+                value_id=str(_value.value_id),
+                value_hash=_value.value_hash,
+                data_type=_value.data_type_name,
+                size=size,
+                seed=seed,
+                stratify_by=stratify_by,
+                samples=samples,
+            )
+
+        try:
+            return await response_cache.get_or_create(
+                value_cache.create_cache_key("sample", _value, size, seed, stratify_by),
+                create_sample,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+
+    @post(
+        path="/aggregate/{value:str}",
+        summary="Run a group-by aggregation over the data of a table value.",
+    )
+    async def aggregate_data(
+        self,
+        value_cache: ValueCache,
+        response_cache: ResponseCache,
+        context_access: ContextAccess,
+        aggregation_threads: int,
+        value: str,
+        data: AggregateQuery,
+    ) -> AggregateResult:
+        """Compute counts, sums, minimums, maximums and distinct counts per group, only the result is returned.
+
+        Results for stored values are cached by value hash and query.
+        """
+
+        _value = await context_access.read(value_cache.get_value, value)
+
+        async def aggregate() -> AggregateResult:
+            loaded = await context_access.read(
+                value_cache.get_value, _value.value_id, load_data=True
+            )
+            table = getattr(loaded.data, "arrow_table", None)
+            if table is None:
+                raise ValueError(
+                    f"Can't aggregate value of type '{_value.data_type_name}': not a table."
+                )
+            return await context_access.read(
+                aggregate_table, table, data, threads=aggregation_threads
+            )
+
+        try:
+            return await response_cache.get_or_create(
+                value_cache.create_cache_key("aggregate", _value, data.model_dump()),
+                aggregate,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
 
     async def filter_data(self, kiara: Kiara, value):
         raise NotImplementedError()
 
     @post(path="/validate/inputs", summary="Validate inputs against a schema.")
     async def validate_inputs(
-        self, kiara_api: KiaraAPI, data: InputsValidationData
+        self,
+        kiara_api: KiaraAPI,
+        value_cache: ValueCache,
+        context_access: ContextAccess,
+        data: InputsValidationData,
     ) -> Dict[str, str]:
 
         print("VALIDATE REQUEST")
         try:
-            value_map = kiara_api.context.data_registry.create_valuemap(
-                data=data.inputs, schema=data.inputs_schema
+            inputs = await context_access.read(value_cache.resolve_inputs, data.inputs)
+            # creating a value map registers (non-persisted) values in the data registry
+            value_map = await context_access.write(
+                kiara_api.context.data_registry.create_valuemap,
+                data=inputs,
+                schema=data.inputs_schema,
             )
             return value_map.check_invalid()
         except InvalidValuesException as ive:
@@ -176,15 +533,26 @@ class ValueControllerJson(Controller):
 
     @get(path="/lineage/{value:str}", summary="Retrieve the lineage data for a value.")
     async def get_value_lineage(
-        self, kiara_api: KiaraAPI, value: str
+        self,
+        value_cache: ValueCache,
+        response_cache: ResponseCache,
+        context_access: ContextAccess,
+        value: str,
     ) -> Dict[str, Any]:
 
         print(f"LINEAGE REQUEST: {value}")
-        _value = kiara_api.get_value(value=value)
+        _value = await context_access.read(value_cache.get_value, value=value)
+
+        async def create_lineage() -> Dict[str, Any]:
+            graph: DiGraph = await context_access.read(
+                lambda: _value.lineage.module_graph
+            )
+            return json_graph.node_link_data(graph)
+
         try:
-            graph: DiGraph = _value.lineage.module_graph
-            result = json_graph.node_link_data(graph)
-            return result
+            return await response_cache.get_or_create(
+                value_cache.create_cache_key("lineage", _value), create_lineage
+            )
         except Exception as e:
             import traceback
 
@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
-from typing import Dict, List, Union
+import uuid
+from typing import Dict, Hashable, List, Union
 
 from pydantic import BaseModel, Field
 from starlite import Controller
 
 from kiara.api import KiaraAPI
-from kiara.models.workflow import WorkflowInfo
+from kiara.models.workflow import WorkflowInfo, WorkflowMetadata
 from kiara_plugin.service.openapi.controllers import get, post
+from kiara_plugin.service.utils.cache import LRUCache
+from kiara_plugin.service.utils.concurrency import ContextAccess
 
 
 class WorkflowMatcher(BaseModel):
@@ -15,6 +18,125 @@ class WorkflowMatcher(BaseModel):
         description="The (optional) filter strings, an operation must match all of them to be included in the result.",
         default_factory=list,
     )
+    has_alias: bool = Field(
+        description="Only include workflows that have at least one alias.",
+        default=False,
+    )
+    offset: int = Field(
+        description="The number of (matching) workflows to skip.", default=0, ge=0
+    )
+    limit: Union[int, None] = Field(
+        description="The maximum number of workflows to return.", default=None, ge=1
+    )
+
+
+class WorkflowSummary(BaseModel):
+    """A lightweight summary of a workflow, without any per-state details."""
+
+    workflow_id: uuid.UUID = Field(description="The id of the workflow.")
+    aliases: List[str] = Field(description="All aliases of the workflow.")
+    description: str = Field(description="A short description of the workflow.")
+    current_state: Union[str, None] = Field(
+        description="The id of the current state of the workflow."
+    )
+    number_of_states: int = Field(
+        description="The number of states in the workflow history."
+    )
+
+    @classmethod
+    def create_from_metadata(
+        cls, metadata: WorkflowMetadata, aliases: List[str]
+    ) -> "WorkflowSummary":
+
+        return cls(
+            workflow_id=metadata.workflow_id,
+            aliases=aliases,
+            description=metadata.documentation.description,
+            current_state=metadata.current_state,
+            number_of_states=len(metadata.workflow_history),
+        )
+
+
+class WorkflowCache(object):
+    """Filters workflows on their ids and aliases, and caches workflow infos by workflow state and aliases."""
+
+    def __init__(self, kiara_api: KiaraAPI, max_items: Union[int, None] = 256):
+
+        self._kiara_api: KiaraAPI = kiara_api
+        self._workflow_infos: LRUCache[Hashable, WorkflowInfo] = LRUCache(
+            name="workflow_infos", max_items=max_items
+        )
+
+    @property
+    def caches(self) -> List[LRUCache]:
+        return [self._workflow_infos]
+
+    def _aliases_by_id(self) -> Dict[uuid.UUID, List[str]]:
+
+        result: Dict[uuid.UUID, List[str]] = {}
+        workflow_registry = self._kiara_api.context.workflow_registry
+        for alias, workflow_id in workflow_registry.workflow_aliases.items():
+            result.setdefault(workflow_id, []).append(alias)
+        return result
+
+    def find_workflow_ids(self, matcher: WorkflowMatcher) -> List[uuid.UUID]:
+        """Return the (sorted) ids of all workflows that match, without loading any workflow details."""
+
+        aliases_by_id = self._aliases_by_id()
+        if matcher.has_alias:
+            workflow_ids = list(aliases_by_id.keys())
+        else:
+            workflow_ids = list(
+                self._kiara_api.context.workflow_registry.all_workflow_ids
+            )
+
+        result = []
+        for workflow_id in workflow_ids:
+            tokens = [str(workflow_id), *aliases_by_id.get(workflow_id, [])]
+            if all(any(f in token for token in tokens) for f in matcher.filters):
+                result.append(workflow_id)
+
+        result.sort(key=lambda w_id: (sorted(aliases_by_id.get(w_id, [])), str(w_id)))
+
+        end = None if matcher.limit is None else matcher.offset + matcher.limit
+        return result[matcher.offset : end]
+
+    def find_workflow_summaries(
+        self, matcher: WorkflowMatcher
+    ) -> Dict[str, WorkflowSummary]:
+
+        workflow_registry = self._kiara_api.context.workflow_registry
+        aliases_by_id = self._aliases_by_id()
+
+        result = {}
+        for workflow_id in self.find_workflow_ids(matcher):
+            metadata = workflow_registry.get_workflow_metadata(workflow=workflow_id)
+            result[str(workflow_id)] = WorkflowSummary.create_from_metadata(
+                metadata=metadata, aliases=sorted(aliases_by_id.get(workflow_id, []))
+            )
+        return result
+
+    def find_workflow_infos(self, matcher: WorkflowMatcher) -> Dict[str, WorkflowInfo]:
+
+        return {
+            str(workflow_id): self.get_workflow_info(workflow_id)
+            for workflow_id in self.find_workflow_ids(matcher)
+        }
+
+    def get_workflow_info(self, workflow: Union[str, uuid.UUID]) -> WorkflowInfo:
+
+        workflow_registry = self._kiara_api.context.workflow_registry
+        metadata = workflow_registry.get_workflow_metadata(workflow=workflow)
+        # aliases can change without a new workflow state
+        aliases = tuple(sorted(workflow_registry.get_aliases(metadata.workflow_id)))
+        key = (metadata.workflow_id, metadata.current_state, aliases)
+
+        return self._workflow_infos.get_or_create(
+            key,
+            lambda: self._kiara_api.retrieve_workflow_info(
+                workflow=metadata.workflow_id
+            ),
+        )
 
 
 class WorkflowControllerJson(Controller):
@@ -22,20 +144,44 @@ class WorkflowControllerJson(Controller):
 
     @post(path="/ids", api_func=KiaraAPI.retrieve_workflows_info)
     async def list_workflows(
-        self, kiara_api: KiaraAPI, data: Union[WorkflowMatcher, None] = None
+        self,
+        workflow_cache: WorkflowCache,
+        context_access: ContextAccess,
+        data: Union[WorkflowMatcher, None] = None,
     ) -> Dict[str, WorkflowInfo]:
 
-        # if data is None:
-        #     filters: List[str] = []
-        # else:
-        #     filters = data.filters
+        if data is None:
+            data = WorkflowMatcher()
+
+        return await context_access.read(workflow_cache.find_workflow_infos, data)
+
+    @post(
+        path="/summaries",
+        summary="List lightweight summaries of all matching workflows.",
+    )
+    async def list_workflow_summaries(
+        self,
+        workflow_cache: WorkflowCache,
+        context_access: ContextAccess,
+        data: Union[WorkflowMatcher, None] = None,
+    ) -> Dict[str, WorkflowSummary]:
+        """List summaries of all matching workflows, created from workflow metadata only.
+
+        Unlike the infos returned by '/ids', summaries don't contain the pipeline details of the current workflow
+        state, so they are cheap to create for large numbers of workflows.
+        """
+
+        if data is None:
+            data = WorkflowMatcher()
 
-        result = kiara_api.retrieve_workflows_info().item_infos
-        return result  # type: ignore
+        return await context_access.read(workflow_cache.find_workflow_summaries, data)
 
     @post(path="/aliases", api_func=KiaraAPI.list_workflow_alias_names)
     async def list_workflow_aliases(
-        self, kiara_api: KiaraAPI, data: Union[WorkflowMatcher, None] = None
+        self,
+        kiara_api: KiaraAPI,
+        context_access: ContextAccess,
+        data: Union[WorkflowMatcher, None] = None,
     ) -> List[str]:
 
         # if data is None:
@@ -43,16 +189,20 @@ class WorkflowControllerJson(Controller):
         # else:
         #     filters = data.filters
 
-        result = kiara_api.list_workflow_alias_names()
+        result = await context_access.read(kiara_api.list_workflow_alias_names)
         return result
 
     @get(
         path="/workflow_info/{workflow: str}", api_func=KiaraAPI.retrieve_workflow_info
     )
     async def get_workflow_info(
-        self, kiara_api: KiaraAPI, workflow: str
+        self,
+        workflow_cache: WorkflowCache,
+        context_access: ContextAccess,
+        workflow: str,
     ) -> WorkflowInfo:
 
         print(f"INFO: {workflow}")
-        workflow_info = kiara_api.retrieve_workflow_info(workflow=workflow)
-        return workflow_info
+        return await context_access.read(
+            workflow_cache.get_workflow_info, workflow=workflow
+        )
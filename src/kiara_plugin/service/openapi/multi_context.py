@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+"""Serve several kiara contexts from a single service process.
+
+Requests are routed to a context by path prefix ('/contexts/<context_name>/...'), or by the 'x-kiara-context' header.
+Requests that specify neither are served by the default context (the one the service was started with), so a
+multi-context service is a drop-in replacement for a single-context one.
+
+Additional contexts are opened on first use, each with its own service instance (and caches of context data), and are
+closed again once they have been idle for too long, or the pool of open contexts exceeds its limits. The job worker
+processes, templates and assets don't depend on a context, so they are shared by all context services. Plugin code is
+imported only once per process, so opening another context is much cheaper than starting another service.
+
+The HTML pages of a context are rendered with the root path of their requests, so links and htmx requests stay within
+the prefix of the context they were served from.
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, List, Set, Tuple, Union
+
+import anyio
+import orjson
+import structlog
+
+from kiara.context import KiaraConfig
+from kiara.interfaces.python_api import KiaraAPI
+from kiara_plugin.service.config import KiaraServiceConfig
+from kiara_plugin.service.openapi.service import KiaraOpenAPIService, ServiceResources
+from kiara_plugin.service.utils.context_pool import ContextPool, ContextPoolStats
+
+logger = structlog.getLogger()
+
+CONTEXT_HEADER = b"x-kiara-context"
+CONTEXT_PATH_PREFIX = "/contexts/"
+
+CONTEXT_BASE_BYTES = 32 * 1024 * 1024
+"""The estimated memory used by an open kiara context (and its service), without its cached values."""
+
+
+class KiaraMultiContextService(object):
+    """An ASGI app that serves all contexts of a kiara config.
+
+    Arguments:
+        kiara_config: the kiara config to open contexts with
+        default_context: the context that serves requests without a context prefix or header
+        config: the service configuration, used for all contexts
+    """
+
+    def __init__(
+        self,
+        kiara_config: KiaraConfig,
+        default_context: str,
+        config: Union[KiaraServiceConfig, None] = None,
+    ):
+
+        if config is None:
+            config = KiaraServiceConfig()
+
+        self._config: KiaraServiceConfig = config
+        self._kiara_config_data: Dict[str, Any] = kiara_config.model_dump()
+        self._default_context: str = default_context
+        self._resources: ServiceResources = ServiceResources(
+            config=config,
+            kiara_config=self._kiara_config_data,
+            default_context=default_context,
+        )
+        self._default_service: KiaraOpenAPIService = KiaraOpenAPIService(
+            kiara_api=self._create_kiara_api(default_context),
+            config=config,
+            resources=self._resources,
+        )
+        self._context_names: Set[str] = set(kiara_config.available_context_names)
+
+        self._pool: ContextPool[KiaraOpenAPIService] = ContextPool(
+            open_context=self._open_service,
+            close_context=self._close_service,
+            max_open=config.max_open_contexts,
+            idle_timeout=config.context_idle_timeout,
+            max_bytes=config.context_memory_budget,
+            size_func=lambda service: service.estimate_memory(CONTEXT_BASE_BYTES),
+            is_busy=lambda service: service.busy,
+        )
+        self._reaper_task: Union[asyncio.Task, None] = None
+
+    @property
+    def stats(self) -> ContextPoolStats:
+        return self._pool.stats
+
+    def _create_kiara_api(self, context_name: str) -> KiaraAPI:
+
+        # every context needs its own kiara config instance, since those keep track of the contexts they opened
+        kiara_api = KiaraAPI(kiara_config=KiaraConfig(**self._kiara_config_data))
+        kiara_api.set_active_context(context_name)
+        return kiara_api
+
+    def _create_service(self, context_name: str) -> KiaraOpenAPIService:
+
+        kiara_api = self._create_kiara_api(context_name)
+
+        update: Dict[str, Any] = {"warmup_aliases": []}
+        if self._config.upload_staging_dir is not None:
+            update["upload_staging_dir"] = os.path.join(
+                self._config.upload_staging_dir, str(kiara_api.context.id)
+            )
+        service = KiaraOpenAPIService(
+            kiara_api=kiara_api,
+            config=self._config.model_copy(update=update),
+            resources=self._resources,
+        )
+        service.app()
+        return service
+
+    async def _open_service(self, context_name: str) -> KiaraOpenAPIService:
+
+        service = await anyio.to_thread.run_sync(self._create_service, context_name)
+        await service._on_startup()
+        logger.info("context.opened", context=context_name)
+        return service
+
+    async def _close_service(self, service: KiaraOpenAPIService) -> None:
+
+        await service._on_shutdown()
+        logger.info(
+            "context.closed", context=service.kiara_api.get_current_context_name()
+        )
+
+    async def _context_exists(self, context_name: str) -> bool:
+
+        if context_name in self._context_names:
+            return True
+
+        # the context might have been created after the service started
+        def list_context_names() -> List[str]:
+            return list(KiaraConfig(**self._kiara_config_data).available_context_names)
+
+        self._context_names = set(await anyio.to_thread.run_sync(list_context_names))
+        return context_name in self._context_names
+
+    def _resolve_context(
+        self, scope: Dict[str, Any]
+    ) -> Tuple[Union[str, None], Dict[str, Any]]:
+        """Find the name of the context a request is for, and the scope for the app of that context."""
+
+        path: str = scope["path"]
+        if path.startswith(CONTEXT_PATH_PREFIX):
+            context_name, _, remainder = path[len(CONTEXT_PATH_PREFIX) :].partition("/")
+            if context_name:
+                scope = dict(scope)
+                scope["path"] = f"/{remainder}"
+                scope["raw_path"] = scope["path"].encode("utf-8")
+                scope[
+                    "root_path"
+                ] = f"{scope.get('root_path', '')}{CONTEXT_PATH_PREFIX}{context_name}"
+                return context_name, scope
+
+        for key, value in scope.get("headers", []):
+            if key == CONTEXT_HEADER:
+                return value.decode("latin-1"), scope
+        return None, scope
+
+    async def _send_json(self, send: Any, status_code: int, content: Any) -> None:
+
+        body = orjson.dumps(content)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive: Any, send: Any) -> None:
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self._default_service._on_startup()
+                self._reaper_task = asyncio.create_task(self._pool.run_reaper())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._reaper_task is not None:
+                    self._reaper_task.cancel()
+                await self._pool.close_all()
+                await self._default_service._on_shutdown()
+                self._resources.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] == "http" and scope["path"].rstrip("/") == "/contexts":
+            await self._send_json(
+                send,
+                200,
+                {
+                    "default": self._default_context,
+                    "available": sorted(self._context_names),
+                    "pool": self._pool.stats.model_dump(),
+                },
+            )
+            return
+
+        context_name, scope = self._resolve_context(scope)
+        if context_name is None or context_name == self._default_context:
+            await self._default_service.app()(scope, receive, send)
+            return
+
+        if not await self._context_exists(context_name):
+            if scope["type"] == "http":
+                await self._send_json(
+                    send,
+                    404,
+                    {
+                        "status_code": 404,
+                        "detail": f"No kiara context '{context_name}'.",
+                    },
+                )
+            else:
+                await send({"type": "websocket.close", "code": 4404})
+            return
+
+        async with self._pool.use(context_name) as service:
+            await service.app()(scope, receive, send)
+
+    def app(self) -> "KiaraMultiContextService":
+        return self
@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import os
+import uuid
+from importlib.metadata import version
 from pathlib import Path
-from typing import Any, Dict, List, NoReturn, TypeVar, Union, cast
+from typing import Any, Dict, List, Mapping, NoReturn, TypeVar, Union, cast
 
+import anyio
 import structlog
 from jinja2 import Template as JinjaTemplate
 from jinja2 import TemplateNotFound as JinjaTemplateNotFound
@@ -27,6 +32,7 @@ from starlite import (
 )
 from starlite.enums import MediaType, OpenAPIMediaType
 from starlite.exceptions import ImproperlyConfiguredException, TemplateNotFoundException
+from starlite.middleware import DefineMiddleware
 from starlite.status_codes import HTTP_204_NO_CONTENT, HTTP_304_NOT_MODIFIED
 from starlite.template import TemplateEngineProtocol
 from starlite.types import (
@@ -40,22 +46,88 @@ from kiara.interfaces.python_api import KiaraAPI
 from kiara.models import KiaraModel
 from kiara.registries.templates import TemplateRegistry
 from kiara.utils import is_debug, is_develop
-from kiara_plugin.service.defaults import KIARA_SERVICE_RESOURCES_FOLDER
+from kiara_plugin.service.config import KiaraServiceConfig
+from kiara_plugin.service.defaults import (
+    KIARA_SERVICE_RESOURCES_FOLDER,
+    kiara_html_app_dirs,
+)
+from kiara_plugin.service.openapi.controllers.assets import AssetController
+from kiara_plugin.service.openapi.controllers.batch import BatchControllerJson
 from kiara_plugin.service.openapi.controllers.context_info import (
     DataTypeControllerJson,
     KiaraContextControllerJson,
 )
-from kiara_plugin.service.openapi.controllers.jobs import JobControllerJson
+from kiara_plugin.service.openapi.controllers.debug import (
+    AdminGuard,
+    DebugControllerJson,
+)
+from kiara_plugin.service.openapi.controllers.jobs import (
+    JobControllerJson,
+    JobManager,
+)
 from kiara_plugin.service.openapi.controllers.modules import ModuleControllerJson
 from kiara_plugin.service.openapi.controllers.operations import (
     OperationControllerJson,
 )
-from kiara_plugin.service.openapi.controllers.pipeline import PipelineControllerJson
-from kiara_plugin.service.openapi.controllers.render import RenderControllerJson
+from kiara_plugin.service.openapi.controllers.pipeline import (
+    PipelineCache,
+    PipelineControllerJson,
+)
+from kiara_plugin.service.openapi.controllers.render import (
+    RenderControllerJson,
+    ValueInfoRenderer,
+)
+from kiara_plugin.service.openapi.controllers.service import (
+    ServiceControllerJson,
+    ServiceMetrics,
+    ServiceStatus,
+    WarmupStatus,
+)
+from kiara_plugin.service.openapi.controllers.uploads import (
+    UploadControllerJson,
+    UploadManager,
+)
 from kiara_plugin.service.openapi.controllers.values import (
+    ValueCache,
     ValueControllerJson,
 )
-from kiara_plugin.service.openapi.controllers.workflows import WorkflowControllerJson
+from kiara_plugin.service.openapi.controllers.workflows import (
+    WorkflowCache,
+    WorkflowControllerJson,
+)
+from kiara_plugin.service.utils.assets import AssetTable
+from kiara_plugin.service.utils.cache import LRUCache
+from kiara_plugin.service.utils.concurrency import ContextAccess
+from kiara_plugin.service.utils.encoding import (
+    JSON_MEDIA_TYPE,
+    ContentNegotiationMiddleware,
+    EncodedContent,
+    encode,
+    response_media_type,
+)
+from kiara_plugin.service.utils.job_worker import init_kiara_worker
+from kiara_plugin.service.utils.process_pool import ProcessPool
+from kiara_plugin.service.utils.registry_snapshot import (
+    RegistrySnapshot,
+    RegistrySnapshotManager,
+)
+from kiara_plugin.service.utils.response_cache import DiskCache, ResponseCache
+from kiara_plugin.service.utils.templates import (
+    FragmentCache,
+    RequestGlobal,
+    TemplateGlobalsMiddleware,
+    enable_bytecode_cache,
+    precompile_templates,
+    url,
+)
+from kiara_plugin.service.utils.tracing import (
+    Tracer,
+    TracingMiddleware,
+    current_span,
+    end_span,
+    start_span,
+    trace_span,
+)
 
 T = TypeVar("T")
 
@@ -72,6 +144,11 @@ class KiaraModelResponse(Response):
         return super().serializer(value)
 
     def render(self, content: Any) -> bytes:
+
+        with trace_span("response.render", **{"http.media_type": str(self.media_type)}):
+            return self._render_content(content)
+
+    def _render_content(self, content: Any) -> bytes:
         """
         Handles the rendering of content T into a bytes string.
         Args:
@@ -90,29 +167,45 @@ class KiaraModelResponse(Response):
                 )
             ):
                 return b""
+            if isinstance(content, EncodedContent):
+                self.media_type = content.media_type
+                return content.body
             if self.media_type == MediaType.JSON:
-                return dumps(
-                    content,
-                    default=self.serializer,
-                    option=OPT_SERIALIZE_NUMPY
-                    | OPT_OMIT_MICROSECONDS
-                    | OPT_NON_STR_KEYS,
-                )
+                return self._render_json(content)
             if isinstance(content, OpenAPI):
-                content_dict = content.dict(by_alias=True, exclude_none=True)
-                if self.media_type == OpenAPIMediaType.OPENAPI_YAML:
-                    encoded = yaml.dump(content_dict).encode("utf-8")
-                    return cast("bytes", encoded)
-                return dumps(
-                    content_dict,
-                    option=OPT_INDENT_2 | OPT_OMIT_MICROSECONDS | OPT_NON_STR_KEYS,
-                )
+                return self._render_openapi(content)
             return super().render(content)
         except (AttributeError, ValueError, TypeError) as e:
             raise ImproperlyConfiguredException(
                 "Unable to serialize response content"
             ) from e
 
+    def _render_json(self, content: Any) -> bytes:
+        """Render content as json, or in the (non-json) media type negotiated for the request."""
+
+        media_type = response_media_type()
+        if media_type != JSON_MEDIA_TYPE:
+            encoded = encode(content, media_type, default=self.serializer)
+            self.media_type = media_type
+            return encoded
+        return dumps(
+            content,
+            default=self.serializer,
+            option=OPT_SERIALIZE_NUMPY | OPT_OMIT_MICROSECONDS | OPT_NON_STR_KEYS,
+        )
+
+    def _render_openapi(self, content: OpenAPI) -> bytes:
+        """Render an OpenAPI schema as yaml or json, depending on the media type of the response."""
+
+        content_dict = content.dict(by_alias=True, exclude_none=True)
+        if self.media_type == OpenAPIMediaType.OPENAPI_YAML:
+            encoded = yaml.dump(content_dict).encode("utf-8")
+            return cast("bytes", encoded)
+        return dumps(
+            content_dict,
+            option=OPT_INDENT_2 | OPT_OMIT_MICROSECONDS | OPT_NON_STR_KEYS,
+        )
+
 
 def logging_exception_handler(request: Request, exc: Exception) -> Response:
     """
@@ -134,6 +227,18 @@ def logging_exception_handler(request: Request, exc: Exception) -> Response:
     return create_exception_response(exc)
 
 
+async def start_handler_span(request: Request) -> None:
+    """Start a span around the route handler (including the resolution of its dependencies), if the request is traced."""
+
+    start_span(f"handler {request.scope['route_handler'].fn.__qualname__}")
+
+
+async def end_handler_span(response: Response) -> Response:
+
+    end_span(current_span())
+    return response
+
+
 # def http_exception_handler(_: Request, exc: Exception) -> Response:
 #     """Default handler for exceptions subclassed from HTTPException"""
 #     status_code = HTTP_500_INTERNAL_SERVER_ERROR
@@ -158,13 +263,329 @@ def logging_exception_handler(request: Request, exc: Exception) -> Response:
 #     return JSONResponse({"detail": model.dict()}, status_code=model.status)
 
 
+class ServiceResources(object):
+    """The parts of a service that don't depend on a kiara context, so the services of several contexts can share them.
+
+    Arguments:
+        config: the service configuration
+        kiara_config: the (serialized) kiara config the job worker processes open contexts with
+        default_context: the context job worker processes open at startup
+    """
+
+    def __init__(
+        self,
+        config: KiaraServiceConfig,
+        kiara_config: Mapping[str, Any],
+        default_context: str,
+    ):
+
+        self.process_pool: Union[ProcessPool, None] = None
+        if config.job_workers:
+            self.process_pool = ProcessPool(
+                size=config.job_workers,
+                max_tasks_per_worker=config.job_worker_max_jobs,
+                initializer=init_kiara_worker,
+                initargs=(kiara_config, default_context),
+            )
+
+        self.tracer: Union[Tracer, None] = None
+        if config.tracing:
+            self.tracer = Tracer(
+                sample_rate=config.trace_sample_rate,
+                buffer_size=config.trace_buffer_size,
+                trace_file=config.trace_file,
+            )
+
+        self.asset_table: AssetTable = AssetTable(
+            directories=[Path(KIARA_SERVICE_RESOURCES_FOLDER) / "static"],
+            url_prefix="/assets",
+            fallback_prefix="/static",
+            minify=config.minify_assets,
+        )
+        self.template_registry: TemplateRegistry = TemplateRegistry()
+        for template_registry in (self.template_registry, TemplateRegistry.instance()):
+            enable_bytecode_cache(
+                template_registry.environment, config.template_bytecode_cache_dir
+            )
+        self.template_registry.environment.globals.update(
+            kiara_api=RequestGlobal("kiara_api"),
+            url=url,
+            asset_url=self.asset_table.url,
+        )
+        self.fragment_cache: FragmentCache = FragmentCache(
+            environment=self.template_registry.environment,
+            max_items=config.template_fragment_cache_size,
+        )
+        self._templates_compiled: bool = False
+
+    def precompile_templates(self) -> None:
+        """Compile all templates (once)."""
+
+        if self._templates_compiled:
+            return
+        for template_registry in (self.template_registry, TemplateRegistry.instance()):
+            compiled = precompile_templates(template_registry.environment)
+            logger.debug("templates.precompiled", templates=compiled)
+        self._templates_compiled = True
+
+    def shutdown(self) -> None:
+
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+
+
 class KiaraOpenAPIService:
-    def __init__(self, kiara_api: KiaraAPI):
+    """The kiara service of a single kiara context.
+
+    Arguments:
+        kiara_api: the kiara api of the context
+        config: the service configuration
+        resources: the context-independent parts of the service, if shared with other services (which then also
+            have to shut them down), by default the service creates its own
+    """
+
+    def __init__(
+        self,
+        kiara_api: KiaraAPI,
+        config: Union[KiaraServiceConfig, None] = None,
+        resources: Union[ServiceResources, None] = None,
+    ):
+
+        if config is None:
+            config = KiaraServiceConfig()
 
         self._kiara_api: KiaraAPI = kiara_api
+        self._config: KiaraServiceConfig = config
         self._app: Union[Starlite, None] = None
         self._resources_base: Path = Path(KIARA_SERVICE_RESOURCES_FOLDER)
 
+        self._owns_resources: bool = resources is None
+        if resources is None:
+            resources = ServiceResources(
+                config=config,
+                kiara_config=kiara_api._kiara_config.model_dump(),
+                default_context=kiara_api.get_current_context_name(),
+            )
+        self._resources: ServiceResources = resources
+        self._pipeline_cache: PipelineCache = PipelineCache(kiara_api=kiara_api)
+        self._workflow_cache: WorkflowCache = WorkflowCache(kiara_api=kiara_api)
+        self._context_access: ContextAccess = ContextAccess(
+            read_pool_size=config.read_pool_size
+        )
+
+        access_log_file = os.path.join(
+            kiara_html_app_dirs.user_cache_dir,
+            "value_access",
+            f"{kiara_api.context.id}.json",
+        )
+        self._value_cache: ValueCache = ValueCache(
+            kiara_api=kiara_api,
+            max_items=config.value_cache_size,
+            max_bytes=config.value_cache_max_bytes,
+            access_log_file=access_log_file,
+        )
+
+        disk_cache: Union[DiskCache, None] = None
+        if config.response_cache_max_bytes:
+            response_cache_dir = config.response_cache_dir
+            if response_cache_dir is None:
+                response_cache_dir = os.path.join(
+                    kiara_html_app_dirs.user_cache_dir, "responses"
+                )
+            disk_cache = DiskCache(
+                path=os.path.join(response_cache_dir, f"{kiara_api.context.id}.sqlite"),
+                max_bytes=config.response_cache_max_bytes,
+                max_item_bytes=config.response_cache_max_item_bytes,
+            )
+        self._response_cache: ResponseCache = ResponseCache(
+            disk_cache=disk_cache,
+            serializer=KiaraModelResponse.serializer,
+            namespace=f"kiara-{version('kiara')}",
+        )
+
+        self._value_info_renderer: ValueInfoRenderer = ValueInfoRenderer(
+            kiara_api=kiara_api,
+            value_cache=self._value_cache,
+            response_cache=self._response_cache,
+            context_access=self._context_access,
+            stream_threshold=config.value_info_stream_threshold,
+            prerender=config.value_info_prerender,
+        )
+
+        upload_staging_dir = config.upload_staging_dir
+        if upload_staging_dir is None:
+            upload_staging_dir = os.path.join(
+                kiara_html_app_dirs.user_cache_dir,
+                "uploads",
+                str(kiara_api.context.id),
+            )
+        self._upload_manager: UploadManager = UploadManager(
+            kiara_api=kiara_api,
+            staging_dir=upload_staging_dir,
+            default_chunk_size=config.upload_chunk_size,
+        )
+
+        self._process_pool: Union[ProcessPool, None] = resources.process_pool
+        self._job_manager: JobManager = JobManager(
+            kiara_api=kiara_api,
+            context_access=self._context_access,
+            default_timeout=config.job_timeout,
+            operation_timeouts=config.operation_timeouts,
+            process_pool=self._process_pool,
+            max_worker_output_bytes=config.job_worker_max_output_bytes,
+        )
+
+        self._tracer: Union[Tracer, None] = resources.tracer
+        self._asset_table: AssetTable = resources.asset_table
+        self._template_registry: TemplateRegistry = resources.template_registry
+        self._fragment_cache: FragmentCache = resources.fragment_cache
+
+        self._registry_snapshot: Union[RegistrySnapshotManager, None] = None
+        if config.registry_snapshot:
+            self._registry_snapshot = RegistrySnapshotManager(
+                kiara_api=kiara_api,
+                snapshot_dir=config.registry_snapshot_dir,
+                serializer=KiaraModelResponse.serializer,
+            )
+        self._registry_task: Union[asyncio.Task, None] = None
+
+        self._warmup_status: WarmupStatus = WarmupStatus(
+            running=False, total=0, loaded=0, failed=0
+        )
+        self._warmup_task: Union[asyncio.Task, None] = None
+
+    @property
+    def caches(self) -> List[Union[LRUCache, DiskCache]]:
+        """All caches of this service."""
+
+        caches: List[Union[LRUCache, DiskCache]] = [
+            *self.context_caches,
+            self._fragment_cache.cache,
+        ]
+        if self._response_cache.disk_cache is not None:
+            caches.append(self._response_cache.disk_cache)
+        return caches
+
+    @property
+    def context_caches(self) -> List[LRUCache]:
+        """The in-memory caches of this service that hold data of its kiara context (not shared with other services)."""
+
+        return [
+            *self._pipeline_cache.caches,
+            *self._workflow_cache.caches,
+            *self._value_cache.caches,
+            *self._job_manager.caches,
+        ]
+
+    @property
+    def kiara_api(self) -> KiaraAPI:
+        return self._kiara_api
+
+    @property
+    def busy(self) -> bool:
+        """Whether this service is running (or about to run) jobs."""
+
+        return self._job_manager.busy
+
+    def estimate_memory(self, base_bytes: int = 0) -> int:
+        """Estimate the memory used by this service, from the sizes of its (own) in-memory caches.
+
+        Arguments:
+            base_bytes: the (estimated) memory used by the kiara context itself
+        """
+
+        return base_bytes + sum(cache.stats.bytes for cache in self.context_caches)
+
+    def create_metrics(self) -> ServiceMetrics:
+
+        return ServiceMetrics(
+            context_access=self._context_access.stats,
+            caches={cache.name: cache.stats for cache in self.caches},
+            result_reuse=self._job_manager.reuse_stats,
+            job_workers=(
+                self._process_pool.stats if self._process_pool is not None else None
+            ),
+        )
+
+    def create_status(self) -> ServiceStatus:
+
+        return ServiceStatus(
+            ready=not self._warmup_status.running,
+            warmup=self._warmup_status.model_copy(),
+            registries_loaded=(
+                self._registry_snapshot is None
+                or self._registry_snapshot.registries_loaded
+            ),
+        )
+
+    async def _load_registries(self) -> None:
+        """Load the kiara registries (importing all plugins), and update the registry snapshot."""
+
+        assert self._registry_snapshot is not None
+        try:
+            # loading populates the (lazily created) registries of the context, so it must not overlap with readers
+            await self._context_access.write(self._registry_snapshot.load_registries)
+            logger.info("registries.loaded", snapshot=self._registry_snapshot.path)
+        except Exception as e:
+            logger.warning("registries.snapshot_failed", error=str(e))
+
+    async def _warm_up(self) -> None:
+        """Pre-load the configured, and the most recently accessed values into the value cache."""
+
+        values: List[Union[str, uuid.UUID]] = list(self._config.warmup_aliases)
+        if self._config.warmup_recent_values:
+            values.extend(
+                self._value_cache.most_recently_accessed(
+                    self._config.warmup_recent_values
+                )
+            )
+
+        self._warmup_status.total = len(values)
+        try:
+            for value in values:
+                try:
+                    await self._context_access.read(
+                        self._value_cache.preload,
+                        value,
+                        load_data=self._config.warmup_load_data,
+                    )
+                    self._warmup_status.loaded += 1
+                except Exception as e:
+                    self._warmup_status.failed += 1
+                    logger.warning(
+                        "warmup.value_failed", value=str(value), error=str(e)
+                    )
+        finally:
+            self._warmup_status.running = False
+            logger.info(
+                "warmup.finished",
+                loaded=self._warmup_status.loaded,
+                failed=self._warmup_status.failed,
+            )
+
+    async def _on_startup(self) -> None:
+
+        await anyio.to_thread.run_sync(self._resources.precompile_templates)
+        self._value_info_renderer.start()
+
+        if self._registry_snapshot is not None:
+            self._registry_task = asyncio.create_task(self._load_registries())
+        if self._config.warmup_aliases or self._config.warmup_recent_values:
+            self._warmup_status.running = True
+            self._warmup_task = asyncio.create_task(self._warm_up())
+
+    async def _on_shutdown(self) -> None:
+
+        if self._registry_task is not None and not self._registry_task.done():
+            self._registry_task.cancel()
+        self._value_info_renderer.stop()
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        self._job_manager.cancel_all(reason="cancelled, service is shutting down")
+        if self._owns_resources:
+            self._resources.shutdown()
+        self._value_cache.save_access_log()
+
     def app(self) -> Starlite:
         if self._app is not None:
             return self._app
@@ -190,6 +611,15 @@ class KiaraOpenAPIService:
         context_router = Router(
             path="/context", route_handlers=[KiaraContextControllerJson]
         )
+        service_router = Router(path="/service", route_handlers=[ServiceControllerJson])
+        upload_router = Router(path="/uploads", route_handlers=[UploadControllerJson])
+        batch_router = Router(path="/batch", route_handlers=[BatchControllerJson])
+        asset_router = Router(path="/assets", route_handlers=[AssetController])
+        debug_router = Router(
+            path="/debug",
+            route_handlers=[DebugControllerJson],
+            guards=[AdminGuard(self._config.admin_token)],
+        )
 
         # info_router_html = Router(
         #     path="/html/info", route_handlers=[OperationControllerHtml]
@@ -207,6 +637,11 @@ class KiaraOpenAPIService:
         route_handlers.append(workflow_router)
         route_handlers.append(pipeline_router)
         route_handlers.append(context_router)
+        route_handlers.append(service_router)
+        route_handlers.append(upload_router)
+        route_handlers.append(batch_router)
+        route_handlers.append(asset_router)
+        route_handlers.append(debug_router)
 
         # route_handlers.append(value_router_htmx)
         # route_handlers.append(operation_router_htmx)
@@ -216,8 +651,6 @@ class KiaraOpenAPIService:
         static_file_config = [
             StaticFilesConfig(directories=[static_dir], path="/static")
         ]
-        self._template_registry: TemplateRegistry = TemplateRegistry()
-
         environment = self._template_registry.environment
 
         class KiaraTemplateEngine(TemplateEngineProtocol[JinjaTemplate]):
@@ -236,12 +669,8 @@ class KiaraOpenAPIService:
                 except JinjaTemplateNotFound as exc:
                     raise TemplateNotFoundException(template_name=name) from exc
 
-        def engine_callback(jinja_engine: KiaraTemplateEngine) -> KiaraTemplateEngine:
-            jinja_engine.engine.globals["kiara_api"] = self._kiara_api
-            return jinja_engine
-
         template_config: TemplateConfig = TemplateConfig(
-            directory=[], engine=KiaraTemplateEngine, engine_callback=engine_callback
+            directory=[], engine=KiaraTemplateEngine
         )
 
         debug = is_debug() or is_develop()
@@ -269,12 +698,85 @@ class KiaraOpenAPIService:
                 state.template_registry = self._template_registry
             return cast(TemplateRegistry, self._template_registry)
 
+        async def get_pipeline_cache() -> PipelineCache:
+            return self._pipeline_cache
+
+        async def get_workflow_cache() -> WorkflowCache:
+            return self._workflow_cache
+
+        async def get_context_access() -> ContextAccess:
+            return self._context_access
+
+        async def get_service_metrics() -> ServiceMetrics:
+            return self.create_metrics()
+
+        async def get_service_status() -> ServiceStatus:
+            return self.create_status()
+
+        async def get_value_cache() -> ValueCache:
+            return self._value_cache
+
+        async def get_response_cache() -> ResponseCache:
+            return self._response_cache
+
+        async def get_value_info_renderer() -> ValueInfoRenderer:
+            return self._value_info_renderer
+
+        async def get_fragment_cache() -> FragmentCache:
+            return self._fragment_cache
+
+        async def get_asset_table() -> AssetTable:
+            return self._asset_table
+
+        async def get_upload_manager() -> UploadManager:
+            return self._upload_manager
+
+        async def get_job_manager() -> JobManager:
+            return self._job_manager
+
+        async def get_tracer() -> Union[Tracer, None]:
+            return self._tracer
+
+        async def get_max_batch_size() -> int:
+            return self._config.batch_max_requests
+
+        async def get_aggregation_threads() -> int:
+            return self._config.aggregation_threads
+
+        async def get_registry_snapshot() -> Union[RegistrySnapshot, None]:
+            if self._registry_snapshot is None:
+                return None
+            return self._registry_snapshot.active
+
         dependencies = {
             "kiara": Provide(get_kiara_context),
             "kiara_api": Provide(get_kiara_api),
             "template_registry": Provide(get_template_registry),
+            "pipeline_cache": Provide(get_pipeline_cache),
+            "workflow_cache": Provide(get_workflow_cache),
+            "context_access": Provide(get_context_access),
+            "service_metrics": Provide(get_service_metrics),
+            "service_status": Provide(get_service_status),
+            "value_cache": Provide(get_value_cache),
+            "response_cache": Provide(get_response_cache),
+            "fragment_cache": Provide(get_fragment_cache),
+            "value_info_renderer": Provide(get_value_info_renderer),
+            "asset_table": Provide(get_asset_table),
+            "upload_manager": Provide(get_upload_manager),
+            "job_manager": Provide(get_job_manager),
+            "tracer": Provide(get_tracer),
+            "max_batch_size": Provide(get_max_batch_size),
+            "aggregation_threads": Provide(get_aggregation_threads),
+            "registry_snapshot": Provide(get_registry_snapshot),
         }
 
+        middleware: List[Any] = [
+            ContentNegotiationMiddleware,
+            DefineMiddleware(TemplateGlobalsMiddleware, kiara_api=self._kiara_api),
+        ]
+        if self._tracer is not None:
+            middleware.append(DefineMiddleware(TracingMiddleware, tracer=self._tracer))
+
         self._app = Starlite(
             route_handlers=route_handlers,
             dependencies=dependencies,
@@ -284,5 +786,10 @@ class KiaraOpenAPIService:
             cors_config=cors_config,
             exception_handlers=exception_handlers,
             response_class=KiaraModelResponse,
+            on_startup=[self._on_startup],
+            on_shutdown=[self._on_shutdown],
+            middleware=middleware,
+            before_request=start_handler_span if self._tracer is not None else None,
+            after_request=end_handler_span if self._tracer is not None else None,
         )
         return self._app  # type: ignore
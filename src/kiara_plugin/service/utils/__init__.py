@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+"""Helper classes and functions that are used across the ``kiara_plugin.service`` package."""
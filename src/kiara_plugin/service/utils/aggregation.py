@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+"""Group-by aggregations over the (arrow) data of table values, computed inside the service.
+
+Queries are run with DuckDB if it is installed (the 'aggregation' extra), which scans the arrow data in place, with
+a (configurable) number of threads. Otherwise they are run with the (also multi-threaded, but slower) group-by
+implementation of pyarrow. Only the aggregated rows are converted to Python objects and returned.
+"""
+
+import os
+from typing import Any, Dict, List, Literal, Sequence, Union
+
+from pydantic import BaseModel, Field
+
+MAX_AGGREGATE_GROUPS = 10000
+GROUPS_COLUMN = "__num_groups"
+
+AggregateFunction = Literal["count", "sum", "min", "max", "count_distinct"]
+
+_SQL_FUNCTIONS: Dict[str, str] = {
+    "count": "COUNT({})",
+    "sum": "SUM({})",
+    "min": "MIN({})",
+    "max": "MAX({})",
+    "count_distinct": "COUNT(DISTINCT {})",
+}
+
+
+class Aggregation(BaseModel):
+    """An aggregate function, applied to a column of every group."""
+
+    function: AggregateFunction = Field(description="The aggregate function.")
+    column: Union[str, None] = Field(
+        description="The column to aggregate, 'None' to count rows (only valid for 'count').",
+        default=None,
+    )
+    alias: Union[str, None] = Field(
+        description="The name of the result column, defaults to '<column>_<function>' (or 'count').",
+        default=None,
+    )
+
+    @property
+    def name(self) -> str:
+
+        if self.alias:
+            return self.alias
+        if self.column is None:
+            return "count"
+        return f"{self.column}_{self.function}"
+
+
+class AggregateQuery(BaseModel):
+    """A group-by query over a table."""
+
+    group_by: List[str] = Field(
+        description="The columns to group by, no columns aggregate the whole table.",
+        default_factory=list,
+    )
+    aggregations: List[Aggregation] = Field(
+        description="The aggregations to compute for every group.",
+        default_factory=lambda: [Aggregation(function="count")],
+        min_length=1,
+    )
+    limit: int = Field(
+        description="The maximum number of groups to return.",
+        default=1000,
+        ge=1,
+        le=MAX_AGGREGATE_GROUPS,
+    )
+
+
+class AggregateResult(BaseModel):
+    """The result of an aggregate query, one row per group, ordered by the group columns."""
+
+    columns: List[str] = Field(
+        description="The names of the result columns: the group columns, followed by the aggregations."
+    )
+    rows: List[List[Any]] = Field(description="The result rows.")
+    num_groups: int = Field(description="The total number of groups.")
+    truncated: bool = Field(
+        description="Whether groups were left out, because there are more than the query limit."
+    )
+    engine: str = Field(description="The engine that computed the result.")
+
+
+def validate_query(query: AggregateQuery, column_names: Sequence[str]) -> None:
+    """Check that a query only references existing columns, and has unique result column names.
+
+    Raises:
+        ValueError: if the query is invalid for a table with the provided columns
+    """
+
+    for aggregation in query.aggregations:
+        if aggregation.column is None and aggregation.function != "count":
+            raise ValueError(
+                f"Invalid aggregate query: function '{aggregation.function}' requires a column."
+            )
+
+    for column in [*query.group_by, *(a.column for a in query.aggregations)]:
+        if column is not None and column not in column_names:
+            raise ValueError(
+                f"Invalid aggregate query: no column '{column}', available: {', '.join(column_names)}."
+            )
+
+    names = [*query.group_by, *(a.name for a in query.aggregations)]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(
+            f"Invalid aggregate query: duplicate result columns: {', '.join(duplicates)}."
+        )
+
+
+def _quote(identifier: str) -> str:
+    return '"{}"'.format(identifier.replace('"', '""'))
+
+
+def create_sql(query: AggregateQuery, table_name: str) -> str:
+    """Create the (DuckDB) SQL statement for an (already validated) query.
+
+    The statement returns one more row than the query limit, to detect truncated results. Grouped queries have an
+    additional last column, with the total number of groups. All identifiers are quoted, the statement is assembled
+    from its parts, so no user input is ever formatted into it.
+    """
+
+    columns = [_quote(c) for c in query.group_by]
+    for aggregation in query.aggregations:
+        arg = "*" if aggregation.column is None else _quote(aggregation.column)
+        sql_func = _SQL_FUNCTIONS[aggregation.function].format(arg)
+        columns.append(" ".join([sql_func, "AS", _quote(aggregation.name)]))
+
+    parts = ["SELECT"]
+    if query.group_by:
+        # the window is computed after grouping, but before the limit
+        columns.append(" ".join(["COUNT(*) OVER ()", "AS", _quote(GROUPS_COLUMN)]))
+    parts.extend([", ".join(columns), "FROM", _quote(table_name)])
+    if query.group_by:
+        parts.extend(["GROUP BY", ", ".join(_quote(c) for c in query.group_by)])
+        parts.extend(
+            [
+                "ORDER BY",
+                ", ".join(" ".join([_quote(c), "NULLS LAST"]) for c in query.group_by),
+            ]
+        )
+    parts.extend(["LIMIT", str(query.limit + 1)])
+    return " ".join(parts)
+
+
+def _aggregate_duckdb(
+    table: Any, query: AggregateQuery, threads: int
+) -> AggregateResult:
+
+    import duckdb
+
+    con = duckdb.connect(database=":memory:", config={"threads": threads})
+    try:
+        con.register("data", table)
+        rows = [list(r) for r in con.execute(create_sql(query, "data")).fetchall()]
+    finally:
+        con.close()
+
+    num_groups = len(rows)
+    if query.group_by:
+        num_groups = rows[0].pop() if rows else 0
+        for row in rows[1:]:
+            row.pop()
+
+    return AggregateResult(
+        columns=[*query.group_by, *(a.name for a in query.aggregations)],
+        rows=rows[: query.limit],
+        num_groups=num_groups,
+        truncated=len(rows) > query.limit,
+        engine="duckdb",
+    )
+
+
+def _aggregate_pyarrow(table: Any, query: AggregateQuery) -> AggregateResult:
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columns = [*query.group_by, *(a.name for a in query.aggregations)]
+
+    if not query.group_by:
+        row = []
+        for aggregation in query.aggregations:
+            if aggregation.column is None:
+                row.append(table.num_rows)
+                continue
+            column = table.column(aggregation.column)
+            if aggregation.function == "count":
+                row.append(pc.count(column).as_py())
+            elif aggregation.function == "count_distinct":
+                row.append(pc.count_distinct(column).as_py())
+            else:
+                row.append(getattr(pc, aggregation.function)(column).as_py())
+        return AggregateResult(
+            columns=columns, rows=[row], num_groups=1, truncated=False, engine="pyarrow"
+        )
+
+    specs = []
+    for aggregation in query.aggregations:
+        if aggregation.column is None:
+            # count all rows, including those with null group values
+            specs.append((query.group_by[0], "count", pc.CountOptions(mode="all")))
+        else:
+            specs.append((aggregation.column, aggregation.function))
+
+    grouped = table.group_by(query.group_by).aggregate(specs)
+    # depending on the pyarrow version, the group columns come before, or after the aggregations
+    num_aggregations = len(query.aggregations)
+    if grouped.column_names[num_aggregations:] == query.group_by:
+        result_columns = [
+            *grouped.columns[num_aggregations:],
+            *grouped.columns[:num_aggregations],
+        ]
+    else:
+        result_columns = grouped.columns
+    grouped = pa.table(result_columns, names=columns).sort_by(
+        [(c, "ascending") for c in query.group_by]
+    )
+
+    num_groups = grouped.num_rows
+    rows = [list(r.values()) for r in grouped.slice(0, query.limit).to_pylist()]
+    return AggregateResult(
+        columns=columns,
+        rows=rows,
+        num_groups=num_groups,
+        truncated=num_groups > query.limit,
+        engine="pyarrow",
+    )
+
+
+def aggregate_table(
+    table: Any, query: AggregateQuery, threads: Union[int, None] = None
+) -> AggregateResult:
+    """Run an aggregate query against an arrow table.
+
+    Arguments:
+        table: the 'pyarrow.Table' to aggregate
+        query: the query
+        threads: the number of threads DuckDB uses, defaults to the number of cores
+
+    Raises:
+        ValueError: if the query references columns that don't exist
+    """
+
+    validate_query(query, table.column_names)
+
+    try:
+        import duckdb  # noqa
+    except ImportError:
+        return _aggregate_pyarrow(table, query)
+
+    if threads is None:
+        threads = os.cpu_count() or 1
+    return _aggregate_duckdb(table, query, threads=threads)
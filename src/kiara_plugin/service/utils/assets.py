@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""Static assets with content-hash fingerprinted names, served from memory with immutable caching headers.
+
+Since the name of a fingerprinted asset changes whenever its content does, browsers can cache it forever, and never
+need to revalidate it. Templates reference assets via the 'asset_url' global, e.g. '{{ asset_url("main.css") }}'.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Iterable, List, Union
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+"""The 'Cache-Control' header for fingerprinted assets (cache for one year, never revalidate)."""
+
+FINGERPRINT_LENGTH = 12
+
+# every pattern matches quoted strings first, so they can be left unchanged
+_CSS_STRING = r"\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'"
+_CSS_COMMENTS = re.compile(rf"({_CSS_STRING})|/\*.*?\*/", re.DOTALL)
+_CSS_WHITESPACE = re.compile(rf"({_CSS_STRING})|\s+", re.DOTALL)
+_CSS_PUNCTUATION = re.compile(rf"({_CSS_STRING})|\s*([{{}};,])\s*", re.DOTALL)
+_CSS_TRAILING_SEMICOLONS = re.compile(rf"({_CSS_STRING})|;(}})", re.DOTALL)
+
+_MEDIA_TYPES = {".ico": "image/vnd.microsoft.icon"}
+
+
+def _replace_outside_strings(pattern: re.Pattern, replacement: str, css: str) -> str:
+
+    return pattern.sub(lambda m: m.group(1) or m.expand(replacement), css)
+
+
+def minify_css(css: str) -> str:
+    """Remove comments and redundant whitespace from a stylesheet.
+
+    This is deliberately conservative: whitespace is only removed around characters where it's never significant,
+    so selectors (e.g. 'a :hover') and values (e.g. 'calc(1px + 2px)') are not changed. Quoted strings are never
+    changed.
+    """
+
+    css = _replace_outside_strings(_CSS_COMMENTS, "", css)
+    css = _replace_outside_strings(_CSS_WHITESPACE, " ", css)
+    css = _replace_outside_strings(_CSS_PUNCTUATION, r"\2", css)
+    css = _replace_outside_strings(_CSS_TRAILING_SEMICOLONS, r"\2", css)
+    return css.strip()
+
+
+class Asset(object):
+    """A static asset, held in memory."""
+
+    __slots__ = ("body", "fingerprinted_name", "media_type", "name")
+
+    def __init__(self, name: str, body: bytes, media_type: str):
+
+        self.name: str = name
+        self.body: bytes = body
+        self.media_type: str = media_type
+
+        fingerprint = hashlib.sha256(body).hexdigest()[:FINGERPRINT_LENGTH]
+        stem, ext = os.path.splitext(name)
+        self.fingerprinted_name: str = f"{stem}.{fingerprint}{ext}"
+
+
+class AssetTable(object):
+    """All static assets of the service, indexed by their fingerprinted names.
+
+    Arguments:
+        directories: the folders to load assets from, if a file exists in several folders, the first one is used
+        url_prefix: the url path fingerprinted assets are served under
+        fallback_prefix: the url path for (not fingerprinted) files that are not in the table
+        minify: whether to minify stylesheets
+    """
+
+    def __init__(
+        self,
+        directories: Iterable[Union[str, "os.PathLike[str]"]],
+        url_prefix: str = "/assets",
+        fallback_prefix: str = "/static",
+        minify: bool = False,
+    ):
+
+        self._url_prefix: str = url_prefix.rstrip("/")
+        self._fallback_prefix: str = fallback_prefix.rstrip("/")
+        self._assets: Dict[str, Asset] = {}
+        self._urls: Dict[str, str] = {}
+
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                for file_name in sorted(files):
+                    path = os.path.join(root, file_name)
+                    name = os.path.relpath(path, directory).replace(os.sep, "/")
+                    if name not in self._urls:
+                        self._add(name, path, minify=minify)
+
+    def _add(self, name: str, path: str, minify: bool) -> None:
+
+        with open(path, "rb") as f:
+            body = f.read()
+        if minify and name.endswith(".css"):
+            body = minify_css(body.decode("utf-8")).encode("utf-8")
+
+        ext = os.path.splitext(name)[1]
+        media_type = _MEDIA_TYPES.get(ext) or (
+            mimetypes.guess_type(name)[0] or "application/octet-stream"
+        )
+        if media_type.startswith("text/"):
+            media_type = f"{media_type}; charset=utf-8"
+
+        asset = Asset(name=name, body=body, media_type=media_type)
+        self._assets[asset.fingerprinted_name] = asset
+        self._urls[name] = f"{self._url_prefix}/{asset.fingerprinted_name}"
+
+    @property
+    def names(self) -> List[str]:
+        return sorted(self._urls.keys())
+
+    def url(self, name: str) -> str:
+        """The url of an asset, fingerprinted if the asset is in the table."""
+
+        name = name.lstrip("/")
+        url = self._urls.get(name)
+        if url is None:
+            return f"{self._fallback_prefix}/{name}"
+        return url
+
+    def get(self, fingerprinted_name: str) -> Union[Asset, None]:
+        return self._assets.get(fingerprinted_name)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""Dispatch several requests to an ASGI app in-process and concurrently, and combine their responses."""
+
+from typing import Any, Dict, Iterable, List, Literal, Mapping, Sequence, Tuple, Union
+
+import anyio
+import orjson
+from pydantic import BaseModel, Field
+
+# the headers of the batch request that are passed on to its requests; credentials (e.g. 'authorization' or
+# 'cookie') are not, they have to be set explicitly per request, and sub-responses are embedded in a json
+# document, so 'accept' and 'accept-encoding' are left out as well
+FORWARDED_HEADERS = {
+    b"accept-language",
+    b"host",
+    b"traceparent",
+    b"tracestate",
+    b"user-agent",
+}
+
+
+class SubRequest(BaseModel):
+    """A single request of a batch."""
+
+    method: Literal["GET", "POST", "PUT", "DELETE"] = Field(
+        description="The http method.", default="GET"
+    )
+    path: str = Field(
+        description="The request path (relative to the service root), can include a query string."
+    )
+    body: Union[Any, None] = Field(
+        description="The (optional) json body of the request.", default=None
+    )
+    headers: Dict[str, str] = Field(
+        description="The request headers (e.g. 'Authorization'), only a few, non-sensitive headers of the batch request are inherited.",
+        default_factory=dict,
+    )
+
+
+class SubResponse(BaseModel):
+    """The response to a single request of a batch."""
+
+    status: int = Field(description="The http status code.")
+    content_type: Union[str, None] = Field(
+        description="The content type of the response body.", default=None
+    )
+    body: bytes = Field(description="The raw response body.", default=b"")
+
+
+def _create_scope(
+    parent_scope: Mapping[str, Any], request: SubRequest, body: bytes
+) -> Dict[str, Any]:
+
+    path, _, query_string = request.path.partition("?")
+    if not path.startswith("/"):
+        path = f"/{path}"
+
+    headers: List[Tuple[bytes, bytes]] = [
+        (k, v)
+        for k, v in parent_scope.get("headers", [])
+        if k.lower() in FORWARDED_HEADERS
+    ]
+    headers.extend(
+        (k.lower().encode("latin-1"), v.encode("latin-1"))
+        for k, v in request.headers.items()
+    )
+    if body:
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode()))
+
+    return {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "scheme": parent_scope.get("scheme", "http"),
+        "server": parent_scope.get("server", None),
+        "client": parent_scope.get("client", None),
+        "root_path": parent_scope.get("root_path", ""),
+        "method": request.method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "headers": headers,
+    }
+
+
+async def dispatch(
+    app: Any, parent_scope: Mapping[str, Any], request: SubRequest
+) -> SubResponse:
+    """Send a single request to an ASGI app, in-process."""
+
+    body = orjson.dumps(request.body) if request.body is not None else b""
+    scope = _create_scope(parent_scope, request, body)
+
+    request_sent = False
+    disconnected = anyio.Event()
+    status = 500
+    content_type: Union[str, None] = None
+    chunks: List[bytes] = []
+
+    async def receive() -> Mapping[str, Any]:
+
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Mapping[str, Any]) -> None:
+
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for k, v in message.get("headers", []):
+                if k.lower() == b"content-type":
+                    content_type = v.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                disconnected.set()
+
+    await app(scope, receive, send)
+    return SubResponse(status=status, content_type=content_type, body=b"".join(chunks))
+
+
+async def dispatch_all(
+    app: Any, parent_scope: Mapping[str, Any], requests: Sequence[SubRequest]
+) -> List[SubResponse]:
+    """Send several requests to an ASGI app concurrently, in-process.
+
+    A request that fails with an (unhandled) exception gets a response with status 500.
+    """
+
+    responses: List[Union[SubResponse, None]] = [None] * len(requests)
+
+    async def run(idx: int, request: SubRequest) -> None:
+
+        try:
+            responses[idx] = await dispatch(app, parent_scope, request)
+        except Exception as e:
+            responses[idx] = SubResponse(
+                status=500,
+                content_type="application/json",
+                body=orjson.dumps({"status_code": 500, "detail": str(e)}),
+            )
+
+    async with anyio.create_task_group() as tg:
+        for idx, request in enumerate(requests):
+            tg.start_soon(run, idx, request)
+
+    return [r for r in responses if r is not None]
+
+
+def encode_responses(responses: Iterable[SubResponse]) -> bytes:
+    """Combine the responses of a batch into a json document ('{"responses": [{"status": ..., "body": ...}, ...]}').
+
+    Json bodies are embedded as they are, without parsing and re-serializing them, other bodies are embedded as strings.
+    """
+
+    parts = []
+    for response in responses:
+        if response.content_type and response.content_type.startswith(
+            "application/json"
+        ):
+            body = response.body or b"null"
+        else:
+            body = orjson.dumps(response.body.decode("utf-8", errors="replace"))
+        parts.append(
+            b'{"status":%d,"content_type":%s,"body":%s}'
+            % (response.status, orjson.dumps(response.content_type), body)
+        )
+    return b'{"responses":[' + b",".join(parts) + b"]}"
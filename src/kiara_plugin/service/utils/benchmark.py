@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+"""A load generator to benchmark ASGI apps (in-process, or over the network), with per-endpoint latency percentiles and throughput."""
+
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Mapping, Sequence, Union
+
+import anyio
+import httpx
+from pydantic import BaseModel, Field
+
+BENCHMARK_BASE_URL = "http://benchmark"
+
+
+class BenchmarkRequest(BaseModel):
+    """A request to send to the app under test.
+
+    Requests with the same name are reported as a single endpoint, and are sent in turns.
+    """
+
+    name: str = Field(description="The name of the endpoint, used for reporting.")
+    method: str = Field(description="The http method.", default="GET")
+    path: str = Field(description="The request path.")
+    body: Union[Any, None] = Field(
+        description="The (optional) json body of the request.", default=None
+    )
+
+
+class EndpointStats(BaseModel):
+    """Latency and throughput of a single benchmarked endpoint, latencies are in milliseconds."""
+
+    requests: int = Field(description="The number of requests sent.")
+    errors: int = Field(description="The number of failed requests (status >= 400).")
+    duration: float = Field(description="The wall-clock duration (in seconds).")
+    throughput: float = Field(description="The number of requests per second.")
+    mean: float = Field(description="The mean latency.")
+    min: float = Field(description="The minimum latency.")
+    max: float = Field(description="The maximum latency.")
+    p50: float = Field(description="The median latency.")
+    p95: float = Field(description="The 95th percentile latency.")
+    p99: float = Field(description="The 99th percentile latency.")
+
+
+class BenchmarkReport(BaseModel):
+    """The results of a benchmark run."""
+
+    concurrency: int = Field(description="The number of concurrent clients.")
+    iterations: int = Field(description="The number of requests per endpoint.")
+    metadata: Dict[str, Any] = Field(
+        description="Information about the benchmarked app, and the environment.",
+        default_factory=dict,
+    )
+    endpoints: Dict[str, EndpointStats] = Field(
+        description="The results per endpoint.", default_factory=dict
+    )
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Compute a percentile of already sorted values, using linear interpolation between the closest ranks.
+
+    Arguments:
+        values: the (ascending) sorted values
+        q: the percentile, between 0 and 100
+    """
+
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * q / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def summarize(
+    latencies: Sequence[float], errors: int, duration: float
+) -> EndpointStats:
+    """Create the statistics for an endpoint from its request latencies (in milliseconds)."""
+
+    ordered = sorted(latencies)
+    return EndpointStats(
+        requests=len(ordered),
+        errors=errors,
+        duration=duration,
+        throughput=len(ordered) / duration if duration else 0.0,
+        mean=sum(ordered) / len(ordered) if ordered else 0.0,
+        min=ordered[0] if ordered else 0.0,
+        max=ordered[-1] if ordered else 0.0,
+        p50=percentile(ordered, 50),
+        p95=percentile(ordered, 95),
+        p99=percentile(ordered, 99),
+    )
+
+
+def find_regressions(
+    baseline: BenchmarkReport,
+    current: BenchmarkReport,
+    tolerance: float = 0.2,
+    metric: str = "p95",
+) -> Dict[str, float]:
+    """Compare a benchmark report against a baseline.
+
+    Arguments:
+        baseline: the report to compare against
+        current: the new report
+        tolerance: the relative slowdown that is still acceptable
+        metric: the latency metric to compare
+
+    Returns:
+        the relative slowdown of all endpoints that regressed, by endpoint name
+    """
+
+    result = {}
+    for name, stats in current.endpoints.items():
+        base_stats = baseline.endpoints.get(name, None)
+        if base_stats is None:
+            continue
+        base = getattr(base_stats, metric)
+        value = getattr(stats, metric)
+        if not base:
+            continue
+        slowdown = (value - base) / base
+        if slowdown > tolerance:
+            result[name] = slowdown
+    return result
+
+
+@asynccontextmanager
+async def app_lifespan(app: Any) -> AsyncIterator[None]:
+    """Run the startup and shutdown handlers of an ASGI app, via the lifespan protocol."""
+
+    startup_done = anyio.Event()
+    shutdown_done = anyio.Event()
+    stop = anyio.Event()
+    failures: List[str] = []
+    messages = iter(["lifespan.startup", "lifespan.shutdown"])
+
+    async def receive() -> Mapping[str, Any]:
+
+        message = next(messages)
+        if message == "lifespan.shutdown":
+            await stop.wait()
+        return {"type": message}
+
+    async def send(message: Mapping[str, Any]) -> None:
+
+        if message["type"].endswith(".failed"):
+            failures.append(message.get("message", ""))
+        if message["type"].startswith("lifespan.startup"):
+            startup_done.set()
+        else:
+            shutdown_done.set()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(
+            app, {"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send
+        )
+        await startup_done.wait()
+        if failures:
+            raise Exception(f"App startup failed: {failures[0]}")
+        try:
+            yield
+        finally:
+            stop.set()
+            await shutdown_done.wait()
+
+
+async def _run_endpoint(
+    client: httpx.AsyncClient,
+    requests: Sequence[BenchmarkRequest],
+    concurrency: int,
+    iterations: int,
+) -> EndpointStats:
+
+    latencies: List[float] = []
+    errors = 0
+    sent = 0
+
+    async def run_client() -> None:
+
+        nonlocal errors, sent
+        while sent < iterations:
+            request = requests[sent % len(requests)]
+            sent += 1
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    request.method, request.path, json=request.body
+                )
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            if failed:
+                errors += 1
+
+    started = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for _ in range(min(concurrency, iterations)):
+            tg.start_soon(run_client)
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def benchmark_client(
+    client: httpx.AsyncClient,
+    requests: Sequence[BenchmarkRequest],
+    concurrency: int = 8,
+    iterations: int = 100,
+    warmup: int = 1,
+    metadata: Union[Mapping[str, Any], None] = None,
+) -> BenchmarkReport:
+    """Benchmark the server behind an http client, one endpoint after the other.
+
+    Every endpoint gets a few (unmeasured) warmup requests, followed by 'iterations' requests that are sent by
+    'concurrency' concurrent clients.
+
+    Arguments:
+        client: the http client, with the base url of the server
+        requests: the requests to send, requests with the same name are reported as one endpoint
+        concurrency: the number of concurrent clients
+        iterations: the number of measured requests per endpoint
+        warmup: the number of warmup requests per endpoint
+        metadata: information to include in the report
+    """
+
+    endpoints: Dict[str, List[BenchmarkRequest]] = {}
+    for request in requests:
+        endpoints.setdefault(request.name, []).append(request)
+
+    report = BenchmarkReport(
+        concurrency=concurrency, iterations=iterations, metadata=dict(metadata or {})
+    )
+    for name, endpoint_requests in endpoints.items():
+        if warmup:
+            await _run_endpoint(client, endpoint_requests, 1, warmup)
+        report.endpoints[name] = await _run_endpoint(
+            client, endpoint_requests, concurrency, iterations
+        )
+
+    return report
+
+
+async def run_benchmark(
+    app: Any,
+    requests: Sequence[BenchmarkRequest],
+    concurrency: int = 8,
+    iterations: int = 100,
+    warmup: int = 1,
+    metadata: Union[Mapping[str, Any], None] = None,
+) -> BenchmarkReport:
+    """Benchmark an ASGI app in-process, one endpoint after the other.
+
+    Arguments:
+        app: the ASGI app
+        requests: the requests to send, requests with the same name are reported as one endpoint
+        concurrency: the number of concurrent clients
+        iterations: the number of measured requests per endpoint
+        warmup: the number of warmup requests per endpoint
+        metadata: information to include in the report
+    """
+
+    transport = httpx.ASGITransport(app=app)
+    async with app_lifespan(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url=BENCHMARK_BASE_URL
+        ) as client:
+            return await benchmark_client(
+                client,
+                requests,
+                concurrency=concurrency,
+                iterations=iterations,
+                warmup=warmup,
+                metadata=metadata,
+            )
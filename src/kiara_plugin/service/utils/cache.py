@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""In-process caches used by the service to avoid re-computing expensive, immutable results."""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, TypeVar, Union
+
+from pydantic import BaseModel, Field, computed_field
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class CacheStats(BaseModel):
+    """Usage statistics of a service cache."""
+
+    name: str = Field(description="The name of the cache.")
+    items: int = Field(description="The number of items currently held.")
+    max_items: Union[int, None] = Field(
+        description="The maximum number of items, 'None' if unbounded."
+    )
+    bytes: int = Field(
+        description="The (estimated) number of bytes currently held, '0' if the cache doesn't track item sizes.",
+        default=0,
+    )
+    max_bytes: Union[int, None] = Field(
+        description="The maximum (estimated) number of bytes, 'None' if unbounded.",
+        default=None,
+    )
+    hits: int = Field(description="The number of cache hits.")
+    misses: int = Field(description="The number of cache misses.")
+    evictions: int = Field(description="The number of evicted items.")
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def hit_rate(self) -> float:
+
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return self.hits / total
+
+
+class LRUCache(Generic[K, V]):
+    """A thread-safe, least-recently-used cache with hit/miss counters.
+
+    The cache can be bounded by the number of items, and/or by the (estimated) size of its items, in which case a
+    function to compute the size of an item must be provided.
+
+    Arguments:
+        name: a name for this cache, used for reporting
+        max_items: the maximum number of items to keep, 'None' means unbounded
+        max_bytes: the maximum (estimated) size of all items, 'None' means unbounded
+        size_func: a function that returns the (estimated) size of an item in bytes
+        on_evict: a function that is called with the key and item whenever an item is evicted
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_items: Union[int, None] = 1024,
+        max_bytes: Union[int, None] = None,
+        size_func: Union[Callable[[V], int], None] = None,
+        on_evict: Union[Callable[[K, V], None], None] = None,
+    ):
+
+        if max_bytes is not None and size_func is None:
+            raise ValueError(
+                f"Can't create cache '{name}': 'max_bytes' requires a 'size_func'."
+            )
+
+        self._name: str = name
+        self._max_items: Union[int, None] = max_items
+        self._max_bytes: Union[int, None] = max_bytes
+        self._size_func: Union[Callable[[V], int], None] = size_func
+        self._on_evict: Union[Callable[[K, V], None], None] = on_evict
+
+        self._items: "OrderedDict[K, V]" = OrderedDict()
+        self._sizes: Dict[K, int] = {}
+        self._bytes: int = 0
+        self._lock = threading.RLock()
+
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def __len__(self) -> int:
+
+        with self._lock:
+            return len(self._items)
+
+    def __contains__(self, key: K) -> bool:
+
+        with self._lock:
+            return key in self._items
+
+    def get(self, key: K, default: Union[V, None] = None) -> Union[V, None]:
+
+        with self._lock:
+            value = self._items.get(key, _MISSING)
+            if value is _MISSING:
+                self._misses += 1
+                return default
+
+            self._hits += 1
+            self._items.move_to_end(key)
+            return value  # type: ignore
+
+    def set(self, key: K, value: V) -> None:
+        """Add or replace an item, re-computing its size (which might have changed since it was added)."""
+
+        with self._lock:
+            self._bytes -= self._sizes.pop(key, 0)
+            if self._size_func is not None:
+                size = self._size_func(value)
+                self._sizes[key] = size
+                self._bytes += size
+
+            self._items[key] = value
+            self._items.move_to_end(key)
+            self._evict()
+
+    def add(self, key: K, value: V) -> V:
+        """Add an item, unless there already is one for 'key', return the item that is cached for 'key'."""
+
+        with self._lock:
+            existing = self._items.get(key, _MISSING)
+            if existing is not _MISSING:
+                self._items.move_to_end(key)
+                return existing  # type: ignore
+            self.set(key, value)
+            return value
+
+    def replace(self, key: K, old: V, new: V) -> bool:
+        """Replace the item for 'key' with 'new', but only if it is still 'old', returns whether it was replaced."""
+
+        with self._lock:
+            if self._items.get(key, _MISSING) is not old:
+                return False
+            self.set(key, new)
+            return True
+
+    def get_or_create(self, key: K, factory: Callable[[], V]) -> V:
+        """Return the cached item for 'key', or create, cache and return it using 'factory'.
+
+        The factory is called without holding the lock of the cache, if several threads create an item for the same
+        key at the same time, all of them get the one that was added first.
+        """
+
+        value = self.get(key, _MISSING)  # type: ignore
+        if value is not _MISSING:
+            return value  # type: ignore
+
+        return self.add(key, factory())
+
+    def invalidate(self, key: K) -> None:
+
+        with self._lock:
+            self._items.pop(key, None)
+            self._bytes -= self._sizes.pop(key, 0)
+
+    def clear(self) -> None:
+
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def _is_full(self) -> bool:
+
+        if self._max_items is not None and len(self._items) > self._max_items:
+            return True
+        if self._max_bytes is not None and self._bytes > self._max_bytes:
+            return True
+        return False
+
+    def _evict(self) -> None:
+
+        while self._items and self._is_full():
+            key, value = self._items.popitem(last=False)
+            self._bytes -= self._sizes.pop(key, 0)
+            self._evictions += 1
+            if self._on_evict is not None:
+                self._on_evict(key, value)
+
+    @property
+    def stats(self) -> CacheStats:
+
+        with self._lock:
+            return CacheStats(
+                name=self._name,
+                items=len(self._items),
+                max_items=self._max_items,
+                bytes=self._bytes,
+                max_bytes=self._max_bytes,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
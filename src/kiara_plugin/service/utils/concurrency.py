@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+"""Helpers to coordinate concurrent access to a kiara context from the service's request handlers."""
+
+import functools
+import math
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar, Union
+
+import anyio
+from pydantic import BaseModel, Field, computed_field
+
+from kiara_plugin.service.utils.tracing import trace_span
+
+T = TypeVar("T")
+
+
+def _func_name(func: Callable[..., Any]) -> str:
+
+    while isinstance(func, functools.partial):
+        func = func.func
+    return getattr(func, "__qualname__", None) or repr(func)
+
+
+class JobCancelledError(Exception):
+    """Raised when a cancelled unit of work reaches a cancellation point."""
+
+
+class JobTimeoutError(JobCancelledError):
+    """Raised when a timed out unit of work reaches a cancellation point."""
+
+
+class CancellationToken(object):
+    """Tracks the cancellation of a single unit of work that writes to the kiara context.
+
+    Work that is still waiting for write access is cancelled immediately. Work that already runs in a worker thread
+    can't be interrupted, so it has to cooperate: it needs to call 'check' at points where it is safe to stop. The same
+    goes for the (optional) timeout, which starts counting when the token is created.
+
+    Arguments:
+        timeout: the (optional) wall-clock timeout in seconds, after which the work is cancelled automatically
+    """
+
+    def __init__(self, timeout: Union[float, None] = None):
+
+        self._timeout: Union[float, None] = timeout
+        self._deadline: Union[float, None] = (
+            None if timeout is None else time.monotonic() + timeout
+        )
+        self._reason: Union[str, None] = None
+        self._timed_out: bool = False
+        self._scope: Union[anyio.CancelScope, None] = None
+        self._started: bool = False
+        self._requested_at: Union[float, None] = None
+        self._finished_at: Union[float, None] = None
+
+    @property
+    def timeout(self) -> Union[float, None]:
+        return self._timeout
+
+    @property
+    def cancelled(self) -> bool:
+        return self._reason is not None
+
+    @property
+    def timed_out(self) -> bool:
+        return self._timed_out
+
+    @property
+    def reason(self) -> Union[str, None]:
+        return self._reason
+
+    @property
+    def cancellation_latency_ms(self) -> Union[float, None]:
+        """The time between requesting the cancellation (or the timeout), and the work actually stopping (in ms)."""
+
+        if self._requested_at is None or self._finished_at is None:
+            return None
+        return (self._finished_at - self._requested_at) * 1000
+
+    def _set_reason(self, reason: str, requested_at: float) -> None:
+
+        if self._reason is None:
+            self._reason = reason
+            self._requested_at = requested_at
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Request cancellation, must be called from the event loop thread."""
+
+        self._set_reason(reason, requested_at=time.monotonic())
+        if not self._started and self._scope is not None:
+            self._scope.cancel()
+
+    def check(self) -> None:
+        """Raise a 'JobCancelledError' if cancellation was requested (or timed out), can be called from any thread."""
+
+        if (
+            self._reason is None
+            and self._deadline is not None
+            and time.monotonic() >= self._deadline
+        ):
+            self._set_reason(
+                f"timed out after {self._timeout} seconds", requested_at=self._deadline
+            )
+            self._timed_out = True
+
+        if self._timed_out:
+            raise JobTimeoutError(self._reason)
+        if self._reason is not None:
+            raise JobCancelledError(self._reason)
+
+    @contextmanager
+    def cancellable(self) -> Iterator[None]:
+        """Cancel the enclosed block on cancellation (or timeout), as long as it's waiting for its work to start.
+
+        Raises a 'JobCancelledError' if the block was cancelled.
+        """
+
+        deadline = math.inf
+        if self._deadline is not None:
+            deadline = anyio.current_time() + (self._deadline - time.monotonic())
+        self._scope = anyio.CancelScope(deadline=deadline)
+        self._started = False
+        if self.cancelled:
+            self._scope.cancel()
+
+        try:
+            with self._scope:
+                yield
+        finally:
+            self._finished_at = time.monotonic()
+
+        if self._scope.cancelled_caught:
+            self.check()
+            raise JobCancelledError(self.reason)
+
+    def start(self) -> None:
+        """Mark the work as started, from here on cancellation is up to the work itself."""
+
+        self._started = True
+        if self._scope is not None:
+            self._scope.deadline = math.inf
+        self.check()
+
+
+class AccessStats(BaseModel):
+    """Usage statistics for either reading from, or writing to the kiara context."""
+
+    count: int = Field(description="The number of completed acquisitions.", default=0)
+    wait_total_ms: float = Field(
+        description="The total time spent waiting for access (in ms).", default=0.0
+    )
+    wait_max_ms: float = Field(
+        description="The longest time spent waiting for access (in ms).", default=0.0
+    )
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def wait_avg_ms(self) -> float:
+
+        if not self.count:
+            return 0.0
+        return self.wait_total_ms / self.count
+
+    def record(self, wait_ms: float) -> None:
+
+        self.count += 1
+        self.wait_total_ms += wait_ms
+        if wait_ms > self.wait_max_ms:
+            self.wait_max_ms = wait_ms
+
+
+class ContextAccessStats(BaseModel):
+    """Statistics about the pool of read slots and the single writer of a kiara context."""
+
+    read_pool_size: int = Field(description="The maximum number of parallel readers.")
+    active_readers: int = Field(description="The number of currently active readers.")
+    writer_active: bool = Field(description="Whether a write is currently happening.")
+    waiting_writers: int = Field(description="The number of writers waiting.")
+    reads: AccessStats = Field(description="Read access statistics.")
+    writes: AccessStats = Field(description="Write access statistics.")
+
+
+class ContextAccess(object):
+    """Coordinates access to a (not thread-safe) kiara context.
+
+    Readers run in worker threads. The registries and caches of a kiara context are not thread-safe, so by default
+    only one reader runs at a time; a larger 'read_pool_size' lets that many readers run in parallel, which is only
+    safe if they don't touch shared kiara state that is not yet loaded. Writes are serialized and exclusive: a write
+    waits for all active readers to finish, and new readers wait while a writer is waiting or active, so writers can't
+    starve.
+
+    Arguments:
+        read_pool_size: the maximum number of parallel readers
+    """
+
+    def __init__(self, read_pool_size: int = 1):
+
+        if read_pool_size < 1:
+            raise ValueError(
+                f"Invalid read pool size '{read_pool_size}': must be at least 1."
+            )
+
+        self._read_pool_size: int = read_pool_size
+        self._condition = anyio.Condition()
+        self._readers: int = 0
+        self._writer: bool = False
+        self._waiting_writers: int = 0
+
+        self._read_stats: AccessStats = AccessStats()
+        self._write_stats: AccessStats = AccessStats()
+
+    @property
+    def stats(self) -> ContextAccessStats:
+
+        return ContextAccessStats(
+            read_pool_size=self._read_pool_size,
+            active_readers=self._readers,
+            writer_active=self._writer,
+            waiting_writers=self._waiting_writers,
+            reads=self._read_stats.model_copy(),
+            writes=self._write_stats.model_copy(),
+        )
+
+    @asynccontextmanager
+    async def reading(self) -> AsyncIterator[None]:
+
+        start = time.perf_counter()
+        async with self._condition:
+            while (
+                self._writer
+                or self._waiting_writers
+                or self._readers >= self._read_pool_size
+            ):
+                await self._condition.wait()
+            self._readers += 1
+        self._read_stats.record((time.perf_counter() - start) * 1000)
+
+        try:
+            yield
+        finally:
+            with anyio.CancelScope(shield=True):
+                async with self._condition:
+                    self._readers -= 1
+                    self._condition.notify_all()
+
+    @asynccontextmanager
+    async def writing(self) -> AsyncIterator[None]:
+
+        start = time.perf_counter()
+        async with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    await self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+                # in case this writer was cancelled, readers waiting on it need to re-check
+                self._condition.notify_all()
+            self._writer = True
+        self._write_stats.record((time.perf_counter() - start) * 1000)
+
+        try:
+            yield
+        finally:
+            with anyio.CancelScope(shield=True):
+                async with self._condition:
+                    self._writer = False
+                    self._condition.notify_all()
+
+    async def read(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a (blocking) function that only reads from the kiara context in a worker thread."""
+
+        with trace_span(_func_name(func), **{"kiara.context_access": "read"}):
+            async with self.reading():
+                return await anyio.to_thread.run_sync(
+                    functools.partial(func, *args, **kwargs)
+                )
+
+    async def write(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a (blocking) function that writes to the kiara context in a worker thread, with exclusive access."""
+
+        with trace_span(_func_name(func), **{"kiara.context_access": "write"}):
+            async with self.writing():
+                return await anyio.to_thread.run_sync(
+                    functools.partial(func, *args, **kwargs)
+                )
+
+    async def write_cancellable(
+        self,
+        token: CancellationToken,
+        func: Callable[..., T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        """Run a (blocking) function that writes to the kiara context, and that can be cancelled using 'token'.
+
+        The token only cancels the function while it waits for write access. Once it runs, cancellations (and the
+        timeout) are only enforced where the function itself calls 'token.check()'.
+
+        Raises a 'JobCancelledError' if the work was cancelled (or timed out) before it could start.
+        """
+
+        with trace_span(_func_name(func), **{"kiara.context_access": "write"}):
+            with token.cancellable():
+                async with self.writing():
+                    token.start()
+                    return await anyio.to_thread.run_sync(
+                        functools.partial(func, *args, **kwargs)
+                    )
+
+            raise JobCancelledError(token.reason)
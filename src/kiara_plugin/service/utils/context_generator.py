@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+"""Generate synthetic kiara contexts of configurable size, for scaling tests and benchmarks.
+
+Generated contexts are deterministic (for the same spec, the generated data, aliases, lineage and workflows are the
+same, only the value and job ids differ), and cached on disk: the contexts are kept in sub-folders of a cache folder,
+named after the hash of their spec, and re-used by later runs. Anything that writes to a generated context (like
+running jobs against it in a benchmark) should use a copy of it (see 'copy_to' in 'generate_context').
+"""
+
+import hashlib
+import os
+import random
+import shutil
+from importlib.metadata import version
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple, Union
+
+import orjson
+from pydantic import BaseModel, Field
+
+from kiara_plugin.service.defaults import kiara_html_app_dirs
+
+if TYPE_CHECKING:
+    from kiara.api import KiaraAPI, Value
+
+GENERATED_CONTEXTS_DIR = os.path.join(
+    kiara_html_app_dirs.user_cache_dir, "generated_contexts"
+)
+"""The default folder to cache generated contexts in."""
+
+SPEC_FILE_NAME = "context_spec.json"
+"""The name of the file that marks a generated context as complete."""
+
+_WORDS = [
+    "alpha",
+    "beta",
+    "gamma",
+    "delta",
+    "epsilon",
+    "kiara",
+    "value",
+    "table",
+    "lineage",
+    "workflow",
+    "archive",
+    "network",
+]
+
+
+class ContextSpec(BaseModel):
+    """The description of a generated kiara context."""
+
+    scalar_values: int = Field(
+        description="The number of (scalar) values to create.", default=1000, ge=0
+    )
+    aliases: int = Field(
+        description="The number of aliases, each pointing to one of the scalar values, can be larger than the number of values.",
+        default=1000,
+        ge=0,
+    )
+    lineage_chains: int = Field(
+        description="The number of values with lineage, each is the result of a chain of jobs.",
+        default=10,
+        ge=0,
+    )
+    lineage_depth: int = Field(
+        description="The number of jobs in each lineage chain.", default=5, ge=1
+    )
+    tables: int = Field(
+        description="The number of tables to create, requires the 'kiara_plugin.tabular' plugin.",
+        default=0,
+        ge=0,
+    )
+    table_rows: int = Field(
+        description="The number of rows of each table.", default=1000, ge=0
+    )
+    workflows: int = Field(
+        description="The number of (saved) workflows to create.", default=0, ge=0
+    )
+    seed: int = Field(
+        description="The seed for the random number generator.", default=0
+    )
+
+    @property
+    def spec_hash(self) -> str:
+
+        data = orjson.dumps(
+            {"spec": self.model_dump(), "kiara_version": version("kiara")},
+            option=orjson.OPT_SORT_KEYS,
+        )
+        return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _random_scalar(rnd: random.Random, idx: int) -> Tuple[Any, str]:
+
+    kind = idx % 4
+    if kind == 0:
+        return (" ".join(rnd.choices(_WORDS, k=rnd.randint(1, 8))), "string")
+    elif kind == 1:
+        return (rnd.randint(-(10**9), 10**9), "integer")
+    elif kind == 2:
+        return (rnd.random() * 1000, "float")
+    else:
+        return (rnd.random() < 0.5, "boolean")
+
+
+def _store(kiara_api: "KiaraAPI", value: "Value", aliases: List[str]) -> None:
+
+    store_result = kiara_api.store_value(value=value, alias=aliases or None)
+    if store_result.error:
+        raise Exception(f"Can't store generated value: {store_result.error}")
+
+
+def populate_context(
+    kiara_api: "KiaraAPI",
+    spec: ContextSpec,
+    on_progress: Union[Callable[[str, int, int], None], None] = None,
+) -> None:
+    """Fill a (preferably empty) kiara context with generated values, lineage, tables and workflows.
+
+    Arguments:
+        kiara_api: the kiara api of the context to populate
+        spec: the description of the content to create
+        on_progress: an (optional) callback that is called with the current task, and the number of processed and total items
+    """
+
+    def progress(task: str, done: int, total: int) -> None:
+        if on_progress is not None and (done == total or not done % 100):
+            on_progress(task, done, total)
+
+    rnd = random.Random(spec.seed)  # noqa: S311
+
+    if spec.tables and "table" not in kiara_api.list_data_type_names():
+        raise Exception(
+            "Can't generate tables: the 'kiara_plugin.tabular' plugin is not installed."
+        )
+
+    # distribute the aliases over the scalar values, every value gets at most one alias before any value gets a second one
+    alias_map: Dict[int, List[str]] = {}
+    if spec.scalar_values:
+        for alias_idx in range(spec.aliases):
+            alias_map.setdefault(alias_idx % spec.scalar_values, []).append(
+                f"value_{alias_idx}"
+            )
+
+    for idx in range(spec.scalar_values):
+        data, data_type = _random_scalar(rnd, idx)
+        value = kiara_api.register_data(data=data, data_type=data_type)
+        _store(kiara_api, value, alias_map.get(idx, []))
+        progress("values", idx + 1, spec.scalar_values)
+
+    for chain_idx in range(spec.lineage_chains):
+        current: Any = rnd.random() < 0.5
+        for _ in range(spec.lineage_depth):
+            results = kiara_api.run_job(operation="logic.not", inputs={"a": current})
+            current = results["y"]
+        _store(kiara_api, current, [f"lineage_{chain_idx}"])
+        progress("lineage", chain_idx + 1, spec.lineage_chains)
+
+    for table_idx in range(spec.tables):
+        table_data = {
+            "id": list(range(spec.table_rows)),
+            "label": [rnd.choice(_WORDS) for _ in range(spec.table_rows)],
+            "score": [rnd.random() for _ in range(spec.table_rows)],
+            "flag": [rnd.random() < 0.5 for _ in range(spec.table_rows)],
+        }
+        value = kiara_api.register_data(data=table_data, data_type="table")
+        _store(kiara_api, value, [f"table_{table_idx}"])
+        progress("tables", table_idx + 1, spec.tables)
+
+    for workflow_idx in range(spec.workflows):
+        kiara_api.create_workflow(
+            workflow_alias=f"workflow_{workflow_idx}",
+            initial_pipeline="logic.nand",
+            initial_inputs={"a": rnd.random() < 0.5, "b": rnd.random() < 0.5},
+            save=True,
+        )
+        progress("workflows", workflow_idx + 1, spec.workflows)
+
+
+def get_context_dir(spec: ContextSpec, cache_dir: Union[str, None] = None) -> str:
+    """Return the folder a context for the spec is (or would be) generated in."""
+
+    if cache_dir is None:
+        cache_dir = GENERATED_CONTEXTS_DIR
+    return os.path.join(cache_dir, spec.spec_hash)
+
+
+def copy_context(context_dir: str, target_dir: str) -> "KiaraAPI":
+    """Copy a (generated) kiara context to a new folder, and return a kiara api for the copy.
+
+    Kiara configs reference the context stores by absolute path, and the stores link files by absolute path, those
+    are changed to point to the copy.
+
+    Arguments:
+        context_dir: the folder of the context to copy
+        target_dir: the folder to copy the context to, must not exist yet
+    """
+
+    from kiara.api import KiaraAPI
+    from kiara.context import KiaraConfig
+    from kiara.defaults import KIARA_CONFIG_FILE_NAME
+
+    context_dir = os.path.abspath(context_dir)
+    target_dir = os.path.abspath(target_dir)
+    shutil.copytree(context_dir, target_dir, symlinks=True)
+
+    for root, _, file_names in os.walk(target_dir):
+        for file_name in file_names:
+            path = os.path.join(root, file_name)
+            if not os.path.islink(path):
+                continue
+            link_target = os.readlink(path)
+            if link_target.startswith(context_dir + os.sep):
+                os.remove(path)
+                os.symlink(target_dir + link_target[len(context_dir) :], path)
+
+    config_files = [os.path.join(target_dir, KIARA_CONFIG_FILE_NAME)]
+    config_files.extend(
+        path.as_posix() for path in Path(target_dir, "contexts").glob("*.yaml")
+    )
+    for config_file in config_files:
+        with open(config_file, "rt") as f:
+            content = f.read()
+        with open(config_file, "wt") as f:
+            f.write(content.replace(context_dir, target_dir))
+
+    return KiaraAPI(kiara_config=KiaraConfig.load_from_file(Path(target_dir)))
+
+
+def generate_context(
+    spec: ContextSpec,
+    cache_dir: Union[str, None] = None,
+    force: bool = False,
+    on_progress: Union[Callable[[str, int, int], None], None] = None,
+    copy_to: Union[str, None] = None,
+) -> "KiaraAPI":
+    """Generate a kiara context (or re-use a previously generated one), and return a kiara api for it.
+
+    A context only counts as generated once it was fully populated, incomplete contexts (e.g. from an interrupted run)
+    are deleted and generated again.
+
+    Arguments:
+        spec: the description of the context
+        cache_dir: the folder to keep generated contexts in, defaults to a folder in the user cache dir
+        force: whether to re-generate the context, even if it exists already
+        on_progress: an (optional) progress callback, see 'populate_context'
+        copy_to: if set, the (not yet existing) folder to copy the context to, the returned kiara api uses the copy
+    """
+
+    from kiara.api import KiaraAPI
+    from kiara.context import KiaraConfig
+
+    context_dir = get_context_dir(spec, cache_dir=cache_dir)
+    spec_file = os.path.join(context_dir, SPEC_FILE_NAME)
+
+    if os.path.isfile(spec_file) and not force:
+        if copy_to is not None:
+            return copy_context(context_dir, copy_to)
+        return KiaraAPI(kiara_config=KiaraConfig.load_from_file(Path(context_dir)))
+
+    if os.path.exists(context_dir):
+        shutil.rmtree(context_dir)
+
+    kiara_config = KiaraConfig.create_in_folder(context_dir)
+    kiara_api = KiaraAPI(kiara_config=kiara_config)
+    populate_context(kiara_api=kiara_api, spec=spec, on_progress=on_progress)
+
+    with open(spec_file, "wb") as f:
+        f.write(orjson.dumps(spec.model_dump(), option=orjson.OPT_INDENT_2))
+    if copy_to is not None:
+        return copy_context(context_dir, copy_to)
+    return kiara_api
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+"""A pool of lazily opened (kiara) contexts, bounded by number, idle time and (estimated) memory use.
+
+Contexts are opened on first use, and closed least-recently-used first once the pool exceeds its limits, or after
+they have been idle for too long. Contexts that are in use (or busy, e.g. running jobs) are never closed.
+"""
+
+import time
+from contextlib import asynccontextmanager
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    TypeVar,
+    Union,
+)
+
+import anyio
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class ContextPoolStats(BaseModel):
+    """Usage statistics of a context pool."""
+
+    open: List[str] = Field(
+        description="The names of the open contexts, least recently used first."
+    )
+    max_open: Union[int, None] = Field(
+        description="The maximum number of open contexts, 'None' if unbounded."
+    )
+    bytes: int = Field(description="The (estimated) memory used by the open contexts.")
+    max_bytes: Union[int, None] = Field(
+        description="The memory budget for open contexts, 'None' if unbounded."
+    )
+    opened: int = Field(description="The number of times a context was opened.")
+    closed: int = Field(description="The number of times a context was closed.")
+
+
+class _PooledContext(Generic[T]):
+
+    __slots__ = ("item", "last_used", "users")
+
+    def __init__(self, item: T):
+
+        self.item: T = item
+        self.last_used: float = time.monotonic()
+        self.users: int = 0
+
+
+class ContextPool(Generic[T]):
+    """Opens contexts on demand, and closes idle ones to stay within its limits.
+
+    Arguments:
+        open_context: an async function that opens the context with the provided name
+        close_context: an async function that closes a context
+        max_open: the maximum number of open contexts, 'None' means unbounded
+        idle_timeout: the number of seconds after which an unused context is closed, 'None' means never
+        max_bytes: the memory budget for all open contexts, 'None' means unbounded
+        size_func: a function that returns the (estimated) memory used by a context, required for 'max_bytes'
+        is_busy: a function that checks whether a context is busy (e.g. running jobs), busy contexts are not closed
+    """
+
+    def __init__(
+        self,
+        open_context: Callable[[str], Awaitable[T]],
+        close_context: Callable[[T], Awaitable[None]],
+        max_open: Union[int, None] = None,
+        idle_timeout: Union[float, None] = None,
+        max_bytes: Union[int, None] = None,
+        size_func: Union[Callable[[T], int], None] = None,
+        is_busy: Union[Callable[[T], bool], None] = None,
+    ):
+
+        if max_bytes is not None and size_func is None:
+            raise ValueError(
+                "Can't create context pool: 'max_bytes' requires a 'size_func'."
+            )
+
+        self._open_context: Callable[[str], Awaitable[T]] = open_context
+        self._close_context: Callable[[T], Awaitable[None]] = close_context
+        self._max_open: Union[int, None] = max_open
+        self._idle_timeout: Union[float, None] = idle_timeout
+        self._max_bytes: Union[int, None] = max_bytes
+        self._size_func: Union[Callable[[T], int], None] = size_func
+        self._is_busy: Union[Callable[[T], bool], None] = is_busy
+
+        # ordered by last use, least recently used first
+        self._contexts: Dict[str, _PooledContext[T]] = {}
+        self._opening: Dict[str, anyio.Lock] = {}
+        # contexts that are removed from the pool, but not closed yet
+        self._closing: Dict[str, anyio.Event] = {}
+
+        self._opened: int = 0
+        self._closed: int = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._contexts
+
+    def _size(self) -> int:
+
+        if self._size_func is None:
+            return 0
+        return sum(self._size_func(c.item) for c in self._contexts.values())
+
+    def _can_close(self, pooled: _PooledContext[T]) -> bool:
+
+        if pooled.users:
+            return False
+        return self._is_busy is None or not self._is_busy(pooled.item)
+
+    async def _close(self, name: str) -> None:
+
+        pooled = self._contexts.pop(name)
+        self._closed += 1
+        closed = self._closing[name] = anyio.Event()
+        try:
+            await self._close_context(pooled.item)
+        finally:
+            del self._closing[name]
+            closed.set()
+
+    async def _acquire(self, name: str) -> _PooledContext[T]:
+
+        pooled = self._contexts.get(name)
+        if pooled is not None:
+            return pooled
+
+        # a context must not be reopened before it is closed, both would use the same resources
+        closing = self._closing.get(name)
+        while closing is not None:
+            await closing.wait()
+            closing = self._closing.get(name)
+
+        lock = self._opening.setdefault(name, anyio.Lock())
+        try:
+            async with lock:
+                pooled = self._contexts.get(name)
+                if pooled is None and name in self._closing:
+                    # closed (by 'enforce_limits') while waiting for the lock
+                    await self._closing[name].wait()
+                if pooled is None:
+                    pooled = _PooledContext(await self._open_context(name))
+                    self._contexts[name] = pooled
+                    self._opened += 1
+        finally:
+            self._opening.pop(name, None)
+        return pooled
+
+    @asynccontextmanager
+    async def use(self, name: str) -> AsyncIterator[T]:
+        """Use a context, opening it if necessary, it won't be closed while in use.
+
+        Exceptions raised while opening the context (e.g. because it doesn't exist) are propagated.
+        """
+
+        pooled = await self._acquire(name)
+        pooled.users += 1
+        # move to the end: most recently used
+        self._contexts[name] = self._contexts.pop(name)
+        try:
+            await self.enforce_limits()
+            yield pooled.item
+        finally:
+            pooled.users -= 1
+            pooled.last_used = time.monotonic()
+
+    async def enforce_limits(self) -> None:
+        """Close the least recently used contexts (that are not in use) until the pool is within its limits."""
+
+        def over_limits() -> bool:
+
+            if self._max_open is not None and len(self._contexts) > self._max_open:
+                return True
+            if self._max_bytes is not None and self._size() > self._max_bytes:
+                return True
+            return False
+
+        while over_limits():
+            candidates = [n for n, c in self._contexts.items() if self._can_close(c)]
+            if not candidates:
+                return
+            await self._close(candidates[0])
+
+    async def close_idle(self) -> List[str]:
+        """Close all contexts that have not been used for longer than the idle timeout.
+
+        Returns:
+            the names of the closed contexts
+        """
+
+        if self._idle_timeout is None:
+            return []
+
+        threshold = time.monotonic() - self._idle_timeout
+        closed = []
+        for name in list(self._contexts.keys()):
+            # re-check every context, it might have been used while an earlier one was closed
+            pooled = self._contexts.get(name)
+            if pooled is None or pooled.last_used >= threshold:
+                continue
+            if self._can_close(pooled):
+                await self._close(name)
+                closed.append(name)
+        return closed
+
+    async def run_reaper(self, interval: Union[float, None] = None) -> None:
+        """Periodically close idle contexts, until cancelled."""
+
+        if self._idle_timeout is None:
+            return
+        if interval is None:
+            interval = max(self._idle_timeout / 4, 0.01)
+        while True:
+            await anyio.sleep(interval)
+            await self.close_idle()
+
+    async def close_all(self) -> None:
+
+        for name in list(self._contexts.keys()):
+            await self._close(name)
+
+    @property
+    def stats(self) -> ContextPoolStats:
+
+        return ContextPoolStats(
+            open=list(self._contexts.keys()),
+            max_open=self._max_open,
+            bytes=self._size(),
+            max_bytes=self._max_bytes,
+            opened=self._opened,
+            closed=self._closed,
+        )
@@ -0,0 +1,434 @@
+# -*- coding: utf-8 -*-
+
+"""Compact binary encodings (MessagePack, CBOR) for service responses, and Accept header based negotiation.
+
+MessagePack support requires the 'msgpack' package, CBOR support the 'cbor2' package. Formats whose package is not
+installed are not offered, and clients get json instead.
+
+MessagePack extension types:
+
+- UUIDs: extension type 1, the 16 bytes of the UUID
+- datetimes: the native timestamp extension type (-1), naive datetimes are assumed to be UTC
+- numpy arrays: extension type 2, a little endian uint32 header length, the msgpack encoded header ('[<dtype>, <shape>]'), and the raw array buffer
+
+CBOR uses its native tags for UUIDs (37) and datetimes (0), and RFC 8746 typed arrays for numpy arrays.
+"""
+
+import dataclasses
+import enum
+import struct
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+import orjson
+from pydantic import BaseModel, Field
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+CBOR_MEDIA_TYPE = "application/cbor"
+
+MSGPACK_EXT_UUID = 1
+MSGPACK_EXT_NDARRAY = 2
+
+JSON_OPTIONS = (
+    orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_OMIT_MICROSECONDS | orjson.OPT_NON_STR_KEYS
+)
+"""The orjson options used for json responses."""
+
+_MEDIA_TYPES = {
+    "*/*": JSON_MEDIA_TYPE,
+    "application/*": JSON_MEDIA_TYPE,
+    JSON_MEDIA_TYPE: JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE: MSGPACK_MEDIA_TYPE,
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+    CBOR_MEDIA_TYPE: CBOR_MEDIA_TYPE,
+}
+
+_CBOR_TAG_MULTI_DIM_ARRAY = 40
+_CBOR_TAG_TYPED_ARRAY_BASE = 64
+
+_response_media_type: ContextVar[str] = ContextVar(
+    "response_media_type", default=JSON_MEDIA_TYPE
+)
+
+Serializer = Callable[[Any], Any]
+
+
+class EncodedContent(object):
+    """Response content that's already encoded, and is sent as it is."""
+
+    __slots__ = ("body", "media_type")
+
+    def __init__(self, body: bytes, media_type: str):
+
+        self.body: bytes = body
+        self.media_type: str = media_type
+
+
+def available_media_types() -> List[str]:
+    """The media types responses can be encoded in, depending on the installed packages."""
+
+    result = [JSON_MEDIA_TYPE]
+    try:
+        import msgpack  # noqa
+
+        result.append(MSGPACK_MEDIA_TYPE)
+    except ImportError:
+        pass
+    try:
+        import cbor2  # noqa
+
+        result.append(CBOR_MEDIA_TYPE)
+    except ImportError:
+        pass
+    return result
+
+
+def negotiate_media_type(
+    accept: Union[str, None], available: Union[List[str], None] = None
+) -> str:
+    """Pick the response media type with the highest quality value in an 'Accept' header.
+
+    Json is used if the header is missing, or if it doesn't contain any of the available media types.
+
+    Arguments:
+        accept: the value of the 'Accept' header
+        available: the media types to choose from, defaults to all available ones
+    """
+
+    if not accept:
+        return JSON_MEDIA_TYPE
+    if available is None:
+        available = available_media_types()
+
+    result = JSON_MEDIA_TYPE
+    result_quality = -1.0
+    for entry in accept.split(","):
+        media_type, *params = (part.strip() for part in entry.split(";"))
+        media_type = _MEDIA_TYPES.get(media_type.lower(), "")
+        if media_type not in available:
+            continue
+
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > result_quality and quality > 0:
+            result = media_type
+            result_quality = quality
+
+    return result
+
+
+def response_media_type() -> str:
+    """The media type negotiated for json responses of the current request."""
+
+    return _response_media_type.get()
+
+
+def _is_ndarray(obj: Any) -> bool:
+
+    return type(obj).__module__ == "numpy" and type(obj).__name__ == "ndarray"
+
+
+def _default(obj: Any, default: Union[Serializer, None]) -> Any:
+    """Convert an object that's not supported by the binary encoders natively."""
+
+    if type(obj).__module__ == "numpy" and hasattr(obj, "item"):
+        # numpy scalars, and arrays with an 'object' dtype
+        return obj.tolist() if _is_ndarray(obj) else obj.item()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, date) and not isinstance(obj, datetime):
+        return obj.isoformat()
+    if default is not None:
+        return default(obj)
+    raise TypeError(f"Can't encode object of type: {type(obj)}")
+
+
+def encode_json(content: Any, default: Union[Serializer, None] = None) -> bytes:
+    """Encode content as json, the same way as json responses."""
+
+    return orjson.dumps(content, default=default, option=JSON_OPTIONS)
+
+
+def encode_msgpack(content: Any, default: Union[Serializer, None] = None) -> bytes:
+    """Encode content as MessagePack.
+
+    Arguments:
+        content: the content to encode
+        default: a function to convert objects that aren't supported natively (e.g. models) into ones that are
+    """
+
+    import msgpack
+
+    def msgpack_default(obj: Any) -> Any:
+
+        if isinstance(obj, uuid.UUID):
+            return msgpack.ExtType(MSGPACK_EXT_UUID, obj.bytes)
+        if isinstance(obj, datetime):
+            # aware datetimes are handled by msgpack itself
+            return msgpack.Timestamp.from_datetime(obj.replace(tzinfo=timezone.utc))
+        if _is_ndarray(obj) and obj.dtype.kind in "biufcmM":
+            header = msgpack.packb([obj.dtype.str, list(obj.shape)])
+            buffer = obj.data if obj.flags.c_contiguous else obj.tobytes()
+            return msgpack.ExtType(
+                MSGPACK_EXT_NDARRAY,
+                b"".join((struct.pack("<I", len(header)), header, buffer)),
+            )
+        return _default(obj, default)
+
+    return msgpack.packb(content, default=msgpack_default, datetime=True)
+
+
+def decode_msgpack(data: bytes) -> Any:
+    """Decode MessagePack data, including the extension types used by the service.
+
+    Numpy arrays are not copied, they are (read-only) views on the input data.
+    """
+
+    import msgpack
+
+    def ext_hook(code: int, ext_data: bytes) -> Any:
+
+        if code == MSGPACK_EXT_UUID:
+            return uuid.UUID(bytes=ext_data)
+        if code == MSGPACK_EXT_NDARRAY:
+            import numpy as np
+
+            (header_length,) = struct.unpack_from("<I", ext_data)
+            dtype, shape = msgpack.unpackb(ext_data[4 : 4 + header_length])
+            return np.frombuffer(
+                ext_data, dtype=np.dtype(dtype), offset=4 + header_length
+            ).reshape(shape)
+        return msgpack.ExtType(code, ext_data)
+
+    return msgpack.unpackb(data, ext_hook=ext_hook, timestamp=3, strict_map_key=False)
+
+
+def _cbor_typed_array_tag(dtype: Any) -> Union[int, None]:
+    """The RFC 8746 typed array tag for a numpy dtype, or None if there isn't one."""
+
+    if dtype.kind not in "iuf" or dtype.itemsize not in (1, 2, 4, 8):
+        return None
+    if dtype.kind == "f" and dtype.itemsize == 1:
+        return None
+
+    is_float = dtype.kind == "f"
+    is_signed = dtype.kind == "i"
+    if dtype.itemsize == 1:
+        little_endian = False
+    elif dtype.byteorder == "=":
+        little_endian = struct.pack("=H", 1) == b"\x01\x00"
+    else:
+        little_endian = dtype.byteorder == "<"
+    size_bits = {1: 0, 2: 1, 4: 2, 8: 3}[dtype.itemsize]
+    if is_float:
+        size_bits -= 1
+
+    return (
+        _CBOR_TAG_TYPED_ARRAY_BASE
+        | int(is_float) << 4
+        | int(is_signed) << 3
+        | int(little_endian) << 2
+        | size_bits
+    )
+
+
+def _cbor_typed_array_dtype(tag: int) -> Union[str, None]:
+    """The numpy dtype for an RFC 8746 typed array tag, or None if it's not a supported typed array tag."""
+
+    if tag < _CBOR_TAG_TYPED_ARRAY_BASE or tag > _CBOR_TAG_TYPED_ARRAY_BASE + 0x1F:
+        return None
+    is_float = bool(tag & 0x10)
+    is_signed = bool(tag & 0x08)
+    little_endian = bool(tag & 0x04)
+    size_bits = tag & 0x03
+
+    if is_float:
+        if is_signed or size_bits == 3:
+            return None
+        kind, itemsize = "f", 2 << size_bits
+    else:
+        if little_endian and size_bits == 0 and not is_signed:
+            # clamped uint8
+            little_endian = False
+        kind, itemsize = ("i" if is_signed else "u"), 1 << size_bits
+    byteorder = "|" if itemsize == 1 else ("<" if little_endian else ">")
+    return f"{byteorder}{kind}{itemsize}"
+
+
+def encode_cbor(content: Any, default: Union[Serializer, None] = None) -> bytes:
+    """Encode content as CBOR.
+
+    Arguments:
+        content: the content to encode
+        default: a function to convert objects that aren't supported natively (e.g. models) into ones that are
+    """
+
+    import cbor2
+
+    def cbor_default(encoder: Any, obj: Any) -> None:
+
+        if _is_ndarray(obj):
+            tag = _cbor_typed_array_tag(obj.dtype)
+            if tag is not None:
+                typed_array = cbor2.CBORTag(tag, obj.tobytes())
+                if obj.ndim == 1:
+                    encoder.encode(typed_array)
+                else:
+                    encoder.encode(
+                        cbor2.CBORTag(
+                            _CBOR_TAG_MULTI_DIM_ARRAY, [list(obj.shape), typed_array]
+                        )
+                    )
+                return
+        encoder.encode(_default(obj, default))
+
+    return cbor2.dumps(content, default=cbor_default, timezone=timezone.utc)
+
+
+def decode_cbor(data: bytes) -> Any:
+    """Decode CBOR data, including typed (numpy) arrays.
+
+    Numpy arrays are not copied, they are (read-only) views on the decoded byte strings.
+    """
+
+    import cbor2
+
+    def tag_hook(decoder: Any, tag: Any) -> Any:
+
+        if tag.tag == _CBOR_TAG_MULTI_DIM_ARRAY and _is_ndarray(tag.value[1]):
+            return tag.value[1].reshape(tag.value[0])
+        dtype = _cbor_typed_array_dtype(tag.tag)
+        if dtype is not None:
+            import numpy as np
+
+            return np.frombuffer(tag.value, dtype=np.dtype(dtype))
+        return tag
+
+    return cbor2.loads(data, tag_hook=tag_hook)
+
+
+_ENCODERS: Dict[str, Callable[[Any, Union[Serializer, None]], bytes]] = {
+    JSON_MEDIA_TYPE: encode_json,
+    MSGPACK_MEDIA_TYPE: encode_msgpack,
+    CBOR_MEDIA_TYPE: encode_cbor,
+}
+
+_DECODERS: Dict[str, Callable[[bytes], Any]] = {
+    JSON_MEDIA_TYPE: orjson.loads,
+    MSGPACK_MEDIA_TYPE: decode_msgpack,
+    CBOR_MEDIA_TYPE: decode_cbor,
+}
+
+
+def encode(
+    content: Any, media_type: str, default: Union[Serializer, None] = None
+) -> bytes:
+    """Encode content in one of the supported media types.
+
+    Arguments:
+        content: the content to encode
+        media_type: the media type to encode the content in
+        default: a function to convert objects that aren't supported natively (e.g. models) into ones that are
+    """
+
+    return _ENCODERS[media_type](content, default)
+
+
+def decode(data: bytes, media_type: str) -> Any:
+    """Decode data in one of the supported media types."""
+
+    return _DECODERS[media_type](data)
+
+
+class ContentNegotiationMiddleware(object):
+    """ASGI middleware that picks the encoding of json responses from the 'Accept' header of a request.
+
+    Responses of negotiable route handlers then need to check `response_media_type()` when rendering.
+    """
+
+    def __init__(self, app: Any):
+
+        self.app = app
+        self.available: List[str] = available_media_types()
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+
+        if scope["type"] != "http" or len(self.available) == 1:
+            await self.app(scope, receive, send)
+            return
+
+        accept = None
+        for key, value in scope.get("headers", []):
+            if key == b"accept":
+                accept = value.decode("latin-1")
+                break
+
+        async def send_with_vary(message: Any) -> None:
+
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = [*message.get("headers", []), (b"vary", b"accept")]
+            await send(message)
+
+        token = _response_media_type.set(
+            negotiate_media_type(accept, available=self.available)
+        )
+        try:
+            await self.app(scope, receive, send_with_vary)
+        finally:
+            _response_media_type.reset(token)
+
+
+class EncodingStats(BaseModel):
+    """Payload size, and encode and decode time of some content in one encoding."""
+
+    size: int = Field(description="The size of the encoded content, in bytes.")
+    encode_ms: float = Field(description="The mean time to encode the content.")
+    decode_ms: float = Field(description="The mean time to decode the content.")
+
+
+def _time_ms(func: Callable[[], Any], iterations: int) -> Tuple[Any, float]:
+
+    result = func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return result, (time.perf_counter() - start) * 1000 / iterations
+
+
+def benchmark_encodings(
+    content: Any, default: Union[Serializer, None] = None, iterations: int = 10
+) -> Dict[str, EncodingStats]:
+    """Compare payload size, and encode and decode time of some content, in all available encodings.
+
+    Arguments:
+        content: the content to encode
+        default: a function to convert objects that aren't supported natively (e.g. models) into ones that are
+        iterations: the number of measured encode and decode runs
+    """
+
+    result = {}
+    for media_type in available_media_types():
+        encoded, encode_ms = _time_ms(
+            lambda: encode(content, media_type, default=default), iterations
+        )
+        _, decode_ms = _time_ms(lambda: decode(encoded, media_type), iterations)
+        result[media_type] = EncodingStats(
+            size=len(encoded), encode_ms=encode_ms, decode_ms=decode_ms
+        )
+    return result
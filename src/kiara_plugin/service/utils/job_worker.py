@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""Functions to run kiara jobs in the worker processes of a 'ProcessPool'.
+
+Worker processes open the same kiara context as the service (the pool of a multi-context service opens every context
+it runs jobs for), but never write to it. Inputs are exchanged via the context's data store, by value id: the service
+makes sure all input values are stored before a job is sent to a worker. Workers return the data of the job outputs
+(or the ids of outputs that are already stored, e.g. the results of an earlier job kiara re-used), and the service
+registers and stores them with exclusive write access to the context.
+
+Outputs can't be exchanged by value id as well, since storing them from a worker would mean several processes writing
+to the same context, which kiara's data and alias stores don't support. Returning the data means it is pickled and
+copied into the service process, so the size of the pickled output data is limited (by the service config), and jobs
+with larger outputs fail instead of exhausting the memory of the service process.
+"""
+
+import pickle
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Tuple, Union
+
+from kiara_plugin.service.utils.process_pool import report
+
+if TYPE_CHECKING:
+    from kiara.api import KiaraAPI
+    from kiara.models.module.jobs import JobStatus
+
+
+class _JobProgressReporter(object):
+    """Reports the creation of the job that runs in this worker, and every finished pipeline step of it.
+
+    Messages are tuples: ("job_created", <job id>), and ("step_finished", <step id>, <job id>, <error>, <outputs>),
+    with the outputs being serialized value infos, indexed by field name.
+    """
+
+    def __init__(self, kiara_api: "KiaraAPI"):
+
+        self._kiara_api: "KiaraAPI" = kiara_api
+        self._processor = kiara_api.context.job_registry._processor
+        self._step_ids: Dict[uuid.UUID, str] = {}
+        self.job_id: Union[uuid.UUID, None] = None
+
+    def reset(self) -> None:
+
+        self._step_ids.clear()
+        self.job_id = None
+
+    def job_status_changed(
+        self,
+        job_id: uuid.UUID,
+        old_status: Union["JobStatus", None],
+        new_status: "JobStatus",
+    ) -> None:
+
+        from kiara.models.module.jobs import JobStatus
+
+        if new_status is JobStatus.CREATED:
+            job_details = self._processor._created_jobs.get(job_id, {})
+            module = job_details.get("module", None)
+            if module is None or module.characteristics.is_internal:
+                return
+
+            job_metadata = job_details.get("job_metadata", None) or {}
+            if job_metadata.get("is_pipeline_step", False):
+                self._step_ids[job_id] = job_metadata["step_id"]
+            elif self.job_id is None:
+                self.job_id = job_id
+                report(("job_created", job_id))
+            return
+
+        if new_status not in (JobStatus.SUCCESS, JobStatus.FAILED):
+            return
+
+        step_id = self._step_ids.pop(job_id, None)
+        if step_id is None:
+            return
+
+        job = self._processor.get_job(job_id)
+        outputs = {
+            field_name: self._kiara_api.retrieve_value_info(value_id).model_dump(
+                mode="json"
+            )
+            for field_name, value_id in (job.results or {}).items()
+        }
+        report(("step_finished", step_id, job_id, job.error, outputs))
+
+
+class _WorkerState(object):
+    """The kiara contexts of this worker process, set up by 'init_kiara_worker'."""
+
+    def __init__(self) -> None:
+
+        self.kiara_config: Union[Mapping[str, Any], None] = None
+        self.default_context: Union[str, None] = None
+        self.contexts: Dict[str, Tuple["KiaraAPI", _JobProgressReporter]] = {}
+
+    def get_context(
+        self, context_name: Union[str, None] = None
+    ) -> Tuple["KiaraAPI", _JobProgressReporter]:
+        """Return the kiara api (and job reporter) of a context, opening the context if necessary."""
+
+        from kiara.api import KiaraAPI
+        from kiara.context import KiaraConfig
+
+        if self.kiara_config is None or self.default_context is None:
+            raise Exception("Can't run job: kiara worker not initialized.")
+        if context_name is None:
+            context_name = self.default_context
+
+        context = self.contexts.get(context_name, None)
+        if context is None:
+            # every context needs its own kiara config instance, since those keep track of the contexts they opened
+            kiara_api = KiaraAPI(kiara_config=KiaraConfig(**self.kiara_config))
+            kiara_api.set_active_context(context_name)
+            reporter = _JobProgressReporter(kiara_api)
+            kiara_api.context.job_registry._processor.register_job_status_listener(
+                reporter
+            )
+            context = (kiara_api, reporter)
+            self.contexts[context_name] = context
+        return context
+
+
+_worker = _WorkerState()
+
+
+def init_kiara_worker(kiara_config: Mapping[str, Any], context_name: str) -> None:
+    """Open the (default) kiara context in a new worker process, other contexts of the config are opened on demand."""
+
+    _worker.kiara_config = kiara_config
+    _worker.default_context = context_name
+    _worker.get_context(context_name)
+
+
+def run_kiara_job(
+    operation: Union[str, Mapping[str, Any]],
+    inputs: Mapping[str, Any],
+    context_name: Union[str, None] = None,
+    max_output_bytes: Union[int, None] = None,
+) -> Dict[str, Any]:
+    """Run a job in this worker process, without storing anything in the kiara context.
+
+    Arguments:
+        operation: the operation id, or the (serialized) manifest of the module to run
+        inputs: the job inputs, values are referenced by their id
+        context_name: the kiara context to run the job in, defaults to the one the worker was initialized with
+        max_output_bytes: the maximum size of the pickled output data, 'None' means unbounded
+
+    Returns:
+        the (serialized) job details ('job'), the ids of outputs of a successful job that are already stored
+        ('outputs'), and the pickled data of its other outputs ('output_data'), both indexed by field name
+    """
+
+    from kiara.defaults import SpecialValue
+    from kiara.models.module.jobs import JobStatus
+    from kiara.models.module.manifest import Manifest
+
+    kiara_api, reporter = _worker.get_context(context_name)
+
+    _operation: Union[str, Manifest] = (
+        operation if isinstance(operation, str) else Manifest(**operation)
+    )
+
+    reporter.reset()
+    try:
+        job_id = kiara_api.queue_job(operation=_operation, inputs=inputs)
+    finally:
+        reporter.reset()
+
+    job = kiara_api.get_job(job_id=job_id)
+    outputs: Dict[str, uuid.UUID] = {}
+    output_data: Dict[str, Any] = {}
+    if job.status is JobStatus.SUCCESS:
+        for field_name, value in kiara_api.get_job_result(job_id=job_id).items():
+            if value.is_stored:
+                outputs[field_name] = value.value_id
+            elif not value.is_set:
+                output_data[field_name] = SpecialValue.NO_VALUE
+            else:
+                output_data[field_name] = value.data
+
+    # pickled here (instead of by the process pool), to check the size before it is sent
+    pickled = pickle.dumps(output_data, protocol=pickle.HIGHEST_PROTOCOL)
+    if max_output_bytes is not None and len(pickled) > max_output_bytes:
+        raise Exception(
+            f"Can't return outputs of job '{job_id}': size of output data ({len(pickled)} bytes) exceeds the maximum ({max_output_bytes} bytes)."
+        )
+
+    return {
+        "job": job.model_dump(mode="json"),
+        "outputs": outputs,
+        "output_data": pickled,
+    }
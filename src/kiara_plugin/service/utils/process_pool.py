@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+
+"""A pool of worker processes, to run CPU-bound or unsafe work outside of the service process."""
+
+import functools
+import multiprocessing
+import threading
+from multiprocessing.connection import Connection
+from typing import Any, Callable, List, Tuple, TypeVar, Union
+
+import anyio
+from pydantic import BaseModel, Field
+
+from kiara_plugin.service.utils.concurrency import (
+    CancellationToken,
+    JobCancelledError,
+)
+
+T = TypeVar("T")
+
+POLL_INTERVAL = 0.05
+"""How often (in seconds) to check a running task for cancellation."""
+
+
+class _WorkerState(object):
+    """The connection of this worker process to the service process, set when the worker starts."""
+
+    def __init__(self) -> None:
+
+        self.connection: Union[Connection, None] = None
+
+
+_worker = _WorkerState()
+
+
+class WorkerCrashedError(Exception):
+    """Raised when a worker process died while running a task."""
+
+
+class ProcessPoolStats(BaseModel):
+    """Statistics about a pool of worker processes."""
+
+    size: int = Field(description="The maximum number of worker processes.")
+    idle_workers: int = Field(description="The number of idle worker processes.")
+    busy_workers: int = Field(description="The number of busy worker processes.")
+    tasks: int = Field(description="The number of finished tasks.", default=0)
+    started_workers: int = Field(
+        description="The number of worker processes started.", default=0
+    )
+    recycled_workers: int = Field(
+        description="The number of worker processes that were replaced after running their maximum number of tasks.",
+        default=0,
+    )
+    terminated_workers: int = Field(
+        description="The number of worker processes that were terminated because their task was cancelled.",
+        default=0,
+    )
+    crashed_workers: int = Field(
+        description="The number of worker processes that died while running a task.",
+        default=0,
+    )
+
+
+def report(message: Any) -> None:
+    """Send a progress message from the task that currently runs in this worker process to the service process."""
+
+    if _worker.connection is None:
+        raise Exception("Can't report progress: not running in a worker process.")
+    _worker.connection.send(("progress", message))
+
+
+def _worker_main(
+    connection: Connection,
+    initializer: Union[Callable[..., None], None],
+    initargs: Tuple[Any, ...],
+) -> None:
+
+    _worker.connection = connection
+
+    if initializer is not None:
+        initializer(*initargs)
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+
+        func, args, kwargs = task
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            try:
+                connection.send(("error", e))
+            except Exception:
+                # the exception can't be pickled
+                connection.send(("error", Exception(f"{type(e).__name__}: {e}")))
+        else:
+            connection.send(("result", result))
+
+
+class _Worker(object):
+    def __init__(
+        self,
+        context: Any,
+        initializer: Union[Callable[..., None], None],
+        initargs: Tuple[Any, ...],
+    ):
+
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_connection, initializer, initargs),
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        self.tasks: int = 0
+
+    def stop(self) -> None:
+
+        try:
+            self.connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+
+    def terminate(self) -> None:
+
+        self.process.terminate()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.connection.close()
+
+
+class ProcessPool(object):
+    """A pool of worker processes, started on demand (using 'spawn').
+
+    Tasks (a picklable function and its arguments) run in a worker process, so CPU-bound work doesn't hold the GIL of
+    the service process, and a crashing task only takes its worker down. Workers are recycled after a configurable
+    number of tasks, to keep memory leaks in check. A cancelled task has its worker terminated, and the worker is
+    replaced on demand.
+
+    Arguments:
+        size: the maximum number of worker processes
+        max_tasks_per_worker: the number of tasks after which a worker is replaced, 'None' means never
+        initializer: a (picklable) function that is called in every new worker process
+        initargs: the arguments for the initializer
+    """
+
+    def __init__(
+        self,
+        size: int,
+        max_tasks_per_worker: Union[int, None] = None,
+        initializer: Union[Callable[..., None], None] = None,
+        initargs: Tuple[Any, ...] = (),
+    ):
+
+        if size < 1:
+            raise ValueError(f"Invalid process pool size '{size}': must be at least 1.")
+
+        self._size: int = size
+        self._max_tasks_per_worker: Union[int, None] = max_tasks_per_worker
+        self._initializer: Union[Callable[..., None], None] = initializer
+        self._initargs: Tuple[Any, ...] = initargs
+
+        self._mp_context = multiprocessing.get_context("spawn")
+        self._idle: List[_Worker] = []
+        self._busy: int = 0
+        self._lock = threading.Lock()
+        self._slots: Union[anyio.Semaphore, None] = None
+
+        self._stats: ProcessPoolStats = ProcessPoolStats(
+            size=size, idle_workers=0, busy_workers=0
+        )
+
+    @property
+    def stats(self) -> ProcessPoolStats:
+
+        stats = self._stats.model_copy()
+        stats.idle_workers = len(self._idle)
+        stats.busy_workers = self._busy
+        return stats
+
+    def _acquire_worker(self) -> _Worker:
+
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        self._stats.started_workers += 1
+        return _Worker(self._mp_context, self._initializer, self._initargs)
+
+    def _release_worker(self, worker: _Worker) -> None:
+
+        worker.tasks += 1
+        if (
+            self._max_tasks_per_worker is not None
+            and worker.tasks >= self._max_tasks_per_worker
+        ):
+            self._stats.recycled_workers += 1
+            worker.stop()
+            return
+
+        with self._lock:
+            self._idle.append(worker)
+
+    def _wait_for_message(
+        self, worker: _Worker, token: CancellationToken
+    ) -> Tuple[str, Any]:
+
+        while not worker.connection.poll(POLL_INTERVAL):
+            try:
+                token.check()
+            except JobCancelledError:
+                self._stats.terminated_workers += 1
+                worker.terminate()
+                raise
+            if not worker.process.is_alive():
+                raise WorkerCrashedError(
+                    f"Worker process died (exit code: {worker.process.exitcode})."
+                )
+
+        try:
+            return worker.connection.recv()
+        except EOFError:
+            worker.process.join(timeout=5)
+            raise WorkerCrashedError(
+                f"Worker process died (exit code: {worker.process.exitcode})."
+            )
+
+    def _run_task(
+        self,
+        func: Callable[..., T],
+        args: Tuple[Any, ...],
+        kwargs: Any,
+        token: CancellationToken,
+        on_progress: Union[Callable[[Any], None], None],
+    ) -> T:
+
+        worker = self._acquire_worker()
+        self._busy += 1
+        try:
+            worker.connection.send((func, args, kwargs))
+            while True:
+                try:
+                    kind, payload = self._wait_for_message(worker, token)
+                except WorkerCrashedError:
+                    self._stats.crashed_workers += 1
+                    worker.terminate()
+                    raise
+
+                if kind == "progress":
+                    if on_progress is not None:
+                        on_progress(payload)
+                    continue
+
+                self._release_worker(worker)
+                if kind == "error":
+                    raise payload
+                return payload
+        finally:
+            self._busy -= 1
+            self._stats.tasks += 1
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        token: Union[CancellationToken, None] = None,
+        on_progress: Union[Callable[[Any], None], None] = None,
+        **kwargs: Any,
+    ) -> T:
+        """Run a (picklable) function in a worker process, and return its (picklable) result.
+
+        If the task is cancelled (or times out) via 'token', its worker process is terminated. The 'on_progress'
+        callback is called (from a worker thread) with every message the task sends using 'report'.
+        """
+
+        if self._slots is None:
+            self._slots = anyio.Semaphore(self._size)
+        if token is None:
+            token = CancellationToken()
+
+        with token.cancellable():
+            async with self._slots:
+                token.start()
+                return await anyio.to_thread.run_sync(
+                    functools.partial(
+                        self._run_task, func, args, kwargs, token, on_progress
+                    )
+                )
+
+        raise JobCancelledError(token.reason)
+
+    def shutdown(self) -> None:
+
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
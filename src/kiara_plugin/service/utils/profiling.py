@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""Profile the running service process, without restarting it under a profiler.
+
+The CPU profiler samples the stacks of all threads at a fixed interval (like 'py-spy'), which means it covers the
+event loop as well as the worker threads that access the kiara context, and its overhead doesn't depend on the number
+of function calls. Results are returned as collapsed stacks, which can be rendered as a flamegraph by tools like
+'flamegraph.pl' or speedscope.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from types import FrameType
+from typing import Dict, List, Union
+
+from pydantic import BaseModel, Field
+
+MAX_PROFILE_SECONDS = 60.0
+"""The maximum duration of a single profiling run."""
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profiler is started while another one is still running."""
+
+
+class MemoryAllocation(BaseModel):
+    """The memory allocated at a single source location, and still held."""
+
+    location: str = Field(description="The source location ('<file>:<line>').")
+    size: int = Field(description="The allocated memory (in bytes).")
+    count: int = Field(description="The number of allocated memory blocks.")
+    traceback: List[str] = Field(
+        description="The (most recent last) call stack of the allocation, if more than one frame is recorded.",
+        default_factory=list,
+    )
+
+
+class MemorySnapshot(BaseModel):
+    """The top memory allocators of the service process."""
+
+    duration: float = Field(
+        description="How long allocations were traced before the snapshot (in seconds), '0' if tracing was active already."
+    )
+    traced_memory: int = Field(
+        description="The memory (in bytes) of all traced allocations at the time of the snapshot."
+    )
+    peak_traced_memory: int = Field(
+        description="The peak memory (in bytes) of all traced allocations."
+    )
+    allocations: List[MemoryAllocation] = Field(
+        description="The top allocators, largest first."
+    )
+
+
+def _frame_name(frame: FrameType) -> str:
+
+    code = frame.f_code
+    file_name = os.path.basename(code.co_filename)
+    # ';' separates frames in the collapsed stack format
+    return f"{code.co_name} ({file_name}:{code.co_firstlineno})".replace(";", ":")
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Dict[str, int]:
+    """Sample the stacks of all (other) threads of this process.
+
+    Arguments:
+        seconds: how long to sample
+        interval: the time between two samples
+
+    Returns:
+        the number of samples per stack, stacks are in collapsed format: root-first frames separated by ';', starting with the thread name
+    """
+
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("Can't start profiler: another profiler is running.")
+
+    try:
+        own_thread_id = threading.get_ident()
+        stacks: Dict[str, int] = collections.Counter()
+        deadline = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+        while time.monotonic() < deadline:
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+                frames: List[str] = []
+                current: Union[FrameType, None] = frame
+                while current is not None:
+                    frames.append(_frame_name(current))
+                    current = current.f_back
+                frames.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+
+    return dict(stacks)
+
+
+def format_collapsed_stacks(stacks: Dict[str, int]) -> str:
+    """Render stack samples in the collapsed stack format, one '<stack> <count>' line per stack, most frequent first."""
+
+    lines = [
+        f"{stack} {count}"
+        for stack, count in sorted(stacks.items(), key=lambda x: x[1], reverse=True)
+    ]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def snapshot_memory(seconds: float, limit: int = 20, frames: int = 1) -> MemorySnapshot:
+    """Take a snapshot of the top memory allocators, using 'tracemalloc'.
+
+    If tracemalloc isn't tracing already, it is started, allocations are traced for 'seconds', and tracing is stopped
+    again after the snapshot. Otherwise, the snapshot is taken immediately.
+
+    Arguments:
+        seconds: how long to trace allocations, if tracing needs to be started
+        limit: the number of top allocators to return
+        frames: the number of frames to record per allocation (more frames are more expensive)
+    """
+
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("Can't start profiler: another profiler is running.")
+
+    try:
+        started = not tracemalloc.is_tracing()
+        duration = 0.0
+        if started:
+            tracemalloc.start(frames)
+            duration = min(seconds, MAX_PROFILE_SECONDS)
+            time.sleep(duration)
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            traced_memory, peak_traced_memory = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+    finally:
+        _profile_lock.release()
+
+    group_by = "traceback" if frames > 1 else "lineno"
+    allocations = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        frame = stat.traceback[-1]
+        allocations.append(
+            MemoryAllocation(
+                location=f"{frame.filename}:{frame.lineno}",
+                size=stat.size,
+                count=stat.count,
+                traceback=(
+                    [f"{f.filename}:{f.lineno}" for f in stat.traceback]
+                    if frames > 1
+                    else []
+                ),
+            )
+        )
+
+    return MemorySnapshot(
+        duration=duration,
+        traced_memory=traced_memory,
+        peak_traced_memory=peak_traced_memory,
+        allocations=allocations,
+    )
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+"""Snapshots of the registry metadata served by the service (operations, module types, data types, pipelines).
+
+Building the kiara registries requires importing all plugins, which can take a while. A snapshot taken by a previous
+run of the service lets the metadata endpoints answer immediately after startup, while the registries are loaded in
+the background. Snapshots are keyed by the installed versions of kiara and its plugins (and the parts of the context
+config that add pipelines), so they are never served for a different environment.
+"""
+
+import hashlib
+import os
+import platform
+import threading
+from datetime import datetime, timezone
+from importlib.metadata import distributions
+from typing import Any, Dict, List, Union
+
+import orjson
+from pydantic import BaseModel, Field
+
+from kiara.interfaces.python_api import KiaraAPI
+from kiara.interfaces.python_api.models.info import PipelineStructureInfo
+from kiara.utils.pipelines import get_pipeline_config
+from kiara_plugin.service.defaults import kiara_html_app_dirs
+from kiara_plugin.service.utils.encoding import Serializer, encode_json
+
+SNAPSHOT_FORMAT_VERSION = 1
+"""The version of the snapshot format, snapshots with a different version are ignored."""
+
+REGISTRY_SNAPSHOTS_DIR = os.path.join(
+    kiara_html_app_dirs.user_cache_dir, "registry_snapshots"
+)
+
+
+def installed_versions() -> Dict[str, str]:
+    """The versions of Python, kiara and all installed kiara plugins."""
+
+    result = {"python": platform.python_version()}
+    for dist in distributions():
+        name = dist.metadata["Name"]
+        if name and name.lower().replace("-", "_").startswith("kiara"):
+            result[name] = dist.version
+    return dict(sorted(result.items()))
+
+
+class RegistrySnapshot(BaseModel):
+    """The (json-serialized) registry metadata of a kiara context."""
+
+    format_version: int = Field(
+        description="The version of the snapshot format.",
+        default=SNAPSHOT_FORMAT_VERSION,
+    )
+    key: str = Field(
+        description="The key of the environment the snapshot was taken in."
+    )
+    created: datetime = Field(description="When the snapshot was taken.")
+    versions: Dict[str, str] = Field(
+        description="The versions of Python, kiara and its plugins."
+    )
+    operation_ids: List[str] = Field(
+        description="The ids of all operations that are not internal."
+    )
+    operations: Dict[str, Any] = Field(
+        description="The infos of all operations (including internal ones), by id."
+    )
+    module_types: Dict[str, Any] = Field(
+        description="The infos of all module types, by name."
+    )
+    data_types: Dict[str, Any] = Field(
+        description="The infos of all data types, by name."
+    )
+    pipeline_ids: List[str] = Field(description="The ids of all pipeline operations.")
+    pipelines: Dict[str, Any] = Field(
+        description="The structure infos of all pipeline operations, by id."
+    )
+
+
+def _to_json(content: Any, serializer: Union[Serializer, None]) -> Any:
+
+    return orjson.loads(encode_json(content, default=serializer))
+
+
+def create_snapshot(
+    kiara_api: KiaraAPI, key: str, serializer: Union[Serializer, None] = None
+) -> RegistrySnapshot:
+    """Take a snapshot of the registry metadata of a kiara context, this loads all registries.
+
+    Arguments:
+        kiara_api: the kiara api of the context
+        key: the key of the environment (see 'RegistrySnapshotManager.key')
+        serializer: a function to convert objects that can't be serialized to json natively (e.g. models)
+    """
+
+    operations = kiara_api.retrieve_operations_info(include_internal=True).item_infos
+    pipeline_ids = sorted(
+        kiara_api.context.operation_registry.operations_by_type.get("pipeline", [])
+    )
+    pipelines = {}
+    for pipeline_id in pipeline_ids:
+        pipeline_config = get_pipeline_config(
+            pipeline=pipeline_id, kiara=kiara_api.context
+        )
+        pipelines[pipeline_id] = PipelineStructureInfo.create_from_instance(
+            kiara=kiara_api.context, instance=pipeline_config.structure
+        )
+
+    return RegistrySnapshot(
+        key=key,
+        created=datetime.now(timezone.utc),
+        versions=installed_versions(),
+        operation_ids=kiara_api.list_operation_ids(),
+        operations=_to_json(operations, serializer),
+        module_types=_to_json(
+            kiara_api.retrieve_module_types_info().item_infos, serializer
+        ),
+        data_types=_to_json(
+            kiara_api.retrieve_data_types_info().item_infos, serializer
+        ),
+        pipeline_ids=pipeline_ids,
+        pipelines=_to_json(pipelines, serializer),
+    )
+
+
+def save_snapshot(snapshot: RegistrySnapshot, path: str) -> None:
+    """Write a snapshot to a file (atomically, so concurrent readers never see a partial snapshot)."""
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(snapshot.model_dump_json().encode())
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path: str, key: str) -> Union[RegistrySnapshot, None]:
+    """Load a snapshot from a file, returns 'None' if it doesn't exist, is invalid, or doesn't match the key."""
+
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            snapshot = RegistrySnapshot.model_validate_json(f.read())
+    except Exception:
+        return None
+    if snapshot.format_version != SNAPSHOT_FORMAT_VERSION or snapshot.key != key:
+        return None
+    return snapshot
+
+
+class RegistrySnapshotManager(object):
+    """Serves registry metadata from a snapshot until the registries of the kiara context are loaded.
+
+    Arguments:
+        kiara_api: the kiara api of the context
+        snapshot_dir: the folder to keep snapshots in, defaults to a folder in the user cache dir
+        serializer: a function to convert objects that can't be serialized to json natively (e.g. models)
+    """
+
+    def __init__(
+        self,
+        kiara_api: KiaraAPI,
+        snapshot_dir: Union[str, None] = None,
+        serializer: Union[Serializer, None] = None,
+    ):
+
+        self._kiara_api: KiaraAPI = kiara_api
+        self._serializer: Union[Serializer, None] = serializer
+
+        context_config = kiara_api.context.context_config
+        key_data = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "versions": installed_versions(),
+            "extra_pipelines": getattr(context_config, "extra_pipelines", None),
+        }
+        self._key: str = hashlib.sha256(
+            orjson.dumps(key_data, option=orjson.OPT_SORT_KEYS)
+        ).hexdigest()[:16]
+
+        if snapshot_dir is None:
+            snapshot_dir = REGISTRY_SNAPSHOTS_DIR
+        self._path: str = os.path.join(snapshot_dir, f"{self._key}.json")
+
+        self._snapshot: Union[RegistrySnapshot, None] = load_snapshot(
+            self._path, self._key
+        )
+        self._registries_loaded = threading.Event()
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def registries_loaded(self) -> bool:
+        return self._registries_loaded.is_set()
+
+    @property
+    def active(self) -> Union[RegistrySnapshot, None]:
+        """The snapshot to serve registry metadata from, 'None' if there is none, or the registries are loaded."""
+
+        if self._registries_loaded.is_set():
+            return None
+        return self._snapshot
+
+    def load_registries(self) -> RegistrySnapshot:
+        """Load all registries of the kiara context, and update the snapshot on disk if it's missing or outdated."""
+
+        snapshot = create_snapshot(
+            self._kiara_api, key=self._key, serializer=self._serializer
+        )
+        if self._snapshot is None or self._snapshot.model_dump(
+            exclude={"created"}
+        ) != snapshot.model_dump(exclude={"created"}):
+            save_snapshot(snapshot, self._path)
+        self._snapshot = snapshot
+        self._registries_loaded.set()
+        return snapshot
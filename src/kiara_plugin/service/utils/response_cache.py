@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+
+"""A persistent, on-disk cache for encoded (immutable) responses, shared by all service processes of a kiara context.
+
+Entries are stored in a SQLite database (in WAL mode, so several processes can read and write concurrently), and
+are evicted least-recently-used first once the cache exceeds its size limit. Large entries are stored in files next
+to the database, so they can be read in chunks.
+"""
+
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import IO, Any, AsyncIterator, Awaitable, Callable, List, Tuple, Union
+
+import anyio
+import orjson
+
+from kiara_plugin.service.utils.cache import CacheStats
+from kiara_plugin.service.utils.encoding import (
+    EncodedContent,
+    Serializer,
+    encode,
+    response_media_type,
+)
+
+ACCESS_TIME_RESOLUTION = 60
+"""Access times of entries are only updated if they are older than this (in seconds), to avoid writes on every hit."""
+
+EVICTION_TARGET = 0.9
+"""When the cache is full, entries are evicted until it's filled to this fraction of its size limit."""
+
+STREAM_CHUNK_SIZE = 256 * 1024
+"""The size of the chunks large responses are streamed from the cache in (in bytes)."""
+
+# 'body' is 'NULL' for entries that are stored in a file
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB,
+    file TEXT,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    items INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS responses_inserted AFTER INSERT ON responses BEGIN
+    UPDATE totals SET items = items + 1, bytes = bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_updated AFTER UPDATE OF size ON responses BEGIN
+    UPDATE totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_deleted AFTER DELETE ON responses BEGIN
+    UPDATE totals SET items = items - 1, bytes = bytes - OLD.size WHERE id = 0;
+END;
+"""
+
+
+def cache_key(kind: str, *parts: Any) -> str:
+    """Create a cache key from the (json-serializable) parts that identify an immutable response.
+
+    Arguments:
+        kind: the kind of response (e.g. 'lineage'), used as prefix of the key
+        parts: the ids and content hashes the response is derived from
+    """
+
+    digest = hashlib.sha256(
+        orjson.dumps(parts, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    ).hexdigest()
+    return f"{kind}:{digest}"
+
+
+class DiskCache(object):
+    """A thread- and process-safe, size-bounded key-value store for bytes, backed by a SQLite database.
+
+    Arguments:
+        path: the path of the database file, it's created if it doesn't exist
+        name: a name for this cache, used for reporting
+        max_bytes: the maximum size of all entries
+        max_item_bytes: entries larger than this are not stored, defaults to a quarter of 'max_bytes'
+        max_inline_bytes: entries larger than this are stored in files (in a folder next to the database)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        name: str = "responses",
+        max_bytes: int = 1024 * 1024 * 1024,
+        max_item_bytes: Union[int, None] = None,
+        max_inline_bytes: int = STREAM_CHUNK_SIZE,
+    ):
+
+        self._path: str = path
+        self._name: str = name
+        self._max_bytes: int = max_bytes
+        self._max_item_bytes: int = (
+            max_item_bytes if max_item_bytes is not None else max_bytes // 4
+        )
+        self._max_inline_bytes: int = max_inline_bytes
+        self._files_dir: str = f"{os.path.splitext(os.path.abspath(path))[0]}.files"
+        self._local = threading.local()
+
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+        os.makedirs(self._files_dir, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _connection(self) -> sqlite3.Connection:
+
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether an entry exists, without reading it."""
+
+        row = (
+            self._connection()
+            .execute("SELECT 1 FROM responses WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return row is not None
+
+    def get(self, key: str) -> Union[bytes, None]:
+
+        opened = self.open(key)
+        if opened is None:
+            return None
+        with opened[1] as f:
+            return f.read()
+
+    def open(self, key: str) -> Union[Tuple[int, IO[bytes]], None]:
+        """Open an entry, in order to read it in chunks.
+
+        Entries stored in files stay readable through the returned file object, even if they are evicted (or
+        replaced) in the meantime.
+
+        Returns:
+            the size of the entry and a file object to read it from (which the caller has to close), or 'None' if it doesn't exist
+        """
+
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT body, file, size, accessed FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self._misses += 1
+            return None
+
+        body, file_name, size, accessed = row
+        if file_name is None:
+            f: IO[bytes] = io.BytesIO(body)
+        else:
+            try:
+                f = open(os.path.join(self._files_dir, file_name), "rb")
+            except FileNotFoundError:
+                # removed by another process after the lookup
+                self._misses += 1
+                return None
+
+        self._hits += 1
+        self._touch(connection, key, accessed)
+        return size, f
+
+    def _touch(self, connection: sqlite3.Connection, key: str, accessed: float) -> None:
+
+        now = time.time()
+        if accessed < now - ACCESS_TIME_RESOLUTION:
+            connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+
+    def set(self, key: str, body: bytes) -> bool:
+        """Store an entry, evicting the least recently used entries if the cache gets too big.
+
+        Returns:
+            whether the entry was stored, entries that are larger than the item size limit are not
+        """
+
+        if len(body) > self._max_item_bytes:
+            return False
+
+        file_name: Union[str, None] = None
+        if len(body) > self._max_inline_bytes:
+            # a new file for every version of an entry, so readers of the previous one are not affected
+            file_name = (
+                f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.{uuid.uuid4().hex}"
+            )
+            file_path = os.path.join(self._files_dir, file_name)
+            with open(f"{file_path}.tmp", "wb") as f:
+                f.write(body)
+            os.replace(f"{file_path}.tmp", file_path)
+
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            replaced = self._files_of(connection, [key])
+            connection.execute(
+                """INSERT INTO responses (key, body, file, size, accessed) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET body = excluded.body, file = excluded.file, size = excluded.size,
+                accessed = excluded.accessed""",
+                (key, None if file_name else body, file_name, len(body), time.time()),
+            )
+        self._remove_files(replaced)
+        self._evict()
+        return True
+
+    def invalidate(self, key: str) -> None:
+
+        self._delete([key])
+
+    def clear(self) -> None:
+
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            files = [
+                row[0]
+                for row in connection.execute(
+                    "SELECT file FROM responses WHERE file IS NOT NULL"
+                )
+            ]
+            connection.execute("DELETE FROM responses")
+        self._remove_files(files)
+
+    def _files_of(self, connection: sqlite3.Connection, keys: List[str]) -> List[str]:
+
+        files = []
+        for key in keys:
+            row = connection.execute(
+                "SELECT file FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] is not None:
+                files.append(row[0])
+        return files
+
+    def _delete(self, keys: List[str]) -> None:
+
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            files = self._files_of(connection, keys)
+            connection.executemany(
+                "DELETE FROM responses WHERE key = ?", [(key,) for key in keys]
+            )
+        self._remove_files(files)
+
+    def _remove_files(self, file_names: List[str]) -> None:
+
+        for file_name in file_names:
+            try:
+                os.remove(os.path.join(self._files_dir, file_name))
+            except OSError:
+                # already removed by another process, or (on Windows) still open for reading
+                pass
+
+    def _totals(self) -> Tuple[int, int]:
+
+        return (
+            self._connection()
+            .execute("SELECT items, bytes FROM totals WHERE id = 0")
+            .fetchone()
+        )
+
+    def _evict(self) -> None:
+
+        _, total_bytes = self._totals()
+        if total_bytes <= self._max_bytes:
+            return
+
+        to_free = total_bytes - self._max_bytes * EVICTION_TARGET
+        evicted = []
+        cursor = self._connection().execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        )
+        for key, size in cursor:
+            evicted.append(key)
+            to_free -= size
+            if to_free <= 0:
+                break
+        cursor.close()
+
+        self._delete(evicted)
+        self._evictions += len(evicted)
+
+    @property
+    def stats(self) -> CacheStats:
+
+        items, total_bytes = self._totals()
+        return CacheStats(
+            name=self._name,
+            items=items,
+            max_items=None,
+            bytes=total_bytes,
+            max_bytes=self._max_bytes,
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+        )
+
+
+class EncodedStream(object):
+    """A (large) encoded response that is streamed from the cache in chunks."""
+
+    __slots__ = ("chunks", "media_type", "size")
+
+    def __init__(self, size: int, media_type: str, chunks: AsyncIterator[bytes]):
+
+        self.size: int = size
+        self.media_type: str = media_type
+        self.chunks: AsyncIterator[bytes] = chunks
+
+
+class ResponseCache(object):
+    """Caches the encoded bodies of immutable responses, in the media type negotiated for the current request.
+
+    If no disk cache is configured, responses are created on every request, and encoded as usual.
+
+    Arguments:
+        disk_cache: the (optional) store for encoded responses
+        serializer: a function to convert objects the encoders don't support natively (e.g. models)
+        namespace: a prefix for all keys, e.g. to separate responses created by different versions of kiara
+    """
+
+    def __init__(
+        self,
+        disk_cache: Union[DiskCache, None],
+        serializer: Union[Serializer, None] = None,
+        namespace: str = "",
+    ):
+
+        self._disk_cache: Union[DiskCache, None] = disk_cache
+        self._serializer: Union[Serializer, None] = serializer
+        self._namespace: str = namespace
+
+    @property
+    def disk_cache(self) -> Union[DiskCache, None]:
+        return self._disk_cache
+
+    def _full_key(self, key: str, media_type: str) -> str:
+        return f"{self._namespace}|{key}|{media_type}"
+
+    def contains(self, key: str) -> bool:
+        """Check whether a response is cached in the media type of the current request."""
+
+        if self._disk_cache is None:
+            return False
+        return self._full_key(key, response_media_type()) in self._disk_cache
+
+    async def _stream(self, f: IO[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+
+        try:
+            while True:
+                chunk = await anyio.to_thread.run_sync(f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            f.close()
+
+    async def get_or_create(
+        self,
+        key: Union[str, None],
+        factory: Callable[[], Awaitable[Any]],
+        stream_threshold: Union[int, None] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> Any:
+        """Return the cached response for a key, or create, encode and cache it.
+
+        Arguments:
+            key: the cache key (see `cache_key`), 'None' means the response can't be cached
+            factory: an async function that creates the (not yet encoded) response content
+            stream_threshold: if set, cached responses larger than this (in bytes) are returned as 'EncodedStream'
+            chunk_size: the size of the chunks to stream large responses in
+        """
+
+        if self._disk_cache is None or key is None:
+            return await factory()
+
+        media_type = response_media_type()
+        full_key = self._full_key(key, media_type)
+        body: Union[bytes, None] = None
+        if stream_threshold is None:
+            body = await anyio.to_thread.run_sync(self._disk_cache.get, full_key)
+        else:
+            opened = await anyio.to_thread.run_sync(self._disk_cache.open, full_key)
+            if opened is not None:
+                size, f = opened
+                if size > stream_threshold:
+                    # the open file keeps the entry readable, even if it's evicted while streaming
+                    return EncodedStream(
+                        size=size,
+                        media_type=media_type,
+                        chunks=self._stream(f, chunk_size),
+                    )
+                with f:
+                    body = await anyio.to_thread.run_sync(f.read)
+        if body is None:
+            content = await factory()
+            body = await anyio.to_thread.run_sync(
+                encode, content, media_type, self._serializer
+            )
+            await anyio.to_thread.run_sync(self._disk_cache.set, full_key, body)
+        return EncodedContent(body=body, media_type=media_type)
@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+
+"""Fixed-size random (or stratified) samples of the rows of tables, the items of arrays, and the tables of databases.
+
+Samples are drawn in a single pass over the data, in chunks (e.g. the record batches of an arrow table), with reservoir
+sampling ('Algorithm L'), so only the sampled items are ever converted to Python objects, and the number of random
+numbers needed grows only logarithmically with the number of items. Samples are deterministic for a given seed.
+
+Stratified samples allocate the sample size to the distinct values of a column proportionally (but with at least one
+item per value, if possible), which keeps rare values visible in previews. The number of items per value is counted
+first (e.g. with a 'GROUP BY' query), so every value only needs a reservoir for its share of the sample.
+"""
+
+import math
+import random
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from pydantic import BaseModel, Field
+
+MAX_SAMPLE_SIZE = 10000
+MAX_STRATA = 100
+SAMPLE_CHUNK_SIZE = 65536
+
+# a function that returns the (position, item) pairs of the provided offsets in a chunk
+Take = Callable[[Sequence[int]], Sequence[Tuple[int, Any]]]
+
+
+class SampledItems(BaseModel):
+    """A sample of the items (e.g. rows) of a value, or a table of a value."""
+
+    total: int = Field(description="The number of items the sample was drawn from.")
+    positions: List[int] = Field(
+        description="The positions of the sampled items in the data, in ascending order."
+    )
+    items: List[Any] = Field(description="The sampled items, in the same order.")
+
+
+class DataSample(BaseModel):
+    """A random, or stratified sample of the data of a value."""
+
+    value_id: str = Field(description="The id of the sampled value.")
+    value_hash: str = Field(description="The hash of the sampled value.")
+    data_type: str = Field(description="The data type of the sampled value.")
+    size: int = Field(description="The (maximum) number of items per sample.")
+    seed: int = Field(description="The seed of the random number generator.")
+    stratify_by: Union[str, None] = Field(
+        description="The column the sample was stratified by, 'None' for a simple random sample."
+    )
+    samples: Dict[str, SampledItems] = Field(
+        description="The samples, by table name ('rows' for tables, 'items' for arrays)."
+    )
+
+
+class Reservoir(object):
+    """A reservoir sample of fixed size over a stream of items, that is offered in chunks.
+
+    Arguments:
+        size: the number of items to sample
+        rng: the random number generator to use
+    """
+
+    def __init__(self, size: int, rng: random.Random):
+
+        if size < 1:
+            raise ValueError(f"Invalid sample size '{size}': must be positive.")
+
+        self._size: int = size
+        self._rng: random.Random = rng
+        self._slots: List[Tuple[int, Any]] = []
+        self._seen: int = 0
+
+        self._w: float = math.exp(math.log(self._uniform()) / size)
+        # the index of the next item that replaces one in the (full) reservoir
+        self._next: Union[int, None] = None
+
+    @property
+    def seen(self) -> int:
+        return self._seen
+
+    @property
+    def items(self) -> List[Tuple[int, Any]]:
+        """The sampled (position, item) pairs, in the order they were added."""
+        return list(self._slots)
+
+    def _uniform(self) -> float:
+
+        while True:
+            u = self._rng.random()
+            if u > 0.0:
+                return u
+
+    def _skip(self) -> int:
+        return int(math.log(self._uniform()) / math.log1p(-self._w)) + 1
+
+    def _select(self, length: int) -> Dict[int, int]:
+        """Select the slots the next items replace, as a map from slot to the offset of the item in the chunk."""
+
+        start = self._seen
+        end = start + length
+        assignments: Dict[int, int] = {}
+
+        index = start
+        while index < end and index < self._size:
+            assignments[index] = index - start
+            index += 1
+
+        if self._next is None and index >= self._size:
+            self._next = self._size - 1 + self._skip()
+
+        while self._next is not None and self._next < end:
+            assignments[self._rng.randrange(self._size)] = self._next - start
+            self._w *= math.exp(math.log(self._uniform()) / self._size)
+            self._next += self._skip()
+
+        self._seen = end
+        return assignments
+
+    def add(self, length: int, take: Take) -> None:
+        """Offer the next chunk of items to the reservoir.
+
+        Arguments:
+            length: the number of items in the chunk
+            take: a function that returns the (position, item) pairs of the provided offsets in the chunk, it's only
+                called for the items that are actually sampled
+        """
+
+        assignments = self._select(length)
+        if not assignments:
+            return
+
+        selected = take(list(assignments.values()))
+        for slot, item in zip(assignments.keys(), selected):
+            if slot < len(self._slots):
+                self._slots[slot] = item
+            else:
+                self._slots.append(item)
+
+
+def allocate_sample(counts: Mapping[Hashable, int], size: int) -> Dict[Hashable, int]:
+    """Allocate a sample size to strata proportionally to their sizes (largest remainder method).
+
+    Every stratum gets at least one item, as long as there are no more strata than the sample size.
+
+    Arguments:
+        counts: the number of items per stratum
+        size: the total sample size
+
+    Returns:
+        the number of items to sample per stratum
+    """
+
+    total = sum(counts.values())
+    if total <= size:
+        return dict(counts)
+
+    allocation: Dict[Hashable, int] = {k: 0 for k in counts}
+    if len(counts) <= size:
+        allocation = {k: 1 for k in counts}
+
+    remaining = size - sum(allocation.values())
+    capacity = {k: counts[k] - allocation[k] for k in counts}
+    capacity_total = sum(capacity.values())
+    if remaining <= 0 or capacity_total <= 0:
+        return allocation
+
+    shares = {k: remaining * c / capacity_total for k, c in capacity.items()}
+    for k, share in shares.items():
+        allocation[k] += int(share)
+
+    missing = size - sum(allocation.values())
+    by_remainder = sorted(
+        shares, key=lambda k: shares[k] - int(shares[k]), reverse=True
+    )
+    for k in by_remainder[:missing]:
+        allocation[k] += 1
+    return allocation
+
+
+def _hashable(value: Any) -> Hashable:
+
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class Sampler(object):
+    """Draws a random, or stratified sample from a stream of chunks.
+
+    Arguments:
+        size: the sample size
+        seed: the seed of the random number generator
+        strata_counts: the number of items per stratum (distinct value) for stratified samples, in which case every
+            chunk must provide the stratum of its items
+        max_strata: the maximum number of strata, since every stratum needs its own reservoir
+    """
+
+    def __init__(
+        self,
+        size: int,
+        seed: int = 0,
+        strata_counts: Union[Mapping[Any, int], None] = None,
+        max_strata: int = MAX_STRATA,
+    ):
+
+        self._size: int = size
+        self._rng: random.Random = random.Random(seed)  # noqa: S311
+        self._position: int = 0
+
+        self._reservoir: Union[Reservoir, None] = None
+        self._strata: Dict[Hashable, Union[Reservoir, None]] = {}
+        if strata_counts is None:
+            self._reservoir = Reservoir(size, self._rng)
+            return
+
+        if len(strata_counts) > max_strata:
+            raise ValueError(
+                f"Can't create stratified sample: more than {max_strata} distinct values."
+            )
+        # sorted, so the sample doesn't depend on the order the strata were counted in
+        counts = {
+            _hashable(k): c
+            for k, c in sorted(strata_counts.items(), key=lambda kc: repr(kc[0]))
+        }
+        for stratum, stratum_size in allocate_sample(counts, size).items():
+            # strata without share in the sample are skipped
+            self._strata[stratum] = (
+                Reservoir(stratum_size, self._rng) if stratum_size else None
+            )
+
+    def add(
+        self,
+        length: int,
+        take: Callable[[Sequence[int]], Sequence[Any]],
+        strata: Union[Sequence[Any], None] = None,
+    ) -> None:
+        """Offer the next chunk of items to the sampler.
+
+        Arguments:
+            length: the number of items in the chunk
+            take: a function that returns the items at the provided offsets in the chunk
+            strata: the stratum of every item in the chunk, required for stratified samples
+        """
+
+        start = self._position
+        self._position += length
+
+        def take_offsets(offsets: Sequence[int]) -> List[Tuple[int, Any]]:
+            return list(zip((start + o for o in offsets), take(offsets)))
+
+        if self._reservoir is not None:
+            self._reservoir.add(length, take_offsets)
+            return
+
+        if strata is None:
+            raise ValueError(
+                "Can't add chunk to stratified sample: no strata provided."
+            )
+
+        offsets_by_stratum: Dict[Hashable, List[int]] = {}
+        for offset, stratum in enumerate(strata):
+            offsets_by_stratum.setdefault(_hashable(stratum), []).append(offset)
+
+        for stratum, offsets in offsets_by_stratum.items():
+            if stratum not in self._strata:
+                raise ValueError(
+                    f"Can't add chunk to stratified sample: value '{stratum}' was not counted."
+                )
+            reservoir = self._strata[stratum]
+            if reservoir is None:
+                continue
+
+            def take_stratum(
+                indexes: Sequence[int], _offsets: List[int] = offsets
+            ) -> List[Tuple[int, Any]]:
+                return take_offsets([_offsets[i] for i in indexes])
+
+            reservoir.add(len(offsets), take_stratum)
+
+    def result(self) -> SampledItems:
+
+        if self._reservoir is not None:
+            sampled = self._reservoir.items
+        else:
+            sampled = []
+            for reservoir in self._strata.values():
+                if reservoir is not None:
+                    sampled.extend(reservoir.items)
+
+        sampled.sort(key=lambda item: item[0])
+        return SampledItems(
+            total=self._position,
+            positions=[position for position, _ in sampled],
+            items=[item for _, item in sampled],
+        )
+
+
+def _arrow_chunks(
+    data: Any, chunk_size: int
+) -> Iterator[Tuple[int, Callable[[Sequence[int]], Sequence[Any]], Any]]:
+    """Split an arrow table or array into chunks of (length, take function, chunk)."""
+
+    if hasattr(data, "to_batches"):
+        chunks: Iterable[Any] = data.to_batches(max_chunksize=chunk_size)
+    elif hasattr(data, "chunks"):
+        chunks = data.chunks
+    else:
+        chunks = [data]
+
+    for chunk in chunks:
+        for start in range(0, len(chunk), chunk_size):
+            part = chunk.slice(start, chunk_size)
+
+            def take(offsets: Sequence[int], _part: Any = part) -> List[Any]:
+                return _part.take(list(offsets)).to_pylist()
+
+            yield len(part), take, part
+
+
+def sample_arrow(
+    data: Any,
+    size: int,
+    seed: int = 0,
+    stratify_by: Union[str, None] = None,
+    chunk_size: int = SAMPLE_CHUNK_SIZE,
+) -> SampledItems:
+    """Sample the rows of an arrow table (as dicts), or the items of an arrow array.
+
+    Arguments:
+        data: a 'pyarrow.Table', 'pyarrow.RecordBatch', 'pyarrow.Array' or 'pyarrow.ChunkedArray'
+        size: the sample size
+        seed: the seed of the random number generator
+        stratify_by: the name of the column to stratify the sample by (tables only)
+        chunk_size: the maximum number of items to process at once
+    """
+
+    if stratify_by is not None:
+        column_names = getattr(data, "column_names", None)
+        if column_names is None:
+            raise ValueError("Can't create stratified sample: data has no columns.")
+        if stratify_by not in column_names:
+            raise ValueError(
+                f"Can't create stratified sample: no column '{stratify_by}', available: {', '.join(column_names)}."
+            )
+
+    strata_counts = None
+    if stratify_by is not None:
+        import pyarrow.compute as pc
+
+        strata_counts = {
+            c["values"]: c["counts"]
+            for c in pc.value_counts(data.column(stratify_by)).to_pylist()
+        }
+
+    sampler = Sampler(size=size, seed=seed, strata_counts=strata_counts)
+    for length, take, chunk in _arrow_chunks(data, chunk_size):
+        strata = None
+        if stratify_by is not None:
+            strata = chunk.column(chunk.schema.get_field_index(stratify_by)).to_pylist()
+        sampler.add(length, take, strata=strata)
+    return sampler.result()
+
+
+def sample_rows(
+    rows: Iterable[Sequence[Mapping[str, Any]]],
+    size: int,
+    seed: int = 0,
+    stratify_by: Union[str, None] = None,
+    strata_counts: Union[Mapping[Any, int], None] = None,
+) -> SampledItems:
+    """Sample rows (dicts) that are provided in chunks, e.g. the partitions of a database query result.
+
+    Stratified samples require the number of rows per value of the 'stratify_by' column ('strata_counts').
+    """
+
+    if stratify_by is not None and strata_counts is None:
+        raise ValueError(
+            "Can't create stratified sample: number of rows per value not provided."
+        )
+
+    sampler = Sampler(size=size, seed=seed, strata_counts=strata_counts)
+    for chunk in rows:
+        strata = None
+        if stratify_by is not None:
+            try:
+                strata = [row[stratify_by] for row in chunk]
+            except KeyError:
+                raise ValueError(
+                    f"Can't create stratified sample: no column '{stratify_by}'."
+                )
+
+        def take(offsets: Sequence[int], _chunk: Sequence[Any] = chunk) -> List[Any]:
+            return [dict(_chunk[o]) for o in offsets]
+
+        sampler.add(len(chunk), take, strata=strata)
+    return sampler.result()
+
+
+def _sample_database(
+    database: Any,
+    size: int,
+    seed: int,
+    stratify_by: Union[str, None],
+    chunk_size: int,
+) -> Dict[str, SampledItems]:
+
+    from sqlalchemy import column, func, inspect, select, table
+
+    engine = database.get_sqlalchemy_engine()
+    inspector = inspect(engine)
+    samples = {}
+    for table_name in sorted(database.table_names):
+        # identifiers are quoted by sqlalchemy
+        column_names = [c["name"] for c in inspector.get_columns(table_name)]
+        _table = table(table_name, *(column(c) for c in column_names))
+
+        with engine.connect() as conn:
+            strata_counts = None
+            if stratify_by is not None:
+                if stratify_by not in column_names:
+                    raise ValueError(
+                        f"Can't create stratified sample: no column '{stratify_by}' in table '{table_name}', available: {', '.join(column_names)}."
+                    )
+                stratum = _table.c[stratify_by]
+                strata_counts = dict(
+                    conn.execute(select(stratum, func.count()).group_by(stratum)).all()
+                )
+
+            result = conn.execution_options(stream_results=True).execute(select(_table))
+            rows = ([r._mapping for r in p] for p in result.partitions(chunk_size))
+            samples[table_name] = sample_rows(
+                rows,
+                size=size,
+                seed=seed,
+                stratify_by=stratify_by,
+                strata_counts=strata_counts,
+            )
+    return samples
+
+
+def sample_data(
+    data: Any,
+    size: int,
+    seed: int = 0,
+    stratify_by: Union[str, None] = None,
+    chunk_size: int = SAMPLE_CHUNK_SIZE,
+) -> Dict[str, SampledItems]:
+    """Sample the data of a (table, array, database or network data) value.
+
+    Arguments:
+        data: the data of the value, e.g. a 'KiaraTable', 'KiaraArray' or 'KiaraDatabase' instance
+        size: the sample size (per table, for data that consists of several tables)
+        seed: the seed of the random number generator
+        stratify_by: the name of the column to stratify the sample by
+        chunk_size: the maximum number of items to process at once
+
+    Returns:
+        the samples, by table name ('rows' for tables, 'items' for arrays)
+    """
+
+    if hasattr(data, "arrow_table"):
+        return {
+            "rows": sample_arrow(
+                data.arrow_table,
+                size=size,
+                seed=seed,
+                stratify_by=stratify_by,
+                chunk_size=chunk_size,
+            )
+        }
+    if hasattr(data, "arrow_array"):
+        return {
+            "items": sample_arrow(
+                data.arrow_array,
+                size=size,
+                seed=seed,
+                stratify_by=stratify_by,
+                chunk_size=chunk_size,
+            )
+        }
+
+    tables = {
+        name: getattr(data, name, None) for name in ("nodes", "edges")
+    }  # network data
+    if all(hasattr(table, "arrow_table") for table in tables.values()):
+        return {
+            name: sample_arrow(
+                table.arrow_table,  # type: ignore
+                size=size,
+                seed=seed,
+                stratify_by=stratify_by,
+                chunk_size=chunk_size,
+            )
+            for name, table in tables.items()
+        }
+
+    if hasattr(data, "get_sqlalchemy_engine") and hasattr(data, "table_names"):
+        return _sample_database(
+            data,
+            size=size,
+            seed=seed,
+            stratify_by=stratify_by,
+            chunk_size=chunk_size,
+        )
+
+    raise ValueError(
+        f"Can't sample data of type '{type(data).__name__}': only tables, arrays and databases are supported."
+    )
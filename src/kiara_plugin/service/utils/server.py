@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""Run an ASGI app on a TCP or Unix domain socket listener, over HTTP/1.1 (uvicorn) or HTTP/2 (hypercorn).
+
+HTTP/2 requires the 'hypercorn' package, it's served in cleartext ('h2c'), with support for both the 'Upgrade'
+mechanism and prior knowledge. HTTP/1.1 clients can connect to HTTP/2 listeners too.
+"""
+
+import socket
+from typing import Any, Union
+
+import anyio
+import httpx
+from pydantic import BaseModel, Field
+
+
+class ListenerConfig(BaseModel):
+    """Where and how a service listens for requests."""
+
+    host: str = Field(description="The host to bind to.", default="localhost")
+    port: int = Field(description="The port to bind to.", default=8080)
+    uds: Union[str, None] = Field(
+        description="The path of a Unix domain socket to listen on, instead of host and port.",
+        default=None,
+    )
+    http2: bool = Field(
+        description="Whether to serve HTTP/2 (cleartext), in addition to HTTP/1.1.",
+        default=False,
+    )
+    keep_alive_timeout: int = Field(
+        description="The number of seconds to keep idle connections open.",
+        default=5,
+        ge=0,
+    )
+    backlog: int = Field(
+        description="The maximum number of pending connections.", default=2048, ge=1
+    )
+
+    @property
+    def base_url(self) -> str:
+
+        if self.uds:
+            return "http://localhost"
+        return f"http://{self.host}:{self.port}"
+
+
+def find_free_port(host: str = "localhost") -> int:
+    """Find a TCP port that's currently not in use."""
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+async def serve(
+    app: Any, listener: ListenerConfig, shutdown: Union[anyio.Event, None] = None
+) -> None:
+    """Serve an ASGI app (on the asyncio event loop), until the 'shutdown' event is set, or the process is interrupted.
+
+    Arguments:
+        app: the ASGI app
+        listener: where and how to listen
+        shutdown: an (optional) event that stops the server
+    """
+
+    if listener.http2:
+        from hypercorn.asyncio import serve as hypercorn_serve
+        from hypercorn.config import Config as HypercornConfig
+
+        config = HypercornConfig()
+        config.bind = [
+            f"unix:{listener.uds}"
+            if listener.uds
+            else f"{listener.host}:{listener.port}"
+        ]
+        config.keep_alive_timeout = listener.keep_alive_timeout
+        config.backlog = listener.backlog
+        config.accesslog = None
+
+        if shutdown is None:
+            await hypercorn_serve(app, config)
+        else:
+            await hypercorn_serve(app, config, shutdown_trigger=shutdown.wait)
+        return
+
+    import uvicorn
+
+    uvicorn_config = uvicorn.Config(
+        app=app,
+        host=listener.host,
+        port=listener.port,
+        uds=listener.uds,
+        timeout_keep_alive=listener.keep_alive_timeout,
+        backlog=listener.backlog,
+        log_level="info",
+    )
+    server = uvicorn.Server(config=uvicorn_config)
+    if shutdown is None:
+        await server.serve()
+        return
+
+    async def stop_on_shutdown() -> None:
+
+        await shutdown.wait()
+        server.should_exit = True
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(stop_on_shutdown)
+        await server.serve()
+        tg.cancel_scope.cancel()
+
+
+def run_server(app: Any, listener: ListenerConfig) -> None:
+    """Serve an ASGI app until the process is interrupted, using uvloop if it's installed."""
+
+    import asyncio
+
+    try:
+        import uvloop
+
+        uvloop.install()
+    except Exception:
+        pass
+
+    asyncio.run(serve(app, listener))
+
+
+def create_client(listener: ListenerConfig, **kwargs: Any) -> httpx.AsyncClient:
+    """Create an http client for a listener, using HTTP/2 (with prior knowledge) if the listener supports it.
+
+    HTTP/2 clients require the 'h2' package.
+    """
+
+    transport = httpx.AsyncHTTPTransport(
+        uds=listener.uds, http1=not listener.http2, http2=listener.http2
+    )
+    return httpx.AsyncClient(transport=transport, base_url=listener.base_url, **kwargs)
+
+
+async def wait_until_listening(
+    listener: ListenerConfig, timeout: float = 30, path: str = "/"
+) -> None:
+    """Wait until a listener accepts requests.
+
+    Arguments:
+        listener: the listener to wait for
+        timeout: the maximum number of seconds to wait
+        path: the path to request
+    """
+
+    with anyio.fail_after(timeout):
+        async with create_client(listener) as client:
+            while True:
+                try:
+                    await client.get(path)
+                    return
+                except httpx.TransportError:
+                    await anyio.sleep(0.05)
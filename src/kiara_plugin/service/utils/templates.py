@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""Faster rendering of (jinja) templates: precompilation, a persistent bytecode cache, and caching of rendered fragments.
+
+Compiling a template is much more expensive than rendering it, so all templates are compiled once at startup, and the
+compiled bytecode is kept on disk so restarts don't have to compile them again. Fragments that are rendered from
+immutable inputs only (e.g. the result view of a finished job) are cached, so they are rendered only once.
+
+Template globals that depend on the request (the kiara api of its context, and the root path URLs are relative to)
+are looked up per request, so the services of several kiara contexts can share one environment.
+"""
+
+import os
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Mapping, Tuple, Union
+
+import structlog
+from jinja2 import Environment, FileSystemBytecodeCache
+
+from kiara_plugin.service.defaults import kiara_html_app_dirs
+from kiara_plugin.service.utils.cache import LRUCache
+
+logger = structlog.getLogger()
+
+TEMPLATE_BYTECODE_CACHE_DIR = os.path.join(
+    kiara_html_app_dirs.user_cache_dir, "template_bytecode"
+)
+
+_request_globals: ContextVar[Union[Mapping[str, Any], None]] = ContextVar(
+    "template_request_globals", default=None
+)
+
+
+def url(path: str) -> str:
+    """Create the URL of a service path, below the root path of the current request.
+
+    Templates use this for all links, so they also work for the contexts of a multi-context service (which are
+    served below '/contexts/<context_name>').
+    """
+
+    request_globals = _request_globals.get() or {}
+    return f"{request_globals.get('root_path', '')}{path}"
+
+
+class RequestGlobal(object):
+    """A template global that stands for an object of the current request, e.g. the kiara api of its context.
+
+    Arguments:
+        name: the name of the object, as passed to 'TemplateGlobalsMiddleware'
+    """
+
+    def __init__(self, name: str):
+
+        self._name: str = name
+
+    def __getattr__(self, attr: str) -> Any:
+
+        request_globals = _request_globals.get() or {}
+        if self._name not in request_globals:
+            raise AttributeError(
+                f"Template global '{self._name}' is only available while handling a request."
+            )
+        return getattr(request_globals[self._name], attr)
+
+
+class TemplateGlobalsMiddleware(object):
+    """ASGI middleware that provides the request-specific template globals (see `url` and `RequestGlobal`).
+
+    Arguments:
+        app: the ASGI app
+        values: the objects 'RequestGlobal's refer to, by name
+    """
+
+    def __init__(self, app: Any, **values: Any):
+
+        self.app = app
+        self.values: Dict[str, Any] = values
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_globals.set(
+            {**self.values, "root_path": scope.get("root_path", "")}
+        )
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_globals.reset(token)
+
+
+def enable_bytecode_cache(
+    environment: Environment, cache_dir: Union[str, None] = None
+) -> str:
+    """Keep the compiled bytecode of the templates of an environment on disk.
+
+    Cached bytecode is invalidated automatically if the source of a template changes.
+
+    Arguments:
+        environment: the jinja environment
+        cache_dir: the folder to store the bytecode in, defaults to a folder in the user cache dir
+
+    Returns:
+        the bytecode cache folder
+    """
+
+    if cache_dir is None:
+        cache_dir = TEMPLATE_BYTECODE_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    environment.bytecode_cache = FileSystemBytecodeCache(directory=cache_dir)
+    return cache_dir
+
+
+def precompile_templates(
+    environment: Environment,
+    prefixes: Union[Tuple[str, ...], None] = None,
+    extensions: Tuple[str, ...] = (".html",),
+) -> int:
+    """Load (and thus compile) all templates of an environment into its template cache.
+
+    Arguments:
+        environment: the jinja environment
+        prefixes: only compile templates whose names start with one of these prefixes, 'None' means all templates
+        extensions: only compile templates with one of these file extensions
+
+    Returns:
+        the number of compiled templates
+    """
+
+    def include(name: str) -> bool:
+
+        if not name.endswith(extensions):
+            return False
+        return prefixes is None or name.startswith(prefixes)
+
+    compiled = 0
+    for name in environment.list_templates(filter_func=include):
+        try:
+            environment.get_template(name)
+            compiled += 1
+        except Exception as e:
+            logger.warning("template.compile_failed", template=name, error=str(e))
+    return compiled
+
+
+class FragmentCache(object):
+    """Caches rendered template fragments, keyed by template name and the ids (and hashes) of their immutable inputs.
+
+    Arguments:
+        environment: the jinja environment to load templates from
+        max_items: the maximum number of fragments to keep
+    """
+
+    def __init__(self, environment: Environment, max_items: Union[int, None] = 1024):
+
+        self._environment: Environment = environment
+        self._fragments: LRUCache[Hashable, str] = LRUCache(
+            name="template_fragments", max_items=max_items
+        )
+
+    @property
+    def cache(self) -> LRUCache[Hashable, str]:
+        return self._fragments
+
+    def render(
+        self,
+        template_name: str,
+        context: Union[Mapping[str, Any], Callable[[], Mapping[str, Any]]],
+        key: Union[Tuple[Hashable, ...], None] = None,
+    ) -> str:
+        """Render a template, or return the fragment that was rendered for the same template and key before.
+
+        Arguments:
+            template_name: the name of the template
+            context: the template context, or a function that creates it (only called if the fragment isn't cached)
+            key: the ids and hashes of all inputs of the fragment, 'None' if the fragment can't be cached because
+                some of its inputs are mutable
+        """
+
+        def render_fragment() -> str:
+
+            _context = context() if callable(context) else context
+            return self._environment.get_template(template_name).render(**_context)
+
+        if key is None:
+            return render_fragment()
+        # the links in a fragment depend on the root path of the request
+        return self._fragments.get_or_create(
+            (template_name, url(""), *key), render_fragment
+        )
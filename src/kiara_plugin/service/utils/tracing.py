@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+
+"""Lightweight, sampled request tracing, with traces exported in the OpenTelemetry (OTLP/JSON) format.
+
+A trace is started for a (sampled) request by 'TracingMiddleware', code that runs while handling the request can add
+nested spans using 'trace_span'. The current span is tracked in a context variable, which means spans also nest
+correctly for work that runs in worker threads (via 'anyio.to_thread'). Outside of a sampled request, 'trace_span' is
+(almost) free.
+"""
+
+import collections
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Mapping, Union
+
+import anyio
+import orjson
+
+TRACEPARENT_HEADER = "traceparent"
+"""The W3C trace context header, used to continue traces from (and report them to) clients."""
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+STATUS_CODE_UNSET = 0
+STATUS_CODE_ERROR = 2
+
+_TRACEPARENT_REGEX = re.compile(
+    r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$", re.IGNORECASE
+)
+
+_current_span: ContextVar[Union["Span", None]] = ContextVar(
+    "kiara_service_current_span", default=None
+)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    elif isinstance(value, int):
+        return {"intValue": str(value)}
+    elif isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span(object):
+    """A timed operation within a trace."""
+
+    __slots__ = (
+        "trace",
+        "span_id",
+        "parent",
+        "name",
+        "kind",
+        "attributes",
+        "start_time",
+        "end_time",
+        "error",
+    )
+
+    def __init__(
+        self,
+        trace: "Trace",
+        name: str,
+        parent: Union["Span", None] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Union[Mapping[str, Any], None] = None,
+    ):
+
+        self.trace: Trace = trace
+        self.span_id: str = os.urandom(8).hex()
+        self.parent: Union[Span, None] = parent
+        self.name: str = name
+        self.kind: int = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_time: int = time.time_ns()
+        self.end_time: Union[int, None] = None
+        self.error: Union[str, None] = None
+
+        trace.spans.append(self)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_time is None:
+            self.end_time = time.time_ns()
+
+    def to_otlp(self) -> Dict[str, Any]:
+
+        if self.parent is not None:
+            parent_span_id = self.parent.span_id
+        else:
+            parent_span_id = self.trace.parent_span_id or ""
+
+        result: Dict[str, Any] = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time or self.start_time),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()
+            ],
+            "status": {"code": STATUS_CODE_UNSET},
+        }
+        if self.error is not None:
+            result["status"] = {"code": STATUS_CODE_ERROR, "message": self.error}
+        return result
+
+
+class Trace(object):
+    """All spans that were recorded while handling a single request."""
+
+    def __init__(self, trace_id: str, parent_span_id: Union[str, None] = None):
+
+        self.trace_id: str = trace_id
+        self.parent_span_id: Union[str, None] = parent_span_id
+        self.spans: List[Span] = []
+
+
+class Tracer(object):
+    """Samples requests, and collects their traces in a ring buffer and (optionally) a file.
+
+    The trace file contains one OTLP/JSON 'TracesData' document per line (as written by the OpenTelemetry collector's
+    file exporter), so it can be imported by OpenTelemetry tooling.
+
+    Arguments:
+        sample_rate: the fraction of requests to trace, requests with a sampled 'traceparent' header are always traced
+        buffer_size: the number of most recent traces to keep in memory
+        trace_file: the (optional) file to append traces to
+        service_name: the service name to report
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        buffer_size: int = 100,
+        trace_file: Union[str, None] = None,
+        service_name: str = "kiara-service",
+    ):
+
+        self._sample_rate: float = sample_rate
+        self._trace_file: Union[str, None] = trace_file
+        self._service_name: str = service_name
+        self._traces: Deque[Dict[str, Any]] = collections.deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._random = secrets.SystemRandom()
+
+    def start_trace(
+        self,
+        name: str,
+        attributes: Union[Mapping[str, Any], None] = None,
+        traceparent: Union[str, None] = None,
+    ) -> Union[Span, None]:
+        """Start a new trace with a root (server) span, or return 'None' if the request is not sampled."""
+
+        match = _TRACEPARENT_REGEX.match(traceparent) if traceparent else None
+        if match is not None and int(match.group(3), 16) & 1:
+            trace = Trace(
+                trace_id=match.group(1).lower(), parent_span_id=match.group(2).lower()
+            )
+        elif self._random.random() < self._sample_rate:
+            trace = Trace(trace_id=os.urandom(16).hex())
+        else:
+            return None
+
+        return Span(
+            trace=trace, name=name, kind=SPAN_KIND_SERVER, attributes=attributes
+        )
+
+    async def finish_trace(self, root: Span) -> None:
+        """End the root span (and any span that wasn't ended properly), and export the trace.
+
+        The trace file is appended to in a worker thread, so the event loop doesn't wait for the disk.
+        """
+
+        root.end()
+        for span in root.trace.spans:
+            if span.end_time is None:
+                span.end_time = root.end_time
+
+        traces_data = self._create_traces_data([root.trace])
+        with self._lock:
+            self._traces.append(traces_data)
+        if self._trace_file:
+            # the trace is written even if the request was cancelled
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(self._write_trace, traces_data)
+
+    def _write_trace(self, traces_data: Dict[str, Any]) -> None:
+
+        assert self._trace_file is not None
+        line = orjson.dumps(traces_data) + b"\n"
+        with self._file_lock:
+            with open(self._trace_file, "ab") as f:
+                f.write(line)
+
+    def _create_traces_data(self, traces: List[Trace]) -> Dict[str, Any]:
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self._service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "kiara_plugin.service"},
+                            "spans": [
+                                span.to_otlp()
+                                for trace in traces
+                                for span in trace.spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def get_traces(
+        self, limit: Union[int, None] = None, trace_id: Union[str, None] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the most recent traces (newest first), as OTLP/JSON 'TracesData' documents."""
+
+        with self._lock:
+            traces = list(reversed(self._traces))
+        if trace_id is not None:
+            traces = [
+                t
+                for t in traces
+                if t["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["traceId"]
+                == trace_id
+            ]
+        return traces[:limit] if limit is not None else traces
+
+
+def current_span() -> Union[Span, None]:
+    return _current_span.get()
+
+
+@contextmanager
+def trace_span(name: str, **attributes: Any) -> Iterator[Union[Span, None]]:
+    """Record a (nested) span, if the current request is traced, otherwise do nothing."""
+
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    span = Span(trace=parent.trace, name=name, parent=parent, attributes=attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def start_span(name: str, **attributes: Any) -> Union[Span, None]:
+    """Start a (nested) span and make it the current one, if the current request is traced.
+
+    This is for code that can't use 'trace_span' (e.g. request hooks), the span must be ended with 'end_span'.
+    """
+
+    parent = _current_span.get()
+    if parent is None:
+        return None
+
+    span = Span(trace=parent.trace, name=name, parent=parent, attributes=attributes)
+    _current_span.set(span)
+    return span
+
+
+def end_span(span: Union[Span, None]) -> None:
+    """End a span that was started with 'start_span', and make its parent the current span again."""
+
+    if span is None:
+        return
+    span.end()
+    if _current_span.get() is span:
+        _current_span.set(span.parent)
+
+
+class TracingMiddleware(object):
+    """ASGI middleware that starts a trace for every sampled http request.
+
+    Sampled responses contain a 'traceparent' header, which can be used to look up the trace.
+    """
+
+    def __init__(self, app: Any, tracer: Tracer):
+
+        self.app = app
+        self.tracer: Tracer = tracer
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        attributes = {"http.method": scope["method"], "http.target": scope["path"]}
+        name = f"{scope['method']} {scope['path']}"
+
+        if _current_span.get() is not None:
+            # an in-process request (e.g. from a batch), which is part of the current trace
+            with trace_span(name, **attributes):
+                await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", []):
+            if key == TRACEPARENT_HEADER.encode():
+                traceparent = value.decode("latin-1")
+                break
+
+        root = self.tracer.start_trace(
+            name=name, attributes=attributes, traceparent=traceparent
+        )
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_traceparent = f"00-{root.trace.trace_id}-{root.span_id}-01".encode()
+
+        async def send_traced(message: Any) -> None:
+
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                message = dict(message)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (TRACEPARENT_HEADER.encode(), response_traceparent),
+                ]
+            await send(message)
+
+        token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_traced)
+        except BaseException as e:
+            root.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            await self.tracer.finish_trace(root)
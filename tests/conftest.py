@@ -21,6 +21,7 @@ from kiara.context import KiaraConfig
 from kiara.interfaces.python_api import KiaraAPI
 from kiara.interfaces.python_api.models.job import JobTest
 from kiara.utils.testing import get_tests_for_job, list_job_descs
+from kiara_plugin.service.config import KiaraServiceConfig
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 JOBS_FOLDER = Path(os.path.join(ROOT_DIR, "examples", "jobs"))
@@ -72,3 +73,15 @@ def example_pipelines_folder() -> Path:
 @pytest.fixture()
 def tests_resources_folder() -> Path:
     return Path(os.path.join(ROOT_DIR, "tests"))
+
+
+@pytest.fixture
+def service_config(tmp_path: Path) -> KiaraServiceConfig:
+    """A service configuration that keeps all files the service writes in a temporary folder."""
+
+    return KiaraServiceConfig(
+        upload_staging_dir=str(tmp_path / "uploads"),
+        response_cache_dir=str(tmp_path / "responses"),
+        registry_snapshot_dir=str(tmp_path / "snapshots"),
+        template_bytecode_cache_dir=str(tmp_path / "templates"),
+    )
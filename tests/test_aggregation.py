@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the aggregate queries in `kiara_plugin.service.utils.aggregation`."""
+
+import sys
+
+import pytest
+
+from kiara_plugin.service.utils.aggregation import (
+    AggregateQuery,
+    Aggregation,
+    aggregate_table,
+    create_sql,
+    validate_query,
+)
+
+COLUMNS = ["city", "year", "amount"]
+
+
+@pytest.fixture(params=["duckdb", "pyarrow"])
+def engine(request, monkeypatch) -> str:
+    """Run a test with both aggregation engines, pyarrow is used if DuckDB isn't importable."""
+
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+    else:
+        monkeypatch.setitem(sys.modules, "duckdb", None)
+    return request.param
+
+
+def test_validate_query():
+
+    validate_query(AggregateQuery(group_by=["city"]), COLUMNS)
+
+    invalid = [
+        AggregateQuery(group_by=["country"]),
+        AggregateQuery(aggregations=[Aggregation(function="sum", column="price")]),
+        AggregateQuery(aggregations=[Aggregation(function="sum")]),
+        AggregateQuery(
+            group_by=["city"],
+            aggregations=[Aggregation(function="count", alias="city")],
+        ),
+    ]
+    for query in invalid:
+        with pytest.raises(ValueError):
+            validate_query(query, COLUMNS)
+
+
+def test_create_sql():
+
+    query = AggregateQuery(
+        group_by=["city", "year"],
+        aggregations=[
+            Aggregation(function="count"),
+            Aggregation(function="count_distinct", column="amount", alias='a"b'),
+        ],
+        limit=10,
+    )
+    assert create_sql(query, "data") == (
+        'SELECT "city", "year", COUNT(*) AS "count", COUNT(DISTINCT "amount") AS "a""b", '
+        'COUNT(*) OVER () AS "__num_groups" FROM "data" GROUP BY "city", "year" '
+        'ORDER BY "city" NULLS LAST, "year" NULLS LAST LIMIT 11'
+    )
+
+    query = AggregateQuery(aggregations=[Aggregation(function="max", column="year")])
+    assert create_sql(query, "data") == (
+        'SELECT MAX("year") AS "year_max" FROM "data" LIMIT 1001'
+    )
+
+
+def test_aggregate_table(engine: str):
+
+    pa = pytest.importorskip("pyarrow")
+
+    table = pa.table(
+        {
+            "city": ["a", "b", "a", "c", "a", None],
+            "year": [2020, 2021, 2021, 2020, 2021, 2022],
+            "amount": [1, 2, 3, 4, 5, 6],
+        }
+    )
+    query = AggregateQuery(
+        group_by=["city"],
+        aggregations=[
+            Aggregation(function="count"),
+            Aggregation(function="sum", column="amount"),
+            Aggregation(function="min", column="year"),
+            Aggregation(function="count_distinct", column="year", alias="years"),
+        ],
+        limit=2,
+    )
+
+    result = aggregate_table(table, query)
+    assert result.engine == engine
+    assert result.columns == ["city", "count", "amount_sum", "year_min", "years"]
+    assert result.rows == [["a", 3, 9, 2020, 2], ["b", 1, 2, 2021, 1]]
+    assert result.num_groups == 4
+    assert result.truncated
+
+    result = aggregate_table(
+        table,
+        AggregateQuery(aggregations=[Aggregation(function="max", column="amount")]),
+    )
+    assert result.rows == [[6]]
+    assert not result.truncated
+
+    result = aggregate_table(table, query.model_copy(update={"limit": 10}))
+    assert result.rows[-1] == [None, 1, 6, 2022, 1]
+    assert result.num_groups == 4
+    assert not result.truncated
+
+    empty = table.slice(0, 0)
+    result = aggregate_table(empty, query)
+    assert result.rows == []
+    assert result.num_groups == 0
+
+
+def test_aggregate_table_threads(monkeypatch):
+
+    pa = pytest.importorskip("pyarrow")
+    duckdb = pytest.importorskip("duckdb")
+
+    configs = []
+    connect = duckdb.connect
+
+    def record_connect(*args, **kwargs):
+        configs.append(kwargs.get("config"))
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(duckdb, "connect", record_connect)
+    table = pa.table({"city": ["a", "b"]})
+    aggregate_table(table, AggregateQuery(group_by=["city"]), threads=2)
+    assert configs == [{"threads": 2}]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the fingerprinted static assets in `kiara_plugin.service.utils.assets`."""
+
+import os
+import tempfile
+
+from kiara_plugin.service.defaults import KIARA_SERVICE_RESOURCES_FOLDER
+from kiara_plugin.service.utils.assets import AssetTable, minify_css
+
+
+def test_minify_css():
+
+    css = """
+    /* a comment */
+    a :hover ,  b > c {
+        color : red;
+        width: calc(1px + 2px);
+    }
+    """
+    assert minify_css(css) == "a :hover,b > c{color : red;width: calc(1px + 2px)}"
+
+    # quoted strings are left as they are
+    css = """
+    a[title='x ;  }'] , b::before {
+        content: "a  ,  b /* c */ \\" ;}";
+        font-family: 'A  B', sans-serif ;
+    }
+    """
+    assert minify_css(css) == (
+        "a[title='x ;  }'],b::before{"
+        'content: "a  ,  b /* c */ \\" ;}";'
+        "font-family: 'A  B',sans-serif}"
+    )
+
+
+def test_asset_table_fingerprints_assets():
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(os.path.join(temp_dir, "main.css"), "w") as f:
+            f.write("body {\n  color: red;\n}\n")
+        os.makedirs(os.path.join(temp_dir, "icons"))
+        with open(os.path.join(temp_dir, "icons", "favicon.ico"), "wb") as f:
+            f.write(b"\x00\x01")
+
+        table = AssetTable(directories=[temp_dir])
+        assert table.names == ["icons/favicon.ico", "main.css"]
+
+        url = table.url("main.css")
+        assert url.startswith("/assets/main.") and url.endswith(".css")
+        asset = table.get(url[len("/assets/") :])
+        assert asset is not None
+        assert asset.body == b"body {\n  color: red;\n}\n"
+        assert asset.media_type == "text/css; charset=utf-8"
+
+        icon = table.get(table.url("/icons/favicon.ico")[len("/assets/") :])
+        assert icon is not None
+        assert icon.media_type == "image/vnd.microsoft.icon"
+
+        assert table.url("missing.js") == "/static/missing.js"
+        assert table.get("main.css") is None
+
+        # the fingerprint changes with the content
+        minified = AssetTable(directories=[temp_dir], minify=True)
+        assert minified.url("main.css") != url
+        assert minified.get(minified.url("main.css")[8:]).body == b"body{color: red}"
+        assert minified.url("icons/favicon.ico") == table.url("icons/favicon.ico")
+
+
+def test_service_assets():
+
+    static_dir = os.path.join(KIARA_SERVICE_RESOURCES_FOLDER, "static")
+    table = AssetTable(directories=[static_dir])
+    minified = AssetTable(directories=[static_dir], minify=True)
+
+    assert "main.css" in table.names
+    assert "favicon.ico" in table.names
+    original_size = len(table.get(table.url("main.css")[8:]).body)
+    assert len(minified.get(minified.url("main.css")[8:]).body) < original_size
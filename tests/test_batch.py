@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the in-process request dispatcher in `kiara_plugin.service.utils.batch`."""
+
+import anyio
+import orjson
+
+from kiara_plugin.service.utils.batch import (
+    SubRequest,
+    SubResponse,
+    dispatch_all,
+    encode_responses,
+)
+
+TOKEN = "Bearer x"  # noqa: S105
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+class _App(object):
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, scope, receive, send):
+
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        message = await receive()
+        await anyio.sleep(0.01)
+        self.running -= 1
+
+        if scope["path"] == "/fail":
+            raise Exception("failed")
+
+        headers = dict(scope["headers"])
+        if scope["path"] == "/text":
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"text/plain")],
+                }
+            )
+            await send({"type": "http.response.body", "body": b"hello"})
+            return
+
+        result = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope["query_string"].decode(),
+            "body": orjson.loads(message["body"]) if message["body"] else None,
+            "token": headers.get(b"authorization", b"").decode(),
+            "cookie": headers.get(b"cookie", b"").decode(),
+            "traceparent": headers.get(b"traceparent", b"").decode(),
+        }
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 201 if scope["method"] == "POST" else 200,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": orjson.dumps(result),
+                "more_body": True,
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
+
+
+def test_dispatch_all_runs_requests_concurrently():
+
+    app = _App()
+    parent_scope = {
+        "type": "http",
+        "headers": [
+            (b"authorization", TOKEN.encode()),
+            (b"cookie", b"session=1"),
+            (b"content-length", b"1000"),
+            (b"traceparent", TRACEPARENT.encode()),
+        ],
+    }
+    requests = [
+        SubRequest(path="/operations/a?full=true"),
+        SubRequest(
+            method="POST",
+            path="values",
+            body={"a": 1},
+            headers={"Authorization": TOKEN},
+        ),
+        SubRequest(path="/text"),
+        SubRequest(path="/fail"),
+    ]
+
+    responses = anyio.run(dispatch_all, app, parent_scope, requests)
+
+    assert app.max_running == len(requests)
+    assert [r.status for r in responses] == [200, 201, 200, 500]
+
+    first = orjson.loads(responses[0].body)
+    assert first["path"] == "/operations/a"
+    assert first["query"] == "full=true"
+    assert first["traceparent"] == TRACEPARENT
+    # credentials of the batch request are not passed on
+    assert first["token"] == ""
+    assert first["cookie"] == ""
+
+    second = orjson.loads(responses[1].body)
+    assert second["path"] == "/values"
+    assert second["body"] == {"a": 1}
+    assert second["token"] == TOKEN
+
+    assert responses[2].body == b"hello"
+
+    encoded = orjson.loads(encode_responses(responses))
+    assert [r["status"] for r in encoded["responses"]] == [200, 201, 200, 500]
+    assert encoded["responses"][0]["body"] == first
+    assert encoded["responses"][2]["body"] == "hello"
+    assert encoded["responses"][3]["body"]["detail"] == "failed"
+
+
+def test_encode_empty_json_body():
+
+    encoded = encode_responses(
+        [SubResponse(status=204, content_type="application/json", body=b"")]
+    )
+    assert orjson.loads(encoded) == {
+        "responses": [{"status": 204, "content_type": "application/json", "body": None}]
+    }
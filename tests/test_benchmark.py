@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the load generator in `kiara_plugin.service.utils.benchmark`."""
+
+import anyio
+
+from kiara_plugin.service.utils.benchmark import (
+    BenchmarkReport,
+    BenchmarkRequest,
+    find_regressions,
+    percentile,
+    run_benchmark,
+    summarize,
+)
+
+
+class _App(object):
+    def __init__(self):
+        self.lifespan = []
+        self.paths = []
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                self.lifespan.append(message["type"])
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                else:
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        self.paths.append(scope["path"])
+        await anyio.sleep(0.001)
+        status = 404 if scope["path"] == "/missing" else 200
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+def test_percentile_interpolates():
+
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.5
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([], 95) == 0.0
+
+    stats = summarize([3.0, 1.0, 2.0], errors=1, duration=0.5)
+    assert stats.p50 == 2.0
+    assert stats.min == 1.0
+    assert stats.throughput == 6.0
+
+
+def test_run_benchmark_reports_per_endpoint():
+
+    app = _App()
+    requests = [
+        BenchmarkRequest(name="a", path="/a/1"),
+        BenchmarkRequest(name="a", path="/a/2"),
+        BenchmarkRequest(name="missing", path="/missing"),
+    ]
+
+    report = anyio.run(
+        lambda: run_benchmark(app, requests, concurrency=4, iterations=20, warmup=1)
+    )
+
+    assert app.lifespan == ["lifespan.startup", "lifespan.shutdown"]
+    assert set(report.endpoints.keys()) == {"a", "missing"}
+    assert report.endpoints["a"].requests == 20
+    assert report.endpoints["a"].errors == 0
+    assert report.endpoints["missing"].errors == 20
+    assert {"/a/1", "/a/2"} <= set(app.paths)
+    assert report.endpoints["a"].p50 <= report.endpoints["a"].p99
+
+    # reports survive a round trip to json
+    assert BenchmarkReport.model_validate_json(report.model_dump_json()) == report
+
+
+def test_find_regressions():
+
+    baseline = BenchmarkReport(
+        concurrency=1,
+        iterations=3,
+        endpoints={
+            "a": summarize([10.0, 10.0, 10.0], 0, 1.0),
+            "b": summarize([10.0, 10.0, 10.0], 0, 1.0),
+        },
+    )
+    current = BenchmarkReport(
+        concurrency=1,
+        iterations=3,
+        endpoints={
+            "a": summarize([11.0, 11.0, 11.0], 0, 1.0),
+            "b": summarize([20.0, 20.0, 20.0], 0, 1.0),
+            "c": summarize([20.0, 20.0, 20.0], 0, 1.0),
+        },
+    )
+
+    assert find_regressions(baseline, current, tolerance=0.2) == {"b": 1.0}
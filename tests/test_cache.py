@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the service caches in `kiara_plugin.service.utils.cache`."""
+
+import threading
+
+from kiara_plugin.service.utils.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+
+    cache: LRUCache[str, int] = LRUCache(name="test", max_items=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.stats.evictions == 1
+
+
+def test_lru_cache_get_or_create_counts_hits():
+
+    cache: LRUCache[str, int] = LRUCache(name="test")
+    calls = []
+
+    def factory() -> int:
+        calls.append(1)
+        return 42
+
+    assert cache.get_or_create("x", factory) == 42
+    assert cache.get_or_create("x", factory) == 42
+
+    assert len(calls) == 1
+    stats = cache.stats
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.hit_rate == 0.5
+
+
+def test_lru_cache_bounded_by_size():
+
+    evicted = []
+    cache: LRUCache[str, bytes] = LRUCache(
+        name="test",
+        max_items=None,
+        max_bytes=10,
+        size_func=len,
+        on_evict=lambda key, value: evicted.append(key),
+    )
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    assert cache.stats.bytes == 8
+
+    cache.set("c", b"1234")
+
+    assert evicted == ["a"]
+    assert cache.stats.bytes == 8
+
+    # replacing an item re-computes its size
+    cache.set("b", b"1234567")
+    assert evicted == ["a", "c"]
+    assert cache.stats.bytes == 7
+
+
+def test_lru_cache_add_and_replace():
+
+    cache: LRUCache[str, list] = LRUCache(name="test")
+    first = [1]
+
+    assert cache.add("a", first) is first
+    assert cache.add("a", [2]) is first
+
+    assert not cache.replace("a", [1], [3])
+    assert cache.replace("a", first, [3])
+    assert cache.get("a") == [3]
+
+
+def test_lru_cache_get_or_create_from_threads():
+
+    cache: LRUCache[str, object] = LRUCache(
+        name="test", max_bytes=100, size_func=lambda v: 1
+    )
+    barrier = threading.Barrier(4)
+    results = []
+
+    def create():
+        barrier.wait()
+        return object()
+
+    def get():
+        results.append(cache.get_or_create("x", create))
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # all threads get the item that was added first
+    assert len({id(r) for r in results}) == 1
+    assert cache.stats.items == 1
+    assert cache.stats.bytes == 1
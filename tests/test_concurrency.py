@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `kiara_plugin.service.utils.concurrency`."""
+
+import threading
+import time
+
+import anyio
+import pytest
+
+from kiara_plugin.service.utils.concurrency import (
+    CancellationToken,
+    ContextAccess,
+    JobCancelledError,
+    JobTimeoutError,
+)
+
+
+def test_readers_run_in_parallel_up_to_pool_size():
+
+    access = ContextAccess(read_pool_size=2)
+    lock = threading.Lock()
+    active = []
+    max_active = []
+
+    def read():
+        with lock:
+            active.append(1)
+            max_active.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            for _ in range(4):
+                tg.start_soon(access.read, read)
+
+    anyio.run(main)
+
+    assert max(max_active) == 2
+    assert access.stats.reads.count == 4
+
+
+def test_writes_are_exclusive():
+
+    access = ContextAccess(read_pool_size=4)
+    events = []
+
+    def read():
+        events.append("read_start")
+        time.sleep(0.02)
+        events.append("read_end")
+
+    def write():
+        events.append("write_start")
+        time.sleep(0.02)
+        events.append("write_end")
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(access.read, read)
+            await anyio.sleep(0.005)
+            tg.start_soon(access.write, write)
+            tg.start_soon(access.write, write)
+            await anyio.sleep(0.005)
+            tg.start_soon(access.read, read)
+
+    anyio.run(main)
+
+    assert events == [
+        "read_start",
+        "read_end",
+        "write_start",
+        "write_end",
+        "write_start",
+        "write_end",
+        "read_start",
+        "read_end",
+    ]
+    assert access.stats.writes.count == 2
+
+
+def test_cancel_waiting_write():
+
+    access = ContextAccess()
+    token = CancellationToken()
+    calls = []
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(access.write, time.sleep, 0.1)
+            await anyio.sleep(0.01)
+
+            async def cancel():
+                await anyio.sleep(0.01)
+                token.cancel()
+
+            tg.start_soon(cancel)
+            with pytest.raises(JobCancelledError):
+                await access.write_cancellable(token, calls.append, 1)
+
+    anyio.run(main)
+
+    assert calls == []
+    assert token.cancellation_latency_ms < 50
+
+
+def test_cancel_running_write_cooperatively():
+
+    access = ContextAccess()
+    token = CancellationToken()
+    steps = []
+
+    def job():
+        for step in range(100):
+            token.check()
+            steps.append(step)
+            time.sleep(0.01)
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+
+            async def cancel():
+                await anyio.sleep(0.05)
+                token.cancel()
+
+            tg.start_soon(cancel)
+            with pytest.raises(JobCancelledError):
+                await access.write_cancellable(token, job)
+
+    anyio.run(main)
+
+    assert len(steps) < 100
+    # cancellation happens at the next step boundary
+    assert token.cancellation_latency_ms < 50
+
+
+def test_write_timeout():
+
+    access = ContextAccess()
+    token = CancellationToken(timeout=0.02)
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(access.write, time.sleep, 0.1)
+            await anyio.sleep(0.01)
+            with pytest.raises(JobTimeoutError):
+                await access.write_cancellable(token, time.sleep, 0)
+
+    anyio.run(main)
+
+    assert token.cancellation_latency_ms < 50
+
+
+def test_readers_are_serialized_by_default():
+
+    access = ContextAccess()
+    events = []
+
+    def read():
+        events.append("read_start")
+        time.sleep(0.02)
+        events.append("read_end")
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(access.read, read)
+            tg.start_soon(access.read, read)
+
+    anyio.run(main)
+
+    assert access.stats.read_pool_size == 1
+    assert events == ["read_start", "read_end"] * 2
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the synthetic context generator in `kiara_plugin.service.utils.context_generator`."""
+
+import os
+
+import pytest
+
+from kiara_plugin.service.utils.context_generator import (
+    SPEC_FILE_NAME,
+    ContextSpec,
+    generate_context,
+    get_context_dir,
+    populate_context,
+)
+
+
+def test_generate_context_is_deterministic_and_cached(tmp_path):
+
+    spec = ContextSpec(scalar_values=8, aliases=10, lineage_chains=1, lineage_depth=2)
+
+    kiara_api = generate_context(spec, cache_dir=str(tmp_path / "a"))
+    aliases = sorted(kiara_api.list_alias_names())
+    assert len(aliases) == 11
+    assert "lineage_0" in aliases
+    # aliases beyond the number of values point to values that already have one
+    assert (
+        kiara_api.get_value("value_8").value_id
+        == kiara_api.get_value("value_0").value_id
+    )
+
+    spec_file = os.path.join(
+        get_context_dir(spec, cache_dir=str(tmp_path / "a")), SPEC_FILE_NAME
+    )
+    mtime = os.path.getmtime(spec_file)
+    cached_api = generate_context(spec, cache_dir=str(tmp_path / "a"))
+    assert os.path.getmtime(spec_file) == mtime
+    assert sorted(cached_api.list_alias_names()) == aliases
+
+    other_api = generate_context(spec, cache_dir=str(tmp_path / "b"))
+    for alias in aliases:
+        assert other_api.get_value(alias).data == kiara_api.get_value(alias).data
+
+
+def test_context_spec_hash_depends_on_spec():
+
+    assert ContextSpec().spec_hash == ContextSpec().spec_hash
+    assert ContextSpec(seed=1).spec_hash != ContextSpec().spec_hash
+
+
+def test_generate_context_copy(tmp_path):
+
+    spec = ContextSpec(scalar_values=4, aliases=4, lineage_chains=0)
+    cache_dir = str(tmp_path / "cache")
+    generated_api = generate_context(spec, cache_dir=cache_dir)
+    aliases = sorted(generated_api.list_alias_names())
+
+    copy_api = generate_context(
+        spec, cache_dir=cache_dir, copy_to=str(tmp_path / "copy")
+    )
+    assert sorted(copy_api.list_alias_names()) == aliases
+    for root, _, file_names in os.walk(tmp_path / "copy"):
+        for file_name in file_names:
+            path = os.path.join(root, file_name)
+            if os.path.islink(path):
+                assert os.readlink(path).startswith(str(tmp_path / "copy"))
+
+    value = copy_api.register_data(data="changed", data_type="string")
+    copy_api.store_value(value=value, alias="extra")
+
+    assert "extra" in copy_api.list_alias_names()
+    cached_api = generate_context(spec, cache_dir=cache_dir)
+    assert sorted(cached_api.list_alias_names()) == aliases
+
+
+def test_populate_context(kiara_api):
+
+    spec = ContextSpec(
+        scalar_values=3, aliases=2, lineage_chains=2, lineage_depth=3, workflows=1
+    )
+    progress = []
+    populate_context(kiara_api, spec, on_progress=lambda *args: progress.append(args))
+
+    assert progress == [
+        ("values", 3, 3),
+        ("lineage", 2, 2),
+        ("workflows", 1, 1),
+    ]
+    assert sorted(kiara_api.list_alias_names()) == [
+        "lineage_0",
+        "lineage_1",
+        "value_0",
+        "value_1",
+    ]
+    # the last value of a lineage chain is the result of the last job
+    lineage_value = kiara_api.get_value("lineage_0")
+    assert lineage_value.pedigree.module_type == "logic.not"
+    assert list(kiara_api.list_workflow_alias_names()) == ["workflow_0"]
+
+    if "table" not in kiara_api.list_data_type_names():
+        with pytest.raises(Exception, match="tabular"):
+            populate_context(kiara_api, ContextSpec(scalar_values=0, tables=1))
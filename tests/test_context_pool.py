@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the pool of open contexts in `kiara_plugin.service.utils.context_pool`."""
+
+from typing import Dict, List
+
+import anyio
+import pytest
+
+from kiara_plugin.service.utils.context_pool import ContextPool
+
+
+class _Context(object):
+    def __init__(self, name: str, size: int = 10):
+
+        self.name = name
+        self.size = size
+        self.busy = False
+        self.closed = False
+
+
+def _create_pool(opened: List[str], **kwargs) -> ContextPool[_Context]:
+    async def open_context(name: str) -> _Context:
+        if name == "missing":
+            raise KeyError(name)
+        await anyio.sleep(0.01)
+        opened.append(name)
+        return _Context(name)
+
+    async def close_context(context: _Context) -> None:
+        context.closed = True
+
+    return ContextPool(
+        open_context=open_context,
+        close_context=close_context,
+        size_func=lambda context: context.size,
+        is_busy=lambda context: context.busy,
+        **kwargs,
+    )
+
+
+def test_contexts_are_opened_once_and_evicted_lru():
+
+    opened: List[str] = []
+    pool = _create_pool(opened, max_open=2)
+
+    async def run() -> Dict[str, _Context]:
+
+        contexts = {}
+
+        async def use(name: str) -> None:
+            async with pool.use(name) as context:
+                contexts[name] = context
+
+        async with anyio.create_task_group() as tg:
+            for _ in range(5):
+                tg.start_soon(use, "a")
+        await use("b")
+        await use("a")
+        # 'b' is the least recently used context now
+        await use("c")
+
+        with pytest.raises(KeyError):
+            await use("missing")
+        return contexts
+
+    contexts = anyio.run(run)
+
+    assert opened == ["a", "b", "c"]
+    assert contexts["b"].closed
+    assert not contexts["a"].closed
+    assert pool.stats.open == ["a", "c"]
+    assert pool.stats.opened == 3
+    assert pool.stats.closed == 1
+
+
+def test_contexts_in_use_or_busy_are_not_closed():
+
+    opened: List[str] = []
+    pool = _create_pool(opened, max_bytes=15, idle_timeout=0.05)
+
+    async def run():
+
+        async with pool.use("a") as a:
+            # 'a' is in use, so the pool exceeds its budget for now
+            async with pool.use("b") as b:
+                assert pool.stats.bytes == 20
+            assert not a.closed and not b.closed
+
+            await pool.enforce_limits()
+            assert b.closed
+            assert pool.stats.open == ["a"]
+
+        async with pool.use("c") as c:
+            c.busy = True
+        assert a.closed
+        assert pool.stats.open == ["c"]
+
+        await anyio.sleep(0.1)
+        assert await pool.close_idle() == []
+        c.busy = False
+        assert await pool.close_idle() == ["c"]
+
+        await pool.close_all()
+        return pool.stats
+
+    stats = anyio.run(run)
+    assert stats.open == []
+    assert stats.closed == 3
+
+
+def test_contexts_are_not_reopened_while_closing():
+
+    events: List[str] = []
+
+    async def open_context(name: str) -> _Context:
+        events.append(f"open {name}")
+        return _Context(name)
+
+    async def close_context(context: _Context) -> None:
+        events.append(f"closing {context.name}")
+        await anyio.sleep(0.05)
+        context.closed = True
+        events.append(f"closed {context.name}")
+
+    pool: ContextPool[_Context] = ContextPool(
+        open_context=open_context, close_context=close_context, idle_timeout=0
+    )
+
+    async def run() -> _Context:
+
+        async with pool.use("a"):
+            pass
+
+        async def use() -> _Context:
+            # starts while 'a' is being closed
+            await anyio.sleep(0.01)
+            async with pool.use("a") as context:
+                return context
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(pool.close_idle)
+            context = await use()
+        return context
+
+    context = anyio.run(run)
+
+    assert events == ["open a", "closing a", "closed a", "open a"]
+    assert not context.closed
+    assert pool.stats.open == ["a"]
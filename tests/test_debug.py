@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the admin-only endpoints in `kiara_plugin.service.openapi.controllers.debug`."""
+
+import pytest
+
+from kiara.interfaces.python_api import KiaraAPI
+from kiara_plugin.service.config import KiaraServiceConfig
+
+try:
+    from starlite.testing import TestClient
+
+    from kiara_plugin.service.openapi.service import KiaraOpenAPIService
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service: {e}", allow_module_level=True)
+
+ADMIN_TOKEN = "admin-token"  # noqa: S105
+
+ADMIN_REQUESTS = [
+    "/debug/profile?seconds=0.05",
+    "/debug/memory?seconds=0&limit=5",
+    "/debug/traces",
+]
+
+
+def _client(kiara_api: KiaraAPI, config: KiaraServiceConfig) -> TestClient:
+
+    service = KiaraOpenAPIService(kiara_api=kiara_api, config=config)
+    return TestClient(app=service.app())
+
+
+@pytest.mark.parametrize("path", ADMIN_REQUESTS)
+def test_admin_endpoints_are_disabled_without_admin_token(
+    kiara_api: KiaraAPI, service_config: KiaraServiceConfig, path: str
+):
+
+    with _client(kiara_api, service_config) as client:
+        response = client.get(path, headers={"Authorization": f"Bearer {ADMIN_TOKEN}"})
+        assert response.status_code == 403
+
+
+@pytest.mark.parametrize("path", ADMIN_REQUESTS)
+def test_admin_endpoints_require_the_admin_token(
+    kiara_api: KiaraAPI, service_config: KiaraServiceConfig, path: str
+):
+
+    config = service_config.model_copy(
+        update={"admin_token": ADMIN_TOKEN, "tracing": True}
+    )
+    with _client(kiara_api, config) as client:
+        assert client.get(path).status_code == 401
+        response = client.get(path, headers={"Authorization": "Bearer other-token"})
+        assert response.status_code == 403
+
+        response = client.get(path, headers={"Authorization": f"Bearer {ADMIN_TOKEN}"})
+        assert response.status_code == 200
+
+
+def test_non_admin_endpoints_are_not_guarded(
+    kiara_api: KiaraAPI, service_config: KiaraServiceConfig
+):
+
+    config = service_config.model_copy(update={"admin_token": ADMIN_TOKEN})
+    with _client(kiara_api, config) as client:
+        assert client.get("/service/health/live").status_code == 200
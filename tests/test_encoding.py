@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the response encodings in `kiara_plugin.service.utils.encoding`."""
+
+import uuid
+from datetime import datetime, timezone
+
+import anyio
+import pytest
+
+from kiara_plugin.service.utils.encoding import (
+    CBOR_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    ContentNegotiationMiddleware,
+    decode,
+    encode,
+    negotiate_media_type,
+    response_media_type,
+)
+
+ALL_MEDIA_TYPES = [JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, CBOR_MEDIA_TYPE]
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, JSON_MEDIA_TYPE),
+        ("text/html, */*", JSON_MEDIA_TYPE),
+        ("application/msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/x-msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/json, application/cbor", JSON_MEDIA_TYPE),
+        ("application/json;q=0.5, application/cbor", CBOR_MEDIA_TYPE),
+        ("application/msgpack;q=0, application/json;q=0.1", JSON_MEDIA_TYPE),
+        ("image/png", JSON_MEDIA_TYPE),
+    ],
+)
+def test_negotiate_media_type(accept, expected):
+
+    assert negotiate_media_type(accept, available=ALL_MEDIA_TYPES) == expected
+
+
+def test_negotiate_unavailable_media_type():
+
+    assert (
+        negotiate_media_type("application/cbor", available=[JSON_MEDIA_TYPE])
+        == JSON_MEDIA_TYPE
+    )
+
+
+@pytest.mark.parametrize(
+    "media_type, package",
+    [(MSGPACK_MEDIA_TYPE, "msgpack"), (CBOR_MEDIA_TYPE, "cbor2")],
+)
+def test_round_trip_native_types(media_type, package):
+
+    pytest.importorskip(package)
+
+    value_id = uuid.uuid4()
+    content = {
+        value_id: {
+            "id": value_id,
+            "created": datetime(2023, 1, 2, 3, 4, 5, 678, tzinfo=timezone.utc),
+            "naive": datetime(2023, 1, 2, 3, 4, 5),
+            "items": [1, 2.5, "a", None, True],
+            "tags": {"x"},
+        }
+    }
+
+    decoded = decode(encode(content, media_type), media_type)
+    item = decoded[value_id]
+    assert item["id"] == value_id
+    assert item["created"] == datetime(2023, 1, 2, 3, 4, 5, 678, tzinfo=timezone.utc)
+    assert item["naive"] == datetime(2023, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert item["items"] == [1, 2.5, "a", None, True]
+    assert list(item["tags"]) == ["x"]
+
+    assert len(encode(content, media_type)) < len(
+        encode({str(value_id): {**content[value_id], "tags": ["x"]}}, JSON_MEDIA_TYPE)
+    )
+
+
+@pytest.mark.parametrize(
+    "media_type, package",
+    [(MSGPACK_MEDIA_TYPE, "msgpack"), (CBOR_MEDIA_TYPE, "cbor2")],
+)
+def test_round_trip_numpy_arrays(media_type, package):
+
+    pytest.importorskip(package)
+    np = pytest.importorskip("numpy")
+
+    arrays = [
+        np.arange(10, dtype="<f8"),
+        np.arange(12, dtype=">i4").reshape(3, 4),
+        np.arange(6, dtype="u1").reshape(2, 3)[:, 1:],
+    ]
+
+    decoded = decode(encode({"arrays": arrays}, media_type), media_type)
+    for original, result in zip(arrays, decoded["arrays"]):
+        assert result.shape == original.shape
+        assert np.array_equal(result, original)
+
+
+def test_default_serializer():
+    class Model(object):
+        def __init__(self, value):
+            self.value = value
+
+    content = [Model(1), Model("a")]
+    for media_type in [JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE]:
+        if media_type == MSGPACK_MEDIA_TYPE:
+            pytest.importorskip("msgpack")
+        encoded = encode(content, media_type, default=lambda m: {"value": m.value})
+        assert decode(encoded, media_type) == [{"value": 1}, {"value": "a"}]
+
+
+def test_middleware_sets_media_type():
+
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(response_media_type())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    middleware = ContentNegotiationMiddleware(app)
+    middleware.available = ALL_MEDIA_TYPES
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept", b"application/cbor")]}
+    anyio.run(middleware, scope, None, send)
+
+    assert seen == [CBOR_MEDIA_TYPE]
+    assert response_media_type() == JSON_MEDIA_TYPE
+    assert (b"vary", b"accept") in sent[0]["headers"]
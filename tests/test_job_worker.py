@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for running kiara jobs in worker processes, in `kiara_plugin.service.utils.job_worker`."""
+
+import pickle
+import uuid
+
+import pytest
+
+from kiara.context import KiaraConfig
+from kiara.interfaces.python_api import KiaraAPI
+from kiara.models.module.jobs import JobStatus
+from kiara_plugin.service.utils import job_worker
+
+
+@pytest.fixture
+def worker(kiara_api: KiaraAPI, monkeypatch) -> list:
+    """Initialize the kiara worker in this process, and collect the progress messages it reports."""
+
+    messages: list = []
+    monkeypatch.setattr(job_worker, "_worker", job_worker._WorkerState())
+    monkeypatch.setattr(job_worker, "report", messages.append)
+    job_worker.init_kiara_worker(
+        kiara_api._kiara_config.model_dump(), kiara_api.get_current_context_name()
+    )
+    return messages
+
+
+def test_run_kiara_job(kiara_api: KiaraAPI, worker: list):
+
+    result = job_worker.run_kiara_job("logic.nand", {"a": True, "b": True})
+
+    job_id = uuid.UUID(result["job"]["job_id"])
+    assert result["job"]["status"] == JobStatus.SUCCESS.value
+    assert result["outputs"] == {}
+    assert pickle.loads(result["output_data"]) == {"y": False}  # noqa: S301
+    assert worker[0] == ("job_created", job_id)
+    assert [m[1] for m in worker[1:]] == ["and", "not"]
+
+    # the worker doesn't write to the context
+    api = KiaraAPI(kiara_config=KiaraConfig(**kiara_api._kiara_config.model_dump()))
+    api.set_active_context(kiara_api.get_current_context_name())
+    assert api.list_value_ids() == []
+
+
+def test_run_kiara_job_with_stored_inputs(kiara_api: KiaraAPI, worker: list):
+
+    value = kiara_api.register_data(True, data_type="boolean")
+    kiara_api.store_value(value=value, alias=None)
+
+    result = job_worker.run_kiara_job(
+        {"module_type": "logic.and"}, {"a": str(value.value_id), "b": False}
+    )
+    assert result["outputs"] == {}
+    assert pickle.loads(result["output_data"]) == {"y": False}  # noqa: S301
+
+    with pytest.raises(Exception, match="exceeds the maximum"):
+        job_worker.run_kiara_job(
+            "logic.and", {"a": str(value.value_id), "b": False}, max_output_bytes=1
+        )
+
+    with pytest.raises(Exception, match="not set"):
+        job_worker.run_kiara_job("logic.and", {"a": True})
+
+
+def test_run_kiara_job_in_other_context(kiara_api: KiaraAPI, worker: list):
+
+    kiara_api.create_new_context("other", set_active=False)
+    api = KiaraAPI(kiara_config=KiaraConfig(**kiara_api._kiara_config.model_dump()))
+    api.set_active_context("other")
+    value = api.register_data(True, data_type="boolean")
+    api.store_value(value=value, alias=None)
+
+    # values are only found in the context they are stored in
+    with pytest.raises(Exception):
+        job_worker.run_kiara_job("logic.not", {"a": str(value.value_id)})
+
+    result = job_worker.run_kiara_job(
+        "logic.not", {"a": str(value.value_id)}, context_name="other"
+    )
+    assert result["outputs"] == {}
+    assert pickle.loads(result["output_data"]) == {"y": False}  # noqa: S301
+    assert set(job_worker._worker.contexts) == {
+        kiara_api.get_current_context_name(),
+        "other",
+    }
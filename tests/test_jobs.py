@@ -0,0 +1,433 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the job manager in `kiara_plugin.service.openapi.controllers.jobs`."""
+
+import os
+import threading
+import time
+import uuid
+
+import anyio
+import orjson
+import pytest
+
+from kiara.context import KiaraConfig
+from kiara.interfaces.python_api import KiaraAPI
+from kiara.models.module.jobs import JobStatus
+from kiara_plugin.service.utils.concurrency import (
+    ContextAccess,
+    JobCancelledError,
+    JobTimeoutError,
+)
+from kiara_plugin.service.utils.job_worker import init_kiara_worker
+from kiara_plugin.service.utils.process_pool import ProcessPool
+
+try:
+    from kiara_plugin.service.openapi.controllers import jobs
+    from kiara_plugin.service.openapi.controllers.values import ValueCache
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service controllers: {e}", allow_module_level=True)
+
+
+@pytest.fixture
+def context_access() -> ContextAccess:
+    return ContextAccess()
+
+
+@pytest.fixture
+def job_manager(
+    kiara_api: KiaraAPI, context_access: ContextAccess
+) -> "jobs.JobManager":
+
+    return jobs.JobManager(kiara_api=kiara_api, context_access=context_access)
+
+
+def test_run_job(job_manager: "jobs.JobManager"):
+
+    steps = []
+
+    async def main():
+        return await job_manager.run_job(
+            "logic.nand", {"a": True, "b": True}, on_step=steps.append
+        )
+
+    job_id = anyio.run(main)
+
+    job = job_manager.get_job(job_id)
+    assert job.status is JobStatus.SUCCESS
+    assert [step.step_id for step in steps] == ["and", "not"]
+    assert not job_manager.busy
+
+
+def test_reads_wait_while_module_runs(kiara_api: KiaraAPI, monkeypatch):
+
+    context_access = ContextAccess()
+    job_manager = jobs.JobManager(kiara_api=kiara_api, context_access=context_access)
+
+    events = []
+    started = threading.Event()
+    module_cls = kiara_api.context.module_registry.get_module_class("logic.and")
+    process = module_cls.process
+
+    def slow_process(self, inputs, outputs):
+        events.append("process_start")
+        started.set()
+        time.sleep(0.2)
+        events.append("process_end")
+        return process(self, inputs, outputs)
+
+    monkeypatch.setattr(module_cls, "process", slow_process)
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(job_manager.run_job, "logic.and", {"a": True, "b": True})
+            await anyio.to_thread.run_sync(started.wait)
+            await context_access.read(events.append, "read")
+
+    anyio.run(main)
+
+    # kiara registers the outputs while the module runs, so the job keeps exclusive write access
+    assert events == ["process_start", "process_end", "read"]
+    assert not context_access.stats.writer_active
+
+
+def test_pipeline_steps_with_the_same_module(
+    job_manager: "jobs.JobManager", kiara_api: KiaraAPI, tmp_path
+):
+
+    pipeline = {
+        "pipeline_name": "two_ands",
+        "steps": [
+            {"module_type": "logic.and", "step_id": "first"},
+            {"module_type": "logic.and", "step_id": "second"},
+        ],
+        "input_aliases": {
+            "first.a": "a",
+            "first.b": "b",
+            "second.a": "c",
+            "second.b": "d",
+        },
+    }
+    pipeline_file = os.path.join(tmp_path, "two_ands.json")
+    with open(pipeline_file, "wb") as f:
+        f.write(orjson.dumps(pipeline))
+    steps = []
+
+    async def main():
+        return await job_manager.run_job(
+            pipeline_file,
+            {"a": True, "b": True, "c": False, "d": True},
+            on_step=steps.append,
+        )
+
+    job_id = anyio.run(main)
+
+    assert job_manager.get_job(job_id).status is JobStatus.SUCCESS
+    # the steps run the same module, they are told apart by their inputs
+    results = {
+        step.step_id: kiara_api.get_value(step.outputs["y"].value_id).data
+        for step in steps
+    }
+    assert results == {"first": True, "second": False}
+
+
+def _stream_job(
+    job_manager: "jobs.JobManager",
+    kiara_api: KiaraAPI,
+    context_access: ContextAccess,
+    **data,
+):
+
+    controller = object.__new__(jobs.JobControllerJson)
+    return jobs.JobControllerJson.stream_job(
+        controller,
+        kiara_api=kiara_api,
+        context_access=context_access,
+        value_cache=ValueCache(kiara_api=kiara_api),
+        job_manager=job_manager,
+        data=jobs.RunJobRequest(**data),
+    )
+
+
+def test_stream_job(
+    job_manager: "jobs.JobManager", kiara_api: KiaraAPI, context_access: ContextAccess
+):
+    async def main():
+        response = await _stream_job(
+            job_manager,
+            kiara_api,
+            context_access,
+            operation_id="logic.nand",
+            inputs={"a": True, "b": True},
+        )
+        return [orjson.loads(line) async for line in response.iterator]
+
+    events = anyio.run(main)
+
+    assert [e["event"] for e in events] == [
+        "job_queued",
+        "job_created",
+        "step_finished",
+        "step_finished",
+        "job_finished",
+    ]
+    assert events[0]["run_id"]
+    assert [e["step"]["step_id"] for e in events[2:4]] == ["and", "not"]
+    assert events[4]["results"]["job"]["job_id"] == events[1]["job_id"]
+
+
+def test_stream_job_client_disconnects(
+    job_manager: "jobs.JobManager", kiara_api: KiaraAPI, context_access: ContextAccess
+):
+    async def main():
+        response = await _stream_job(
+            job_manager,
+            kiara_api,
+            context_access,
+            operation_id="logic.nand",
+            inputs={"a": True, "b": False},
+        )
+        iterator = response.iterator
+        await iterator.__anext__()
+        created = orjson.loads(await iterator.__anext__())
+        await iterator.aclose()
+
+        # the job keeps running in the background
+        while job_manager.busy:
+            await anyio.sleep(0.01)
+        return created["job_id"]
+
+    job_id = anyio.run(main)
+    assert job_manager.get_job(job_id).status is JobStatus.SUCCESS
+
+
+def test_cancel_queued_job_by_run_id(
+    job_manager: "jobs.JobManager", context_access: ContextAccess
+):
+
+    run_id = uuid.uuid4()
+
+    async def main():
+        async with context_access.writing():
+            # the job waits for write access, kiara hasn't assigned it a job id yet
+            task = job_manager.run_in_background(
+                job_manager.run_job("logic.and", {"a": True, "b": True}, run_id=run_id)
+            )
+            await anyio.sleep(0.01)
+            assert job_manager.cancel_job(run_id)
+        with pytest.raises(JobCancelledError):
+            await task
+
+    anyio.run(main)
+    assert not job_manager.cancel_job(run_id)
+
+
+def test_timeout_between_pipeline_steps(
+    job_manager: "jobs.JobManager", kiara_api: KiaraAPI, monkeypatch
+):
+
+    module_cls = kiara_api.context.module_registry.get_module_class("logic.and")
+    process = module_cls.process
+
+    def slow_process(self, inputs, outputs):
+        time.sleep(1.0)
+        return process(self, inputs, outputs)
+
+    monkeypatch.setattr(module_cls, "process", slow_process)
+    steps = []
+
+    async def main():
+        await job_manager.run_job(
+            "logic.nand", {"a": True, "b": True}, timeout=0.5, on_step=steps.append
+        )
+
+    # the first step can't be interrupted, but the pipeline stops before the second one
+    with pytest.raises(JobTimeoutError):
+        anyio.run(main)
+    assert [step.step_id for step in steps] == ["and"]
+    assert not job_manager.busy
+
+
+def test_stopped_jobs_are_not_reused(
+    job_manager: "jobs.JobManager", kiara_api: KiaraAPI, monkeypatch
+):
+
+    module_cls = kiara_api.context.module_registry.get_module_class("logic.and")
+    process = module_cls.process
+
+    def slow_process(self, inputs, outputs):
+        time.sleep(1.0)
+        return process(self, inputs, outputs)
+
+    monkeypatch.setattr(module_cls, "process", slow_process)
+    value = kiara_api.register_data(True, data_type="boolean")
+    inputs = {"a": value.value_id, "b": value.value_id}
+
+    async def run(timeout=None):
+        steps = []
+        job_id = await job_manager.run_job(
+            "logic.nand", inputs, timeout=timeout, on_step=steps.append
+        )
+        return job_id, steps
+
+    with pytest.raises(JobTimeoutError):
+        anyio.run(run, 0.5)
+    assert not kiara_api.context.job_registry._active_jobs
+
+    # the stopped step is recorded as failed, so the same inputs run a fresh job (the first step is re-used)
+    monkeypatch.setattr(module_cls, "process", process)
+    job_id, steps = anyio.run(run)
+    assert job_manager.get_job(job_id).status is JobStatus.SUCCESS
+    assert [step.step_id for step in steps] == ["not"]
+    assert steps[0].error is None
+    assert kiara_api.get_job(steps[0].job_id).status is JobStatus.SUCCESS
+
+
+def _count_runs(kiara_api: KiaraAPI, monkeypatch, module_type: str) -> list:
+
+    runs: list = []
+    module_cls = kiara_api.context.module_registry.get_module_class(module_type)
+    process = module_cls.process
+
+    def counting_process(self, inputs, outputs):
+        runs.append(module_type)
+        return process(self, inputs, outputs)
+
+    monkeypatch.setattr(module_cls, "process", counting_process)
+    return runs
+
+
+def _store_job(kiara_api: KiaraAPI, job_id: uuid.UUID) -> None:
+
+    job = kiara_api.get_job(job_id)
+    kiara_api.store_values(job.results, alias_map={})
+    kiara_api.context.job_registry.store_job_record(job_id)
+
+
+def test_reuse_results(
+    job_manager: "jobs.JobManager", kiara_api: KiaraAPI, monkeypatch
+):
+
+    runs = _count_runs(kiara_api, monkeypatch, "logic.and")
+    value = kiara_api.register_data(True, data_type="boolean")
+
+    async def run(inputs):
+        return await job_manager.run_job("logic.and", inputs)
+
+    # kiara matches jobs with the same input values in the current session
+    job_id = anyio.run(run, {"a": value.value_id, "b": value.value_id})
+    assert anyio.run(run, {"a": value.value_id, "b": value.value_id}) == job_id
+    assert len(runs) == 1
+
+    # ... and stored job records by input data, so re-sent data matches as well
+    assert anyio.run(run, {"a": True, "b": True}) != job_id
+    assert len(runs) == 2
+    _store_job(kiara_api, job_id)
+    assert anyio.run(run, {"a": True, "b": True}) == job_id
+    assert len(runs) == 2
+    assert job_manager.get_job(job_id).status is JobStatus.SUCCESS
+
+    stats = job_manager.reuse_stats
+    assert (stats.hits, stats.misses) == (2, 2)
+    assert stats.hit_rate == 0.5
+
+
+def test_reuse_results_opt_out(
+    job_manager: "jobs.JobManager", kiara_api: KiaraAPI, monkeypatch
+):
+
+    runs = _count_runs(kiara_api, monkeypatch, "logic.and")
+
+    async def run(reuse_results: bool):
+        return await job_manager.run_job(
+            "logic.and", {"a": True, "b": True}, reuse_results=reuse_results
+        )
+
+    job_id = anyio.run(run, True)
+    _store_job(kiara_api, job_id)
+
+    # kiara still matches the stored job record when the job is executed ...
+    assert anyio.run(run, False) == job_id
+    assert len(runs) == 1
+
+    # ... unless that is disabled for the kiara context
+    kiara_api.context.update_runtime_config(job_cache="no_cache")
+    assert anyio.run(run, False) != job_id
+    assert len(runs) == 2
+
+
+def test_non_idempotent_modules_run_again(
+    job_manager: "jobs.JobManager", kiara_api: KiaraAPI, tmp_path
+):
+
+    path = tmp_path / "data.txt"
+
+    async def run():
+        job_id = await job_manager.run_job("import.local.file", {"path": str(path)})
+        [value_id] = job_manager.get_job(job_id).results.values()
+        return job_id, kiara_api.get_value(value_id).data.read_text()
+
+    path.write_text("first")
+    job_id, text = anyio.run(run)
+    assert text == "first"
+    _store_job(kiara_api, job_id)
+
+    path.write_text("second")
+    other_job_id, text = anyio.run(run)
+    assert other_job_id != job_id
+    assert text == "second"
+
+
+def test_run_job_in_worker_process(kiara_api: KiaraAPI, context_access: ContextAccess):
+
+    kiara_config = kiara_api._kiara_config.model_dump()
+    context_name = kiara_api.get_current_context_name()
+    pool = ProcessPool(
+        size=1, initializer=init_kiara_worker, initargs=(kiara_config, context_name)
+    )
+    job_manager = jobs.JobManager(
+        kiara_api=kiara_api, context_access=context_access, process_pool=pool
+    )
+    steps = []
+
+    async def main():
+        return await job_manager.run_job(
+            "logic.nand", {"a": True, "b": False}, on_step=steps.append
+        )
+
+    limited_job_manager = jobs.JobManager(
+        kiara_api=kiara_api,
+        context_access=context_access,
+        process_pool=pool,
+        max_worker_output_bytes=1,
+    )
+
+    async def run_limited():
+        return await limited_job_manager.run_job("logic.nand", {"a": False, "b": False})
+
+    try:
+        job_id = anyio.run(main)
+        # the output data is returned (pickled) to the service, which is limited in size
+        with pytest.raises(Exception, match="exceeds the maximum"):
+            anyio.run(run_limited)
+    finally:
+        pool.shutdown()
+
+    assert [step.step_id for step in steps] == ["and", "not"]
+    job = job_manager.get_job(job_id)
+    assert job.status is JobStatus.SUCCESS
+    # the outputs were stored by the service, not the worker
+    value = kiara_api.get_value(job.results["y"])
+    assert value.is_stored
+    assert value.data is True
+    assert value.pedigree.module_type == job.job_config.module_type
+
+    # the job can still be looked up after a restart
+    restarted_api = KiaraAPI(kiara_config=KiaraConfig(**kiara_config))
+    restarted_api.set_active_context(context_name)
+    restarted = jobs.JobManager(kiara_api=restarted_api, context_access=ContextAccess())
+    job = restarted.get_job(job_id)
+    assert job.status is JobStatus.SUCCESS
+    assert restarted_api.get_value(job.results["y"]).data is True
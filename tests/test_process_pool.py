@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `kiara_plugin.service.utils.process_pool`."""
+
+import os
+import time
+
+import anyio
+import pytest
+
+from kiara_plugin.service.utils.concurrency import CancellationToken, JobCancelledError
+from kiara_plugin.service.utils.process_pool import ProcessPool, WorkerCrashedError
+
+
+def test_process_pool_recycles_workers():
+
+    pool = ProcessPool(size=1, max_tasks_per_worker=2)
+
+    async def main():
+        return [await pool.run(os.getpid) for _ in range(3)]
+
+    try:
+        pids = anyio.run(main)
+    finally:
+        pool.shutdown()
+
+    assert pids[0] == pids[1]
+    assert pids[2] != pids[0]
+    assert os.getpid() not in pids
+    assert pool.stats.recycled_workers == 1
+
+
+def test_process_pool_survives_crashing_task():
+
+    pool = ProcessPool(size=1)
+
+    async def main():
+        with pytest.raises(WorkerCrashedError):
+            await pool.run(os._exit, 1)
+        return await pool.run(sum, [1, 2, 3])
+
+    try:
+        assert anyio.run(main) == 6
+    finally:
+        pool.shutdown()
+
+    assert pool.stats.crashed_workers == 1
+
+
+def test_process_pool_terminates_cancelled_task():
+
+    pool = ProcessPool(size=1)
+    token = CancellationToken()
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+
+            async def cancel():
+                await anyio.sleep(0.5)
+                token.cancel()
+
+            tg.start_soon(cancel)
+            with pytest.raises(JobCancelledError):
+                await pool.run(time.sleep, 30, token=token)
+
+    try:
+        anyio.run(main)
+    finally:
+        pool.shutdown()
+
+    assert pool.stats.terminated_workers == 1
+    assert token.cancellation_latency_ms < 500
+
+
+def test_event_loop_stays_responsive_under_cpu_load():
+    """Benchmark: CPU-bound tasks in the pool don't delay the event loop of the service process."""
+
+    pool = ProcessPool(size=2)
+    delays = []
+
+    async def ticker(stop: anyio.Event):
+        while not stop.is_set():
+            start = time.perf_counter()
+            await anyio.sleep(0.01)
+            delays.append(time.perf_counter() - start - 0.01)
+
+    async def main():
+        # start the workers, so process startup isn't measured
+        await pool.run(sum, [])
+        await pool.run(sum, [])
+
+        stop = anyio.Event()
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(ticker, stop)
+            async with anyio.create_task_group() as jobs:
+                for _ in range(4):
+                    jobs.start_soon(pool.run, sum, range(20_000_000))
+            stop.set()
+
+    try:
+        anyio.run(main)
+    finally:
+        pool.shutdown()
+
+    assert len(delays) > 10
+    assert max(delays) < 0.1
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the in-process profilers in `kiara_plugin.service.utils.profiling`."""
+
+import threading
+import tracemalloc
+
+import pytest
+
+from kiara_plugin.service.utils.profiling import (
+    ProfilerBusyError,
+    _profile_lock,
+    format_collapsed_stacks,
+    sample_stacks,
+    snapshot_memory,
+)
+
+
+def _busy_loop(stop: threading.Event) -> None:
+
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sample_stacks_covers_other_threads():
+
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        stacks = sample_stacks(seconds=0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    busy = {stack: count for stack, count in stacks.items() if "_busy_loop" in stack}
+    assert busy
+    assert all(stack.startswith("busy-worker;") for stack in busy)
+
+    collapsed = format_collapsed_stacks(stacks)
+    first_line = collapsed.splitlines()[0]
+    assert int(first_line.rsplit(" ", 1)[1]) == max(stacks.values())
+
+
+def test_snapshot_memory_finds_allocations():
+
+    held = []
+
+    def allocate() -> None:
+        for _ in range(200):
+            held.append(bytearray(10_000))
+
+    timer = threading.Timer(0.05, allocate)
+    timer.start()
+    snapshot = snapshot_memory(seconds=0.3, limit=5)
+    timer.join()
+
+    assert not tracemalloc.is_tracing()
+    assert snapshot.duration == 0.3
+    assert snapshot.allocations[0].size >= 200 * 10_000
+    assert "test_profiling.py" in snapshot.allocations[0].location
+
+
+def test_only_one_profiler_at_a_time():
+
+    with _profile_lock:
+        with pytest.raises(ProfilerBusyError):
+            sample_stacks(seconds=0.01)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the registry metadata snapshots in `kiara_plugin.service.utils.registry_snapshot`."""
+
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any
+
+from pydantic import BaseModel
+
+from kiara.interfaces.python_api import KiaraAPI
+from kiara_plugin.service.utils.registry_snapshot import (
+    RegistrySnapshot,
+    RegistrySnapshotManager,
+    installed_versions,
+    load_snapshot,
+    save_snapshot,
+)
+
+
+def _create_snapshot(key: str) -> RegistrySnapshot:
+
+    return RegistrySnapshot(
+        key=key,
+        created=datetime.now(timezone.utc),
+        versions=installed_versions(),
+        operation_ids=["logic.and"],
+        operations={
+            "logic.and": {"type_name": "logic.and"},
+            "internal.op": {"type_name": "internal.op"},
+        },
+        module_types={"logic.and": {"type_name": "logic.and"}},
+        data_types={"boolean": {"type_name": "boolean"}},
+        pipeline_ids=["logic.xor"],
+        pipelines={"logic.xor": {"pipeline_config": {"pipeline_name": "xor"}}},
+    )
+
+
+def test_installed_versions():
+
+    versions = installed_versions()
+    assert "python" in versions
+    assert "kiara" in versions
+
+
+def test_snapshot_round_trip():
+
+    snapshot = _create_snapshot("key")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "snapshots", "key.json")
+        save_snapshot(snapshot, path)
+        assert os.listdir(os.path.dirname(path)) == ["key.json"]
+
+        assert load_snapshot(path, "key") == snapshot
+        # snapshots from a different environment are never used
+        assert load_snapshot(path, "other_key") is None
+
+
+def test_invalid_snapshots_are_ignored():
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "key.json")
+        assert load_snapshot(path, "key") is None
+
+        with open(path, "wb") as f:
+            f.write(b'{"key": "key", "operations": {')
+        assert load_snapshot(path, "key") is None
+
+        snapshot = _create_snapshot("key").model_copy(update={"format_version": 0})
+        save_snapshot(snapshot, path)
+        assert load_snapshot(path, "key") is None
+
+
+def _serialize_model(value: Any) -> Any:
+
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Can't serialize: {type(value)}")
+
+
+def test_snapshot_manager(kiara_api: KiaraAPI, tmp_path):
+
+    snapshot_dir = str(tmp_path / "snapshots")
+    manager = RegistrySnapshotManager(
+        kiara_api=kiara_api, snapshot_dir=snapshot_dir, serializer=_serialize_model
+    )
+    assert os.path.dirname(manager.path) == snapshot_dir
+    # without a snapshot from a previous run, metadata is served from the registries
+    assert manager.active is None
+    assert not manager.registries_loaded
+
+    snapshot = manager.load_registries()
+    assert manager.registries_loaded
+    assert manager.active is None
+    assert "logic.and" in snapshot.module_types
+    assert "boolean" in snapshot.data_types
+    assert set(snapshot.operation_ids) <= set(snapshot.operations)
+    assert load_snapshot(manager.path, manager.key) == snapshot
+
+    # the next run serves the snapshot until its registries are loaded
+    next_manager = RegistrySnapshotManager(
+        kiara_api=kiara_api, snapshot_dir=snapshot_dir, serializer=_serialize_model
+    )
+    assert next_manager.key == manager.key
+    assert next_manager.active == snapshot
+
+    # an unchanged snapshot isn't written again
+    mtime = os.stat(manager.path).st_mtime_ns
+    next_manager.load_registries()
+    assert next_manager.active is None
+    assert os.stat(manager.path).st_mtime_ns == mtime
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the cached HTML value infos in `kiara_plugin.service.openapi.controllers.render`."""
+
+import anyio
+import pytest
+
+from kiara.interfaces.python_api import KiaraAPI
+from kiara_plugin.service.utils.concurrency import ContextAccess
+from kiara_plugin.service.utils.encoding import EncodedContent
+from kiara_plugin.service.utils.response_cache import (
+    DiskCache,
+    EncodedStream,
+    ResponseCache,
+)
+
+try:
+    from kiara_plugin.service.openapi.controllers.render import ValueInfoRenderer
+    from kiara_plugin.service.openapi.controllers.values import ValueCache
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service controllers: {e}", allow_module_level=True)
+
+
+@pytest.fixture
+def disk_cache(tmp_path) -> DiskCache:
+    return DiskCache(path=str(tmp_path / "responses.sqlite"))
+
+
+def _renderer(
+    kiara_api: KiaraAPI, disk_cache: DiskCache, **kwargs
+) -> ValueInfoRenderer:
+
+    return ValueInfoRenderer(
+        kiara_api=kiara_api,
+        value_cache=ValueCache(kiara_api=kiara_api),
+        response_cache=ResponseCache(disk_cache=disk_cache),
+        context_access=ContextAccess(),
+        **kwargs,
+    )
+
+
+async def _wait_for_items(disk_cache: DiskCache, items: int) -> None:
+
+    with anyio.fail_after(30):
+        while disk_cache.stats.items < items:
+            await anyio.sleep(0.01)
+
+
+def test_value_infos_are_prerendered(kiara_api: KiaraAPI, disk_cache: DiskCache):
+
+    renderer = _renderer(kiara_api, disk_cache)
+
+    async def run():
+        renderer.start()
+        try:
+            value = kiara_api.register_data(True, data_type="boolean")
+            kiara_api.store_value(value=value, alias="flag")
+            await _wait_for_items(disk_cache, 1)
+
+            misses = disk_cache.stats.misses
+            content = await renderer.get_or_render("flag")
+            assert isinstance(content, EncodedContent)
+            assert str(value.value_id).encode() in content.body
+            assert disk_cache.stats.misses == misses
+        finally:
+            renderer.stop()
+
+    anyio.run(run)
+
+
+def test_value_infos_follow_aliases(kiara_api: KiaraAPI, disk_cache: DiskCache):
+
+    renderer = _renderer(kiara_api, disk_cache, prerender=False)
+
+    async def run():
+        value = kiara_api.register_data(True, data_type="boolean")
+        kiara_api.store_value(value=value, alias="flag")
+        first = await renderer.get_or_render("flag")
+
+        # aliases are resolved on every request, so they render the info of their current target
+        other = kiara_api.register_data(False, data_type="boolean")
+        kiara_api.store_value(value=other, alias="flag")
+        current = await renderer.get_or_render("flag")
+        assert current.body != first.body
+        assert str(other.value_id).encode() in current.body
+        assert (await renderer.get_or_render(other.value_id)).body == current.body
+
+        # the aliases of a value are part of its info, so a new alias means a new cache entry
+        misses = disk_cache.stats.misses
+        assert (await renderer.get_or_render(value.value_id)).body == first.body
+        assert disk_cache.stats.misses == misses
+        kiara_api.store_value(value=value, alias="other_flag")
+        await renderer.get_or_render(value.value_id)
+        assert disk_cache.stats.misses == misses + 1
+
+    anyio.run(run)
+
+
+def test_large_value_infos_are_streamed(kiara_api: KiaraAPI, disk_cache: DiskCache):
+
+    renderer = _renderer(kiara_api, disk_cache, prerender=False, stream_threshold=10)
+
+    async def run():
+        value = kiara_api.register_data(True, data_type="boolean")
+        kiara_api.store_value(value=value, alias="flag")
+        created = await renderer.get_or_render("flag")
+        assert isinstance(created, EncodedContent)
+
+        cached = await renderer.get_or_render("flag")
+        assert isinstance(cached, EncodedStream)
+        assert cached.size == len(created.body)
+        assert b"".join([chunk async for chunk in cached.chunks]) == created.body
+
+    anyio.run(run)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the on-disk response cache in `kiara_plugin.service.utils.response_cache`."""
+
+import os
+import tempfile
+import uuid
+
+import anyio
+import orjson
+
+from kiara_plugin.service.utils.encoding import EncodedContent
+from kiara_plugin.service.utils.response_cache import (
+    DiskCache,
+    EncodedStream,
+    ResponseCache,
+    cache_key,
+)
+
+
+def test_cache_key_identifies_parts():
+
+    value_id = uuid.uuid4()
+    key = cache_key("render", value_id, "hash", {"a": 1, "b": 2})
+
+    assert key.startswith("render:")
+    assert key == cache_key("render", value_id, "hash", {"b": 2, "a": 1})
+    assert key != cache_key("render", value_id, "other_hash", {"a": 1, "b": 2})
+    assert key != cache_key("lineage", value_id, "hash", {"a": 1, "b": 2})
+
+
+def test_disk_cache_is_shared_and_evicts():
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "responses", "cache.sqlite")
+        cache = DiskCache(path=path, max_bytes=1000, max_item_bytes=500)
+
+        assert cache.set("a", b"x" * 400)
+        assert not cache.set("too_big", b"x" * 501)
+        assert "a" in cache
+        assert "too_big" not in cache
+
+        # another process (or a restarted one) sees the same entries
+        other = DiskCache(path=path, max_bytes=1000, max_item_bytes=500)
+        assert other.get("a") == b"x" * 400
+        assert other.get("missing") is None
+        assert other.stats.hits == 1
+        assert other.stats.misses == 1
+
+        other.set("b", b"y" * 400)
+        other.set("c", b"z" * 400)
+
+        stats = cache.stats
+        assert stats.bytes <= 1000
+        assert stats.items == 2
+        assert "a" not in cache
+        assert cache.get("c") == b"z" * 400
+
+        cache.invalidate("c")
+        assert "c" not in other
+        assert other.stats.bytes == 400
+
+
+def test_response_cache_encodes_once():
+
+    calls = []
+
+    async def create():
+        calls.append(1)
+        return {"id": uuid.UUID(int=1), "items": [1, 2]}
+
+    async def run(response_cache: ResponseCache, key):
+        return [await response_cache.get_or_create(key, create) for _ in range(3)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        disk_cache = DiskCache(path=os.path.join(temp_dir, "cache.sqlite"))
+        response_cache = ResponseCache(disk_cache=disk_cache, namespace="test")
+
+        results = anyio.run(run, response_cache, "key")
+        assert len(calls) == 1
+        assert all(isinstance(r, EncodedContent) for r in results)
+        assert orjson.loads(results[0].body) == {
+            "id": str(uuid.UUID(int=1)),
+            "items": [1, 2],
+        }
+        assert results[0].media_type == "application/json"
+        assert response_cache.contains("key")
+
+        # uncacheable responses are created every time, and not encoded
+        results = anyio.run(run, response_cache, None)
+        assert len(calls) == 4
+        assert results[0]["items"] == [1, 2]
+
+
+def test_response_cache_streams_large_responses():
+
+    html = "<div>" + "x" * 1000 + "</div>"
+
+    async def create():
+        return html
+
+    async def run(response_cache: ResponseCache):
+        results = []
+        for _ in range(2):
+            result = await response_cache.get_or_create(
+                "key", create, stream_threshold=100, chunk_size=64
+            )
+            if isinstance(result, EncodedStream):
+                chunks = [chunk async for chunk in result.chunks]
+                results.append((result, chunks))
+            else:
+                results.append((result, None))
+        small = await response_cache.get_or_create(
+            "small", create, stream_threshold=len(html) * 2
+        )
+        small_again = await response_cache.get_or_create(
+            "small", create, stream_threshold=len(html) * 2
+        )
+        return results, small, small_again
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        disk_cache = DiskCache(path=os.path.join(temp_dir, "cache.sqlite"))
+        response_cache = ResponseCache(disk_cache=disk_cache)
+
+        (created, cached), small, small_again = anyio.run(run, response_cache)
+
+        # the response is encoded in memory when it's created, and streamed from the cache afterwards
+        assert isinstance(created[0], EncodedContent)
+        assert isinstance(cached[0], EncodedStream)
+        assert cached[0].size == len(created[0].body)
+        assert all(len(chunk) <= 64 for chunk in cached[1])
+        assert b"".join(cached[1]) == created[0].body
+        assert orjson.loads(created[0].body) == html
+
+        assert isinstance(small_again, EncodedContent)
+        assert small_again.body == small.body
+        assert disk_cache.stats.hits == 2
+
+
+def test_disk_cache_stores_large_entries_in_files(tmp_path):
+
+    path = str(tmp_path / "cache.sqlite")
+    files_dir = str(tmp_path / "cache.files")
+    cache = DiskCache(path=path, max_bytes=10000, max_inline_bytes=100)
+
+    cache.set("small", b"x" * 100)
+    cache.set("large", b"y" * 1000)
+    assert len(os.listdir(files_dir)) == 1
+    assert cache.get("small") == b"x" * 100
+    assert cache.get("large") == b"y" * 1000
+    assert cache.stats.bytes == 1100
+
+    # replacing an entry removes its previous file
+    cache.set("large", b"z" * 1000)
+    assert len(os.listdir(files_dir)) == 1
+    cache.set("large", b"z" * 10)
+    assert os.listdir(files_dir) == []
+    assert cache.get("large") == b"z" * 10
+
+    cache.set("large", b"y" * 1000)
+    cache.clear()
+    assert os.listdir(files_dir) == []
+    assert cache.stats.items == 0
+
+
+def test_response_cache_streams_evicted_responses():
+
+    html = "<div>" + "x" * 1000 + "</div>"
+
+    async def create():
+        return html
+
+    async def run(response_cache: ResponseCache):
+        created = await response_cache.get_or_create(
+            "key", create, stream_threshold=100
+        )
+        stream = await response_cache.get_or_create(
+            "key", create, stream_threshold=100, chunk_size=64
+        )
+        chunks = [await stream.chunks.__anext__()]
+        # the entry goes away while it's streamed
+        disk_cache.clear()
+        chunks.extend([chunk async for chunk in stream.chunks])
+        return created, stream, chunks
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        disk_cache = DiskCache(
+            path=os.path.join(temp_dir, "cache.sqlite"), max_inline_bytes=100
+        )
+        response_cache = ResponseCache(disk_cache=disk_cache)
+
+        created, stream, chunks = anyio.run(run, response_cache)
+        assert isinstance(stream, EncodedStream)
+        assert b"".join(chunks) == created.body
+        assert disk_cache.stats.items == 0
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the reservoir sampling in `kiara_plugin.service.utils.sampling`."""
+
+from collections import Counter
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from kiara_plugin.service.utils.sampling import (
+    Sampler,
+    allocate_sample,
+    sample_arrow,
+    sample_data,
+    sample_rows,
+)
+
+GROUP_COUNTS = {"common": 9000, "rare": 1000}
+
+
+def _chunks(num_rows: int, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+
+    for start in range(0, num_rows, chunk_size):
+        end = min(start + chunk_size, num_rows)
+        yield [
+            {"id": i, "group": "rare" if i % 10 == 0 else "common"}
+            for i in range(start, end)
+        ]
+
+
+def test_random_sample():
+
+    sample = sample_rows(_chunks(10000, 333), size=50, seed=7)
+
+    assert sample.total == 10000
+    assert len(sample.items) == 50
+    assert len(set(sample.positions)) == 50
+    assert sample.positions == sorted(sample.positions)
+    assert [row["id"] for row in sample.items] == sample.positions
+
+    # deterministic for a seed, independent of the chunk size
+    assert sample_rows(_chunks(10000, 333), size=50, seed=7) == sample
+    assert sample_rows(_chunks(10000, 1000), size=50, seed=8) != sample
+
+    small = sample_rows(_chunks(20, 7), size=50, seed=7)
+    assert small.positions == list(range(20))
+
+
+def test_random_sample_is_uniform():
+
+    counts: Counter = Counter()
+    for seed in range(2000):
+        sample = sample_rows(_chunks(50, 7), size=5, seed=seed)
+        counts.update(sample.positions)
+
+    # every row is expected to be sampled 200 times
+    assert len(counts) == 50
+    assert min(counts.values()) > 140
+    assert max(counts.values()) < 260
+
+
+def test_stratified_sample():
+
+    sample = sample_rows(
+        _chunks(10000, 333),
+        size=20,
+        seed=1,
+        stratify_by="group",
+        strata_counts=GROUP_COUNTS,
+    )
+
+    groups = Counter(row["group"] for row in sample.items)
+    assert groups == {"common": 17, "rare": 3}
+    assert [row["id"] for row in sample.items] == sample.positions
+
+    with pytest.raises(ValueError):
+        sample_rows(
+            _chunks(100, 10), size=20, stratify_by="missing", strata_counts={"a": 1}
+        )
+    with pytest.raises(ValueError, match="not provided"):
+        sample_rows(_chunks(100, 10), size=20, stratify_by="group")
+    with pytest.raises(ValueError, match="was not counted"):
+        sample_rows(
+            _chunks(100, 10), size=20, stratify_by="group", strata_counts={"rare": 10}
+        )
+
+
+def test_strata_only_keep_their_share():
+
+    sampler = Sampler(size=10, strata_counts={"a": 90, "b": 9, "c": 1})
+    # every stratum has a reservoir of the size of its share, rather than of the whole sample
+    assert {k: r._size for k, r in sampler._strata.items()} == {  # type: ignore
+        "a": 7,
+        "b": 2,
+        "c": 1,
+    }
+
+    sampler = Sampler(size=2, strata_counts={"a": 90, "b": 9, "c": 1})
+    assert sampler._strata["b"] is None
+    assert sampler._strata["c"] is None
+    for stratum in ("a", "b", "c", "a"):
+        sampler.add(1, lambda offsets, _s=stratum: [_s] * len(offsets), [stratum])
+    assert sampler.result().positions == [0, 3]
+
+    with pytest.raises(ValueError, match="more than 2 distinct values"):
+        Sampler(size=10, strata_counts={"a": 1, "b": 1, "c": 1}, max_strata=2)
+
+
+def test_allocate_sample():
+
+    assert allocate_sample({"a": 900, "b": 90, "c": 10}, 10) == {"a": 7, "b": 2, "c": 1}
+    assert allocate_sample({"a": 3, "b": 1}, 10) == {"a": 3, "b": 1}
+    assert sum(allocate_sample({i: 1 for i in range(20)}, 10).values()) == 10
+
+
+def test_arrow_sample():
+
+    pa = pytest.importorskip("pyarrow")
+
+    table = pa.table({"id": list(range(1000)), "group": ["a", "b"] * 500})
+    sample = sample_arrow(table, size=10, seed=3, stratify_by="group", chunk_size=64)
+    assert sample.total == 1000
+    assert [row["id"] for row in sample.items] == sample.positions
+    assert Counter(row["group"] for row in sample.items) == {"a": 5, "b": 5}
+
+    array = pa.chunked_array([list(range(100)), list(range(100, 150))])
+    sample = sample_arrow(array, size=10, seed=3)
+    assert sample.items == sample.positions
+
+
+class _Database(object):
+    """A database with the interface of a 'KiaraDatabase'."""
+
+    def __init__(self, engine: Any):
+
+        self._engine = engine
+
+    def get_sqlalchemy_engine(self) -> Any:
+        return self._engine
+
+    @property
+    def table_names(self) -> List[str]:
+
+        from sqlalchemy import inspect
+
+        return inspect(self._engine).get_table_names()
+
+
+def test_database_sample():
+
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+
+    engine = sqlalchemy.create_engine("sqlite://")
+    metadata = sqlalchemy.MetaData()
+    tables = [
+        sqlalchemy.Table(
+            name,
+            metadata,
+            sqlalchemy.Column("id", sqlalchemy.Integer),
+            sqlalchemy.Column("group", sqlalchemy.String),
+        )
+        for name in ("rows", 'quoted "rows"')
+    ]
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        for t in tables:
+            conn.execute(
+                t.insert(), [row for chunk in _chunks(1000, 1000) for row in chunk]
+            )
+
+    samples = sample_data(
+        _Database(engine), size=20, seed=1, stratify_by="group", chunk_size=64
+    )
+    assert set(samples) == {"rows", 'quoted "rows"'}
+    for sample in samples.values():
+        assert sample.total == 1000
+        assert [row["id"] for row in sample.items] == sample.positions
+        assert Counter(row["group"] for row in sample.items) == {
+            "common": 17,
+            "rare": 3,
+        }
+
+    with pytest.raises(ValueError, match="no column 'missing'"):
+        sample_data(_Database(engine), size=20, stratify_by="missing")
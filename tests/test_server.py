@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the listeners in `kiara_plugin.service.utils.server`."""
+
+import os
+import tempfile
+
+import anyio
+import pytest
+
+from kiara_plugin.service.utils.benchmark import BenchmarkRequest, benchmark_client
+from kiara_plugin.service.utils.server import (
+    ListenerConfig,
+    create_client,
+    find_free_port,
+    serve,
+    wait_until_listening,
+)
+
+
+async def _app(scope, receive, send):
+
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            await send({"type": f"{message['type']}.complete"})
+            if message["type"] == "lifespan.shutdown":
+                return
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain")],
+        }
+    )
+    await send({"type": "http.response.body", "body": scope["http_version"].encode()})
+
+
+async def _serve_and_request(listener: ListenerConfig):
+
+    shutdown = anyio.Event()
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(serve, _app, listener, shutdown)
+        try:
+            await wait_until_listening(listener, timeout=10)
+            async with create_client(listener) as client:
+                response = await client.get("/")
+                report = await benchmark_client(
+                    client,
+                    [BenchmarkRequest(name="root", path="/")],
+                    concurrency=4,
+                    iterations=20,
+                )
+        finally:
+            shutdown.set()
+    return response, report
+
+
+@pytest.mark.parametrize("use_uds", [False, True])
+def test_serve_http1(use_uds):
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        listener = ListenerConfig(
+            port=find_free_port(),
+            uds=os.path.join(temp_dir, "service.sock") if use_uds else None,
+        )
+        response, report = anyio.run(_serve_and_request, listener)
+
+    assert response.status_code == 200
+    assert response.text == "1.1"
+    assert report.endpoints["root"].requests == 20
+    assert report.endpoints["root"].errors == 0
+
+
+def test_serve_http2():
+
+    pytest.importorskip("hypercorn")
+    pytest.importorskip("h2")
+
+    listener = ListenerConfig(port=find_free_port(), http2=True)
+    response, report = anyio.run(_serve_and_request, listener)
+
+    assert response.http_version == "HTTP/2"
+    assert response.text == "2"
+    assert report.endpoints["root"].errors == 0
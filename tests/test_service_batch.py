@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the '/batch' endpoint in `kiara_plugin.service.openapi.controllers.batch`."""
+
+import pytest
+
+from kiara.interfaces.python_api import KiaraAPI
+from kiara_plugin.service.config import KiaraServiceConfig
+
+try:
+    from starlite.testing import TestClient
+
+    from kiara_plugin.service.openapi.service import KiaraOpenAPIService
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service: {e}", allow_module_level=True)
+
+ADMIN_TOKEN = "admin-token"  # noqa: S105
+
+
+@pytest.fixture
+def client(kiara_api: KiaraAPI, service_config: KiaraServiceConfig):
+
+    config = service_config.model_copy(
+        update={"admin_token": ADMIN_TOKEN, "tracing": True}
+    )
+    service = KiaraOpenAPIService(kiara_api=kiara_api, config=config)
+    with TestClient(app=service.app()) as client:
+        yield client
+
+
+def test_batch(client):
+
+    admin_headers = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+    response = client.post(
+        "/batch",
+        json={
+            "requests": [
+                {"path": "/service/health/live"},
+                {"path": "/debug/traces"},
+                {"path": "/debug/traces", "headers": admin_headers},
+                {"path": "/does/not/exist"},
+            ]
+        },
+        headers=admin_headers,
+    )
+    assert response.status_code == 201
+
+    responses = response.json()["responses"]
+    # the admin token of the batch request isn't passed on to the requests
+    assert [r["status"] for r in responses] == [200, 401, 200, 404]
+    assert all(r["content_type"].startswith("application/json") for r in responses)
+    assert isinstance(responses[2]["body"], list)
+
+
+def test_batch_validation(client):
+
+    response = client.post("/batch", json={"requests": [{"path": "/batch"}]})
+    assert response.status_code == 400
+
+    too_many = [{"path": "/service/health/live"}] * 51
+    response = client.post("/batch", json={"requests": too_many})
+    assert response.status_code == 400
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the service benchmarks in `kiara_plugin.service.openapi.benchmark`."""
+
+import os
+
+import anyio
+import pytest
+
+from kiara_plugin.service.config import KiaraServiceConfig
+from kiara_plugin.service.utils.context_generator import ContextSpec, generate_context
+
+try:
+    from kiara_plugin.service.openapi import benchmark
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service controllers: {e}", allow_module_level=True)
+
+
+def test_create_benchmark_requests(tmp_path):
+
+    spec = ContextSpec(scalar_values=4, aliases=4, lineage_chains=0, workflows=1)
+    kiara_api = generate_context(spec, cache_dir=str(tmp_path / "cache"))
+
+    requests = benchmark.create_benchmark_requests(kiara_api, samples=2)
+    names = [r.name for r in requests]
+    assert names.count("data.value_info") == 2
+    assert "pipelines.structure" in names
+    assert names.count("workflows.info") == 1
+
+
+def test_benchmark_service_on_a_copy(tmp_path):
+
+    spec = ContextSpec(scalar_values=4, aliases=4, lineage_chains=0)
+    cache_dir = str(tmp_path / "cache")
+    value_ids = sorted(generate_context(spec, cache_dir=cache_dir).list_value_ids())
+
+    kiara_api = generate_context(
+        spec, cache_dir=cache_dir, copy_to=str(tmp_path / "copy")
+    )
+    config = KiaraServiceConfig(
+        upload_staging_dir=os.path.join(tmp_path, "uploads"),
+        response_cache_dir=os.path.join(tmp_path, "responses"),
+    )
+
+    async def main():
+        return await benchmark.benchmark_service(
+            kiara_api=kiara_api, config=config, concurrency=1, iterations=2, samples=1
+        )
+
+    report = anyio.run(main)
+    assert report.endpoints["jobs.queue_job"].requests == 2
+    assert report.endpoints["jobs.queue_job"].errors == 0
+
+    # the jobs ran in the copy, the generated context is unchanged
+    cached_api = generate_context(spec, cache_dir=cache_dir)
+    assert sorted(cached_api.list_value_ids()) == value_ids
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the data sampling and aggregation endpoints in `kiara_plugin.service.openapi.controllers.values`."""
+
+from collections import Counter
+
+import pytest
+
+from kiara.interfaces.python_api import KiaraAPI
+from kiara_plugin.service.config import KiaraServiceConfig
+
+try:
+    from starlite.testing import TestClient
+
+    from kiara_plugin.service.openapi.service import KiaraOpenAPIService
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service: {e}", allow_module_level=True)
+
+
+@pytest.fixture
+def client(kiara_api: KiaraAPI, service_config: KiaraServiceConfig):
+
+    service = KiaraOpenAPIService(kiara_api=kiara_api, config=service_config)
+    with TestClient(app=service.app()) as client:
+        yield client
+
+
+@pytest.fixture
+def table_alias(kiara_api: KiaraAPI) -> str:
+
+    pytest.importorskip("kiara_plugin.tabular")
+    pa = pytest.importorskip("pyarrow")
+
+    table = pa.table(
+        {
+            "id": list(range(1000)),
+            "group": ["rare" if i % 10 == 0 else "common" for i in range(1000)],
+            "amount": [i % 7 for i in range(1000)],
+        }
+    )
+    value = kiara_api.register_data(table, data_type="table")
+    kiara_api.store_value(value=value, alias="rows")
+    return "rows"
+
+
+def test_sample(client, table_alias: str):
+
+    response = client.get(f"/data/sample/{table_alias}", params={"size": 20})
+    assert response.status_code == 200
+    sample = response.json()
+    assert sample["data_type"] == "table"
+    rows = sample["samples"]["rows"]
+    assert rows["total"] == 1000
+    assert len(rows["items"]) == 20
+    assert [row["id"] for row in rows["items"]] == rows["positions"]
+
+    # samples are cached, and deterministic for a seed
+    assert (
+        client.get(f"/data/sample/{table_alias}", params={"size": 20}).json() == sample
+    )
+
+    response = client.get(
+        f"/data/sample/{table_alias}",
+        params={"size": 20, "seed": 1, "stratify_by": "group"},
+    )
+    rows = response.json()["samples"]["rows"]
+    assert Counter(row["group"] for row in rows["items"]) == {"common": 17, "rare": 3}
+
+    response = client.get(
+        f"/data/sample/{table_alias}", params={"stratify_by": "missing"}
+    )
+    assert response.status_code == 400
+
+
+def test_sample_of_unsupported_value(client, kiara_api: KiaraAPI):
+
+    value = kiara_api.register_data(True, data_type="boolean")
+    kiara_api.store_value(value=value, alias="flag")
+
+    response = client.get("/data/sample/flag")
+    assert response.status_code == 400
+    assert "Can't sample data of type" in response.json()["detail"]
+
+
+def test_aggregate(client, table_alias: str):
+
+    query = {
+        "group_by": ["group"],
+        "aggregations": [
+            {"function": "count"},
+            {"function": "sum", "column": "amount", "alias": "total"},
+            {"function": "count_distinct", "column": "amount"},
+        ],
+    }
+    response = client.post(f"/data/aggregate/{table_alias}", json=query)
+    assert response.status_code == 201
+    result = response.json()
+    assert result["columns"] == ["group", "count", "total", "amount_count_distinct"]
+    assert [row[:2] for row in result["rows"]] == [["common", 900], ["rare", 100]]
+    assert result["num_groups"] == 2
+    assert not result["truncated"]
+
+    response = client.post(
+        f"/data/aggregate/{table_alias}", json={"group_by": ["missing"]}
+    )
+    assert response.status_code == 400
+    assert "no column 'missing'" in response.json()["detail"]
+
+
+def test_aggregate_non_table_value(client, kiara_api: KiaraAPI):
+
+    value = kiara_api.register_data(True, data_type="boolean")
+    kiara_api.store_value(value=value, alias="flag")
+
+    response = client.post("/data/aggregate/flag", json={})
+    assert response.status_code == 400
+    assert "not a table" in response.json()["detail"]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for serving several kiara contexts in `kiara_plugin.service.openapi.multi_context`."""
+
+import pytest
+
+from kiara.interfaces.python_api import KiaraAPI
+from kiara.models.module.jobs import JobStatus
+from kiara_plugin.service.config import KiaraServiceConfig
+
+try:
+    from starlite.testing import TestClient
+
+    from kiara_plugin.service.openapi.controllers.jobs import JobManager
+    from kiara_plugin.service.openapi.multi_context import KiaraMultiContextService
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service: {e}", allow_module_level=True)
+
+
+@pytest.fixture
+def service(kiara_api: KiaraAPI, service_config: KiaraServiceConfig):
+
+    kiara_api.create_new_context("other", set_active=False)
+    value = kiara_api.register_data(True, data_type="boolean")
+    kiara_api.store_value(value=value, alias="flag")
+
+    return KiaraMultiContextService(
+        kiara_config=kiara_api._kiara_config,
+        default_context=kiara_api.get_current_context_name(),
+        config=service_config.model_copy(update={"max_open_contexts": 1}),
+    )
+
+
+def test_contexts_are_routed_by_prefix_and_header(
+    kiara_api: KiaraAPI, service: KiaraMultiContextService
+):
+
+    default_context = kiara_api.get_current_context_name()
+    with TestClient(app=service.app()) as client:
+        contexts = client.get("/contexts").json()
+        assert contexts["default"] == default_context
+        assert set(contexts["available"]) == {default_context, "other"}
+        assert contexts["pool"]["open"] == []
+
+        # the value is only stored in the default context
+        assert len(client.get("/data/ids").json()) == 1
+        assert len(client.get(f"/contexts/{default_context}/data/ids").json()) == 1
+        assert client.get("/contexts/other/data/ids").json() == []
+        response = client.get("/data/ids", headers={"x-kiara-context": "other"})
+        assert response.json() == []
+        assert client.get("/contexts").json()["pool"]["open"] == ["other"]
+
+        response = client.get("/contexts/missing/data/ids")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "No kiara context 'missing'."
+
+    assert service.stats.open == []
+
+
+def test_html_fragments_link_within_their_context(
+    service: KiaraMultiContextService, monkeypatch
+):
+
+    with TestClient(app=service.app()) as client:
+        response = client.post(
+            "/contexts/other/jobs/queue_job",
+            json={"operation_id": "logic.not", "inputs": {"a": True}},
+        )
+        job_id = response.json()["job_id"]
+
+        # pretend the job is still running, so the fragment keeps polling
+        get_job = JobManager.get_job
+
+        def get_running_job(self, job_id):
+            job = get_job(self, job_id)
+            return job.model_copy(update={"status": JobStatus.STARTED})
+
+        monkeypatch.setattr(JobManager, "get_job", get_running_job)
+
+        for prefix in ("/contexts/other", ""):
+            response = client.get(
+                f"{prefix}/jobs/monitor_job/{job_id}/html",
+                params={"element_id": "monitor"},
+                headers={"x-kiara-context": "other"},
+            )
+            assert response.status_code == 200
+            assert f'hx-get="{prefix}/jobs/monitor_job/{job_id}/html"' in response.text
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for serving registry metadata from snapshots in `kiara_plugin.service.openapi.controllers`."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from kiara.interfaces.python_api import KiaraAPI
+from kiara_plugin.service.config import KiaraServiceConfig
+from kiara_plugin.service.utils.registry_snapshot import (
+    RegistrySnapshot,
+    RegistrySnapshotManager,
+    installed_versions,
+    save_snapshot,
+)
+
+try:
+    from starlite.testing import TestClient
+
+    from kiara_plugin.service.openapi.service import KiaraOpenAPIService
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service: {e}", allow_module_level=True)
+
+
+@pytest.fixture
+def service(kiara_api: KiaraAPI, service_config: KiaraServiceConfig, monkeypatch):
+    """A service with a snapshot from a 'previous run', which keeps serving it because its registries never load."""
+
+    manager = RegistrySnapshotManager(
+        kiara_api=kiara_api, snapshot_dir=service_config.registry_snapshot_dir
+    )
+    snapshot = RegistrySnapshot(
+        key=manager.key,
+        created=datetime.now(timezone.utc),
+        versions=installed_versions(),
+        operation_ids=[],
+        operations={},
+        module_types={"snapshot.only": {"type_name": "snapshot.only"}},
+        data_types={},
+        pipeline_ids=[],
+        pipelines={},
+    )
+    save_snapshot(snapshot, manager.path)
+
+    async def load_registries(self) -> None:
+        pass
+
+    monkeypatch.setattr(KiaraOpenAPIService, "_load_registries", load_registries)
+    return KiaraOpenAPIService(kiara_api=kiara_api, config=service_config)
+
+
+def test_registry_metadata_from_snapshot(service):
+
+    with TestClient(app=service.app()) as client:
+        assert client.get("/service/health/ready").json()["registries_loaded"] is False
+        assert client.get("/modules/type_names").json() == ["snapshot.only"]
+        assert client.get("/modules/snapshot.only").json() == {
+            "type_name": "snapshot.only"
+        }
+
+        # items that are missing from the snapshot are looked up in the registries
+        response = client.get("/modules/logic.and")
+        assert response.status_code == 200
+        assert response.json()["type_name"] == "logic.and"
+        response = client.get("/data-types/boolean")
+        assert response.status_code == 200
+        assert response.json()["type_name"] == "boolean"
+
+        # once the registries are loaded, the snapshot isn't used anymore
+        service._registry_snapshot.load_registries()
+        assert client.get("/service/health/ready").json()["registries_loaded"] is True
+        type_names = client.get("/modules/type_names").json()
+        assert "logic.and" in type_names
+        assert "snapshot.only" not in type_names
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the route handler spans of traced requests in `kiara_plugin.service.openapi.service`."""
+
+import anyio
+import httpx
+import pytest
+
+from kiara_plugin.service.utils.tracing import Tracer, TracingMiddleware, trace_span
+
+try:
+    from starlite import Starlite, get
+
+    from kiara_plugin.service.openapi.service import (
+        end_handler_span,
+        start_handler_span,
+    )
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service: {e}", allow_module_level=True)
+
+
+@get("/value")
+async def get_value() -> str:
+
+    with trace_span("lookup"):
+        return "a"
+
+
+@get("/fail")
+async def fail() -> str:
+
+    raise ValueError("failed")
+
+
+def _request(app, path: str) -> httpx.Response:
+    async def run() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.get(path)
+
+    return anyio.run(run)
+
+
+def _spans(tracer: Tracer) -> dict:
+
+    [trace] = tracer.get_traces(limit=1)
+    return {
+        span["name"]: span
+        for span in trace["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    }
+
+
+@pytest.fixture
+def tracer() -> Tracer:
+    return Tracer(sample_rate=1.0)
+
+
+@pytest.fixture
+def app(tracer: Tracer):
+
+    starlite_app = Starlite(
+        route_handlers=[get_value, fail],
+        before_request=start_handler_span,
+        after_request=end_handler_span,
+    )
+    return TracingMiddleware(starlite_app, tracer=tracer)
+
+
+def test_handler_span(app, tracer: Tracer):
+
+    response = _request(app, "/value")
+    assert response.status_code == 200
+
+    spans = _spans(tracer)
+    root = spans["GET /value"]
+    handler = spans["handler get_value"]
+    assert handler["parentSpanId"] == root["spanId"]
+    # spans recorded by the handler are nested in the handler span
+    assert spans["lookup"]["parentSpanId"] == handler["spanId"]
+    assert int(handler["endTimeUnixNano"]) <= int(root["endTimeUnixNano"])
+
+
+def test_handler_span_of_failed_handler(app, tracer: Tracer):
+
+    response = _request(app, "/fail")
+    assert response.status_code == 500
+
+    # the after request hook isn't called, the span is ended with the trace
+    spans = _spans(tracer)
+    root = spans["GET /fail"]
+    handler = spans["handler fail"]
+    assert handler["parentSpanId"] == root["spanId"]
+    assert handler["endTimeUnixNano"] == root["endTimeUnixNano"]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for template precompilation, fragment caching and request globals in `kiara_plugin.service.utils.templates`."""
+
+import os
+import tempfile
+
+import anyio
+import pytest
+from jinja2 import DictLoader, Environment
+
+from kiara_plugin.service.utils.templates import (
+    FragmentCache,
+    RequestGlobal,
+    TemplateGlobalsMiddleware,
+    enable_bytecode_cache,
+    precompile_templates,
+    url,
+)
+
+TEMPLATES = {
+    "jobs/job_monitor.html": "<div>Monitoring job: {{ job_id }}</div>",
+    "jobs/job_finished.html": "<div>{% for name in results %}{{ name }}{% endfor %}</div>",
+    "jobs/readme.txt": "not a template",
+    "values/broken.html": "{% for %}",
+    "values/link.html": "<a hx-get=\"{{ url('/values/' ~ api.name) }}\"></a>",
+}
+
+
+def test_precompile_templates_with_bytecode_cache():
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        environment = Environment(loader=DictLoader(TEMPLATES), autoescape=True)
+        enable_bytecode_cache(environment, cache_dir=temp_dir)
+
+        # broken templates are skipped
+        assert precompile_templates(environment) == 3
+        assert len(os.listdir(temp_dir)) == 3
+
+        assert precompile_templates(environment, prefixes=("jobs/",)) == 2
+        assert precompile_templates(environment, prefixes=("other/",)) == 0
+
+        # a restarted service loads the compiled templates from the bytecode cache
+        restarted = Environment(loader=DictLoader(TEMPLATES), autoescape=True)
+        enable_bytecode_cache(restarted, cache_dir=temp_dir)
+        assert precompile_templates(restarted) == 3
+        assert len(os.listdir(temp_dir)) == 3
+
+
+def test_fragment_cache_renders_immutable_fragments_once():
+
+    environment = Environment(loader=DictLoader(TEMPLATES), autoescape=True)
+    fragment_cache = FragmentCache(environment=environment, max_items=10)
+
+    contexts = []
+
+    def create_context():
+        contexts.append(1)
+        return {"results": ["x", "y"]}
+
+    for _ in range(3):
+        html = fragment_cache.render(
+            "jobs/job_finished.html", create_context, key=("job_1", "element")
+        )
+        assert html == "<div>xy</div>"
+    assert len(contexts) == 1
+    assert fragment_cache.cache.stats.hits == 2
+
+    fragment_cache.render(
+        "jobs/job_finished.html", create_context, key=("job_2", "element")
+    )
+    assert len(contexts) == 2
+
+    # fragments without key are rendered every time
+    for job_id in ("a", "b"):
+        html = fragment_cache.render("jobs/job_monitor.html", {"job_id": job_id})
+        assert html == f"<div>Monitoring job: {job_id}</div>"
+    assert len(fragment_cache.cache) == 2
+
+
+class _Api(object):
+    def __init__(self, name: str):
+        self.name = name
+
+
+def test_request_globals():
+
+    environment = Environment(loader=DictLoader(TEMPLATES), autoescape=True)
+    environment.globals.update(api=RequestGlobal("api"), url=url)
+    fragment_cache = FragmentCache(environment=environment, max_items=10)
+    template = environment.get_template("values/link.html")
+
+    assert url("/values") == "/values"
+    with pytest.raises(AttributeError, match="only available while handling"):
+        RequestGlobal("api").name
+
+    rendered = []
+
+    async def app(scope, receive, send) -> None:
+        rendered.append(template.render())
+        rendered.append(fragment_cache.render("values/link.html", {}, key=("link",)))
+
+    async def run() -> None:
+        # the services of two contexts, sharing the same environment
+        default = TemplateGlobalsMiddleware(app, api=_Api("default"))
+        other = TemplateGlobalsMiddleware(app, api=_Api("other"))
+        await default({"type": "http", "root_path": ""}, None, None)
+        await other({"type": "http", "root_path": "/contexts/other"}, None, None)
+
+    anyio.run(run)
+
+    assert rendered == [
+        '<a hx-get="/values/default"></a>',
+        '<a hx-get="/values/default"></a>',
+        '<a hx-get="/contexts/other/values/other"></a>',
+        '<a hx-get="/contexts/other/values/other"></a>',
+    ]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for request tracing in `kiara_plugin.service.utils.tracing`."""
+
+import json
+
+import anyio
+import httpx
+
+from kiara_plugin.service.utils.concurrency import ContextAccess
+from kiara_plugin.service.utils.tracing import (
+    Tracer,
+    TracingMiddleware,
+    trace_span,
+)
+
+
+def _lookup_value(name: str) -> str:
+    with trace_span("lookup", value=name):
+        return name.upper()
+
+
+def _create_app(context_access: ContextAccess):
+    async def app(scope, receive, send):
+
+        result = await context_access.read(_lookup_value, "a")
+        with trace_span("render"):
+            body = result.encode()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def _request(app, headers=None) -> httpx.Response:
+    async def run() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.get("/data/a", headers=headers)
+
+    return anyio.run(run)
+
+
+def test_sampled_request_records_nested_spans(tmp_path):
+
+    trace_file = tmp_path / "traces.jsonl"
+    tracer = Tracer(sample_rate=1.0, trace_file=str(trace_file))
+    app = TracingMiddleware(_create_app(ContextAccess()), tracer=tracer)
+
+    response = _request(app)
+    assert response.status_code == 200
+    _, trace_id, root_span_id, flags = response.headers["traceparent"].split("-")
+
+    traces = tracer.get_traces()
+    assert len(traces) == 1
+    spans = {
+        span["name"]: span
+        for span in traces[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    }
+    assert set(spans.keys()) == {"GET /data/a", "_lookup_value", "lookup", "render"}
+    assert all(span["traceId"] == trace_id for span in spans.values())
+    assert spans["GET /data/a"]["spanId"] == root_span_id
+    # the span recorded in the worker thread is nested in the span of the context access
+    assert spans["lookup"]["parentSpanId"] == spans["_lookup_value"]["spanId"]
+    assert spans["_lookup_value"]["parentSpanId"] == root_span_id
+    assert spans["render"]["parentSpanId"] == root_span_id
+
+    lines = trace_file.read_text().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0]) == traces[0]
+
+
+def test_unsampled_requests_are_not_traced_unless_requested():
+
+    tracer = Tracer(sample_rate=0.0)
+    app = TracingMiddleware(_create_app(ContextAccess()), tracer=tracer)
+
+    response = _request(app)
+    assert "traceparent" not in response.headers
+    assert tracer.get_traces() == []
+
+    traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    response = _request(app, headers={"traceparent": traceparent})
+    assert response.headers["traceparent"].startswith(
+        "00-0af7651916cd43dd8448eb211c80319c-"
+    )
+    traces = tracer.get_traces(trace_id="0af7651916cd43dd8448eb211c80319c")
+    root = traces[0]["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert root["parentSpanId"] == "b7ad6b7169203331"
+
+
+def test_trace_file_is_written_when_cancelled(tmp_path):
+
+    trace_file = tmp_path / "traces.jsonl"
+    tracer = Tracer(sample_rate=1.0, trace_file=str(trace_file))
+
+    async def main():
+        root = tracer.start_trace("request")
+        with anyio.CancelScope() as scope:
+            scope.cancel()
+            await tracer.finish_trace(root)
+
+    anyio.run(main)
+    assert len(trace_file.read_text().splitlines()) == 1
+    assert len(tracer.get_traces()) == 1
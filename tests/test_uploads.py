@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the chunked uploads in `kiara_plugin.service.openapi.controllers.uploads`."""
+
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+from typing import AsyncIterator, List
+
+import anyio
+import pytest
+
+from kiara.interfaces.python_api import KiaraAPI
+
+try:
+    from starlite.exceptions import ValidationException
+
+    from kiara_plugin.service.openapi.controllers import uploads
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service controllers: {e}", allow_module_level=True)
+
+
+async def _stream(data: bytes, piece_size: int = 3) -> AsyncIterator[bytes]:
+
+    for start in range(0, len(data), piece_size):
+        yield data[start : start + piece_size]
+
+
+def _upload(
+    manager: "uploads.UploadManager", upload_id: str, chunks: List[bytes], **kwargs
+) -> "uploads.UploadStatus":
+    async def main():
+        status = None
+        for index, chunk in enumerate(chunks):
+            status = await manager.write_chunk(
+                upload_id, index, _stream(chunk), **kwargs
+            )
+        return status
+
+    return anyio.run(main)
+
+
+@pytest.fixture
+def staging_dir(tmp_path) -> str:
+    return os.path.join(tmp_path, "uploads")
+
+
+@pytest.fixture
+def upload_manager(kiara_api: KiaraAPI, staging_dir: str) -> "uploads.UploadManager":
+
+    os.makedirs(staging_dir)
+    return uploads.UploadManager(
+        kiara_api=kiara_api, staging_dir=staging_dir, default_chunk_size=4
+    )
+
+
+def _create(manager: "uploads.UploadManager", data: bytes, file_name: str = "x.txt"):
+
+    return manager.create_upload(
+        uploads.CreateUploadRequest(file_name=file_name, size=len(data))
+    )
+
+
+def test_chunk_size_and_checksum(upload_manager: "uploads.UploadManager"):
+
+    status = _create(upload_manager, b"0123456789")
+    assert status.number_of_chunks == 3
+
+    with pytest.raises(ValidationException):
+        _upload(upload_manager, status.upload_id, [b"01234"])
+    with pytest.raises(ValidationException):
+        _upload(upload_manager, status.upload_id, [b"012"])
+    with pytest.raises(ValidationException):
+        _upload(upload_manager, status.upload_id, [b"0123"], checksum="0" * 64)
+    with pytest.raises(ValidationException):
+        upload_manager.get_status(status.upload_id).expected_chunk_size(3)
+
+    checksum = hashlib.sha256(b"0123").hexdigest()
+    status = _upload(upload_manager, status.upload_id, [b"0123"], checksum=checksum)
+    assert status.received_chunks == {0: checksum}
+    assert status.missing_chunks == [1, 2]
+
+
+def test_invalid_file_names(upload_manager: "uploads.UploadManager", staging_dir: str):
+
+    for file_name in ("", ".", "..", "../x.txt", "a/b.txt", "a\\b.txt"):
+        with pytest.raises(ValidationException):
+            _create(upload_manager, b"0123", file_name=file_name)
+    assert os.listdir(staging_dir) == []
+
+    status = _create(upload_manager, b"0123", file_name="..x.txt")
+    _upload(upload_manager, status.upload_id, [b"0123"])
+    # status updates replace the status file, without leaving temporary files behind
+    assert sorted(os.listdir(os.path.join(staging_dir, status.upload_id))) == [
+        "data",
+        "upload.json",
+    ]
+
+
+def test_resume_after_restart(
+    kiara_api: KiaraAPI, upload_manager: "uploads.UploadManager", staging_dir: str
+):
+
+    status = _create(upload_manager, b"0123456789")
+    _upload(upload_manager, status.upload_id, [b"0123"])
+
+    # a new manager (e.g. after a restart of the service) picks up the persisted state
+    restarted = uploads.UploadManager(
+        kiara_api=kiara_api, staging_dir=staging_dir, default_chunk_size=4
+    )
+    status = restarted.get_status(status.upload_id)
+    assert status.missing_chunks == [1, 2]
+
+    with pytest.raises(ValidationException):
+        restarted.complete_upload(status.upload_id, uploads.CompleteUploadRequest())
+
+    async def main():
+        await restarted.write_chunk(status.upload_id, 2, _stream(b"89"))
+        return await restarted.write_chunk(status.upload_id, 1, _stream(b"4567"))
+
+    status = anyio.run(main)
+    assert status.missing_chunks == []
+
+    value = restarted.complete_upload(
+        status.upload_id, uploads.CompleteUploadRequest(aliases=["uploaded"])
+    )
+    assert value.data_type_name == "file"
+    assert value.data.file_name == "x.txt"
+    assert value.data.size == 10
+    assert kiara_api.get_value("uploaded").value_id == value.value_id
+    assert not os.listdir(staging_dir)
+
+
+def _tar(add) -> bytes:
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tf:
+        add(tf)
+    return buffer.getvalue()
+
+
+def _add_file(tf: tarfile.TarFile, name: str, data: bytes) -> None:
+
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tf.addfile(info, io.BytesIO(data))
+
+
+def _complete_bundle(manager: "uploads.UploadManager", data: bytes, file_name: str):
+
+    status = _create(manager, data, file_name=file_name)
+    chunks = [data[i : i + 4] for i in range(0, len(data), 4)]
+    _upload(manager, status.upload_id, chunks)
+    return manager.complete_upload(
+        status.upload_id, uploads.CompleteUploadRequest(data_type="file_bundle")
+    )
+
+
+def test_complete_as_file_bundle(upload_manager: "uploads.UploadManager"):
+    def add(tf: tarfile.TarFile) -> None:
+        _add_file(tf, "a.txt", b"a")
+        _add_file(tf, "sub/b.txt", b"bb")
+
+    value = _complete_bundle(upload_manager, _tar(add), file_name="bundle.tar.gz")
+    assert value.data_type_name == "file_bundle"
+    assert sorted(value.data.included_files.keys()) == ["a.txt", "sub/b.txt"]
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("c.txt", "c")
+    value = _complete_bundle(upload_manager, buffer.getvalue(), file_name="x.zip")
+    assert list(value.data.included_files.keys()) == ["c.txt"]
+
+
+def test_unsafe_archives_are_rejected(upload_manager: "uploads.UploadManager"):
+    def add_link(tf: tarfile.TarFile) -> None:
+        info = tarfile.TarInfo("passwd")
+        info.type = tarfile.SYMTYPE
+        info.linkname = "/etc/passwd"
+        tf.addfile(info)
+
+    def add_outside(tf: tarfile.TarFile) -> None:
+        _add_file(tf, "../outside.txt", b"x")
+
+    for add in (add_link, add_outside):
+        with pytest.raises(ValidationException):
+            _complete_bundle(upload_manager, _tar(add), file_name="bundle.tar.gz")
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("../outside.txt", "x")
+    with pytest.raises(ValidationException):
+        _complete_bundle(upload_manager, buffer.getvalue(), file_name="x.zip")
+
+    with pytest.raises(ValidationException):
+        _complete_bundle(upload_manager, b"not an archive", file_name="x.zip")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the value cache in `kiara_plugin.service.openapi.controllers.values`."""
+
+import os
+
+import pytest
+
+from kiara.interfaces.python_api import KiaraAPI
+
+try:
+    from kiara_plugin.service.openapi.controllers import values
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service controllers: {e}", allow_module_level=True)
+
+
+def _store(kiara_api: KiaraAPI, data: str, alias: str) -> None:
+
+    value = kiara_api.register_data(data, data_type="string")
+    kiara_api.store_value(value, alias=alias)
+
+
+def test_value_cache_hits(kiara_api: KiaraAPI):
+
+    _store(kiara_api, "hello", alias="greeting")
+    value_cache = values.ValueCache(kiara_api=kiara_api)
+    [cache] = value_cache.caches
+
+    value = value_cache.get_value("greeting")
+    assert value_cache.get_value(str(value.value_id)) is value
+    assert value_cache.get_value(value.value_id, load_data=True) is value
+    assert value.data == "hello"
+    assert cache.stats.misses == 1
+    assert cache.stats.hits == 2
+
+    # aliases always resolve to their current target
+    _store(kiara_api, "bye", alias="greeting")
+    assert value_cache.get_value("greeting", load_data=True).data == "bye"
+
+
+def test_value_cache_copies_stored_values(kiara_api: KiaraAPI):
+
+    _store(kiara_api, "hello", alias="greeting")
+    _store(kiara_api, "bye", alias="farewell")
+    value_cache = values.ValueCache(kiara_api=kiara_api, max_items=1)
+
+    # the data is loaded into a copy, never into the instance kiara shares
+    value = value_cache.get_value("greeting", load_data=True)
+    assert value is not kiara_api.get_value("greeting")
+    assert value.value_id == kiara_api.get_value("greeting").value_id
+    assert value.data == "hello"
+
+    # evicting drops the copy (and its data)
+    value_cache.get_value("farewell")
+    assert value_cache.get_value("greeting") is not value
+    [cache] = value_cache.caches
+    assert cache.stats.evictions == 2
+
+
+def test_value_cache_releases_kiara_data(kiara_api: KiaraAPI):
+
+    _store(kiara_api, "hello", alias="greeting")
+    _store(kiara_api, "bye", alias="farewell")
+    unstored = kiara_api.register_data("draft", data_type="string")
+    cached_data = kiara_api.context.data_registry._cached_data
+    value_cache = values.ValueCache(kiara_api=kiara_api, max_items=1)
+
+    greeting = value_cache.get_value("greeting", load_data=True)
+    assert greeting.value_id in cached_data
+
+    # evicting a stored value also drops the data kiara keeps of it
+    value_cache.get_value("farewell", load_data=True)
+    assert greeting.value_id not in cached_data
+    assert value_cache.get_value("greeting", load_data=True).data == "hello"
+
+    # ... but not of values that can't be re-loaded
+    value_cache.get_value(unstored.value_id, load_data=True)
+    value_cache.get_value("farewell")
+    assert unstored.value_id in cached_data
+    assert value_cache.get_value(unstored.value_id, load_data=True).data == "draft"
+
+
+def test_value_cache_warmup(kiara_api: KiaraAPI, tmp_path):
+
+    for i in range(3):
+        _store(kiara_api, f"value {i}", alias=f"value_{i}")
+
+    access_log_file = os.path.join(tmp_path, "access_log.json")
+    value_cache = values.ValueCache(
+        kiara_api=kiara_api, access_log_file=access_log_file
+    )
+    value_ids = [value_cache.get_value(f"value_{i}").value_id for i in range(3)]
+    assert value_cache.most_recently_accessed(2) == value_ids[:0:-1]
+    value_cache.save_access_log()
+
+    # after a restart, the most recently accessed values are pre-loaded (without counting as accessed)
+    restarted = values.ValueCache(kiara_api=kiara_api, access_log_file=access_log_file)
+    assert restarted.most_recently_accessed(2) == value_ids[:0:-1]
+    for value_id in restarted.most_recently_accessed(2):
+        assert restarted.preload(value_id, load_data=True).data
+    [cache] = restarted.caches
+    assert cache.stats.items == 2
+
+    restarted.get_value("value_2")
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+def test_value_cache_bounded_by_size(kiara_api: KiaraAPI):
+
+    _store(kiara_api, "a" * 10000, alias="large")
+    _store(kiara_api, "small", alias="small")
+    max_bytes = values.VALUE_METADATA_SIZE + 12000
+    value_cache = values.ValueCache(
+        kiara_api=kiara_api, max_items=None, max_bytes=max_bytes
+    )
+    [cache] = value_cache.caches
+
+    value_cache.get_value("large")
+    value_cache.get_value("small")
+    assert cache.stats.bytes == 2 * values.VALUE_METADATA_SIZE
+    assert cache.stats.evictions == 0
+
+    # loading the data of the large value exceeds the size bound, which evicts the least recently used (small) value
+    large = value_cache.get_value("large", load_data=True)
+    assert large.data == "a" * 10000
+    assert cache.stats.evictions == 1
+    assert cache.stats.items == 1
+    assert cache.stats.bytes == values.VALUE_METADATA_SIZE + large.value_size
+
+
+def test_value_cache_shared_across_endpoints(kiara_api: KiaraAPI):
+
+    _store(kiara_api, "hello", alias="greeting")
+    value_cache = values.ValueCache(kiara_api=kiara_api)
+
+    # e.g. the value info endpoint, and the inputs of a job
+    value = value_cache.get_value("greeting")
+    inputs = value_cache.resolve_inputs({"text": "greeting", "other": "plain"})
+    assert inputs["text"] is value
+    assert inputs["other"] == "plain"
+
+    # and the data endpoint, which loads the data into the same instance
+    assert value_cache.get_value(value.value_id, load_data=True) is value
+    [cache] = value_cache.caches
+    assert cache.stats.items == 1
+    assert cache.stats.hits == 2
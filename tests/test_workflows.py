@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the workflow listings in `kiara_plugin.service.openapi.controllers.workflows`."""
+
+import pytest
+
+from kiara.interfaces.python_api import KiaraAPI
+
+try:
+    from kiara_plugin.service.openapi.controllers import workflows
+except ImportError as e:
+    # the web framework might not be importable (e.g. with incompatible pydantic versions)
+    pytest.skip(f"Can't import service controllers: {e}", allow_module_level=True)
+
+
+@pytest.fixture
+def workflow_cache(kiara_api: KiaraAPI):
+
+    for alias in ("beta", "alpha", "alphabet"):
+        kiara_api.create_workflow(workflow_alias=alias, save=True)
+    kiara_api.create_workflow(save=True)
+
+    return workflows.WorkflowCache(kiara_api=kiara_api)
+
+
+def _aliases(cache, **matcher) -> list:
+
+    summaries = cache.find_workflow_summaries(workflows.WorkflowMatcher(**matcher))
+    return [s.aliases for s in summaries.values()]
+
+
+def test_workflow_matcher_filters(workflow_cache):
+
+    assert _aliases(workflow_cache) == [[], ["alpha"], ["alphabet"], ["beta"]]
+    assert _aliases(workflow_cache, has_alias=True) == [
+        ["alpha"],
+        ["alphabet"],
+        ["beta"],
+    ]
+    assert _aliases(workflow_cache, filters=["alpha"]) == [["alpha"], ["alphabet"]]
+    assert _aliases(workflow_cache, filters=["alpha", "bet"]) == [["alphabet"]]
+
+
+def test_workflow_matcher_pagination(workflow_cache):
+
+    assert _aliases(workflow_cache, offset=1, limit=2) == [["alpha"], ["alphabet"]]
+    assert _aliases(workflow_cache, offset=3, limit=2) == [["beta"]]
+    assert _aliases(workflow_cache, offset=10) == []
+
+
+def test_workflow_infos(workflow_cache, kiara_api: KiaraAPI):
+
+    # the default matcher lists all workflows, keyed by workflow id (like kiara's 'retrieve_workflows_info')
+    infos = workflow_cache.find_workflow_infos(workflows.WorkflowMatcher())
+    workflow_ids = kiara_api.context.workflow_registry.all_workflow_ids
+    assert sorted(infos.keys()) == sorted(str(w) for w in workflow_ids)
+
+    infos = workflow_cache.find_workflow_infos(
+        workflows.WorkflowMatcher(offset=1, limit=1)
+    )
+    assert list(infos.keys()) == [str(kiara_api.get_workflow("alpha").workflow_id)]
+
+
+def test_workflow_info_cache_by_state(workflow_cache, kiara_api: KiaraAPI, monkeypatch):
+
+    [cache] = workflow_cache.caches
+
+    info = workflow_cache.get_workflow_info("alpha")
+    assert workflow_cache.get_workflow_info("alpha") is info
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+    # a new workflow state is a new cache entry
+    registry = kiara_api.context.workflow_registry
+    metadata = registry.get_workflow_metadata(workflow="alpha")
+    changed = metadata.model_copy(update={"current_state": "new_state"})
+    monkeypatch.setattr(registry, "get_workflow_metadata", lambda workflow: changed)
+
+    updated = workflow_cache.get_workflow_info("alpha")
+    assert updated is not info
+    assert cache.stats.misses == 2
+    assert workflow_cache.get_workflow_info("alpha") is updated
+
+
+def test_workflow_info_cache_by_aliases(workflow_cache, kiara_api: KiaraAPI):
+
+    [cache] = workflow_cache.caches
+    workflow_id = kiara_api.get_workflow("beta").workflow_id
+
+    info = workflow_cache.get_workflow_info(workflow_id)
+    assert workflow_cache.get_workflow_info(workflow_id) is info
+
+    kiara_api.context.workflow_registry.unregister_alias("beta")
+    assert workflow_cache.get_workflow_info(workflow_id) is not info
+    assert cache.stats.misses == 2